@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 import aiofiles
+from database.analytics import GameAnalytics
 from utils.enhanced_logging import get_bot_logger
 
 logger = get_bot_logger()
@@ -77,6 +78,7 @@ class EconomicCacheSystem:
         self.weather_cache: List[WeatherSnapshot] = []
         self.activity_cache: List[PlayerActivitySnapshot] = []
         self.market_cache: List[MarketSnapshot] = []
+        self._analytics: Optional[GameAnalytics] = None
         
         # Cache settings
         self.cache_intervals = {
@@ -115,27 +117,21 @@ class EconomicCacheSystem:
                 current_time - self.last_updates['economic'] < self.cache_intervals['economic']):
                 return self.economic_cache[-1] if self.economic_cache else None
             
-            # Collect economic data
-            all_users = await database.get_all_users()
+            # Collect economic data (SQL aggregate, không load toàn bộ users)
+            if self._analytics is None or self._analytics.db is not database:
+                self._analytics = GameAnalytics(database)
+            stats = await self._analytics.collect_user_stats(current_time)
             
-            # Basic statistics
-            total_players = len(all_users)
-            active_cutoff = current_time - timedelta(hours=24)
-            active_players = sum(1 for user in all_users 
-                               if user.get('last_seen', current_time) > active_cutoff)
-            
-            # Money analysis
-            money_amounts = [user.get('money', 0) for user in all_users]
-            total_money = sum(money_amounts)
-            avg_money = total_money / total_players if total_players > 0 else 0
-            median_money = self._calculate_median(money_amounts)
-            
-            # Money distribution analysis
-            money_distribution = self._analyze_money_distribution(money_amounts)
-            top_10_share = self._calculate_top_percent_share(money_amounts, 0.1)
+            total_players = stats.total_players
+            active_players = stats.active_24hour
+            total_money = stats.total_money
+            avg_money = stats.average_money
+            median_money = stats.median_money
+            money_distribution = stats.money_distribution
+            top_10_share = stats.top_10_percent_share
             
             # Economic health metrics
-            inflation_rate = await self._calculate_inflation_rate()
+            inflation_rate = await self._calculate_inflation_rate(database)
             health_score = self._calculate_economic_health_score(
                 money_distribution, inflation_rate, active_players, total_players
             )
@@ -340,53 +336,9 @@ class EconomicCacheSystem:
         if len(cache_list) > self.max_snapshots:
             cache_list[:] = cache_list[-self.max_snapshots:]
     
-    def _calculate_median(self, values: List[float]) -> float:
-        """Tính median"""
-        if not values:
-            return 0.0
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        if n % 2 == 0:
-            return (sorted_values[n//2-1] + sorted_values[n//2]) / 2
-        return sorted_values[n//2]
-    
-    def _analyze_money_distribution(self, money_amounts: List[int]) -> Dict[str, int]:
-        """Phân tích phân bổ tiền"""
-        distribution = {
-            '0-1k': 0,
-            '1k-10k': 0, 
-            '10k-100k': 0,
-            '100k+': 0
-        }
-        
-        for amount in money_amounts:
-            if amount < 1000:
-                distribution['0-1k'] += 1
-            elif amount < 10000:
-                distribution['1k-10k'] += 1
-            elif amount < 100000:
-                distribution['10k-100k'] += 1
-            else:
-                distribution['100k+'] += 1
-        
-        return distribution
-    
-    def _calculate_top_percent_share(self, money_amounts: List[int], percent: float) -> float:
-        """Tính phần trăm tiền mà top X% player sở hữu"""
-        if not money_amounts:
-            return 0.0
-        
-        sorted_amounts = sorted(money_amounts, reverse=True)
-        top_count = max(1, int(len(sorted_amounts) * percent))
-        top_money = sum(sorted_amounts[:top_count])
-        total_money = sum(money_amounts)
-        
-        return top_money / total_money if total_money > 0 else 0.0
-    
-    async def _calculate_inflation_rate(self) -> float:
-        """Tính tỷ lệ lạm phát (placeholder)"""
-        # Would compare current prices vs historical prices
-        return 0.05  # 5% placeholder
+    async def _calculate_inflation_rate(self, database) -> float:
+        """Tính tỷ lệ lạm phát - tăng trưởng tiền lưu hành 24h từ money-delta stream"""
+        return database.economy.inflation_rate()
     
     def _calculate_economic_health_score(self, distribution: Dict, inflation: float, 
                                        active: int, total: int) -> float:
@@ -10,6 +10,8 @@ import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from ai.gemini_transport import gemini_transport, GeminiTimeoutError
+
 try:
     from google import genai
     from google.genai import types
@@ -22,11 +24,19 @@ logger = logging.getLogger(__name__)
 class GeminiClient:
     """Client cho Gemini API sử dụng google-genai SDK"""
     
-    def __init__(self, api_key: str, model: str = "gemini-2.5-pro"):
+    def __init__(self, api_key: str, model: str = "gemini-2.5-pro", sdk_client=None):
         self.api_key = api_key
         self.model = model
         self.client = None
         self.initialized = False
+        self.last_error = None  # 'quota' | 'timeout' | 'error' | None
+        self.token_usage = {"prompt_tokens": 0, "output_tokens": 0, "thinking_tokens": 0}
+        
+        if sdk_client is not None:
+            # Backend thay thế (vd: ai.gemini_fake_backend để benchmark offline)
+            self.client = sdk_client
+            self.initialized = True
+            return
         
         if not GEMINI_AVAILABLE:
             logger.error("❌ google-genai package not available")
@@ -40,64 +50,114 @@ class GeminiClient:
         except Exception as e:
             logger.error(f"❌ Failed to initialize Gemini client: {e}")
     
+    def _stream_generate(self, contents, config, cancel_token=None):
+        """Đọc stream từ SDK (chạy trong worker thread của gemini_transport)
+        
+        Returns:
+            (response_text, usage_metadata của chunk cuối hoặc None)
+        """
+        response_text = ""
+        usage = None
+        stream = self.client.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=config,
+        )
+        try:
+            for chunk in stream:
+                if cancel_token is not None and cancel_token.cancelled:
+                    break  # Hết deadline / bị hủy - ngừng đọc stream
+                if chunk.text:
+                    response_text += chunk.text
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+        return response_text, usage
+    
+    def _record_usage(self, usage):
+        """Cộng dồn token từ usage_metadata"""
+        if usage is None:
+            return
+        self.token_usage["prompt_tokens"] += getattr(usage, 'prompt_token_count', 0) or 0
+        self.token_usage["output_tokens"] += getattr(usage, 'candidates_token_count', 0) or 0
+        self.token_usage["thinking_tokens"] += getattr(usage, 'thoughts_token_count', 0) or 0
+    
+    @staticmethod
+    def _build_request(prompt: str, system_message: Optional[str], response_format: str, use_thinking: bool):
+        """(contents, config) cho generate_content_stream"""
+        texts = []
+        if system_message:
+            texts.append(f"System: {system_message}\n\n")
+        texts.append(prompt)
+        
+        if not GEMINI_AVAILABLE:
+            # Không có SDK (chỉ xảy ra với backend thay thế) -> dùng dict cùng cấu trúc
+            contents = [{"role": "user", "parts": [{"text": text} for text in texts]}]
+            config = {"response_mime_type": response_format}
+            if use_thinking:
+                config["thinking_config"] = {"thinking_budget": -1}
+            return contents, config
+        
+        contents = [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=text) for text in texts],
+            ),
+        ]
+        
+        # Configure generation
+        config = types.GenerateContentConfig(
+            response_mime_type=response_format,
+        )
+        
+        # Add thinking config if enabled (for complex reasoning)
+        if use_thinking:
+            config.thinking_config = types.ThinkingConfig(
+                thinking_budget=-1,  # Unlimited thinking budget
+            )
+        return contents, config
+    
     async def generate_response(self, 
                               prompt: str, 
                               system_message: str = None,
                               response_format: str = "text/plain",
-                              use_thinking: bool = True) -> Optional[str]:
-        """Generate response từ Gemini"""
+                              use_thinking: bool = True,
+                              timeout: Optional[float] = None) -> Optional[str]:
+        """Generate response từ Gemini (SDK chạy ngoài event loop, có deadline)"""
         if not self.initialized:
             logger.error("❌ Gemini client not initialized")
             return None
         
         try:
-            # Prepare content
-            parts = []
-            
-            # Add system message if provided
-            if system_message:
-                parts.append(types.Part.from_text(text=f"System: {system_message}\n\n"))
-            
-            # Add main prompt
-            parts.append(types.Part.from_text(text=prompt))
-            
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=parts,
-                ),
-            ]
-            
-            # Configure generation
-            config = types.GenerateContentConfig(
-                response_mime_type=response_format,
-            )
-            
-            # Add thinking config if enabled (for complex reasoning)
-            if use_thinking:
-                config.thinking_config = types.ThinkingConfig(
-                    thinking_budget=-1,  # Unlimited thinking budget
-                )
+            # Prepare content + generation config
+            contents, config = self._build_request(prompt, system_message, response_format, use_thinking)
             
             # Generate response
             logger.info("🤖 Sending request to Gemini...")
             
-            # Use streaming for better performance
-            response_text = ""
-            for chunk in self.client.models.generate_content_stream(
-                model=self.model,
-                contents=contents,
-                config=config,
-            ):
-                if chunk.text:
-                    response_text += chunk.text
+            # Streaming chạy trong thread pool - không block event loop
+            if timeout is None:
+                timeout = gemini_transport.get_timeout(use_thinking)
+            response_text, usage = await gemini_transport.run(
+                self._stream_generate, contents, config, timeout=timeout
+            )
+            self._record_usage(usage)
+            self.last_error = None
             
             logger.info(f"✅ Gemini response received ({len(response_text)} chars)")
             return response_text.strip()
             
+        except GeminiTimeoutError as e:
+            self.last_error = "timeout"
+            logger.warning(f"⏱️ {e}")
+            return None
         except Exception as e:
             error_str = str(e)
+            self.last_error = "error"
             if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+                self.last_error = "quota"
                 logger.warning(f"⚠️ Gemini quota exceeded, will retry later: {e}")
             else:
                 logger.error(f"❌ Gemini API error: {e}")
@@ -106,13 +166,15 @@ class GeminiClient:
     async def generate_json_response(self, 
                                    prompt: str, 
                                    system_message: str = None,
-                                   use_thinking: bool = True) -> Optional[Dict[str, Any]]:
+                                   use_thinking: bool = True,
+                                   timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Generate JSON response từ Gemini"""
         response = await self.generate_response(
             prompt=prompt,
             system_message=system_message,
             response_format="application/json",
-            use_thinking=use_thinking
+            use_thinking=use_thinking,
+            timeout=timeout
         )
         
         if not response:
@@ -128,7 +190,7 @@ class GeminiClient:
     
     def is_available(self) -> bool:
         """Check if Gemini client is available and initialized"""
-        return GEMINI_AVAILABLE and self.initialized
+        return self.initialized
 
 class GeminiManager:
     """Manager for multiple Gemini clients với failover"""
@@ -139,8 +201,10 @@ class GeminiManager:
         self.current_client_key = None
         self.request_count = {}
         self.config = {}
+        self.backend = "genai"
         
         self.load_config()
+        gemini_transport.configure(self.config.get("transport"))
         self.initialize_clients()
     
     def load_config(self):
@@ -207,17 +271,31 @@ class GeminiManager:
             logger.warning("⚠️ No Gemini API config found")
             return
         
+        # Backend: "genai" (mặc định) hoặc "fake" (ai/gemini_fake_backend.py, benchmark offline)
+        self.backend = os.environ.get("GEMINI_BACKEND") or self.config.get("backend", "genai")
+        if self.backend == "fake":
+            from ai.gemini_fake_backend import create_fake_sdk_client
+            logger.warning("🧪 Using fake Gemini backend - responses are simulated")
+        
         for key, api_config in self.config["gemini_apis"].items():
             if not api_config.get("enabled", True):  # Default enabled = True
                 logger.info(f"⏸️ Gemini client '{key}' disabled in config")
                 continue
             
+            model = api_config.get("model", "gemini-2.5-pro")
+            if self.backend == "fake":
+                sdk_client = create_fake_sdk_client(self.config.get("fake_backend"), key)
+                self.clients[key] = GeminiClient(api_config.get("api_key", ""), model, sdk_client=sdk_client)
+                self.request_count[key] = 0
+                if not self.current_client_key:
+                    self.current_client_key = key
+                continue
+            
             api_key = api_config.get("api_key", "")
             if not api_key or api_key in ["your_api_key_here", "your_secondary_key", "your_backup_key"]:
                 logger.warning(f"⚠️ Invalid API key for '{key}': {api_key[:10] if api_key else 'None'}...")
                 continue
                 
-            model = api_config.get("model", "gemini-2.5-pro")
             logger.info(f"🔧 Initializing Gemini client '{key}' with model '{model}'...")
             
             client = GeminiClient(api_key, model)
@@ -260,20 +338,32 @@ class GeminiManager:
         """Generate response với auto-failover"""
         max_attempts = self.config.get("retry", {}).get("max_attempts", 3)
         delay = self.config.get("retry", {}).get("delay", 1.0)
+        deadline = self._get_deadline(kwargs)
         
         for attempt in range(max_attempts):
             client = self.get_current_client()
             if not client:
                 logger.error("❌ No Gemini clients available")
                 return None
+            client_key = self.current_client_key
+            
+            kwargs["timeout"] = self._remaining(deadline)
+            if kwargs["timeout"] <= 0:
+                break
             
             try:
                 response = await client.generate_response(prompt, **kwargs)
                 if response:
                     # Track usage
-                    self.request_count[self.current_client_key] += 1
+                    self.request_count[client_key] += 1
                     return response
                 
+                if client.last_error == "quota":
+                    # 429 / RESOURCE_EXHAUSTED -> chuyển sang key khác
+                    self._rotate_client()
+                    if attempt < max_attempts - 1:
+                        await asyncio.sleep(delay)
+                
             except Exception as e:
                 logger.error(f"❌ Attempt {attempt + 1} failed: {e}")
                 
@@ -290,20 +380,32 @@ class GeminiManager:
         """Generate JSON response với auto-failover"""
         max_attempts = self.config.get("retry", {}).get("max_attempts", 3)
         delay = self.config.get("retry", {}).get("delay", 1.0)
+        deadline = self._get_deadline(kwargs)
         
         for attempt in range(max_attempts):
             client = self.get_current_client()
             if not client:
                 logger.error("❌ No Gemini clients available")
                 return None
+            client_key = self.current_client_key
+            
+            kwargs["timeout"] = self._remaining(deadline)
+            if kwargs["timeout"] <= 0:
+                break
             
             try:
                 response = await client.generate_json_response(prompt, **kwargs)
                 if response:
                     # Track usage
-                    self.request_count[self.current_client_key] += 1
+                    self.request_count[client_key] += 1
                     return response
                 
+                if client.last_error == "quota":
+                    # 429 / RESOURCE_EXHAUSTED -> chuyển sang key khác
+                    self._rotate_client()
+                    if attempt < max_attempts - 1:
+                        await asyncio.sleep(delay)
+                
             except Exception as e:
                 logger.error(f"❌ Attempt {attempt + 1} failed: {e}")
                 
@@ -316,6 +418,18 @@ class GeminiManager:
         logger.error("❌ All Gemini clients failed")
         return None
     
+    @staticmethod
+    def _get_deadline(kwargs: Dict[str, Any]) -> float:
+        """Deadline chung cho mọi lần retry (timeout=... hoặc mặc định của transport)"""
+        timeout = kwargs.pop("timeout", None)
+        if timeout is None:
+            timeout = gemini_transport.get_timeout(kwargs.get("use_thinking", True))
+        return asyncio.get_running_loop().time() + timeout
+    
+    @staticmethod
+    def _remaining(deadline: float) -> float:
+        return deadline - asyncio.get_running_loop().time()
+    
     def _rotate_client(self):
         """Rotate to next available client"""
         if len(self.clients) <= 1:
@@ -328,13 +442,20 @@ class GeminiManager:
         self.current_client_key = keys[next_index]
         logger.info(f"🔄 Rotated to client: {self.current_client_key}")
     
+    def is_available(self) -> bool:
+        """Có ít nhất một client (SDK thật hoặc backend thay thế)"""
+        return bool(self.clients)
+    
     def get_status(self) -> Dict[str, Any]:
         """Get manager status"""
         return {
             "available_clients": len(self.clients),
             "current_client": self.current_client_key,
             "request_counts": self.request_count.copy(),
-            "gemini_sdk_available": GEMINI_AVAILABLE
+            "gemini_sdk_available": GEMINI_AVAILABLE,
+            "backend": self.backend,
+            "token_usage": {key: client.token_usage.copy() for key, client in self.clients.items()},
+            "transport": gemini_transport.get_stats()
         }
 
 # Global instance
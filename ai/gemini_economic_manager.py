@@ -5,17 +5,19 @@ Gemini Economic Manager - Cân bằng kinh tế game thông qua Gemini AI
 
 import asyncio
 import json
-import os
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
-import aiohttp
+from ai.gemini_client import get_gemini_manager
 from database.database import Database
 from utils.enhanced_logging import get_bot_logger
 
 logger = get_bot_logger()
 
+# Nguồn tiền tính là giao dịch thị trường (bán nông sản, shop, chuồng, ao)
+MARKET_SOURCES = ('market', 'shop', 'barn', 'pond')
+
 @dataclass
 class GameEconomicData:
     """Dữ liệu kinh tế game cho cache"""
@@ -84,13 +86,12 @@ class GeminiEconomicManager:
     Thay thế AI local để cân bằng kinh tế thông qua cache data
     """
     
-    def __init__(self, database: Database, api_key: str = None):
+    def __init__(self, database: Database):
         self.db = database
-        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         self.cache = EconomicCache(cache_duration_minutes=30)
         
-        # Gemini API endpoint
-        self.gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={self.api_key}"
+        # Gọi Gemini qua GeminiManager dùng chung (failover key, deadline, fake backend)
+        self.gemini_manager = get_gemini_manager()
         
         # Economic thresholds
         self.economic_thresholds = {
@@ -141,7 +142,7 @@ class GeminiEconomicManager:
             weather_type = 'sunny'  # Default
             weather_modifier = 1.0
             
-            # Market activity (placeholder - would track actual sales)
+            # Market activity (giao dịch 24h từ money_ledger)
             market_activity = await self._get_market_activity()
             
             # Economic health metrics
@@ -179,33 +180,23 @@ class GeminiEconomicManager:
     async def analyze_economy_with_gemini(self, economic_data: GameEconomicData) -> Optional[GeminiEconomicDecision]:
         """Phân tích kinh tế bằng Gemini AI"""
         try:
-            if not self.api_key:
-                logger.warning("⚠️ No Gemini API key, using mock decision")
+            if not self.gemini_manager.is_available():
+                logger.warning("⚠️ No Gemini backend available, using mock decision")
                 return self._get_mock_decision(economic_data)
             
             # Prepare data for Gemini
             analysis_prompt = self._create_gemini_prompt(economic_data)
             
-            # Call Gemini API
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "contents": [{
-                        "parts": [{"text": analysis_prompt}]
-                    }]
-                }
-                
-                async with session.post(self.gemini_url, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        gemini_response = result['candidates'][0]['content']['parts'][0]['text']
-                        
-                        # Parse Gemini response
-                        decision = self._parse_gemini_response(gemini_response)
-                        logger.info(f"🤖 Gemini decision: {decision.action_type} - {decision.reasoning}")
-                        return decision
-                    else:
-                        logger.error(f"Gemini API error: {response.status}")
-                        return self._get_mock_decision(economic_data)
+            # Call Gemini qua GeminiManager
+            response = await self.gemini_manager.generate_json_response(analysis_prompt)
+            if not response:
+                logger.error("❌ No response from Gemini")
+                return self._get_mock_decision(economic_data)
+            
+            # Parse Gemini response
+            decision = self._parse_gemini_response(response)
+            logger.info(f"🤖 Gemini decision: {decision.action_type} - {decision.reasoning}")
+            return decision
             
         except Exception as e:
             logger.error(f"Error analyzing with Gemini: {e}")
@@ -249,15 +240,18 @@ YÊU CẦU:
 Chỉ cần trả lời JSON, không cần giải thích thêm.
 """
     
-    def _parse_gemini_response(self, response: str) -> GeminiEconomicDecision:
-        """Parse phản hồi từ Gemini thành decision object"""
+    def _parse_gemini_response(self, response: Any) -> GeminiEconomicDecision:
+        """Parse phản hồi từ Gemini (dict JSON hoặc text) thành decision object"""
         try:
-            # Extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                decision_data = json.loads(json_match.group())
-                
+            decision_data = response if isinstance(response, dict) else None
+            if decision_data is None:
+                # Extract JSON from response
+                import re
+                json_match = re.search(r'\{.*\}', response, re.DOTALL)
+                if json_match:
+                    decision_data = json.loads(json_match.group())
+            
+            if decision_data:
                 return GeminiEconomicDecision(
                     action_type=decision_data.get('action_type', 'no_action'),
                     reasoning=decision_data.get('reasoning', 'No reasoning provided'),
@@ -347,18 +341,28 @@ Chỉ cần trả lời JSON, không cần giải thích thêm.
         return sorted_values[n//2]
     
     async def _get_market_activity(self) -> Dict[str, int]:
-        """Lấy hoạt động thị trường (placeholder)"""
-        # TODO: Implement actual market tracking
+        """Lấy hoạt động thị trường 24h (từ money_ledger)"""
+        try:
+            since = int(time.time()) - 24 * 3600
+            activity = await self.db.get_money_activity(since, list(MARKET_SOURCES))
+        except Exception as e:
+            logger.error(f"Error reading market activity: {e}")
+            activity = {}
+        
+        total_transactions = sum(flows['events'] for flows in activity.values())
+        total_volume = sum(flows['inflow'] + flows['outflow'] for flows in activity.values())
         return {
-            "crop_sales_24h": 150,
-            "total_transactions": 300,
-            "average_transaction_value": 2500
+            "crop_sales_24h": activity.get('market', {}).get('events', 0),
+            "total_transactions": total_transactions,
+            "average_transaction_value": total_volume // total_transactions if total_transactions else 0
         }
     
     async def _calculate_inflation_rate(self) -> float:
-        """Tính tỷ lệ lạm phát (placeholder)"""
-        # TODO: Implement actual inflation calculation based on price history
-        return 0.05  # 5% default
+        """Tính tỷ lệ lạm phát - tăng trưởng tiền lưu hành 24h từ money-delta stream"""
+        try:
+            return self.db.economy.inflation_rate()
+        except Exception:
+            return 0.0
     
     def _calculate_economic_health(self, distribution: Dict, inflation: float, 
                                  active: int, total: int) -> float:
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Gemini Fake Backend - SDK giả lập chạy local để benchmark offline
+Thay thế genai.Client trong GeminiClient (cùng interface
+client.models.generate_content_stream), nên request vẫn đi qua toàn bộ
+pipeline thật: GeminiManager (retry / _rotate_client) -> GeminiClient ->
+gemini_transport (thread pool, deadline, semaphore).
+
+Hỗ trợ:
+- Phân phối latency cấu hình được (fixed / uniform / normal / lognormal), có seed
+- Inject lỗi 429 RESOURCE_EXHAUSTED (ngẫu nhiên hoặc theo quota cửa sổ thời gian)
+- Đếm token (prompt / output / thinking) qua usage_metadata giống SDK
+- Trả về decision JSON đúng schema của prompt (đọc action_type từ prompt)
+
+Bật bằng GEMINI_BACKEND=fake hoặc "backend": "fake" trong gemini_config.json:
+    "fake_backend": {
+        "seed": 42,
+        "latency": {"distribution": "lognormal", "mean_ms": 800, "stddev_ms": 400},
+        "thinking_multiplier": 3.0,
+        "error_rate": 0.05,
+        "quota_per_window": 60, "quota_window_seconds": 60,
+        "clients": {"primary": {"error_rate": 0.5}}
+    }
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_FAKE_SETTINGS = {
+    "seed": 0,
+    "latency": {"distribution": "lognormal", "mean_ms": 800, "stddev_ms": 400,
+                "min_ms": 50, "max_ms": 30000},
+    "thinking_multiplier": 3.0,
+    "error_rate": 0.0,
+    "server_error_rate": 0.0,
+    "quota_per_window": 0,        # 0 = không giới hạn
+    "quota_window_seconds": 60,
+    "chunk_count": 3,
+}
+
+WEATHER_TYPES = ["sunny", "rainy", "cloudy"]  # Có trong schema của mọi prompt
+CROP_TYPES = ["all", "carrot", "wheat"]
+
+
+class FakeResourceExhausted(Exception):
+    """429 giả lập (message giống SDK để code xử lý quota nhận ra)"""
+
+
+class FakeServerError(Exception):
+    """500 giả lập"""
+
+
+def _estimate_tokens(text: str) -> int:
+    """Ước lượng token (~4 ký tự / token)"""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def _get(obj, name: str, default=None):
+    """Đọc field từ object SDK (types.*) hoặc dict"""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+class FakeGeminiModels:
+    """Giả lập client.models của google-genai"""
+
+    def __init__(self, settings: Dict[str, Any], name: str):
+        self.settings = settings
+        self.name = name
+        seed = settings.get("seed", 0)
+        # Seed riêng mỗi client để các key có chuỗi ngẫu nhiên khác nhau nhưng vẫn tái lập được
+        self._rng = random.Random(f"{seed}:{name}")
+        self._lock = threading.Lock()
+        self._window = deque()
+        self.stats = {
+            "requests": 0,
+            "responses": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "thinking_tokens": 0,
+            "simulated_latency_ms": 0.0,
+        }
+
+    # ---------- Randomness ----------
+
+    def _sample_latency(self, thinking: bool) -> float:
+        """Latency (giây) theo phân phối cấu hình"""
+        latency = self.settings.get("latency", {})
+        distribution = latency.get("distribution", "lognormal")
+        mean = float(latency.get("mean_ms", 800))
+        stddev = float(latency.get("stddev_ms", 0))
+
+        with self._lock:
+            if distribution == "fixed" or stddev <= 0:
+                value = mean
+            elif distribution == "uniform":
+                value = self._rng.uniform(mean - stddev, mean + stddev)
+            elif distribution == "normal":
+                value = self._rng.gauss(mean, stddev)
+            else:
+                # lognormal với mean/stddev cho trước (đuôi dài như API thật)
+                sigma2 = math.log(1 + (stddev / mean) ** 2)
+                value = self._rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+
+        if thinking:
+            value *= float(self.settings.get("thinking_multiplier", 1.0))
+        value = min(max(value, float(latency.get("min_ms", 0))), float(latency.get("max_ms", 60000)))
+        return value / 1000.0
+
+    def _check_errors(self):
+        """Inject 429 / 500 theo cấu hình"""
+        with self._lock:
+            self.stats["requests"] += 1
+
+            quota = int(self.settings.get("quota_per_window", 0))
+            if quota > 0:
+                now = time.monotonic()
+                window = float(self.settings.get("quota_window_seconds", 60))
+                while self._window and now - self._window[0] > window:
+                    self._window.popleft()
+                if len(self._window) >= quota:
+                    self.stats["rate_limited"] += 1
+                    raise FakeResourceExhausted(
+                        f"429 RESOURCE_EXHAUSTED. Quota exceeded ({quota} requests / {window:g}s) [fake:{self.name}]"
+                    )
+                self._window.append(now)
+
+            roll = self._rng.random()
+            if roll < float(self.settings.get("error_rate", 0.0)):
+                self.stats["rate_limited"] += 1
+                raise FakeResourceExhausted(f"429 RESOURCE_EXHAUSTED. Resource has been exhausted [fake:{self.name}]")
+            if roll < float(self.settings.get("error_rate", 0.0)) + float(self.settings.get("server_error_rate", 0.0)):
+                self.stats["server_errors"] += 1
+                raise FakeServerError(f"500 INTERNAL. An internal error has occurred [fake:{self.name}]")
+
+    # ---------- Response ----------
+
+    def _build_decision(self, prompt: str) -> Dict[str, Any]:
+        """Decision JSON theo schema trong prompt"""
+        options = ["no_action"]
+        match = re.search(r'"action_type":\s*"\[?([A-Za-z_/|]+)\]?"', prompt)
+        if match:
+            options = [option for option in re.split(r"[/|]", match.group(1)) if option]
+
+        priorities = ["low", "medium", "high"]
+        match = re.search(r'"priority":\s*"([a-z/|]+)"', prompt)
+        if match:
+            priorities = [p for p in re.split(r"[/|]", match.group(1)) if p in ("low", "medium", "high")] or priorities
+
+        with self._lock:
+            action_type = self._rng.choice(options)
+            priority = self._rng.choice(priorities)
+            confidence = round(self._rng.uniform(0.6, 0.95), 2)
+            modifier = round(self._rng.uniform(0.85, 1.25), 2)
+            weather_type = self._rng.choice(WEATHER_TYPES)
+            crop_type = self._rng.choice(CROP_TYPES)
+            duration = self._rng.choice([1, 2, 4])
+
+        action = action_type.lower()
+        if "weather" in action:
+            parameters = {"weather_type": weather_type, "specific_action": weather_type,
+                          "modifier": modifier, "duration_hours": duration}
+        elif "event" in action:
+            parameters = {"event_type": "bonus", "name": "Fake Event", "event_name": "Fake Event",
+                          "description": "Sự kiện giả lập (benchmark)", "effect_type": "yield_bonus",
+                          "effect_value": modifier, "rewards": {"money": 1000}, "duration_hours": duration}
+        elif "price" in action or "market" in action:
+            parameters = {"crop_type": crop_type, "sell_price_modifier": modifier,
+                          "seed_price_modifier": round(2 - modifier, 2), "duration_hours": duration}
+        elif "reward" in action:
+            parameters = {"reward_type": "money", "amount": 1000, "duration_hours": duration}
+        elif "economy" in action or "intervention" in action:
+            parameters = {"redistribution_type": "universal_basic", "amount": 1000, "duration_hours": duration}
+        else:
+            parameters = {}
+
+        return {
+            "analysis": "Phân tích giả lập từ fake backend",
+            "action_type": action_type,
+            "reasoning": f"Fake decision ({self.name})",
+            "confidence": confidence,
+            "parameters": parameters,
+            "expected_impact": "Không có (benchmark)",
+            "priority": priority,
+            "affected_users": [],
+            "execution_time": "immediate",
+            "duration": "1_hour",
+            "duration_hours": duration,
+        }
+
+    @staticmethod
+    def _extract_prompt(contents) -> str:
+        texts = []
+        for content in contents or []:
+            for part in _get(content, "parts", []) or []:
+                text = _get(part, "text")
+                if text:
+                    texts.append(text)
+        return "".join(texts)
+
+    def generate_content_stream(self, model: str, contents, config=None) -> Iterator[SimpleNamespace]:
+        """Giống SDK: iterator các chunk có .text, chunk cuối có usage_metadata"""
+        self._check_errors()
+
+        prompt = self._extract_prompt(contents)
+        thinking = _get(config, "thinking_config") is not None
+        latency = self._sample_latency(thinking)
+
+        response_text = json.dumps(self._build_decision(prompt), ensure_ascii=False)
+        prompt_tokens = _estimate_tokens(prompt)
+        output_tokens = _estimate_tokens(response_text)
+        thinking_tokens = output_tokens * 4 if thinking else 0
+
+        with self._lock:
+            self.stats["responses"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["output_tokens"] += output_tokens
+            self.stats["thinking_tokens"] += thinking_tokens
+            self.stats["simulated_latency_ms"] += latency * 1000
+
+        chunk_count = max(1, int(self.settings.get("chunk_count", 3)))
+        chunk_size = math.ceil(len(response_text) / chunk_count)
+        chunks = [response_text[i:i + chunk_size] for i in range(0, len(response_text), chunk_size)]
+
+        # ~80% latency trước chunk đầu (thinking), phần còn lại rải giữa các chunk
+        time.sleep(latency * 0.8)
+        for index, text in enumerate(chunks):
+            if index:
+                time.sleep(latency * 0.2 / max(1, len(chunks) - 1))
+            usage = None
+            if index == len(chunks) - 1:
+                usage = SimpleNamespace(
+                    prompt_token_count=prompt_tokens,
+                    candidates_token_count=output_tokens,
+                    thoughts_token_count=thinking_tokens,
+                    total_token_count=prompt_tokens + output_tokens + thinking_tokens,
+                )
+            yield SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeGenAIClient:
+    """Thay cho genai.Client(api_key=...)"""
+
+    def __init__(self, settings: Dict[str, Any], name: str = "fake"):
+        self.models = FakeGeminiModels(settings, name)
+
+
+def build_fake_settings(config: Optional[Dict[str, Any]], client_key: str) -> Dict[str, Any]:
+    """Gộp default + fake_backend + override theo client key"""
+    config = config or {}
+    settings = json.loads(json.dumps(DEFAULT_FAKE_SETTINGS))
+    for source in (config, config.get("clients", {}).get(client_key, {})):
+        for key, value in source.items():
+            if key == "clients":
+                continue
+            if isinstance(value, dict) and isinstance(settings.get(key), dict):
+                settings[key].update(value)
+            else:
+                settings[key] = value
+    return settings
+
+
+def create_fake_sdk_client(config: Optional[Dict[str, Any]], client_key: str) -> FakeGenAIClient:
+    """SDK client giả lập cho một key trong gemini_apis"""
+    return FakeGenAIClient(build_fake_settings(config, client_key), client_key)
+
+
+if __name__ == "__main__":
+    # Benchmark: N request đồng thời qua GeminiManager với fake backend
+    import asyncio
+    import os
+    import sys
+    import tempfile
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from ai.gemini_client import GeminiManager
+    from ai.gemini_transport import gemini_transport
+
+    async def _benchmark(requests: int = 50):
+        config = {
+            "backend": "fake",
+            "gemini_apis": {
+                "primary": {"api_key": "fake", "model": "fake-model"},
+                "secondary": {"api_key": "fake", "model": "fake-model"},
+            },
+            "retry": {"max_attempts": 3, "delay": 0.1},
+            "transport": {"max_concurrency": 4, "timeout_seconds": 10, "thinking_timeout_seconds": 10},
+            "fake_backend": {
+                "seed": 42,
+                "latency": {"distribution": "lognormal", "mean_ms": 200, "stddev_ms": 100},
+                "thinking_multiplier": 1.5,
+                "clients": {"primary": {"error_rate": 0.3}},
+            },
+        }
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(config, f)
+        manager = GeminiManager(config_path=f.name)
+        os.unlink(f.name)
+
+        prompt = 'RESPONSE FORMAT (JSON): {"action_type": "weather_change|event_trigger|no_action"}'
+        started = time.monotonic()
+        results: List[Any] = await asyncio.gather(
+            *(manager.generate_json_response(prompt, use_thinking=True) for _ in range(requests))
+        )
+        elapsed = time.monotonic() - started
+
+        print(f"✅ {sum(1 for r in results if r)}/{requests} decisions in {elapsed:.2f}s")
+        print(f"🚦 Transport: {gemini_transport.get_stats()}")
+        print(f"📊 Manager: {json.dumps(manager.get_status(), default=str, indent=2)}")
+        for key, client in manager.clients.items():
+            print(f"🧪 {key}: {client.client.models.stats}")
+
+    asyncio.run(_benchmark())
@@ -14,6 +14,7 @@ from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 import aiofiles
 from database.database import Database
+from database.analytics import GameAnalytics
 from utils.enhanced_logging import get_bot_logger
 from ai.gemini_client import get_gemini_manager, GEMINI_AVAILABLE
 import discord
@@ -21,6 +22,9 @@ from ai.smart_decision_cache import SmartDecisionCache
 
 logger = get_bot_logger()
 
+# Subsystem trong money_ledger được tính là giao dịch thị trường
+MARKET_SOURCES = ('market', 'shop', 'barn', 'pond')
+
 @dataclass
 class GameMasterDecision:
     """Quyết định từ Gemini Game Master"""
@@ -88,6 +92,7 @@ class GeminiGameMaster:
     
     def __init__(self, database: Database):
         self.db = database
+        self.analytics = GameAnalytics(database)
         self.gemini_manager = get_gemini_manager()
         
         # Game Master Config
@@ -248,7 +253,7 @@ Luôn trả về JSON với format:
             
             # Get Gemini response
             gemini_manager = get_gemini_manager()
-            response = await gemini_manager.call_gemini_json(full_prompt)
+            response = await gemini_manager.generate_json_response(full_prompt)
             
             if not response:
                 logger.error("❌ No response from Gemini")
@@ -429,50 +434,47 @@ Quyết định cần thiết nhất cho tình hình hiện tại?
     async def initialize_tracking_systems(self):
         """Khởi tạo hệ thống theo dõi"""
         try:
-            # Ensure database connection
-            conn = await self.db.get_connection()
-            
-            # Tạo tables theo dõi nếu chưa có
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS game_master_decisions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    decision_id TEXT UNIQUE,
-                    action_type TEXT,
-                    reasoning TEXT,
-                    confidence REAL,
-                    parameters TEXT,
-                    execution_time TEXT,
-                    priority TEXT,
-                    affected_users TEXT,
-                    created_at TEXT,
-                    executed BOOLEAN DEFAULT FALSE
-                )
-            """)
-            
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS game_state_snapshots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT,
-                    snapshot_data TEXT,
-                    health_score REAL,
-                    created_at TEXT
-                )
-            """)
-            
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS user_behavior_tracking (
-                    user_id INTEGER,
-                    activity_pattern TEXT,
-                    last_active TEXT,
-                    engagement_score REAL,
-                    spending_pattern TEXT,
-                    farming_efficiency REAL,
-                    updated_at TEXT,
-                    PRIMARY KEY (user_id)
-                )
-            """)
+            async with self.db.transaction() as conn:
+                # Tạo tables theo dõi nếu chưa có
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS game_master_decisions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        decision_id TEXT UNIQUE,
+                        action_type TEXT,
+                        reasoning TEXT,
+                        confidence REAL,
+                        parameters TEXT,
+                        execution_time TEXT,
+                        priority TEXT,
+                        affected_users TEXT,
+                        created_at TEXT,
+                        executed BOOLEAN DEFAULT FALSE
+                    )
+                """)
+            
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS game_state_snapshots (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        timestamp TEXT,
+                        snapshot_data TEXT,
+                        health_score REAL,
+                        created_at TEXT
+                    )
+                """)
+            
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS user_behavior_tracking (
+                        user_id INTEGER,
+                        activity_pattern TEXT,
+                        last_active TEXT,
+                        engagement_score REAL,
+                        spending_pattern TEXT,
+                        farming_efficiency REAL,
+                        updated_at TEXT,
+                        PRIMARY KEY (user_id)
+                    )
+                """)
             
-            await conn.commit()
             logger.info("✅ Game Master tracking systems initialized")
             
         except Exception as e:
@@ -483,27 +485,19 @@ Quyết định cần thiết nhất cho tình hình hiện tại?
         try:
             current_time = datetime.now()
             
-            # Player statistics
-            all_users = await self.db.get_all_users()
-            total_players = len(all_users)
+            # Player + economic statistics (SQL aggregate, không load toàn bộ users)
+            user_stats = await self.analytics.collect_user_stats(current_time)
+            total_players = user_stats.total_players
+            active_15min = user_stats.active_15min
+            active_1hour = user_stats.active_1hour
+            active_24hour = user_stats.active_24hour
+            new_today = user_stats.new_players_today
+            total_money = user_stats.total_money
+            avg_money = user_stats.average_money
+            median_money = user_stats.median_money
+            money_distribution = user_stats.money_distribution
             
-            # Time-based activity
             cutoff_15min = current_time - timedelta(minutes=15)
-            cutoff_1hour = current_time - timedelta(hours=1)
-            cutoff_24hour = current_time - timedelta(hours=24)
-            cutoff_today = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            active_15min = sum(1 for user in all_users if user.get('last_seen', current_time) > cutoff_15min)
-            active_1hour = sum(1 for user in all_users if user.get('last_seen', current_time) > cutoff_1hour)
-            active_24hour = sum(1 for user in all_users if user.get('last_seen', current_time) > cutoff_24hour)
-            new_today = sum(1 for user in all_users if user.get('joined_date', current_time) > cutoff_today)
-            
-            # Economic data
-            money_amounts = [user.get('money', 0) for user in all_users]
-            total_money = sum(money_amounts)
-            avg_money = total_money / total_players if total_players > 0 else 0
-            median_money = self._calculate_median(money_amounts)
-            money_distribution = self._analyze_money_distribution(money_amounts)
             
             # Market activity
             market_transactions = await self._get_market_activity(cutoff_15min)
@@ -548,7 +542,7 @@ Quyết định cần thiết nhất cho tình hình hiện tại?
                 weather_satisfaction=weather_data.get('satisfaction', 0.5),
                 active_events=events_data.get('active_events', []),
                 event_participation=events_data.get('participation', 0.0),
-                daily_streak_average=await self._calculate_daily_streak_average(),
+                daily_streak_average=user_stats.daily_streak_average,
                 economic_health_score=economic_health,
                 player_satisfaction=player_satisfaction,
                 game_balance_score=game_balance
@@ -569,6 +563,14 @@ Quyết định cần thiết nhất cho tình hình hiện tại?
         # Get detailed weather data
         weather_data = await self._get_weather_status(bot)
         
+        # Dòng tiền 24h theo subsystem (money-delta stream)
+        hourly_flows = self.db.economy.hourly_flows(24)
+        inflow_24h = sum(flow['inflow'] for flow in hourly_flows)
+        outflow_24h = sum(flow['outflow'] for flow in hourly_flows)
+        source_flows = sorted(self.db.economy.snapshot()['by_source'].items(),
+                              key=lambda item: abs(item[1]['net']), reverse=True)[:5]
+        source_summary = ', '.join(f"{source} {flows['net']:+,}" for source, flows in source_flows) or 'chưa có dữ liệu'
+        
         prompt = f"""
 BẠN LÀ GEMINI GAME MASTER - AI với quyền admin toàn bộ game Discord farming bot.
 
@@ -588,6 +590,8 @@ THỜI GIAN: {game_state.timestamp.strftime("%H:%M %d/%m/%Y")}
 - Tiền trung bình/người: {game_state.average_money_per_player:,.0f} coins
 - Tiền trung vị: {game_state.median_money_per_player:,.0f} coins
 - Tỷ lệ lạm phát: {game_state.inflation_rate:.1%}
+- Dòng tiền 24h: +{inflow_24h:,} vào / -{outflow_24h:,} ra
+- Nguồn/đích tiền chính (từ lúc khởi động): {source_summary}
 - Phân bổ tiền: {game_state.money_distribution}
 
 📊 THỊ TRƯỜNG:
@@ -1005,7 +1009,7 @@ Hãy quyết định ngay bây giờ!
                     if reward_type == 'money':
                         amount = params.get('amount', 1000)
                         user.money += amount
-                        await self.db.update_user(user)
+                        await self.db.update_user(user, source='ai_master')
                         rewards_given += 1
                     elif reward_type == 'items':
                         # Thêm items vào inventory
@@ -1030,10 +1034,10 @@ Hãy quyết định ngay bây giờ!
     
     # Helper methods for data collection
     async def _get_market_activity(self, cutoff_time: datetime) -> int:
-        """Lấy số giao dịch thị trường trong khoảng thời gian"""
+        """Lấy số giao dịch thị trường trong khoảng thời gian (từ money_ledger)"""
         try:
-            # Placeholder - thực tế sẽ query từ market transactions table
-            return random.randint(5, 50)
+            activity = await self.db.get_money_activity(int(cutoff_time.timestamp()), list(MARKET_SOURCES))
+            return sum(flows['events'] for flows in activity.values())
         except Exception:
             return 0
     
@@ -1144,52 +1148,12 @@ Hãy quyết định ngay bây giờ!
         except Exception:
             return {'active_events': [], 'participation': 0.0}
     
-    async def _calculate_daily_streak_average(self) -> float:
-        """Tính streak điểm danh trung bình"""
-        try:
-            cursor = await self.db.connection.execute("SELECT AVG(daily_streak) FROM users WHERE daily_streak > 0")
-            result = await cursor.fetchone()
-            return float(result[0]) if result and result[0] else 0.0
-        except Exception:
-            return 0.0
-    
     async def _calculate_inflation_rate(self) -> float:
-        """Tính tỷ lệ lạm phát"""
+        """Tính tỷ lệ lạm phát - tăng trưởng tiền lưu hành 24h từ money-delta stream"""
         try:
-            # Placeholder - so sánh giá hiện tại với giá base
-            return random.uniform(0.02, 0.08)  # 2-8%
+            return self.db.economy.inflation_rate()
         except Exception:
-            return 0.05
-    
-    def _calculate_median(self, values: List[float]) -> float:
-        """Tính median"""
-        if not values:
             return 0.0
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        if n % 2 == 0:
-            return (sorted_values[n//2 - 1] + sorted_values[n//2]) / 2
-        else:
-            return sorted_values[n//2]
-    
-    def _analyze_money_distribution(self, money_amounts: List[int]) -> Dict[str, int]:
-        """Phân tích phân bổ tiền"""
-        if not money_amounts:
-            return {'0-1k': 0, '1k-10k': 0, '10k-100k': 0, '100k+': 0}
-        
-        ranges = {'0-1k': 0, '1k-10k': 0, '10k-100k': 0, '100k+': 0}
-        
-        for amount in money_amounts:
-            if amount < 1000:
-                ranges['0-1k'] += 1
-            elif amount < 10000:
-                ranges['1k-10k'] += 1
-            elif amount < 100000:
-                ranges['10k-100k'] += 1
-            else:
-                ranges['100k+'] += 1
-        
-        return ranges
     
     def _calculate_economic_health(self, distribution: Dict, total_money: int, active_players: int) -> float:
         """Tính sức khỏe kinh tế"""
@@ -1320,17 +1284,16 @@ Hãy quyết định ngay bây giờ!
     async def record_decision(self, decision: GameMasterDecision):
         """Ghi lại quyết định"""
         try:
-            conn = await self.db.get_connection()
-            await conn.execute("""
-                INSERT INTO game_master_decisions 
-                (decision_id, action_type, reasoning, confidence, parameters, execution_time, priority, affected_users, created_at, executed)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                decision.decision_id, decision.action_type, decision.reasoning, decision.confidence,
-                json.dumps(decision.parameters), decision.execution_time.isoformat(), decision.priority,
-                json.dumps(decision.affected_users), datetime.now().isoformat(), True
-            ))
-            await conn.commit()
+            async with self.db.transaction() as conn:
+                await conn.execute("""
+                    INSERT INTO game_master_decisions 
+                    (decision_id, action_type, reasoning, confidence, parameters, execution_time, priority, affected_users, created_at, executed)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    decision.decision_id, decision.action_type, decision.reasoning, decision.confidence,
+                    json.dumps(decision.parameters), decision.execution_time.isoformat(), decision.priority,
+                    json.dumps(decision.affected_users), datetime.now().isoformat(), True
+                ))
             
         except Exception as e:
             logger.error(f"Error recording decision: {e}")
@@ -1338,15 +1301,14 @@ Hãy quyết định ngay bây giờ!
     async def save_game_state_snapshot(self, snapshot: GameStateSnapshot):
         """Lưu snapshot game state"""
         try:
-            conn = await self.db.get_connection()
-            await conn.execute("""
-                INSERT INTO game_state_snapshots (timestamp, snapshot_data, health_score, created_at)
-                VALUES (?, ?, ?, ?)
-            """, (
-                snapshot.timestamp.isoformat(), json.dumps(snapshot.__dict__, default=str), 
-                snapshot.game_balance_score, datetime.now().isoformat()
-            ))
-            await conn.commit()
+            async with self.db.transaction() as conn:
+                await conn.execute("""
+                    INSERT INTO game_state_snapshots (timestamp, snapshot_data, health_score, created_at)
+                    VALUES (?, ?, ?, ?)
+                """, (
+                    snapshot.timestamp.isoformat(), json.dumps(snapshot.__dict__, default=str), 
+                    snapshot.game_balance_score, datetime.now().isoformat()
+                ))
             
         except Exception as e:
             logger.error(f"Error saving game state snapshot: {e}")
@@ -1382,42 +1344,7 @@ Hãy quyết định ngay bây giờ!
     async def analyze_user_behavior_patterns(self, bot) -> Dict[str, Any]:
         """Phân tích pattern hành vi người dùng"""
         try:
-            all_users = await self.db.get_all_users()
-            
-            patterns = {
-                'high_activity': [],
-                'low_activity': [],
-                'new_users': [],
-                'inactive_users': [],
-                'big_spenders': [],
-                'savers': []
-            }
-            
-            current_time = datetime.now()
-            
-            for user in all_users:
-                user_id = user.get('user_id')
-                money = user.get('money', 0)
-                last_seen = user.get('last_seen', current_time)
-                joined = user.get('joined_date', current_time)
-                
-                # Activity patterns
-                if current_time - last_seen < timedelta(hours=1):
-                    patterns['high_activity'].append(user_id)
-                elif current_time - last_seen > timedelta(days=7):
-                    patterns['inactive_users'].append(user_id)
-                else:
-                    patterns['low_activity'].append(user_id)
-                
-                # New users (joined in last 24h)
-                if current_time - joined < timedelta(hours=24):
-                    patterns['new_users'].append(user_id)
-                
-                # Money patterns
-                if money > 50000:
-                    patterns['big_spenders'].append(user_id)
-                elif money > 10000:
-                    patterns['savers'].append(user_id)
+            patterns = await self.analytics.get_behavior_segments()
             
             return patterns
             
@@ -1484,10 +1411,18 @@ Hãy quyết định ngay bây giờ!
                 await events_cog.start_custom_event(event_data)
                 logger.info(f"🎉 Game Master started event: {event_data['name']}")
                 return True
-            elif hasattr(events_cog, 'current_event'):
-                events_cog.current_event = event_data
-                events_cog.current_event['start_time'] = datetime.now()
-                events_cog.current_event['end_time'] = datetime.now() + timedelta(hours=event_data['duration_hours'])
+            elif hasattr(events_cog, 'start_event'):
+                # Đi qua start_event -> _save_event_state (refresh world modifiers + ready_at)
+                effect_type, effect_value = self._master_event_effect(event_data)
+                await events_cog.start_event({
+                    'name': event_data['name'],
+                    'description': event_data.get('description', ''),
+                    'effect_type': effect_type,
+                    'effect_value': effect_value,
+                    'duration': int(event_data.get('duration_hours', 4) * 3600),
+                    'ai_generated': True,
+                    'ai_reasoning': 'Gemini Game Master',
+                })
                 logger.info(f"🎉 Game Master created event: {event_data['name']}")
                 return True
             else:
@@ -1498,62 +1433,61 @@ Hãy quyết định ngay bây giờ!
             logger.error(f"Error starting event: {e}")
             return False
     
+    @staticmethod
+    def _master_event_effect(event_data: Dict) -> Tuple[str, float]:
+        """Đổi event của Game Master (type bonus / tax) sang effect_type / effect_value của EventsCog"""
+        if 'effect_type' in event_data:
+            return event_data['effect_type'], event_data.get('effect_value', 1.0)
+        if event_data.get('type') == 'tax':
+            # Thuế -> hạt giống đắt hơn theo tax_rate
+            return 'seed_cost_increase', 1.0 + event_data.get('tax_rate', 0.05)
+        # Bonus -> tăng giá bán + sản lượng
+        return 'multi_bonus', event_data.get('bonus_multiplier', 1.5)
+    
     async def _execute_money_redistribution(self, params: Dict, bot) -> bool:
-        """Thực thi phân phối lại tiền"""
+        """Thực thi phân phối lại tiền (set-based SQL, một transaction)
+        
+        params['dry_run'] = True: chỉ tính toán và log user / số tiền bị ảnh hưởng.
+        """
         try:
-            redistribution_type = params.get('type', 'robin_hood')  # robin_hood, universal_basic, wealth_cap
+            redistribution_type = params.get('type', 'robin_hood')  # robin_hood, universal_basic, wealth_cap, money_sink
+            dry_run = bool(params.get('dry_run', False))
             
             if redistribution_type == 'robin_hood':
                 # Lấy từ người giàu cho người nghèo
-                wealth_threshold = params.get('wealth_threshold', 100000)
-                redistribution_rate = params.get('rate', 0.1)  # 10%
-                
-                all_users = await self.db.get_all_users()
-                rich_users = [u for u in all_users if u.get('money', 0) > wealth_threshold]
-                poor_users = [u for u in all_users if u.get('money', 0) < wealth_threshold / 2]
-                
-                if not rich_users or not poor_users:
-                    return False
-                
-                total_redistributed = 0
-                for user in rich_users:
-                    tax_amount = int(user.get('money', 0) * redistribution_rate)
-                    user_obj = await self.db.get_user(user['user_id'])
-                    if user_obj:
-                        user_obj.money -= tax_amount
-                        await self.db.update_user(user_obj)
-                        total_redistributed += tax_amount
-                
-                # Phân phối cho người nghèo
-                per_person = total_redistributed // len(poor_users)
-                for user in poor_users:
-                    user_obj = await self.db.get_user(user['user_id'])
-                    if user_obj:
-                        user_obj.money += per_person
-                        await self.db.update_user(user_obj)
-                
-                logger.info(f"💰 Game Master redistributed {total_redistributed:,} coins from {len(rich_users)} to {len(poor_users)} users")
-                return True
-                
+                result = await self.db.redistribute_wealth(
+                    wealth_threshold=params.get('wealth_threshold', 100000),
+                    rate=params.get('rate', 0.1),  # 10%
+                    dry_run=dry_run
+                )
             elif redistribution_type == 'universal_basic':
                 # Universal Basic Income
-                amount_per_person = params.get('amount', 5000)
-                all_users = await self.db.get_all_users()
-                
-                for user in all_users:
-                    try:
-                        user_obj = await self.db.get_user(user['user_id'])
-                        if user_obj:
-                            user_obj.money += amount_per_person
-                            await self.db.update_user(user_obj)
-                    except Exception as e:
-                        logger.error(f"Error giving UBI to user {user['user_id']}: {e}")
-                        continue
-                
-                logger.info(f"💰 Game Master gave {amount_per_person:,} coins to {len(all_users)} users (UBI)")
-                return True
+                result = await self.db.grant_universal_income(params.get('amount', 5000), dry_run=dry_run)
+            elif redistribution_type == 'wealth_cap':
+                # Giới hạn tài sản tối đa
+                result = await self.db.apply_wealth_cap(params.get('cap', 1000000), dry_run=dry_run)
+            elif redistribution_type == 'money_sink':
+                # Thu thuế trực tiếp
+                result = await self.db.apply_money_sink(
+                    params.get('tax_rate', 0.05),  # 5%
+                    min_balance=params.get('min_balance', 10000),
+                    dry_run=dry_run
+                )
+            else:
+                return False
             
-            return False
+            if not result['affected_users']:
+                return False
+            
+            prefix = "[DRY RUN] " if dry_run else ""
+            logger.info(
+                f"💰 {prefix}Game Master {redistribution_type}: {result['affected_users']} users, "
+                f"+{result['total_added']:,} / -{result['total_removed']:,} coins"
+            )
+            if dry_run:
+                for user_id, delta, balance_after in result['adjustments'][:20]:
+                    logger.info(f"   {prefix}user {user_id}: {delta:+,} -> {balance_after:,}")
+            return True
             
         except Exception as e:
             logger.error(f"Error in money redistribution: {e}")
@@ -8,13 +8,14 @@ import json
 import os
 import random
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 import aiofiles
 from database.database import Database
+from database.analytics import GameAnalytics
 from utils.enhanced_logging import get_bot_logger
 from ai.smart_cache import SmartCache
-from ai.gemini_client import get_gemini_manager, GEMINI_AVAILABLE
+from ai.gemini_client import get_gemini_manager
 
 logger = get_bot_logger()
 
@@ -94,8 +95,8 @@ class GeminiAPIManager:
     
     async def call_gemini(self, prompt: str, max_retries: int = 3) -> Optional[str]:
         """Gọi Gemini API sử dụng google-genai SDK"""
-        if not GEMINI_AVAILABLE:
-            logger.error("❌ google-genai SDK not available")
+        if not self.gemini_manager.is_available():
+            logger.error("❌ No Gemini backend available (google-genai SDK / API key)")
             return None
         
         try:
@@ -116,8 +117,8 @@ class GeminiAPIManager:
     
     async def call_gemini_json(self, prompt: str) -> Optional[Dict[str, Any]]:
         """Gọi Gemini API và trả về JSON"""
-        if not GEMINI_AVAILABLE:
-            logger.error("❌ google-genai SDK not available")
+        if not self.gemini_manager.is_available():
+            logger.error("❌ No Gemini backend available (google-genai SDK / API key)")
             return None
         
         try:
@@ -147,6 +148,7 @@ class GeminiEconomicManagerV2:
     
     def __init__(self, database: Database):
         self.db = database
+        self.analytics = GameAnalytics(database)
         self.api_manager = GeminiAPIManager()
         self.smart_cache = SmartCache()  # Smart cache for token saving
         
@@ -240,22 +242,13 @@ class GeminiEconomicManagerV2:
             return self.economic_cache[cache_key]['data']
         
         # Collect fresh data
-        all_users = await self.db.get_all_users()
-        total_players = len(all_users)
-        
-        # Player activity
-        active_cutoff = current_time - timedelta(hours=24)
-        active_players = sum(1 for user in all_users 
-                           if user.get('last_seen', current_time) > active_cutoff)
-        
-        # Money analysis
-        money_amounts = [user.get('money', 0) for user in all_users]
-        total_money = sum(money_amounts)
-        avg_money = total_money / total_players if total_players > 0 else 0
-        median_money = self._calculate_median(money_amounts)
-        
-        # Money distribution
-        distribution = self._analyze_money_distribution(money_amounts)
+        stats = await self.analytics.collect_user_stats(current_time)
+        total_players = stats.total_players
+        active_players = stats.active_24hour
+        total_money = stats.total_money
+        avg_money = stats.average_money
+        median_money = stats.median_money
+        distribution = stats.money_distribution
         
         economic_data = {
             'total_players': total_players,
@@ -429,28 +422,6 @@ Hãy trả lời CHÍNH XÁC theo format JSON trên:
         )
     
     # Utility methods
-    def _calculate_median(self, values: List[float]) -> float:
-        if not values:
-            return 0.0
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        if n % 2 == 0:
-            return (sorted_values[n//2-1] + sorted_values[n//2]) / 2
-        return sorted_values[n//2]
-    
-    def _analyze_money_distribution(self, money_amounts: List[int]) -> Dict[str, int]:
-        distribution = {'0-1k': 0, '1k-10k': 0, '10k-100k': 0, '100k+': 0}
-        for amount in money_amounts:
-            if amount < 1000:
-                distribution['0-1k'] += 1
-            elif amount < 10000:
-                distribution['1k-10k'] += 1
-            elif amount < 100000:
-                distribution['10k-100k'] += 1
-            else:
-                distribution['100k+'] += 1
-        return distribution
-    
     def _calculate_health_score(self, distribution: Dict, active: int, total: int) -> float:
         if total == 0:
             return 0.0
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Gemini Transport - Chạy các lời gọi SDK đồng bộ ngoài event loop
+google-genai generate_content_stream là iterator đồng bộ; gọi trực tiếp
+trong coroutine sẽ block toàn bộ bot (mọi command Discord) trong lúc
+Gemini "thinking". Transport đẩy lời gọi sang thread pool có giới hạn,
+kèm deadline, hủy (cancel), semaphore toàn cục và thống kê latency.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Số request Gemini chạy đồng thời tối đa (toàn bot)
+DEFAULT_MAX_CONCURRENCY = 4
+# Deadline mặc định mỗi request (giây)
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_THINKING_TIMEOUT = 120.0
+# Số mẫu latency giữ lại để tính percentile
+LATENCY_WINDOW = 256
+
+
+class GeminiTimeoutError(Exception):
+    """Request Gemini vượt quá deadline"""
+
+
+class CancelToken:
+    """Cờ hủy chia sẻ giữa coroutine và worker thread"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class LatencyMetrics:
+    """Thống kê latency / lỗi của các request Gemini"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.queued = 0
+
+    def record(self, latency: float, outcome: str):
+        self.requests += 1
+        self.samples.append(latency)
+        if outcome == 'success':
+            self.successes += 1
+        elif outcome == 'timeout':
+            self.timeouts += 1
+        elif outcome == 'cancelled':
+            self.cancelled += 1
+        else:
+            self.errors += 1
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'successes': self.successes,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'cancelled': self.cancelled,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'p50_ms': round(self.percentile(0.50) * 1000, 1),
+            'p95_ms': round(self.percentile(0.95) * 1000, 1),
+            'max_ms': round(max(self.samples) * 1000, 1) if self.samples else 0.0,
+        }
+
+
+class GeminiTransport:
+    """Thread pool + semaphore cho các lời gọi Gemini SDK"""
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 default_timeout: float = DEFAULT_TIMEOUT,
+                 thinking_timeout: float = DEFAULT_THINKING_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.thinking_timeout = thinking_timeout
+        self.metrics = LatencyMetrics()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def configure(self, settings: Optional[Dict[str, Any]] = None):
+        """Áp dụng cấu hình (section "transport" trong gemini_config.json)"""
+        settings = settings or {}
+        max_concurrency = int(settings.get('max_concurrency', self.max_concurrency))
+        self.default_timeout = float(settings.get('timeout_seconds', self.default_timeout))
+        self.thinking_timeout = float(settings.get('thinking_timeout_seconds', self.thinking_timeout))
+
+        if max_concurrency != self.max_concurrency:
+            self.max_concurrency = max_concurrency
+            self.shutdown()
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix='gemini'
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def get_timeout(self, use_thinking: bool = False) -> float:
+        return self.thinking_timeout if use_thinking else self.default_timeout
+
+    async def run(self, func: Callable[..., Any], *args,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """Chạy func(*args, cancel_token=..., **kwargs) trong thread pool
+
+        Deadline tính cả thời gian chờ semaphore. Khi hết hạn hoặc coroutine
+        bị cancel, cancel_token được bật để worker dừng đọc stream sớm.
+
+        Raises:
+            GeminiTimeoutError: quá deadline
+        """
+        self._ensure_started()
+        timeout = self.default_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        token = CancelToken()
+        loop = asyncio.get_running_loop()
+
+        self.metrics.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.record(timeout, 'timeout')
+            raise GeminiTimeoutError(f"Gemini request queued longer than {timeout:g}s")
+        finally:
+            self.metrics.queued -= 1
+
+        started = time.monotonic()
+        self.metrics.in_flight += 1
+        semaphore = self._semaphore
+        future = None
+        outcome = 'error'
+        try:
+            future = loop.run_in_executor(
+                self._executor, lambda: func(*args, cancel_token=token, **kwargs)
+            )
+            remaining = max(0.0, deadline - time.monotonic())
+            # shield: hết hạn không hủy future, slot được trả khi thread dừng hẳn
+            result = await asyncio.wait_for(asyncio.shield(future), remaining)
+            outcome = 'success'
+            return result
+        except asyncio.TimeoutError:
+            token.cancel()
+            outcome = 'timeout'
+            raise GeminiTimeoutError(f"Gemini request exceeded {timeout:g}s deadline")
+        except asyncio.CancelledError:
+            token.cancel()
+            outcome = 'cancelled'
+            raise
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.record(time.monotonic() - started, outcome)
+            if future is not None and not future.done():
+                # Worker thread vẫn đang chạy -> giữ slot tới khi nó thực sự dừng
+                def _release(done_future):
+                    if not done_future.cancelled():
+                        done_future.exception()  # Tránh warning "exception never retrieved"
+                    semaphore.release()
+                future.add_done_callback(_release)
+            else:
+                semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.metrics.snapshot()
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
+
+    def shutdown(self):
+        """Đóng thread pool (request đang chạy vẫn được hoàn tất)"""
+        if self._executor is not None:
+            if sys.version_info >= (3, 9):
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                # Python 3.8 chưa có cancel_futures (semaphore giới hạn số job = số worker
+                # nên hàng đợi của pool gần như luôn rỗng)
+                self._executor.shutdown(wait=False)
+        self._executor = None
+        self._semaphore = None
+
+
+# Global instance dùng chung cho mọi GeminiClient
+gemini_transport = GeminiTransport()
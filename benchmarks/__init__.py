@@ -0,0 +1 @@
+# Benchmarks package - mô phỏng / đo tốc độ chạy offline (không cần Discord, DB)
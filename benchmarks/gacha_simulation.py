@@ -0,0 +1,445 @@
+"""
+Gacha Simulation - Monte Carlo cho gacha, buff, reroll + đo tốc độ roll
+Chạy hàng triệu roll / reroll vectorized bằng NumPy trên đúng config thật
+(features/maid_config_backup.py, alias table của gacha_engine,
+DynamicRerollCostCalculator) để kiểm tra economy đúng như thiết kế:
+
+- Tỷ lệ thực nghiệm theo rarity / từng maid so với RARITY_CONFIG (z-score)
+- Buff sinh ra bởi generate_random_buffs nằm trong buff_range, đúng buff_count
+- Bụi sao kỳ vọng mỗi roll theo STARDUST_CONFIG["dismantle_rewards"]
+- Bụi sao cần để reroll tới mức chất lượng mục tiêu (chi phí dynamic)
+- Coin bị rút khỏi game mỗi player-day qua gacha
+- Throughput: roll/s của đường cũ, engine Python, engine NumPy
+
+Chạy offline (không cần Discord / DB / mạng), cần NumPy:
+    python -m benchmarks.gacha_simulation
+    python -m benchmarks.gacha_simulation --rolls 5000000 --seed 7 --check
+    python -m benchmarks.gacha_simulation --json report.json
+
+--check: exit code 1 nếu tỷ lệ lệch quá --max-z sigma, alias table lệch config
+hoặc buff sai range / buff_count (dùng trong CI).
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database.models import MaidBuff, UserMaid
+from features.gacha_engine import STANDARD_POOL, AliasTable, gacha_engine
+from features.maid_config_backup import (
+    GACHA_CONFIG, LIMITED_RARITY_CONFIG, MAID_TEMPLATES, RARITY_CONFIG, STARDUST_CONFIG,
+    generate_random_buffs, get_random_maid_regular_gacha
+)
+from features.maid_dynamic_reroll import DynamicRerollCostCalculator
+
+RARITIES = ("GR", "UR", "SSR", "SR", "R")
+# Roll theo từng khối để giới hạn RAM khi --rolls rất lớn
+CHUNK_SIZE = 1_000_000
+# Độ phân giải quality khi tra bảng chi phí reroll (ngưỡng calculator là bội của 0.01)
+QUALITY_STEPS = 100
+
+
+# ---------- Tỷ lệ roll ----------
+
+def _pool_rarities(table: AliasTable) -> np.ndarray:
+    return np.array([MAID_TEMPLATES[maid_id]["rarity"] for maid_id in table.items])
+
+
+def configured_rarity_rates(pool: str, table: AliasTable) -> Dict[str, float]:
+    """Tỷ lệ tier theo config (chuẩn hoá trên các tier có maid trong pool)"""
+    config = RARITY_CONFIG if pool == STANDARD_POOL else LIMITED_RARITY_CONFIG
+    present = set(_pool_rarities(table).tolist())
+    rates = {rarity: config[rarity]["total_rate"] for rarity in RARITIES if rarity in present}
+    total = sum(rates.values())
+    return {rarity: rate / total for rarity, rate in rates.items()}
+
+
+def simulate_rolls(table: AliasTable, rolls: int, generator: np.random.Generator) -> np.ndarray:
+    """Số lần ra từng maid (theo thứ tự table.items) sau rolls lần roll"""
+    counts = np.zeros(len(table), dtype=np.int64)
+    remaining = rolls
+    while remaining > 0:
+        size = min(remaining, CHUNK_SIZE)
+        counts += np.bincount(table.sample_indices(size, generator), minlength=len(table))
+        remaining -= size
+    return counts
+
+
+def _z_scores(observed: np.ndarray, rolls: int, probabilities: np.ndarray) -> np.ndarray:
+    expected = rolls * probabilities
+    variance = rolls * probabilities * (1 - probabilities)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(variance > 0, (observed - expected) / np.sqrt(variance), 0.0)
+    return z
+
+
+def analyze_pool(pool: str, rolls: int, generator: np.random.Generator) -> Dict:
+    """Roll một pool, so tỷ lệ thực nghiệm với alias table và config"""
+    table = gacha_engine._table(pool)
+    rarities = _pool_rarities(table)
+    probabilities = np.array([table.probabilities[maid_id] for maid_id in table.items])
+    counts = simulate_rolls(table, rolls, generator)
+    configured = configured_rarity_rates(pool, table)
+    rewards = STARDUST_CONFIG["dismantle_rewards"]
+
+    tiers = {}
+    for rarity, configured_rate in configured.items():
+        mask = rarities == rarity
+        compiled = float(probabilities[mask].sum())
+        observed = int(counts[mask].sum())
+        z = float(_z_scores(np.array([observed]), rolls, np.array([compiled]))[0])
+        tiers[rarity] = {
+            'configured': configured_rate,
+            'compiled': compiled,
+            'empirical': observed / rolls,
+            'count': observed,
+            'z': z,
+        }
+
+    maid_z = _z_scores(counts, rolls, probabilities)
+    worst = int(np.argmax(np.abs(maid_z)))
+    reward_per_item = np.array([rewards.get(rarity, 0) for rarity in rarities])
+    return {
+        'pool': pool,
+        'rolls': rolls,
+        'maids': len(table),
+        'tiers': tiers,
+        'max_maid_z': float(abs(maid_z[worst])),
+        'worst_maid': table.items[worst],
+        'expected_stardust_per_roll': float(probabilities @ reward_per_item),
+        'empirical_stardust_per_roll': float(counts @ reward_per_item) / rolls,
+    }
+
+
+# ---------- Buff ----------
+
+def check_buff_generation(samples: int, seed: int) -> Dict:
+    """Gọi generate_random_buffs thật, đếm buff sai range / buff_count / trùng loại"""
+    rng_state = random.getstate()
+    random.seed(seed)
+    maid_ids = list(MAID_TEMPLATES)
+    violations: List[str] = []
+    values: Dict[str, List[float]] = {rarity: [] for rarity in RARITY_CONFIG}
+    try:
+        for i in range(samples):
+            maid_id = maid_ids[i % len(maid_ids)]
+            template = MAID_TEMPLATES[maid_id]
+            rarity = template["rarity"]
+            low, high = RARITY_CONFIG[rarity]["buff_range"]
+            expected_count = min(RARITY_CONFIG[rarity]["buff_count"], len(template["possible_buffs"]))
+            buffs = generate_random_buffs(maid_id)
+
+            if len(buffs) != expected_count:
+                violations.append(f"{maid_id}: {len(buffs)} buff (cần {expected_count})")
+            if len({buff["buff_type"] for buff in buffs}) != len(buffs):
+                violations.append(f"{maid_id}: buff trùng loại")
+            for buff in buffs:
+                if not low <= buff["value"] <= high:
+                    violations.append(f"{maid_id}: {buff['buff_type']}={buff['value']} ngoài [{low}, {high}]")
+                values[rarity].append(buff["value"])
+    finally:
+        random.setstate(rng_state)
+
+    by_rarity = {}
+    for rarity, observed in values.items():
+        if observed:
+            array = np.array(observed)
+            by_rarity[rarity] = {
+                'range': RARITY_CONFIG[rarity]["buff_range"],
+                'min': float(array.min()), 'max': float(array.max()), 'mean': float(array.mean()),
+            }
+    return {'samples': samples, 'violations': len(violations),
+            'examples': violations[:10], 'by_rarity': by_rarity}
+
+
+# ---------- Reroll ----------
+
+def reroll_cost_table(rarity: str, max_rerolls: int, now: Optional[datetime] = None) -> np.ndarray:
+    """Chi phí reroll thật [số lần đã reroll, quality bucket]
+
+    Mọi reroll giả định diễn ra trong cùng một phiên (< 24h) - trường hợp người
+    chơi reroll liên tục, time multiplier cao nhất.
+    """
+    now = now or datetime.now()
+    low, high = DynamicRerollCostCalculator.BUFF_RANGES[rarity]
+    template = {"rarity": rarity}
+    table = np.zeros((max_rerolls + 1, QUALITY_STEPS + 1), dtype=np.int64)
+    for count in range(max_rerolls + 1):
+        history = [(now - timedelta(minutes=count - i)).isoformat() for i in range(count)]
+        for step in range(QUALITY_STEPS + 1):
+            # Giữa ô quality để tránh sai số float ở đúng ngưỡng
+            quality = min(step + 0.5, QUALITY_STEPS) / QUALITY_STEPS
+            maid = UserMaid("simulation", 0, "simulation",
+                            buff_values=[MaidBuff("growth_speed", low + quality * (high - low))])
+            table[count, step], _ = DynamicRerollCostCalculator.calculate_reroll_cost(maid, template, history)
+    return table
+
+
+def _roll_buff_quality(rarity: str, buff_count: int, size: int, generator: np.random.Generator) -> np.ndarray:
+    """Quality (0-1 theo BUFF_RANGES của calculator) của bộ buff mới roll"""
+    low, high = RARITY_CONFIG[rarity]["buff_range"]
+    values = np.round(generator.uniform(low, high, size=(size, buff_count)), 1)
+    q_low, q_high = DynamicRerollCostCalculator.BUFF_RANGES[rarity]
+    return np.clip((values.mean(axis=1) - q_low) / (q_high - q_low), 0.0, 1.0)
+
+
+def simulate_rerolls(rarity: str, maids: int, max_rerolls: int, target_quality: float,
+                     generator: np.random.Generator) -> Dict:
+    """Reroll tới khi quality >= target (hoặc hết max_rerolls), đo bụi sao tiêu"""
+    costs = reroll_cost_table(rarity, max_rerolls)
+    buff_count = min(RARITY_CONFIG[rarity]["buff_count"],
+                     min(len(template["possible_buffs"]) for template in MAID_TEMPLATES.values()
+                         if template["rarity"] == rarity))
+
+    quality = _roll_buff_quality(rarity, buff_count, maids, generator)
+    spent = np.zeros(maids, dtype=np.int64)
+    rerolls = np.zeros(maids, dtype=np.int64)
+    active = quality < target_quality
+    for count in range(max_rerolls):
+        if not active.any():
+            break
+        index = np.flatnonzero(active)
+        buckets = np.minimum((quality[index] * QUALITY_STEPS).astype(np.int64), QUALITY_STEPS)
+        spent[index] += costs[count, buckets]
+        rerolls[index] += 1
+        quality[index] = _roll_buff_quality(rarity, buff_count, len(index), generator)
+        active[index] = quality[index] < target_quality
+
+    reached = quality >= target_quality
+    r_reward = STARDUST_CONFIG["dismantle_rewards"]["R"]
+    return {
+        'maids': maids,
+        'target_quality': target_quality,
+        'success_rate': float(reached.mean()),
+        'mean_rerolls': float(rerolls.mean()),
+        'mean_stardust': float(spent.mean()),
+        'p50_stardust': float(np.percentile(spent, 50)),
+        'p95_stardust': float(np.percentile(spent, 95)),
+        'max_stardust': int(spent.max()),
+        'r_dismantles_needed': float(spent.mean()) / r_reward,
+    }
+
+
+# ---------- Player-day ----------
+
+def simulate_player_days(players: int, days: int, singles_per_day: float, tens_per_day: float,
+                         generator: np.random.Generator, keep_from: str = "SSR") -> Dict:
+    """Coin sink / bụi sao thu được mỗi player-day qua gacha thường
+
+    Số lần roll đơn / roll 10 mỗi ngày ~ Poisson; tách hết maid dưới keep_from.
+    """
+    table = gacha_engine._table(STANDARD_POOL)
+    rarities = _pool_rarities(table)
+    tiers = [rarity for rarity in RARITIES if rarity in set(rarities.tolist())]
+    tier_probabilities = np.array([sum(p for maid_id, p in table.probabilities.items()
+                                       if MAID_TEMPLATES[maid_id]["rarity"] == rarity) for rarity in tiers])
+    tier_probabilities /= tier_probabilities.sum()
+
+    shape = (players, days)
+    singles = generator.poisson(singles_per_day, size=shape)
+    tens = generator.poisson(tens_per_day, size=shape)
+    coins = singles * GACHA_CONFIG["single_roll_cost"] + tens * GACHA_CONFIG["ten_roll_cost"]
+    rolls = (singles + tens * 10).ravel()
+    pulls = generator.multinomial(rolls, tier_probabilities)  # (player-days, tiers)
+
+    rewards = STARDUST_CONFIG["dismantle_rewards"]
+    kept = RARITIES[:RARITIES.index(keep_from) + 1]
+    dismantle = np.array([0 if rarity in kept else rewards[rarity] for rarity in tiers])
+    stardust = pulls @ dismantle
+    return {
+        'player_days': players * days,
+        'singles_per_day': singles_per_day,
+        'tens_per_day': tens_per_day,
+        'mean_rolls': float(rolls.mean()),
+        'mean_coins': float(coins.mean()),
+        'p50_coins': float(np.percentile(coins, 50)),
+        'p95_coins': float(np.percentile(coins, 95)),
+        'p99_coins': float(np.percentile(coins, 99)),
+        'mean_stardust': float(stardust.mean()),
+        'maids_per_day': {rarity: float(pulls[:, i].mean()) for i, rarity in enumerate(tiers)},
+        'keep_from': keep_from,
+    }
+
+
+# ---------- Throughput ----------
+
+def _rate(rolls: int, started: float) -> float:
+    elapsed = time.perf_counter() - started
+    return rolls / elapsed if elapsed > 0 else float('inf')
+
+
+def benchmark_throughput(rolls: int, seed: int) -> Dict[str, float]:
+    """Roll/s của từng đường roll (cùng pool gacha thường)"""
+    results = {}
+    legacy_rolls = min(rolls, 100_000)  # Đường cũ quét tuyến tính, chậm
+    started = time.perf_counter()
+    for _ in range(legacy_rolls):
+        get_random_maid_regular_gacha()
+    results['legacy_linear_scan'] = _rate(legacy_rolls, started)
+
+    started = time.perf_counter()
+    gacha_engine.roll(rolls, rng=random.Random(seed))
+    results['engine_python'] = _rate(rolls, started)
+
+    started = time.perf_counter()
+    gacha_engine.roll(rolls)
+    results['engine_numpy'] = _rate(rolls, started)
+
+    generator = np.random.default_rng(seed)
+    started = time.perf_counter()
+    gacha_engine._table(STANDARD_POOL).sample_indices(rolls, generator)
+    results['alias_indices_numpy'] = _rate(rolls, started)
+    return results
+
+
+# ---------- Config ----------
+
+def config_warnings() -> List[str]:
+    """Chỗ các bảng config lệch nhau (chỉ cảnh báo, không fail --check)"""
+    warnings = []
+    calculator = DynamicRerollCostCalculator
+    for rarity in RARITY_CONFIG:
+        if rarity not in calculator.BASE_COSTS:
+            warnings.append(f"DynamicRerollCostCalculator.BASE_COSTS thiếu {rarity} (reroll maid {rarity} sẽ KeyError)")
+            continue
+        stardust_cost = STARDUST_CONFIG["reroll_costs"].get(rarity)
+        if stardust_cost != calculator.BASE_COSTS[rarity]:
+            warnings.append(f"{rarity}: BASE_COSTS={calculator.BASE_COSTS[rarity]} "
+                            f"!= STARDUST_CONFIG reroll_costs={stardust_cost}")
+        if tuple(calculator.BUFF_RANGES[rarity]) != tuple(RARITY_CONFIG[rarity]["buff_range"]):
+            warnings.append(f"{rarity}: BUFF_RANGES={calculator.BUFF_RANGES[rarity]} "
+                            f"!= RARITY_CONFIG buff_range={RARITY_CONFIG[rarity]['buff_range']}")
+    standard_total = sum(config["total_rate"] for config in RARITY_CONFIG.values())
+    if abs(standard_total - 100) > 1e-9:
+        warnings.append(f"Tổng RARITY_CONFIG total_rate = {standard_total:g}% (alias table tự chuẩn hoá)")
+    return warnings
+
+
+# ---------- Run ----------
+
+def run_simulation(args: argparse.Namespace) -> Dict:
+    generator = np.random.default_rng(args.seed)
+    pools = [STANDARD_POOL] + sorted(pool for pool in gacha_engine._tables if pool != STANDARD_POOL)
+    reroll_rarities = [rarity for rarity in RARITIES if rarity in DynamicRerollCostCalculator.BASE_COSTS]
+    return {
+        'seed': args.seed,
+        'pools': [analyze_pool(pool, args.rolls, generator) for pool in pools],
+        'buffs': check_buff_generation(args.buff_samples, args.seed),
+        'rerolls': {rarity: simulate_rerolls(rarity, args.reroll_maids, args.max_rerolls,
+                                             args.target_quality, generator)
+                    for rarity in reroll_rarities},
+        'player_days': simulate_player_days(args.players, args.days, args.singles_per_day,
+                                            args.tens_per_day, generator),
+        'throughput': benchmark_throughput(args.bench_rolls, args.seed),
+        'warnings': config_warnings(),
+    }
+
+
+def find_failures(report: Dict, max_z: float) -> List[str]:
+    """Lỗi làm --check fail"""
+    failures = []
+    for pool in report['pools']:
+        for rarity, tier in pool['tiers'].items():
+            if abs(tier['compiled'] - tier['configured']) > 1e-9:
+                failures.append(f"{pool['pool']} {rarity}: alias table {tier['compiled']:.6%} "
+                                f"!= config {tier['configured']:.6%}")
+            if abs(tier['z']) > max_z:
+                failures.append(f"{pool['pool']} {rarity}: lệch {tier['z']:+.2f} sigma")
+        if pool['max_maid_z'] > max_z:
+            failures.append(f"{pool['pool']} {pool['worst_maid']}: lệch {pool['max_maid_z']:.2f} sigma")
+    if report['buffs']['violations']:
+        failures.append(f"{report['buffs']['violations']} buff sai: {report['buffs']['examples'][:3]}")
+    return failures
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"🎰 Gacha simulation (seed={report['seed']})"]
+    for pool in report['pools']:
+        lines.append(f"\n📦 Pool {pool['pool']} - {pool['rolls']:,} rolls, {pool['maids']} maids")
+        lines.append(f"   {'Rarity':<6} {'Config':>10} {'Alias':>10} {'Empirical':>10} {'z':>7}")
+        for rarity, tier in pool['tiers'].items():
+            lines.append(f"   {rarity:<6} {tier['configured']:>10.4%} {tier['compiled']:>10.4%} "
+                         f"{tier['empirical']:>10.4%} {tier['z']:>+7.2f}")
+        lines.append(f"   Max |z| từng maid: {pool['max_maid_z']:.2f} ({pool['worst_maid']})")
+        lines.append(f"   ✨ Bụi sao / roll: kỳ vọng {pool['expected_stardust_per_roll']:.3f}, "
+                     f"thực nghiệm {pool['empirical_stardust_per_roll']:.3f}")
+
+    buffs = report['buffs']
+    lines.append(f"\n💪 Buff ({buffs['samples']:,} lần generate_random_buffs) - {buffs['violations']} lỗi")
+    for rarity, stats in buffs['by_rarity'].items():
+        low, high = stats['range']
+        lines.append(f"   {rarity:<4} range [{low}, {high}] -> min {stats['min']}, "
+                     f"max {stats['max']}, mean {stats['mean']:.2f}")
+
+    lines.append("\n🎲 Reroll tới quality mục tiêu (reroll liên tục trong 24h)")
+    for rarity, stats in report['rerolls'].items():
+        lines.append(f"   {rarity:<4} target {stats['target_quality']:.0%}: đạt {stats['success_rate']:.1%}, "
+                     f"{stats['mean_rerolls']:.2f} lần, bụi sao mean {stats['mean_stardust']:,.0f} / "
+                     f"p95 {stats['p95_stardust']:,.0f} (~{stats['r_dismantles_needed']:,.1f} lần tách R)")
+
+    days = report['player_days']
+    lines.append(f"\n💸 Coin sink / player-day ({days['player_days']:,} player-days, "
+                 f"{days['singles_per_day']} roll đơn + {days['tens_per_day']} roll 10 / ngày)")
+    lines.append(f"   Coins: mean {days['mean_coins']:,.0f}, p50 {days['p50_coins']:,.0f}, "
+                 f"p95 {days['p95_coins']:,.0f}, p99 {days['p99_coins']:,.0f}")
+    lines.append(f"   Rolls/ngày {days['mean_rolls']:.2f}, bụi sao/ngày {days['mean_stardust']:.1f} "
+                 f"(tách hết dưới {days['keep_from']})")
+    lines.append("   Maid/ngày: " + ", ".join(f"{rarity} {count:.4f}"
+                                              for rarity, count in days['maids_per_day'].items()))
+
+    lines.append("\n⚡ Throughput (roll/s)")
+    for name, rate in report['throughput'].items():
+        lines.append(f"   {name:<22} {rate:>14,.0f}")
+
+    if report['warnings']:
+        lines.append("\n⚠️ Config lệch nhau:")
+        lines.extend(f"   - {warning}" for warning in report['warnings'])
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Monte Carlo gacha / reroll simulation + benchmark")
+    parser.add_argument('--rolls', type=int, default=2_000_000, help="Số roll mỗi pool")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--buff-samples', type=int, default=20_000, help="Số lần gọi generate_random_buffs")
+    parser.add_argument('--reroll-maids', type=int, default=200_000, help="Số maid mô phỏng reroll mỗi rarity")
+    parser.add_argument('--max-rerolls', type=int, default=30)
+    parser.add_argument('--target-quality', type=float, default=0.75, help="Quality (0-1) dừng reroll")
+    parser.add_argument('--players', type=int, default=10_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--singles-per-day', type=float, default=1.0)
+    parser.add_argument('--tens-per-day', type=float, default=0.3)
+    parser.add_argument('--bench-rolls', type=int, default=200_000, help="Số roll khi đo throughput")
+    parser.add_argument('--max-z', type=float, default=5.0, help="Ngưỡng sigma cho --check")
+    parser.add_argument('--check', action='store_true', help="Exit 1 nếu tỷ lệ / buff sai")
+    parser.add_argument('--json', metavar='PATH', help="Ghi report JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    report = run_simulation(args)
+    print(format_report(report))
+
+    failures = find_failures(report, args.max_z)
+    report['failures'] = failures
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=list)
+
+    if failures:
+        print("\n❌ Check failed:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1 if args.check else 0
+    print("\n✅ Tỷ lệ và buff khớp config")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
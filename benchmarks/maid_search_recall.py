@@ -0,0 +1,129 @@
+"""
+Maid Search Recall - So MaidSearchIndex với scorer difflib cũ (MaidFuzzySearch)
+Sinh bộ từ khóa từ chính MAID_TEMPLATES (tên, full name, series, prefix,
+lỗi gõ: thiếu / thay / đảo ký tự) rồi kiểm tra mọi kết quả scorer cũ trả về
+vẫn có trong index với điểm không thấp hơn. Index được phép tìm thêm
+(maid_id, alias, chuẩn hoá dấu / ký tự đặc biệt).
+
+Chạy offline (không cần Discord / DB / mạng):
+    python -m benchmarks.maid_search_recall
+    python -m benchmarks.maid_search_recall --threshold 0.3 --check
+
+--check: exit code 1 nếu có kết quả của scorer cũ bị mất (dùng trong CI).
+"""
+import argparse
+import difflib
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from features.maid_config_backup import MAID_TEMPLATES
+from features.maid_search_index import MaidSearchIndex
+
+# Từ khóa từng bị mất khi index chấm điểm bằng trigram Dice
+REGRESSION_QUERIES = ("asna", "emlia", "hinata", "sakura", "ero", "rem", "zero")
+
+
+def legacy_search(search_term: str, templates: Dict[str, Dict], threshold: float) -> List[Tuple[str, Dict, float]]:
+    """Scorer gốc của MaidFuzzySearch.search_maids (quét toàn bộ template)"""
+    search_lower = search_term.lower().strip()
+    results = []
+
+    for maid_id, template in templates.items():
+        if search_lower == template["name"].lower():
+            score = 1.0
+        elif template["name"].lower().startswith(search_lower):
+            score = 0.95
+        elif search_lower in template["name"].lower():
+            score = 0.9
+        elif search_lower in template["full_name"].lower():
+            score = 0.85
+        elif "series" in template and search_lower in template["series"].lower():
+            score = 0.8
+        else:
+            name_ratio = difflib.SequenceMatcher(None, search_lower, template["name"].lower()).ratio()
+            full_name_ratio = difflib.SequenceMatcher(None, search_lower, template["full_name"].lower()).ratio()
+            score = max(name_ratio, full_name_ratio)
+
+        if score >= threshold:
+            results.append((maid_id, template, score))
+
+    results.sort(key=lambda x: (-x[2], x[1]["name"]))
+    return results
+
+
+def _typos(word: str) -> List[str]:
+    """Lỗi gõ một ký tự: thiếu, thay bằng ký tự kế bên, đảo hai ký tự liền nhau"""
+    variants = set()
+    for i in range(len(word)):
+        variants.add(word[:i] + word[i + 1:])
+        variants.add(word[:i] + chr((ord(word[i]) - 96) % 26 + 97) + word[i + 1:])
+        if i + 1 < len(word):
+            variants.add(word[:i] + word[i + 1] + word[i] + word[i + 2:])
+    variants.discard(word)
+    return sorted(variant for variant in variants if variant.strip())
+
+
+def build_queries(templates: Dict[str, Dict]) -> List[str]:
+    queries = set(REGRESSION_QUERIES)
+    for maid_id, template in templates.items():
+        name = template["name"].lower()
+        queries.update((name, template["full_name"].lower(), template.get("series", "").lower(), maid_id))
+        queries.update(name[:length] for length in range(2, len(name)))
+        queries.update(_typos(name))
+    queries.discard("")
+    return sorted(queries)
+
+
+def compare(templates: Dict[str, Dict], threshold: float) -> Dict:
+    index = MaidSearchIndex(templates)
+    queries = build_queries(templates)
+    missing = []
+    extra = 0
+    legacy_time = index_time = 0.0
+
+    for query in queries:
+        start = time.perf_counter()
+        expected = legacy_search(query, templates, threshold)
+        legacy_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = {maid_id: score for maid_id, _, score in index.search(query, limit=None, threshold=threshold)}
+        index_time += time.perf_counter() - start
+
+        for maid_id, _, score in expected:
+            if found.get(maid_id, -1.0) < score - 1e-9:
+                missing.append((query, maid_id, score, found.get(maid_id)))
+        extra += len(set(found) - {maid_id for maid_id, _, _ in expected})
+
+    return {
+        'queries': len(queries),
+        'missing': missing,
+        'extra': extra,
+        'legacy_ms': legacy_time * 1000 / len(queries),
+        'index_ms': index_time * 1000 / len(queries),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="So recall của MaidSearchIndex với scorer difflib cũ")
+    parser.add_argument('--threshold', type=float, default=0.6, help="Ngưỡng điểm (mặc định 0.6 như MaidFuzzySearch)")
+    parser.add_argument('--check', action='store_true', help="Exit 1 nếu scorer cũ tìm được mà index không")
+    args = parser.parse_args(argv)
+
+    report = compare(MAID_TEMPLATES, args.threshold)
+    print(f"🔍 {report['queries']} queries trên {len(MAID_TEMPLATES)} templates (threshold {args.threshold})")
+    print(f"   Scorer cũ: {report['legacy_ms']:.3f} ms/query | Index: {report['index_ms']:.3f} ms/query")
+    print(f"   Kết quả thêm của index (maid_id / alias / chuẩn hoá): {report['extra']}")
+    if report['missing']:
+        print(f"❌ {len(report['missing'])} kết quả của scorer cũ bị mất:")
+        for query, maid_id, score, found in report['missing'][:20]:
+            print(f"   {query!r} -> {maid_id} (cũ {score:.2f}, index {found})")
+    else:
+        print("✅ Index tìm được mọi kết quả của scorer cũ")
+
+    return 1 if args.check and report['missing'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
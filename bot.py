@@ -38,6 +38,11 @@ class FarmBot(commands.Bot):
             await self.db.init_db()
             logger.info("✅ Database connected successfully")
             
+            from utils.world_modifiers import world_modifiers
+            world_modifiers.init(self)
+            from utils.crop_readiness import crop_readiness
+            crop_readiness.init(self)
+            
             # Apply integration fixes for Gemini
             from ai.integration_fix import GeminiIntegrationFix
             integration_fix = GeminiIntegrationFix(self)
@@ -76,6 +81,7 @@ class FarmBot(commands.Bot):
             'features.pond',       # Pond System - Fish farming
             'features.barn',       # Barn System - Animal farming
             'features.livestock',  # Livestock Overview System
+            'features.ready_notifier', # Harvest-ready notifications (opt-in)
         ]
         
         loaded_count = 0
@@ -120,6 +126,9 @@ class FarmBot(commands.Bot):
         
         # Initialize cog state managers
         await self._initialize_cog_states()
+        
+        # Tính ready_at cho cây trồng theo weather/event/maid buff hiện tại
+        await self._initialize_crop_readiness()
     
     async def _initialize_game_master(self):
         """Initialize Gemini Game Master instance"""
@@ -137,8 +146,29 @@ class FarmBot(commands.Bot):
             from features.maid_helper_v2 import init_maid_helper
             maid_helper = init_maid_helper(self)
             logger.info("✅ Maid helper initialized")
+            
+            # Warm buff cache để farm/shop/harvest không query buff từ disk
+            from features.maid_buff_cache import maid_buff_cache
+            await maid_buff_cache.load(self.db)
         except Exception as e:
             log_error(logger, "❌ Error initializing maid helper", e)
+        
+        try:
+            # Log buff usage ghi theo batch, không chặn lệnh farm
+            # (chạy riêng: warm cache lỗi không được làm mất log / security alert)
+            from features.maid_monitoring import maid_monitor
+            maid_monitor.start()
+        except Exception as e:
+            log_error(logger, "❌ Error starting maid monitoring", e)
+    
+    async def _initialize_crop_readiness(self):
+        """Backfill / recompute crops.ready_at after modifiers are loaded"""
+        try:
+            from utils.crop_readiness import crop_readiness
+            count = await crop_readiness.refresh()
+            logger.info(f"✅ Crop ready_at computed ({count} crop groups)")
+        except Exception as e:
+            log_error(logger, "❌ Error computing crop ready_at", e)
     
     async def _initialize_cog_states(self):
         """Initialize state managers for cogs that need persistence"""
@@ -278,6 +308,13 @@ async def shutdown_handler(bot):
     except Exception as e:
         log_error(logger, "⚠️ Error during Discord shutdown", e)
     
+    try:
+        # Ghi nốt buff logs / security alerts còn trong buffer
+        from features.maid_monitoring import maid_monitor
+        await maid_monitor.stop()
+    except Exception as e:
+        log_error(logger, "⚠️ Error flushing maid monitoring", e)
+    
     try:
         # Close database connection
         if bot.db:
@@ -1,23 +1,270 @@
+import asyncio
+import time
 import aiosqlite
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 import config
+from .user_cache import get_user_cache
+from .leaderboard_index import get_leaderboard_index
+from .economy_stream import get_economy_aggregator
 from .models import User, Crop, InventoryItem, WeatherNotification, MarketNotification, AINotification, EventClaim, BotState, Species, UserLivestock, UserFacilities, LivestockProduct
 from utils.enhanced_logging import get_database_logger, log_error
 
 logger = get_database_logger()
 
+# PRAGMA áp dụng cho mọi connection (writer + readers)
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',        # Readers không block writer
+    'PRAGMA synchronous=NORMAL',      # An toàn với WAL, ít fsync hơn FULL
+    'PRAGMA cache_size=-16000',       # ~16MB page cache mỗi connection
+    'PRAGMA mmap_size=268435456',     # 256MB memory-mapped I/O
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',       # Chờ lock thay vì lỗi "database is locked"
+)
+
+# Cột dùng cho từng bảng xếp hạng (board_type -> column)
+RANK_COLUMNS = {
+    'money': 'money',
+    'streak': 'daily_streak',
+    'land': 'land_slots',
+}
+
+# Group commit: gom nhiều write vào một transaction (một lần fsync)
+WRITE_BATCH_INTERVAL = 0.005  # Thời gian gom tối đa (giây)
+WRITE_BATCH_MAX_OPS = 64      # Số thao tác tối đa mỗi batch
+
+# Money ledger: chu kỳ gộp money_ledger vào money_ledger_hourly (giây)
+LEDGER_ROLLUP_INTERVAL = 300
+
 class Database:
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.connection = None
-        self._connection_pool = {}  # Simple connection pooling
+        self.connection = None  # Writer connection duy nhất (dùng chung với các cogs)
+        self._connection_pool: Optional[asyncio.Queue] = None  # Reader connections
+        self._reader_connections = []
         self._pool_size = 5
+        self._write_lock = asyncio.Lock()  # Serialize writes trên writer connection
+        self._transaction_owner: Optional[asyncio.Task] = None  # Task đang giữ transaction() trên writer
+        self._write_queue: Optional[asyncio.Queue] = None  # Group-commit queue
+        self._write_task: Optional[asyncio.Task] = None
+        self._batch_interval = WRITE_BATCH_INTERVAL
+        self._batch_max_ops = WRITE_BATCH_MAX_OPS
+        self._connection_attempts = 0
+        self._max_retries = 3
         self._query_cache = {}  # Cache for expensive queries
+        self.user_cache = get_user_cache(db_path)  # Identity map User (dùng chung theo db_path)
+        self.leaderboard = get_leaderboard_index(db_path)  # Bảng xếp hạng trong RAM
+        self.economy = get_economy_aggregator(db_path)  # Bộ đếm kinh tế (money-delta stream)
+        self._background_tasks = set()
+        self._ledger_rollup_task: Optional[asyncio.Task] = None
         self._cache_expiry = timedelta(minutes=5)
     
+    async def _open_connection(self) -> aiosqlite.Connection:
+        """Open a connection with the standard PRAGMAs applied"""
+        connection = await aiosqlite.connect(self.db_path)
+        for pragma in CONNECTION_PRAGMAS:
+            await connection.execute(pragma)
+        return connection
+    
+    async def _init_pool(self):
+        """Open reader connections for the pool"""
+        await self._close_pool()
+        
+        pool = asyncio.Queue()
+        for _ in range(self._pool_size):
+            reader = await self._open_connection()
+            self._reader_connections.append(reader)
+            pool.put_nowait(reader)
+        
+        self._connection_pool = pool
+    
+    async def _close_pool(self):
+        """Close all reader connections"""
+        self._connection_pool = None
+        readers, self._reader_connections = self._reader_connections, []
+        for reader in readers:
+            try:
+                await reader.close()
+            except Exception:
+                pass
+    
+    @asynccontextmanager
+    async def reader(self):
+        """Acquire a reader connection from the pool (released on exit)"""
+        pool = self._connection_pool
+        if pool is None:
+            # Pool chưa sẵn sàng - đọc trên writer connection
+            yield self.connection
+            return
+        
+        connection = await pool.get()
+        try:
+            yield connection
+        finally:
+            pool.put_nowait(connection)
+    
+    @asynccontextmanager
+    async def writer(self):
+        """Acquire the serialized writer connection"""
+        async with self._write_lock:
+            yield self.connection
+    
+    @asynccontextmanager
+    async def transaction(self):
+        """Run a block atomically on the writer connection.
+        
+        Commits on success, rolls back on error. A transaction() nested
+        inside another one of this Database (same task) uses a SAVEPOINT so
+        the inner block still rolls back on its own. A transaction opened on
+        the shared connection by anyone else (raw BEGIN / implicit DML) is
+        never joined - that would hand its commit to a foreign ROLLBACK.
+        """
+        if self._transaction_owner is not None and self._transaction_owner is asyncio.current_task():
+            # Đang ở trong transaction của chính Database này -> SAVEPOINT
+            connection = self.connection
+            await connection.execute('SAVEPOINT db_transaction')
+            try:
+                yield connection
+            except BaseException:
+                await connection.execute('ROLLBACK TO db_transaction')
+                await connection.execute('RELEASE db_transaction')
+                raise
+            else:
+                await connection.execute('RELEASE db_transaction')
+            return
+        
+        async with self.writer() as connection:
+            if connection.in_transaction:
+                raise RuntimeError(
+                    "Writer connection is inside a transaction not opened by Database.transaction(); "
+                    "refusing to join it (use db.transaction() instead of raw BEGIN/commit)"
+                )
+            
+            await connection.execute('BEGIN IMMEDIATE')
+            self._transaction_owner = asyncio.current_task()
+            try:
+                yield connection
+                await connection.commit()
+            except BaseException:
+                if connection.in_transaction:
+                    await connection.rollback()
+                raise
+            finally:
+                self._transaction_owner = None
+    
+    async def _fetchone(self, query: str, params=()):
+        """Run a read query on a pooled reader and return one row"""
+        async with self.reader() as connection:
+            cursor = await connection.execute(query, params)
+            return await cursor.fetchone()
+    
+    async def _fetchall(self, query: str, params=()):
+        """Run a read query on a pooled reader and return all rows"""
+        async with self.reader() as connection:
+            cursor = await connection.execute(query, params)
+            return await cursor.fetchall()
+    
+    async def _execute_write(self, query: str, params=()):
+        """Queue a write statement and wait until its batch commits.
+        
+        Errors of the statement are raised to the caller; once this returns
+        the row is committed, so reads on the pool see it.
+        """
+        if self._transaction_owner is not None and self._transaction_owner is asyncio.current_task():
+            # Gọi từ bên trong transaction() của chính task này - ghi thẳng vào transaction đó
+            return await self.connection.execute(query, params)
+        
+        if self._write_task is None or self._write_task.done():
+            # Writer task chưa chạy (trước init_db / sau close) - ghi trực tiếp
+            async with self.transaction() as connection:
+                return await connection.execute(query, params)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((query, params, future))
+        return await future
+    
+    def _start_write_task(self):
+        """Start the group-commit writer task"""
+        if self._write_task is not None and not self._write_task.done():
+            return
+        self._write_queue = asyncio.Queue()
+        self._write_task = asyncio.create_task(self._write_loop())
+    
+    async def _stop_write_task(self):
+        """Flush pending writes and stop the writer task"""
+        task, self._write_task = self._write_task, None
+        if task is None or task.done():
+            return
+        self._write_queue.put_nowait(None)  # Sentinel: flush rồi dừng
+        try:
+            await task
+        except Exception as e:
+            log_error(logger, "❌ Error stopping database write queue", e)
+    
+    async def _write_loop(self):
+        """Single writer: coalesce queued writes into one transaction"""
+        queue = self._write_queue
+        stopping = False
+        
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            
+            batch = [item]
+            deadline = asyncio.get_running_loop().time() + self._batch_interval
+            while len(batch) < self._batch_max_ops:
+                timeout = deadline - asyncio.get_running_loop().time()
+                try:
+                    if timeout > 0:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    else:
+                        item = queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            await self._commit_batch(batch)
+    
+    async def _commit_batch(self, batch):
+        """Commit one batch; a failing statement only fails its own caller"""
+        results = []
+        try:
+            async with self.transaction() as connection:
+                for query, params, future in batch:
+                    # SAVEPOINT riêng cho từng statement để lỗi không kéo cả batch
+                    await connection.execute('SAVEPOINT batch_op')
+                    try:
+                        cursor = await connection.execute(query, params)
+                    except Exception as e:
+                        await connection.execute('ROLLBACK TO batch_op')
+                        await connection.execute('RELEASE batch_op')
+                        results.append((future, None, e))
+                    else:
+                        await connection.execute('RELEASE batch_op')
+                        results.append((future, cursor, None))
+        except Exception as e:
+            # Commit thất bại - không statement nào được ghi
+            log_error(logger, f"❌ Group commit failed ({len(batch)} writes)", e)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for future, cursor, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(cursor)
+    
     async def get_connection(self):
-        """Get a database connection from pool or create new one"""
+        """Get the shared writer connection (reconnect if it was closed)"""
         try:
             # Try to reuse existing connection - check if connection exists and is not closed
             if self.connection:
@@ -30,8 +277,7 @@ class Database:
                     self.connection = None
             
             # Create new connection
-            self.connection = await aiosqlite.connect(self.db_path)
-            self.connection.row_factory = aiosqlite.Row  # Enable dict-like access
+            self.connection = await self._open_connection()
             return self.connection
         except Exception as e:
             print(f"Database connection error: {e}")
@@ -63,8 +309,9 @@ class Database:
             if self.connection:
                 await self.connection.close()
                 
-            self.connection = await aiosqlite.connect(self.db_path)
+            self.connection = await self._open_connection()
             await self._create_tables()
+            await self._init_pool()
             logger.info(f"✅ Database reconnected (attempt {self._connection_attempts})")
             self._connection_attempts = 0  # Reset on successful connection
             
@@ -73,24 +320,172 @@ class Database:
             raise
     
     async def init_db(self):
-        """Initialize database and create tables"""
-        self.connection = await aiosqlite.connect(self.db_path)
+        """Initialize database, create tables and open the reader pool"""
+        self.connection = await self._open_connection()
         await self._create_tables()
-        logger.info("Database initialized")
+        await self._init_pool()
+        self._start_write_task()
+        await self._load_registered_users()
+        await self._load_leaderboard()
+        await self._load_economy()
+        self._start_ledger_rollup_task()
+        logger.info(f"Database initialized (WAL, {self._pool_size} readers + 1 writer)")
+    
+    async def _load_registered_users(self):
+        """Nạp set user_id đã đăng ký cho registration check"""
+        if self.user_cache.registered_loaded:
+            return
+        rows = await self._fetchall('SELECT user_id FROM users')
+        self.user_cache.load_registered(row[0] for row in rows)
+    
+    async def _load_leaderboard(self):
+        """Rebuild bảng xếp hạng trong RAM từ SQL (chỉ khi khởi động)"""
+        if self.leaderboard.loaded:
+            return
+        rows = await self._fetchall(
+            'SELECT user_id, username, money, daily_streak, land_slots FROM users'
+        )
+        self.leaderboard.load_users(rows)
+        await self.load_maid_leaderboard()
+    
+    async def _load_economy(self):
+        """Tổng tiền lưu hành ban đầu cho EconomyAggregator"""
+        if self.economy.loaded:
+            return
+        row = await self._fetchone('SELECT COALESCE(SUM(money), 0) FROM users')
+        self.economy.load_circulation(row[0] if row else 0)
+    
+    def record_money_delta(self, user_id: int, amount: int, source: str = 'unknown',
+                           balance: Optional[int] = None):
+        """Phát MoneyDelta sau khi thay đổi tiền đã commit
+        (gọi trực tiếp từ các chỗ sửa users.money bằng SQL riêng: gacha, trade...)"""
+        self.economy.record(user_id, amount, source, balance)
+    
+    async def append_money_ledger(self, connection, user_id: int, delta: int, source: str,
+                                  balance_after: Optional[int] = None):
+        """Ghi một dòng money_ledger trên connection đang mở transaction
+        (phải gọi trước commit, cùng transaction với UPDATE users)"""
+        if not delta:
+            return
+        if balance_after is None:
+            await connection.execute('''
+                INSERT INTO money_ledger (user_id, delta, balance_after, source, ts)
+                SELECT ?, ?, money, ?, ? FROM users WHERE user_id = ?
+            ''', (user_id, delta, source, int(time.time()), user_id))
+        else:
+            await connection.execute('''
+                INSERT INTO money_ledger (user_id, delta, balance_after, source, ts)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, delta, balance_after, source, int(time.time())))
+    
+    def _start_ledger_rollup_task(self):
+        """Gộp money_ledger vào money_ledger_hourly định kỳ"""
+        if self._ledger_rollup_task is not None and not self._ledger_rollup_task.done():
+            return
+        self._ledger_rollup_task = asyncio.create_task(self._ledger_rollup_loop())
+    
+    async def _ledger_rollup_loop(self):
+        while True:
+            try:
+                await self.rollup_money_ledger()
+            except Exception as e:
+                log_error(logger, "❌ Money ledger rollup failed", e)
+            await asyncio.sleep(LEDGER_ROLLUP_INTERVAL)
+    
+    async def rollup_money_ledger(self):
+        """Tính lại các giờ từ giờ đã gộp gần nhất (giờ hiện tại được ghi đè ở lần sau)"""
+        row = await self._fetchone('SELECT MAX(hour) FROM money_ledger_hourly')
+        since = row[0] if row and row[0] is not None else 0
+        await self._execute_write('''
+            INSERT INTO money_ledger_hourly (hour, source, inflow, outflow, events)
+            SELECT ts / 3600 * 3600, source,
+                   SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END),
+                   SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END),
+                   COUNT(*)
+            FROM money_ledger WHERE ts >= ?
+            GROUP BY ts / 3600, source
+            ON CONFLICT (hour, source) DO UPDATE SET
+                inflow = excluded.inflow, outflow = excluded.outflow, events = excluded.events
+        ''', (since,))
+    
+    async def get_money_activity(self, since: int, sources: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Tiền vào / ra theo subsystem từ thời điểm since (epoch) - dùng idx_money_ledger_ts"""
+        query = '''
+            SELECT source, SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END),
+                   SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END), COUNT(*)
+            FROM money_ledger WHERE ts >= ?
+        '''
+        params = [since]
+        if sources:
+            query += f" AND source IN ({','.join('?' for _ in sources)})"
+            params.extend(sources)
+        rows = await self._fetchall(query + ' GROUP BY source', tuple(params))
+        return {
+            source: {'inflow': inflow, 'outflow': outflow, 'net': inflow - outflow, 'events': events}
+            for source, inflow, outflow, events in rows
+        }
+    
+    async def get_hourly_money_flows(self, hours: int = 24) -> List[tuple]:
+        """(hour, source, inflow, outflow, events) từ bảng rollup, N giờ gần nhất"""
+        since = (int(time.time()) // 3600 - hours + 1) * 3600
+        return await self._fetchall('''
+            SELECT hour, source, inflow, outflow, events FROM money_ledger_hourly
+            WHERE hour >= ? ORDER BY hour, source
+        ''', (since,))
+    
+    async def get_user_money_ledger(self, user_id: int, limit: int = 20) -> List[tuple]:
+        """Lịch sử thay đổi tiền của user (mới nhất trước) - audit"""
+        return await self._fetchall('''
+            SELECT delta, balance_after, source, ts FROM money_ledger
+            WHERE user_id = ? ORDER BY ts DESC, id DESC LIMIT ?
+        ''', (user_id, limit))
+    
+    async def load_maid_leaderboard(self):
+        """Rebuild board maid (user_maids_v2 do maid system tạo, có thể chưa tồn tại)"""
+        if self.leaderboard.maid_loaded or not await self.table_exists('user_maids_v2'):
+            return
+        rows = await self._fetchall(
+            'SELECT user_id, COUNT(*) FROM user_maids_v2 GROUP BY user_id'
+        )
+        self.leaderboard.load_maid_counts(rows)
+    
+    async def refresh_leaderboard_users(self, user_ids: List[int]):
+        """Đọc lại điểm của một số user sau khi bị sửa bằng SQL trực tiếp"""
+        if not self.leaderboard.loaded or not user_ids:
+            return
+        placeholders = ','.join('?' * len(user_ids))
+        rows = await self._fetchall(
+            f'SELECT user_id, username, money, daily_streak, land_slots FROM users WHERE user_id IN ({placeholders})',
+            tuple(user_ids)
+        )
+        for row in rows:
+            self.leaderboard.set_user_row(*row)
+        
+        if self.leaderboard.maid_loaded:
+            counts = dict(await self._fetchall(
+                f'SELECT user_id, COUNT(*) FROM user_maids_v2 WHERE user_id IN ({placeholders}) GROUP BY user_id',
+                tuple(user_ids)
+            ))
+            for user_id in user_ids:
+                self.leaderboard.set_maid_count(user_id, counts.get(user_id, 0))
     
     async def close(self):
-        """Close database connection"""
+        """Flush queued writes, close reader pool and writer connection"""
+        if self._ledger_rollup_task is not None:
+            self._ledger_rollup_task.cancel()
+            self._ledger_rollup_task = None
+        await self._stop_write_task()
+        await self._close_pool()
         if self.connection:
             await self.connection.close()
     
     async def table_exists(self, table_name: str) -> bool:
         """Check if table exists"""
         try:
-            cursor = await self.connection.execute(
+            row = await self._fetchone(
                 "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
                 (table_name,)
             )
-            row = await cursor.fetchone()
             return row is not None
         except Exception:
             return False
@@ -98,8 +493,9 @@ class Database:
     async def get_all_users(self) -> List[dict]:
         """Get all users as dictionaries"""
         try:
-            cursor = await self.connection.execute('SELECT * FROM users')
-            rows = await cursor.fetchall()
+            async with self.reader() as connection:
+                cursor = await connection.execute('SELECT * FROM users')
+                rows = await cursor.fetchall()
             
             # Get column names
             description = cursor.description
@@ -218,6 +614,42 @@ class Database:
             )
         ''')
         
+        # Opt-in thông báo khi cây / cá / gia súc sẵn sàng thu hoạch
+        await self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS ready_notifications (
+                user_id INTEGER PRIMARY KEY,
+                mode TEXT NOT NULL,
+                channel_id INTEGER,
+                enabled BOOLEAN DEFAULT 1,
+                updated_at TEXT NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        ''')
+        
+        # Money ledger: append-only, mỗi thay đổi tiền một dòng (ghi cùng transaction)
+        await self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS money_ledger (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                delta INTEGER NOT NULL,
+                balance_after INTEGER,
+                source TEXT NOT NULL,
+                ts INTEGER NOT NULL
+            )
+        ''')
+        
+        # Tổng hợp money_ledger theo giờ + subsystem (hour = epoch đầu giờ)
+        await self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS money_ledger_hourly (
+                hour INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                inflow INTEGER NOT NULL DEFAULT 0,
+                outflow INTEGER NOT NULL DEFAULT 0,
+                events INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (hour, source)
+            ) WITHOUT ROWID
+        ''')
+        
         # Bot state table để lưu trạng thái hệ thống
         await self.connection.execute('''
             CREATE TABLE IF NOT EXISTS bot_states (
@@ -296,14 +728,73 @@ class Database:
         except Exception:
             # Column might already exist, ignore error
             pass
+        
+        # Migration: ready_at (epoch) cho query "cây đã chín" phía SQL
+        try:
+            await self.connection.execute('ALTER TABLE crops ADD COLUMN ready_at INTEGER')
+            await self.connection.commit()
+            logger.info("✅ Added ready_at column to crops table")
+        except Exception:
+            pass
+        
+        await self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS idx_crops_user_ready ON crops (user_id, ready_at)'
+        )
+        await self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS idx_crops_ready_at ON crops (ready_at)'
+        )
+        
+        await self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS idx_money_ledger_ts ON money_ledger (ts)'
+        )
+        await self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS idx_money_ledger_user ON money_ledger (user_id, ts)'
+        )
+        
+        # Index cho leaderboard / rank: ORDER BY column DESC, user_id và COUNT(*) WHERE column > ?
+        for column in RANK_COLUMNS.values():
+            await self.connection.execute(
+                f'CREATE INDEX IF NOT EXISTS idx_users_{column} ON users ({column} DESC, user_id)'
+            )
+        await self.connection.commit()
     
     # User methods
     async def get_user(self, user_id: int) -> Optional[User]:
-        """Get user by ID"""
-        cursor = await self.connection.execute(
+        """Get user by ID (qua identity map - cùng user_id trả về cùng object)"""
+        return await self.user_cache.get_or_load(user_id, self._load_user)
+    
+    async def is_user_registered(self, user_id: int) -> bool:
+        """Registration check - dùng set user_id trong RAM, fallback query DB"""
+        registered = self.user_cache.is_registered(user_id)
+        if registered is not None:
+            return registered
+        return await self.get_user(user_id) is not None
+    
+    def invalidate_users(self, user_ids: Optional[List[int]] = None):
+        """Sau khi users / user_maids_v2 bị sửa bằng SQL trực tiếp:
+        bỏ User khỏi cache và cập nhật lại bảng xếp hạng (chạy nền)"""
+        self.user_cache.invalidate(user_ids)
+        if user_ids is None:
+            self.leaderboard.loaded = False
+            self.leaderboard.maid_loaded = False
+            self._spawn(self._load_leaderboard())
+            # Không biết tiền thay đổi bao nhiêu -> đọc lại tổng tiền lưu hành
+            self.economy.loaded = False
+            self._spawn(self._load_economy())
+        else:
+            self._spawn(self.refresh_leaderboard_users(list(user_ids)))
+    
+    def _spawn(self, coro):
+        """Chạy coroutine nền, giữ reference tới khi xong"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _load_user(self, user_id: int) -> Optional[User]:
+        """Load user từ DB (bỏ qua cache)"""
+        row = await self._fetchone(
             'SELECT * FROM users WHERE user_id = ?', (user_id,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return User(
@@ -321,33 +812,57 @@ class Database:
         """Create new user"""
         user = User(user_id, username)
         
-        await self.connection.execute('''
-            INSERT OR REPLACE INTO users 
-            (user_id, username, money, land_slots, daily_streak, joined_date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user.user_id, user.username, user.money, user.land_slots,
-              user.daily_streak, user.joined_date.isoformat()))
-        
-        await self.connection.commit()
+        async with self.transaction() as db:
+            await db.execute('''
+                INSERT OR REPLACE INTO users 
+                (user_id, username, money, land_slots, daily_streak, joined_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user.user_id, user.username, user.money, user.land_slots,
+                  user.daily_streak, user.joined_date.isoformat()))
+            await self.append_money_ledger(db, user.user_id, user.money, 'signup', user.money)
+        self.user_cache.put(user)
+        self.leaderboard.update_user(user)
+        self.record_money_delta(user.user_id, user.money, 'signup', user.money)
         return user
     
-    async def update_user(self, user: User):
-        """Update user data"""
-        await self.connection.execute('''
+    async def update_user(self, user: User, source: str = 'unknown'):
+        """Update user data (source: subsystem gây ra thay đổi tiền, nếu có)"""
+        query = '''
             UPDATE users SET username = ?, money = ?, land_slots = ?,
             last_daily = ?, daily_streak = ? WHERE user_id = ?
-        ''', (user.username, user.money, user.land_slots,
-              user.last_daily.isoformat() if user.last_daily else None,
-              user.daily_streak, user.user_id))
-        
-        await self.connection.commit()
+        '''
+        params = (user.username, user.money, user.land_slots,
+                  user.last_daily.isoformat() if user.last_daily else None,
+                  user.daily_streak, user.user_id)
+        # Caller khai báo source = có đổi tiền -> luôn đi transaction để ghi ledger
+        # theo số dư đọc từ DB. User cache là identity map (object đã bị sửa),
+        # còn điểm leaderboard có thể cũ, nên không dùng được để so sánh.
+        money_delta = 0
+        try:
+            if source == 'unknown':
+                # Chỉ đổi username / land / daily -> không cần ledger, đi qua group commit
+                await self._execute_write(query, params)
+            else:
+                async with self.transaction() as db:
+                    async with db.execute('SELECT money FROM users WHERE user_id = ?', (user.user_id,)) as cursor:
+                        row = await cursor.fetchone()
+                    await db.execute(query, params)
+                    if row:
+                        money_delta = user.money - row[0]
+                        await self.append_money_ledger(db, user.user_id, money_delta, source, user.money)
+        except Exception:
+            # Object có thể đã bị sửa nhưng chưa ghi được -> đọc lại từ DB lần sau
+            self.user_cache.invalidate([user.user_id])
+            raise
+        self.user_cache.put(user)
+        self.leaderboard.update_user(user)
+        self.record_money_delta(user.user_id, money_delta, source, user.money)
     
     async def get_top_users(self, limit: int = 10) -> List[User]:
         """Get top users by money"""
-        cursor = await self.connection.execute(
-            'SELECT * FROM users ORDER BY money DESC LIMIT ?', (limit,)
+        rows = await self._fetchall(
+            'SELECT * FROM users ORDER BY money DESC, user_id LIMIT ?', (limit,)
         )
-        rows = await cursor.fetchall()
         
         users = []
         for row in rows:
@@ -364,42 +879,133 @@ class Database:
         return users
     
     # Crop methods
-    async def plant_crop(self, user_id: int, crop_type: str, plot_index: int, plant_time: datetime):
+    async def plant_crop(self, user_id: int, crop_type: str, plot_index: int, plant_time: datetime,
+                         ready_at: Optional[int] = None):
         """Plant a crop on user's land with error handling"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute('''
-                    INSERT INTO crops (user_id, crop_type, plant_time, plot_index, growth_stage, buffs_applied)
-                    VALUES (?, ?, ?, ?, 0, ?)
-                ''', (user_id, crop_type, plant_time, plot_index, '{}'))
-                await db.commit()
+            await self._execute_write('''
+                INSERT INTO crops (user_id, crop_type, plant_time, plot_index, growth_stage, buffs_applied, ready_at)
+                VALUES (?, ?, ?, ?, 0, ?, ?)
+            ''', (user_id, crop_type, plant_time, plot_index, '{}', ready_at))
         except aiosqlite.IntegrityError as e:
             print(f"Database integrity error in plant_crop: {e}")
             raise Exception("Không thể trồng cây. Có thể ô đất đã được sử dụng.")
         except Exception as e:
             print(f"Database error in plant_crop: {e}")
             raise Exception("Lỗi cơ sở dữ liệu khi trồng cây.")
-    
+
+    async def plant_crops_bulk(self, user_id: int, crop_type: str, plot_indices: List[int],
+                               plant_time: datetime, ready_at: Optional[int] = None) -> int:
+        """Consume seeds and plant many plots in one transaction (all-or-nothing)
+
+        Returns:
+            number of crops planted
+        """
+        if not plot_indices:
+            return 0
+
+        seeds_needed = len(plot_indices)
+        try:
+            async with self.transaction() as db:
+                # Trừ hạt giống - chỉ thành công khi đủ số lượng
+                cursor = await db.execute('''
+                    UPDATE inventory
+                    SET quantity = quantity - ?
+                    WHERE user_id = ? AND item_type = 'seed' AND item_id = ?
+                    AND quantity >= ?
+                    RETURNING quantity
+                ''', (seeds_needed, user_id, crop_type, seeds_needed))
+                row = await cursor.fetchone()
+                if not row:
+                    raise ValueError("Không đủ hạt giống")
+
+                if row[0] <= 0:
+                    await db.execute(
+                        "DELETE FROM inventory WHERE user_id = ? AND item_type = 'seed' AND item_id = ?",
+                        (user_id, crop_type)
+                    )
+
+                await db.executemany('''
+                    INSERT INTO crops (user_id, crop_type, plant_time, plot_index, growth_stage, buffs_applied, ready_at)
+                    VALUES (?, ?, ?, ?, 0, ?, ?)
+                ''', [(user_id, crop_type, plant_time.isoformat(), plot_index, '{}', ready_at)
+                      for plot_index in plot_indices])
+
+            return seeds_needed
+        except ValueError:
+            raise Exception("Không đủ hạt giống để trồng cây.")
+        except aiosqlite.IntegrityError as e:
+            print(f"Database integrity error in plant_crops_bulk: {e}")
+            raise Exception("Không thể trồng cây. Có thể ô đất đã được sử dụng.")
+        except Exception as e:
+            print(f"Database error in plant_crops_bulk: {e}")
+            raise Exception("Lỗi cơ sở dữ liệu khi trồng cây.")
+
     async def get_user_crops(self, user_id: int) -> List[Crop]:
         """Get all crops for a user"""
-        cursor = await self.connection.execute(
+        rows = await self._fetchall(
             'SELECT * FROM crops WHERE user_id = ?', (user_id,)
         )
-        rows = await cursor.fetchall()
         
-        crops = []
-        for row in rows:
-            crops.append(Crop(
-                crop_id=row[0],
-                user_id=row[1],
-                crop_type=row[2],
-                plot_index=row[3],
-                plant_time=datetime.fromisoformat(row[4]),
-                growth_stage=row[5],
-                buffs_applied=row[6]
-            ))
+        return [self._row_to_crop(row) for row in rows]
+    
+    def _row_to_crop(self, row) -> Crop:
+        """Convert a crops row to Crop"""
+        return Crop(
+            crop_id=row[0],
+            user_id=row[1],
+            crop_type=row[2],
+            plot_index=row[3],
+            plant_time=datetime.fromisoformat(row[4]),
+            growth_stage=row[5],
+            buffs_applied=row[6],
+            ready_at=row[7] if len(row) > 7 else None
+        )
+    
+    async def get_ready_crops(self, user_id: int, now: Optional[int] = None) -> List[Crop]:
+        """Get crops whose ready_at has passed (indexed on user_id, ready_at)"""
+        now = int(time.time()) if now is None else now
+        rows = await self._fetchall(
+            'SELECT * FROM crops WHERE user_id = ? AND ready_at <= ? ORDER BY plot_index',
+            (user_id, now)
+        )
+        return [self._row_to_crop(row) for row in rows]
+    
+    async def count_ready_crops(self, now: Optional[int] = None) -> int:
+        """Count ready crops server-wide"""
+        now = int(time.time()) if now is None else now
+        row = await self._fetchone('SELECT COUNT(*) FROM crops WHERE ready_at <= ?', (now,))
+        return row[0] if row else 0
+    
+    async def get_crop_growth_groups(self, user_ids: Optional[List[int]] = None) -> List[tuple]:
+        """Distinct (user_id, crop_type) pairs that currently have crops"""
+        if user_ids is None:
+            return await self._fetchall('SELECT DISTINCT user_id, crop_type FROM crops')
         
-        return crops
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        placeholders = ",".join("?" * len(user_ids))
+        return await self._fetchall(
+            f'SELECT DISTINCT user_id, crop_type FROM crops WHERE user_id IN ({placeholders})',
+            user_ids
+        )
+    
+    async def update_crops_ready_at(self, growth_times: List[tuple]):
+        """Recompute ready_at from plant_time for (user_id, crop_type, growth_seconds) groups
+        
+        plant_time is stored as local time, the 'utc' modifier converts it the
+        same way datetime.timestamp() does.
+        """
+        if not growth_times:
+            return
+        
+        async with self.transaction() as db:
+            await db.executemany('''
+                UPDATE crops
+                SET ready_at = CAST(strftime('%s', plant_time, 'utc') AS INTEGER) + ?
+                WHERE user_id = ? AND crop_type = ?
+            ''', [(growth_seconds, user_id, crop_type) for user_id, crop_type, growth_seconds in growth_times])
     
     async def get_user_crops_optimized(self, user_id: int) -> List[Crop]:
         """Optimized version of get_user_crops with caching"""
@@ -444,32 +1050,67 @@ class Database:
     async def harvest_crop(self, crop_id: int):
         """Harvest a crop with error handling"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Start transaction
-                async with db.execute('BEGIN'):
-                    await db.execute('DELETE FROM crops WHERE crop_id = ?', (crop_id,))
-                    await db.commit()
+            await self._execute_write('DELETE FROM crops WHERE crop_id = ?', (crop_id,))
         except Exception as e:
             print(f"Database error in harvest_crop: {e}")
             raise Exception("Lỗi cơ sở dữ liệu khi thu hoạch.")
-    
+
+    async def harvest_crops_bulk(self, user_id: int, harvests: List[tuple]) -> List[int]:
+        """Harvest many crops in one transaction
+
+        Args:
+            harvests: list of (crop_id, crop_type, yield_amount)
+
+        Returns:
+            crop_ids that were actually harvested (crops already removed,
+            e.g. by a concurrent harvest, are skipped and not credited)
+        """
+        if not harvests:
+            return []
+
+        yields = {crop_id: (crop_type, yield_amount) for crop_id, crop_type, yield_amount in harvests}
+        placeholders = ",".join("?" * len(yields))
+
+        try:
+            async with self.transaction() as db:
+                cursor = await db.execute(
+                    f'DELETE FROM crops WHERE user_id = ? AND crop_id IN ({placeholders}) RETURNING crop_id',
+                    (user_id, *yields)
+                )
+                harvested_ids = [row[0] for row in await cursor.fetchall()]
+
+                # Gộp sản lượng theo loại cây - một upsert cho mỗi loại
+                totals: Dict[str, int] = {}
+                for crop_id in harvested_ids:
+                    crop_type, yield_amount = yields[crop_id]
+                    totals[crop_type] = totals.get(crop_type, 0) + yield_amount
+
+                await db.executemany('''
+                    INSERT INTO inventory (user_id, item_type, item_id, quantity)
+                    VALUES (?, 'crop', ?, ?)
+                    ON CONFLICT (user_id, item_type, item_id)
+                    DO UPDATE SET quantity = quantity + excluded.quantity
+                ''', [(user_id, crop_type, total) for crop_type, total in totals.items()])
+
+            return harvested_ids
+        except Exception as e:
+            print(f"Database error in harvest_crops_bulk: {e}")
+            raise Exception("Lỗi cơ sở dữ liệu khi thu hoạch.")
+
     # Inventory methods
     async def add_item(self, user_id: int, item_type: str, item_id: str, quantity: int):
         """Add item to inventory"""
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT OR REPLACE INTO inventory (user_id, item_type, item_id, quantity)
             VALUES (?, ?, ?, COALESCE((SELECT quantity FROM inventory 
                     WHERE user_id = ? AND item_type = ? AND item_id = ?), 0) + ?)
         ''', (user_id, item_type, item_id, user_id, item_type, item_id, quantity))
-        
-        await self.connection.commit()
     
     async def get_user_inventory(self, user_id: int) -> List[InventoryItem]:
         """Get user's inventory"""
-        cursor = await self.connection.execute(
+        rows = await self._fetchall(
             'SELECT * FROM inventory WHERE user_id = ? AND quantity > 0', (user_id,)
         )
-        rows = await cursor.fetchall()
         
         items = []
         for row in rows:
@@ -485,49 +1126,42 @@ class Database:
     async def use_item(self, user_id: int, item_type: str, item_id: str, quantity: int = 1) -> bool:
         """Use item from inventory with atomic transaction"""
         try:
-            # Start transaction
-            await self.connection.execute('BEGIN IMMEDIATE')
-            
-            # Atomic update with check
-            cursor = await self.connection.execute('''
-                UPDATE inventory 
-                SET quantity = quantity - ? 
-                WHERE user_id = ? AND item_type = ? AND item_id = ? 
-                AND quantity >= ?
-                RETURNING quantity
-            ''', (quantity, user_id, item_type, item_id, quantity))
-            
-            result = await cursor.fetchone()
-            
-            if not result:
-                # Not enough items or item doesn't exist
-                await self.connection.execute('ROLLBACK')
-                return False
-            
-            new_quantity = result[0]
-            
-            # Remove item if quantity is 0
-            if new_quantity <= 0:
-                await self.connection.execute(
-                    'DELETE FROM inventory WHERE user_id = ? AND item_type = ? AND item_id = ?',
-                    (user_id, item_type, item_id)
-                )
+            async with self.transaction() as connection:
+                # Atomic update with check
+                cursor = await connection.execute('''
+                    UPDATE inventory 
+                    SET quantity = quantity - ? 
+                    WHERE user_id = ? AND item_type = ? AND item_id = ? 
+                    AND quantity >= ?
+                    RETURNING quantity
+                ''', (quantity, user_id, item_type, item_id, quantity))
+                result = await cursor.fetchone()
+                
+                if not result:
+                    # Not enough items or item doesn't exist - nothing changed
+                    return False
+                
+                new_quantity = result[0]
+                
+                # Remove item if quantity is 0
+                if new_quantity <= 0:
+                    await connection.execute(
+                        'DELETE FROM inventory WHERE user_id = ? AND item_type = ? AND item_id = ?',
+                        (user_id, item_type, item_id)
+                    )
             
-            await self.connection.commit()
             return True
             
         except Exception as e:
-            await self.connection.execute('ROLLBACK')
             log_error(logger, "❌ Error using item from inventory", e)
             return False
     
     # Additional methods for leaderboard
     async def get_top_users_by_money(self, limit: int = 10) -> List[User]:
         """Get top users by money"""
-        cursor = await self.connection.execute(
-            'SELECT * FROM users ORDER BY money DESC LIMIT ?', (limit,)
+        rows = await self._fetchall(
+            'SELECT * FROM users ORDER BY money DESC, user_id LIMIT ?', (limit,)
         )
-        rows = await cursor.fetchall()
         
         users = []
         for row in rows:
@@ -545,10 +1179,9 @@ class Database:
     
     async def get_top_users_by_streak(self, limit: int = 10) -> List[User]:
         """Get top users by daily streak"""
-        cursor = await self.connection.execute(
-            'SELECT * FROM users ORDER BY daily_streak DESC LIMIT ?', (limit,)
+        rows = await self._fetchall(
+            'SELECT * FROM users ORDER BY daily_streak DESC, user_id LIMIT ?', (limit,)
         )
-        rows = await cursor.fetchall()
         
         users = []
         for row in rows:
@@ -566,10 +1199,9 @@ class Database:
     
     async def get_top_users_by_land(self, limit: int = 10) -> List[User]:
         """Get top users by land slots"""
-        cursor = await self.connection.execute(
-            'SELECT * FROM users ORDER BY land_slots DESC LIMIT ?', (limit,)
+        rows = await self._fetchall(
+            'SELECT * FROM users ORDER BY land_slots DESC, user_id LIMIT ?', (limit,)
         )
-        rows = await cursor.fetchall()
         
         users = []
         for row in rows:
@@ -585,24 +1217,80 @@ class Database:
         
         return users
     
+    def _leaderboard_ready(self, board_type: str) -> bool:
+        """Bảng xếp hạng trong RAM đã sẵn sàng cho board này chưa"""
+        if board_type == 'maid':
+            return self.leaderboard.maid_loaded
+        return self.leaderboard.loaded
+    
+    async def get_leaderboard(self, board_type: str = 'money', limit: int = 10) -> list:
+        """Top N của board (money|streak|land|maid) - đọc từ index trong RAM"""
+        if self._leaderboard_ready(board_type):
+            return self.leaderboard.top(board_type, limit)
+        
+        if board_type == 'streak':
+            return await self.get_top_users_by_streak(limit)
+        if board_type == 'land':
+            return await self.get_top_users_by_land(limit)
+        if board_type == 'money':
+            return await self.get_top_users_by_money(limit)
+        return []
+    
+    def get_leaderboard_around(self, user_id: int, board_type: str = 'money', radius: int = 2) -> list:
+        """Các user xung quanh user_id trên board (rỗng nếu index chưa sẵn sàng)"""
+        if not self._leaderboard_ready(board_type):
+            return []
+        return self.leaderboard.around(board_type, user_id, radius)
+    
+    async def get_user_ranks(self, user_id: int, board_types: Optional[List[str]] = None) -> Dict[str, int]:
+        """Thứ hạng chính xác của user trên các bảng xếp hạng
+        
+        Đọc từ index trong RAM nếu đã load. Fallback SQL:
+        rank = 1 + số user có giá trị lớn hơn + số user bằng giá trị nhưng user_id nhỏ hơn,
+        khớp với thứ tự ORDER BY column DESC, user_id của get_top_users_by_*.
+        Mỗi COUNT chỉ quét một đoạn của index idx_users_<column>.
+        """
+        board_types = board_types or list(RANK_COLUMNS)
+        if all(self._leaderboard_ready(board_type) for board_type in board_types):
+            ranks = {board_type: self.leaderboard.rank(board_type, user_id) for board_type in board_types}
+            if None not in ranks.values():
+                return ranks
+        
+        board_types = [board_type for board_type in board_types if board_type in RANK_COLUMNS]
+        if not board_types:
+            return {}
+        columns = [RANK_COLUMNS[board_type] for board_type in board_types]
+        
+        selects = ', '.join(
+            f'(SELECT COUNT(*) FROM users WHERE {column} > u.{column}) + '
+            f'(SELECT COUNT(*) FROM users WHERE {column} = u.{column} AND user_id < u.user_id) + 1'
+            for column in columns
+        )
+        row = await self._fetchone(f'SELECT {selects} FROM users u WHERE u.user_id = ?', (user_id,))
+        if not row:
+            return {}
+        return dict(zip(board_types, row))
+    
+    async def get_user_rank(self, user_id: int, board_type: str = 'money') -> Optional[int]:
+        """Thứ hạng của user trên một bảng xếp hạng (None nếu chưa đăng ký)"""
+        ranks = await self.get_user_ranks(user_id, [board_type])
+        return ranks.get(board_type)
+    
     # Weather notification methods
     async def set_weather_notification(self, guild_id: int, channel_id: int, city: str = "Ho Chi Minh City"):
         """Set up weather notification for a guild"""
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT OR REPLACE INTO weather_notifications 
             (guild_id, channel_id, enabled, city)
             VALUES (?, ?, 1, ?)
         ''', (guild_id, channel_id, city))
-        
-        await self.connection.commit()
     
     async def get_weather_notification(self, guild_id: int) -> Optional[WeatherNotification]:
         """Get weather notification settings for a guild"""
         
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM weather_notifications WHERE guild_id = ?', (guild_id,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return WeatherNotification(
@@ -616,27 +1304,24 @@ class Database:
     
     async def update_weather_notification(self, guild_id: int, last_weather: str):
         """Update last weather for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE weather_notifications SET last_weather = ? WHERE guild_id = ?',
             (last_weather, guild_id)
         )
-        await self.connection.commit()
     
     async def toggle_weather_notification(self, guild_id: int, enabled: bool):
         """Enable/disable weather notifications for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE weather_notifications SET enabled = ? WHERE guild_id = ?',
             (enabled, guild_id)
         )
-        await self.connection.commit()
     
     async def get_all_weather_notifications(self) -> List[WeatherNotification]:
         """Get all enabled weather notifications"""
         
-        cursor = await self.connection.execute(
+        rows = await self._fetchall(
             'SELECT * FROM weather_notifications WHERE enabled = 1'
         )
-        rows = await cursor.fetchall()
         
         notifications = []
         for row in rows:
@@ -653,21 +1338,18 @@ class Database:
     # Market notification methods
     async def set_market_notification(self, guild_id: int, channel_id: int, threshold: float = 0.1):
         """Set up market notification for a guild"""
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT OR REPLACE INTO market_notifications 
             (guild_id, channel_id, enabled, threshold)
             VALUES (?, ?, 1, ?)
         ''', (guild_id, channel_id, threshold))
-        
-        await self.connection.commit()
     
     async def get_market_notification(self, guild_id: int) -> Optional[MarketNotification]:
         """Get market notification settings for a guild"""
         
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM market_notifications WHERE guild_id = ?', (guild_id,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return MarketNotification(
@@ -681,27 +1363,24 @@ class Database:
     
     async def update_market_notification(self, guild_id: int, last_market_modifier: float):
         """Update last market modifier for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE market_notifications SET last_market_modifier = ? WHERE guild_id = ?',
             (last_market_modifier, guild_id)
         )
-        await self.connection.commit()
     
     async def toggle_market_notification(self, guild_id: int, enabled: bool):
         """Enable/disable market notifications for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE market_notifications SET enabled = ? WHERE guild_id = ?',
             (enabled, guild_id)
         )
-        await self.connection.commit()
     
     async def get_all_market_notifications(self) -> List[MarketNotification]:
         """Get all enabled market notifications"""
         
-        cursor = await self.connection.execute(
+        rows = await self._fetchall(
             'SELECT * FROM market_notifications WHERE enabled = 1'
         )
-        rows = await cursor.fetchall()
         
         notifications = []
         for row in rows:
@@ -720,21 +1399,18 @@ class Database:
                                   event_notifications: bool = True, weather_notifications: bool = True,
                                   economic_notifications: bool = True):
         """Set up AI notification for a guild"""
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT OR REPLACE INTO ai_notifications 
             (guild_id, channel_id, enabled, event_notifications, weather_notifications, economic_notifications)
             VALUES (?, ?, 1, ?, ?, ?)
         ''', (guild_id, channel_id, event_notifications, weather_notifications, economic_notifications))
-        
-        await self.connection.commit()
     
     async def get_ai_notification(self, guild_id: int) -> Optional[AINotification]:
         """Get AI notification settings for a guild"""
         
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM ai_notifications WHERE guild_id = ?', (guild_id,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return AINotification(
@@ -749,43 +1425,38 @@ class Database:
     
     async def toggle_ai_notification(self, guild_id: int, enabled: bool):
         """Enable/disable AI notifications for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE ai_notifications SET enabled = ? WHERE guild_id = ?',
             (enabled, guild_id)
         )
-        await self.connection.commit()
     
     async def toggle_ai_event_notification(self, guild_id: int, enabled: bool):
         """Enable/disable AI event notifications for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE ai_notifications SET event_notifications = ? WHERE guild_id = ?',
             (enabled, guild_id)
         )
-        await self.connection.commit()
     
     async def toggle_ai_weather_notification(self, guild_id: int, enabled: bool):
         """Enable/disable AI weather notifications for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE ai_notifications SET weather_notifications = ? WHERE guild_id = ?',
             (enabled, guild_id)
         )
-        await self.connection.commit()
     
     async def toggle_ai_economic_notification(self, guild_id: int, enabled: bool):
         """Enable/disable AI economic notifications for a guild"""
-        await self.connection.execute(
+        await self._execute_write(
             'UPDATE ai_notifications SET economic_notifications = ? WHERE guild_id = ?',
             (enabled, guild_id)
         )
-        await self.connection.commit()
     
     async def get_all_ai_notifications(self) -> List[AINotification]:
         """Get all enabled AI notifications"""
         
-        cursor = await self.connection.execute(
+        rows = await self._fetchall(
             'SELECT * FROM ai_notifications WHERE enabled = 1'
         )
-        rows = await cursor.fetchall()
         
         notifications = []
         for row in rows:
@@ -800,28 +1471,30 @@ class Database:
         
         return notifications
     
-    async def update_user_money(self, user_id: int, amount: int):
-        """Update user money with transaction safety"""
+    async def update_user_money(self, user_id: int, amount: int, source: str = 'unknown'):
+        """Update user money with transaction safety (source: subsystem cho economy stream)"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute('BEGIN'):
-                    # Get current money
-                    async with db.execute('SELECT money FROM users WHERE user_id = ?', (user_id,)) as cursor:
-                        row = await cursor.fetchone()
-                        if not row:
-                            raise Exception("User not found")
-                        
-                        current_money = row[0]
-                        new_money = current_money + amount
-                        
-                        if new_money < 0:
-                            raise Exception("Insufficient funds")
-                        
-                        # Update money
-                        await db.execute('UPDATE users SET money = ? WHERE user_id = ?', (new_money, user_id))
-                        await db.commit()
-                        
-                        return new_money
+            async with self.transaction() as db:
+                # Get current money
+                async with db.execute('SELECT money FROM users WHERE user_id = ?', (user_id,)) as cursor:
+                    row = await cursor.fetchone()
+                if not row:
+                    raise Exception("User not found")
+                
+                current_money = row[0]
+                new_money = current_money + amount
+                
+                if new_money < 0:
+                    raise Exception("Insufficient funds")
+                
+                # Update money
+                await db.execute('UPDATE users SET money = ? WHERE user_id = ?', (new_money, user_id))
+                await self.append_money_ledger(db, user_id, amount, source, new_money)
+            
+            self.user_cache.set_money(user_id, new_money)
+            self.leaderboard.set_money(user_id, new_money)
+            self.record_money_delta(user_id, amount, source, new_money)
+            return new_money
         except Exception as e:
             print(f"Database error in update_user_money: {e}")
             raise Exception("Lỗi cơ sở dữ liệu khi cập nhật tiền.")
@@ -829,13 +1502,15 @@ class Database:
     async def execute_transaction(self, operations: list):
         """Execute multiple operations in a single transaction"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute('BEGIN'):
-                    for operation in operations:
-                        query = operation['query']
-                        params = operation.get('params', ())
-                        await db.execute(query, params)
-                    await db.commit()
+            async with self.transaction() as db:
+                for operation in operations:
+                    query = operation['query']
+                    params = operation.get('params', ())
+                    await db.execute(query, params)
+            
+            # Không biết query nào đụng tới bảng users -> bỏ cache cho chắc
+            if any('users' in operation['query'] for operation in operations):
+                self.invalidate_users()
         except Exception as e:
             print(f"Transaction error: {e}")
             raise Exception("Lỗi thực hiện giao dịch cơ sở dữ liệu.")
@@ -843,48 +1518,50 @@ class Database:
     async def buy_seeds_transaction(self, user_id: int, seed_type: str, quantity: int, total_cost: int):
         """Buy seeds with transaction safety - deduct money and add seeds atomically"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute('BEGIN'):
-                    # Check current money
-                    async with db.execute('SELECT money FROM users WHERE user_id = ?', (user_id,)) as cursor:
-                        row = await cursor.fetchone()
-                        if not row:
-                            raise Exception("User not found")
-                        
-                        current_money = row[0]
-                        if current_money < total_cost:
-                            raise Exception("Insufficient funds")
-                        
-                        new_money = current_money - total_cost
-                    
-                    # Update money
-                    await db.execute('UPDATE users SET money = ? WHERE user_id = ?', (new_money, user_id))
-                    
-                    # Add seeds to inventory
-                    # Check if item already exists
-                    async with db.execute('''
-                        SELECT quantity FROM inventory 
+            async with self.transaction() as db:
+                # Check current money
+                async with db.execute('SELECT money FROM users WHERE user_id = ?', (user_id,)) as cursor:
+                    row = await cursor.fetchone()
+                if not row:
+                    raise Exception("User not found")
+                
+                current_money = row[0]
+                if current_money < total_cost:
+                    raise Exception("Insufficient funds")
+                
+                new_money = current_money - total_cost
+                
+                # Update money
+                await db.execute('UPDATE users SET money = ? WHERE user_id = ?', (new_money, user_id))
+                await self.append_money_ledger(db, user_id, -total_cost, 'shop', new_money)
+                
+                # Add seeds to inventory
+                # Check if item already exists
+                async with db.execute('''
+                    SELECT quantity FROM inventory 
+                    WHERE user_id = ? AND item_type = ? AND item_id = ?
+                ''', (user_id, 'seed', seed_type)) as cursor:
+                    row = await cursor.fetchone()
+                
+                if row:
+                    # Update existing
+                    new_quantity = row[0] + quantity
+                    await db.execute('''
+                        UPDATE inventory 
+                        SET quantity = ? 
                         WHERE user_id = ? AND item_type = ? AND item_id = ?
-                    ''', (user_id, 'seed', seed_type)) as cursor:
-                        row = await cursor.fetchone()
-                        
-                        if row:
-                            # Update existing
-                            new_quantity = row[0] + quantity
-                            await db.execute('''
-                                UPDATE inventory 
-                                SET quantity = ? 
-                                WHERE user_id = ? AND item_type = ? AND item_id = ?
-                            ''', (new_quantity, user_id, 'seed', seed_type))
-                        else:
-                            # Insert new
-                            await db.execute('''
-                                INSERT INTO inventory (user_id, item_type, item_id, quantity)
-                                VALUES (?, ?, ?, ?)
-                            ''', (user_id, 'seed', seed_type, quantity))
-                    
-                    await db.commit()
-                    return new_money
+                    ''', (new_quantity, user_id, 'seed', seed_type))
+                else:
+                    # Insert new
+                    await db.execute('''
+                        INSERT INTO inventory (user_id, item_type, item_id, quantity)
+                        VALUES (?, ?, ?, ?)
+                    ''', (user_id, 'seed', seed_type, quantity))
+            
+            self.user_cache.set_money(user_id, new_money)
+            self.leaderboard.set_money(user_id, new_money)
+            self.record_money_delta(user_id, -total_cost, 'shop', new_money)
+            return new_money
                     
         except Exception as e:
             print(f"Buy seeds transaction error: {e}")
@@ -893,83 +1570,255 @@ class Database:
     async def sell_crops_transaction(self, user_id: int, crop_type: str, quantity: int, total_earnings: int):
         """Sell crops with transaction safety - remove crops and add money atomically"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute('BEGIN'):
-                    # Check current crop quantity
-                    async with db.execute('''
-                        SELECT quantity FROM inventory 
+            async with self.transaction() as db:
+                # Check current crop quantity
+                async with db.execute('''
+                    SELECT quantity FROM inventory 
+                    WHERE user_id = ? AND item_type = ? AND item_id = ?
+                ''', (user_id, 'crop', crop_type)) as cursor:
+                    row = await cursor.fetchone()
+                if not row or row[0] < quantity:
+                    raise Exception("Insufficient crops")
+                
+                new_quantity = row[0] - quantity
+                
+                # Update crop quantity
+                if new_quantity > 0:
+                    await db.execute('''
+                        UPDATE inventory 
+                        SET quantity = ? 
                         WHERE user_id = ? AND item_type = ? AND item_id = ?
-                    ''', (user_id, 'crop', crop_type)) as cursor:
-                        row = await cursor.fetchone()
-                        if not row or row[0] < quantity:
-                            raise Exception("Insufficient crops")
-                        
-                        new_quantity = row[0] - quantity
-                    
-                    # Update crop quantity
-                    if new_quantity > 0:
-                        await db.execute('''
-                            UPDATE inventory 
-                            SET quantity = ? 
-                            WHERE user_id = ? AND item_type = ? AND item_id = ?
-                        ''', (new_quantity, user_id, 'crop', crop_type))
-                    else:
-                        await db.execute('''
-                            DELETE FROM inventory 
-                            WHERE user_id = ? AND item_type = ? AND item_id = ?
-                        ''', (user_id, 'crop', crop_type))
-                    
-                    # Add money
-                    async with db.execute('SELECT money FROM users WHERE user_id = ?', (user_id,)) as cursor:
-                        row = await cursor.fetchone()
-                        if not row:
-                            raise Exception("User not found")
-                        
-                        new_money = row[0] + total_earnings
-                    
-                    await db.execute('UPDATE users SET money = ? WHERE user_id = ?', (new_money, user_id))
-                    
-                    await db.commit()
-                    return new_money
+                    ''', (new_quantity, user_id, 'crop', crop_type))
+                else:
+                    await db.execute('''
+                        DELETE FROM inventory 
+                        WHERE user_id = ? AND item_type = ? AND item_id = ?
+                    ''', (user_id, 'crop', crop_type))
+                
+                # Add money
+                async with db.execute('SELECT money FROM users WHERE user_id = ?', (user_id,)) as cursor:
+                    row = await cursor.fetchone()
+                if not row:
+                    raise Exception("User not found")
+                
+                new_money = row[0] + total_earnings
+                
+                await db.execute('UPDATE users SET money = ? WHERE user_id = ?', (new_money, user_id))
+                await self.append_money_ledger(db, user_id, total_earnings, 'market', new_money)
+            
+            self.user_cache.set_money(user_id, new_money)
+            self.leaderboard.set_money(user_id, new_money)
+            self.record_money_delta(user_id, total_earnings, 'market', new_money)
+            return new_money
                     
         except Exception as e:
             print(f"Sell crops transaction error: {e}")
             raise Exception("Lỗi khi bán nông sản.") 
     
+    # Set-based money operations (Game Master): một transaction, vài statement
+    async def _apply_money_adjustments(self, operation: str, select_sql: str, params: Dict[str, Any],
+                                       source: str, dry_run: bool = False) -> Dict[str, Any]:
+        """Áp dụng (user_id, delta) do select_sql sinh ra cho toàn bộ users cùng lúc.
+        
+        Ghi ledger + UPDATE users trong một transaction (không có trạng thái
+        áp dụng nửa chừng). dry_run chỉ tính toán trên reader, không ghi gì.
+        """
+        preview_sql = f'''
+            SELECT a.user_id, a.delta, u.money + a.delta
+            FROM ({select_sql}) a JOIN users u ON u.user_id = a.user_id
+            WHERE a.delta != 0
+        '''
+        if dry_run:
+            adjustments = await self._fetchall(preview_sql, params)
+        else:
+            async with self.transaction() as db:
+                await db.execute(
+                    'CREATE TEMP TABLE IF NOT EXISTS money_adjustments '
+                    '(user_id INTEGER PRIMARY KEY, delta INTEGER NOT NULL, balance_after INTEGER NOT NULL)'
+                )
+                await db.execute('DELETE FROM money_adjustments')
+                await db.execute(f'INSERT INTO money_adjustments (user_id, delta, balance_after) {preview_sql}', params)
+                await db.execute('''
+                    INSERT INTO money_ledger (user_id, delta, balance_after, source, ts)
+                    SELECT user_id, delta, balance_after, ?, ? FROM money_adjustments
+                ''', (source, int(time.time())))
+                await db.execute('''
+                    UPDATE users SET money = (
+                        SELECT balance_after FROM money_adjustments WHERE money_adjustments.user_id = users.user_id
+                    ) WHERE user_id IN (SELECT user_id FROM money_adjustments)
+                ''')
+                async with db.execute('SELECT user_id, delta, balance_after FROM money_adjustments') as cursor:
+                    adjustments = await cursor.fetchall()
+                await db.execute('DELETE FROM money_adjustments')
+            
+            for user_id, delta, balance_after in adjustments:
+                self.user_cache.set_money(user_id, balance_after)
+                self.leaderboard.set_money(user_id, balance_after)
+                self.record_money_delta(user_id, delta, source, balance_after)
+        
+        total_added = sum(delta for _, delta, _ in adjustments if delta > 0)
+        total_removed = -sum(delta for _, delta, _ in adjustments if delta < 0)
+        return {
+            'operation': operation,
+            'dry_run': dry_run,
+            'affected_users': len(adjustments),
+            'total_added': total_added,
+            'total_removed': total_removed,
+            'net': total_added - total_removed,
+            'adjustments': adjustments,  # [(user_id, delta, balance_after)]
+        }
+    
+    async def redistribute_wealth(self, wealth_threshold: int, rate: float,
+                                  source: str = 'ai_master', dry_run: bool = False) -> Dict[str, Any]:
+        """Robin hood: thu rate% của user có money > threshold, chia đều cho user có money < threshold / 2
+        (phần dư của phép chia bị thu hồi). Không làm gì nếu thiếu một trong hai nhóm."""
+        select_sql = '''
+            WITH rich AS (
+                SELECT user_id, CAST(money * :rate AS INTEGER) AS tax FROM users WHERE money > :threshold
+            ), poor AS (
+                SELECT user_id FROM users WHERE money < :poor_threshold
+            ), share AS (
+                SELECT COALESCE((SELECT SUM(tax) FROM rich), 0) / MAX(1, (SELECT COUNT(*) FROM poor)) AS amount
+            )
+            SELECT user_id, -tax AS delta FROM rich
+            WHERE tax > 0 AND EXISTS (SELECT 1 FROM poor)
+            UNION ALL
+            SELECT user_id, (SELECT amount FROM share) AS delta FROM poor
+        '''
+        params = {'rate': rate, 'threshold': wealth_threshold, 'poor_threshold': wealth_threshold / 2}
+        return await self._apply_money_adjustments('robin_hood', select_sql, params, source, dry_run)
+    
+    async def grant_universal_income(self, amount: int, source: str = 'ai_master',
+                                     dry_run: bool = False) -> Dict[str, Any]:
+        """UBI: cộng amount cho mọi user"""
+        return await self._apply_money_adjustments(
+            'universal_basic', 'SELECT user_id, :amount AS delta FROM users',
+            {'amount': amount}, source, dry_run
+        )
+    
+    async def apply_wealth_cap(self, cap: int, source: str = 'ai_master',
+                               dry_run: bool = False) -> Dict[str, Any]:
+        """Wealth cap: đưa money của user vượt cap về đúng cap"""
+        return await self._apply_money_adjustments(
+            'wealth_cap', 'SELECT user_id, :cap - money AS delta FROM users WHERE money > :cap',
+            {'cap': cap}, source, dry_run
+        )
+    
+    async def apply_money_sink(self, rate: float, min_balance: int = 0, source: str = 'ai_master',
+                               dry_run: bool = False) -> Dict[str, Any]:
+        """Money sink: thu rate% money của user có money > min_balance"""
+        return await self._apply_money_adjustments(
+            'money_sink',
+            'SELECT user_id, -CAST(money * :rate AS INTEGER) AS delta FROM users WHERE money > :min_balance',
+            {'rate': rate, 'min_balance': min_balance}, source, dry_run
+        )
+    
+    # Ready notification methods
+    async def set_ready_notification(self, user_id: int, mode: str, channel_id: Optional[int] = None):
+        """Opt a user in to ready notifications ('dm' or 'channel')"""
+        await self._execute_write('''
+            INSERT OR REPLACE INTO ready_notifications (user_id, mode, channel_id, enabled, updated_at)
+            VALUES (?, ?, ?, 1, ?)
+        ''', (user_id, mode, channel_id, datetime.now().isoformat()))
+    
+    async def disable_ready_notification(self, user_id: int):
+        """Opt a user out of ready notifications"""
+        await self._execute_write(
+            'UPDATE ready_notifications SET enabled = 0, updated_at = ? WHERE user_id = ?',
+            (datetime.now().isoformat(), user_id)
+        )
+    
+    async def get_ready_notification(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a user's ready notification settings"""
+        row = await self._fetchone(
+            'SELECT mode, channel_id, enabled FROM ready_notifications WHERE user_id = ?', (user_id,)
+        )
+        if row:
+            return {'mode': row[0], 'channel_id': row[1], 'enabled': bool(row[2])}
+        return None
+    
+    async def get_ready_notification_subscribers(self) -> List[tuple]:
+        """(user_id, mode, channel_id) of every opted-in user"""
+        return await self._fetchall(
+            'SELECT user_id, mode, channel_id FROM ready_notifications WHERE enabled = 1'
+        )
+    
+    async def get_upcoming_crop_ready_times(self, user_ids: List[int], now: Optional[int] = None) -> List[tuple]:
+        """(user_id, ready_at, count) of crops that will be ready after now"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        now = int(time.time()) if now is None else now
+        placeholders = ",".join("?" * len(user_ids))
+        return await self._fetchall(f'''
+            SELECT user_id, ready_at, COUNT(*) FROM crops
+            WHERE user_id IN ({placeholders}) AND ready_at > ?
+            GROUP BY user_id, ready_at
+        ''', (*user_ids, now))
+    
+    async def count_ready_crops_by_user(self, user_ids: List[int], now: Optional[int] = None) -> Dict[int, int]:
+        """Number of ready crops for each user"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        now = int(time.time()) if now is None else now
+        placeholders = ",".join("?" * len(user_ids))
+        rows = await self._fetchall(f'''
+            SELECT user_id, COUNT(*) FROM crops
+            WHERE user_id IN ({placeholders}) AND ready_at <= ?
+            GROUP BY user_id
+        ''', (*user_ids, now))
+        return {user_id: count for user_id, count in rows}
+    
+    async def get_livestock_for_users(self, user_ids: List[int]) -> List[UserLivestock]:
+        """All livestock of the given users in one query"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        placeholders = ",".join("?" * len(user_ids))
+        rows = await self._fetchall(
+            f'SELECT * FROM user_livestock WHERE user_id IN ({placeholders})', user_ids
+        )
+        return [UserLivestock(
+            livestock_id=row[0],
+            user_id=row[1],
+            species_id=row[2],
+            facility_type=row[3],
+            facility_slot=row[4],
+            birth_time=datetime.fromisoformat(row[5]),
+            is_adult=bool(row[6]),
+            last_product_time=datetime.fromisoformat(row[7]) if row[7] else None
+        ) for row in rows]
+    
     # Event claim methods
     async def has_claimed_event(self, user_id: int, event_id: str) -> bool:
         """Check if user has already claimed reward for this event"""
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT 1 FROM event_claims WHERE user_id = ? AND event_id = ?', 
             (user_id, event_id)
         )
-        row = await cursor.fetchone()
         return row is not None
     
     async def record_event_claim(self, user_id: int, event_id: str):
         """Record that user has claimed reward for this event"""
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT OR REPLACE INTO event_claims (user_id, event_id, claimed_at)
             VALUES (?, ?, ?)
         ''', (user_id, event_id, datetime.now().isoformat()))
-        
-        await self.connection.commit()
     
     async def get_user_event_claims(self, user_id: int) -> List[str]:
         """Get list of event IDs that user has claimed"""
-        cursor = await self.connection.execute(
+        rows = await self._fetchall(
             'SELECT event_id FROM event_claims WHERE user_id = ?', (user_id,)
         )
-        rows = await cursor.fetchall()
         return [row[0] for row in rows]
     
     # Bot State methods
     async def get_bot_state(self, state_key: str) -> Optional[BotState]:
         """Get bot state by key"""
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM bot_states WHERE state_key = ?', (state_key,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return BotState.from_dict({
@@ -982,14 +1831,12 @@ class Database:
     async def save_bot_state(self, bot_state: BotState):
         """Save bot state to database"""
         try:
-            await self.connection.execute('''
+            await self._execute_write('''
                 INSERT OR REPLACE INTO bot_states (state_key, state_data, updated_at)
                 VALUES (?, ?, ?)
             ''', (bot_state.state_key, bot_state.to_dict()['state_data'], 
                   bot_state.updated_at.isoformat()))
             
-            await self.connection.commit()
-            
         except Exception as e:
             log_error(logger, f"Error saving bot state {bot_state.state_key}", e)
             raise Exception("Lỗi lưu trạng thái hệ thống")
@@ -1028,10 +1875,9 @@ class Database:
     async def delete_bot_state(self, state_key: str):
         """Delete bot state"""
         try:
-            await self.connection.execute(
+            await self._execute_write(
                 'DELETE FROM bot_states WHERE state_key = ?', (state_key,)
             )
-            await self.connection.commit()
         except Exception as e:
             log_error(logger, f"Error deleting bot state {state_key}", e)
             raise Exception("Lỗi xóa trạng thái hệ thống")
@@ -1041,10 +1887,9 @@ class Database:
     # Species methods
     async def get_species(self, species_id: str) -> Optional[Species]:
         """Get species by ID"""
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM species WHERE species_id = ?', (species_id,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return Species(
@@ -1063,16 +1908,15 @@ class Database:
     async def get_all_species(self, species_type: str = None) -> List[Species]:
         """Get all species, optionally filtered by type"""
         if species_type:
-            cursor = await self.connection.execute(
+            rows = await self._fetchall(
                 'SELECT * FROM species WHERE species_type = ? ORDER BY tier, buy_price', 
                 (species_type,)
             )
         else:
-            cursor = await self.connection.execute(
+            rows = await self._fetchall(
                 'SELECT * FROM species ORDER BY species_type, tier, buy_price'
             )
         
-        rows = await cursor.fetchall()
         species_list = []
         
         for row in rows:
@@ -1092,7 +1936,7 @@ class Database:
     
     async def add_species(self, species: Species):
         """Add new species to database"""
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT OR REPLACE INTO species 
             (species_id, name, species_type, tier, buy_price, sell_price, 
              growth_time, special_ability, emoji)
@@ -1102,15 +1946,13 @@ class Database:
             species.buy_price, species.sell_price, species.growth_time,
             species.special_ability, species.emoji
         ))
-        await self.connection.commit()
     
     # User facilities methods
     async def get_user_facilities(self, user_id: int) -> UserFacilities:
         """Get user facilities, create default if not exists"""
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM user_facilities WHERE user_id = ?', (user_id,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return UserFacilities(
@@ -1123,61 +1965,56 @@ class Database:
         else:
             # Create default facilities
             facilities = UserFacilities(user_id=user_id)
-            await self.connection.execute('''
+            await self._execute_write('''
                 INSERT INTO user_facilities (user_id, pond_slots, barn_slots, pond_level, barn_level)
                 VALUES (?, ?, ?, ?, ?)
             ''', (user_id, facilities.pond_slots, facilities.barn_slots, 
                   facilities.pond_level, facilities.barn_level))
-            await self.connection.commit()
             return facilities
     
     async def create_user_facilities(self, user_id: int):
         """Create default user facilities"""
         facilities = UserFacilities(user_id=user_id)
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT INTO user_facilities (user_id, pond_slots, barn_slots, pond_level, barn_level)
             VALUES (?, ?, ?, ?, ?)
         ''', (user_id, facilities.pond_slots, facilities.barn_slots, 
               facilities.pond_level, facilities.barn_level))
-        await self.connection.commit()
         return facilities
 
     async def update_user_facilities(self, facilities: UserFacilities):
         """Update user facilities"""
-        await self.connection.execute('''
+        await self._execute_write('''
             UPDATE user_facilities 
             SET pond_slots = ?, barn_slots = ?, pond_level = ?, barn_level = ?
             WHERE user_id = ?
         ''', (facilities.pond_slots, facilities.barn_slots, 
               facilities.pond_level, facilities.barn_level, facilities.user_id))
-        await self.connection.commit()
     
     # User livestock methods
     async def add_livestock(self, user_id: int, species_id: str, facility_type: str, 
                            facility_slot: int, birth_time: datetime) -> int:
         """Add livestock to user facility, returns livestock_id"""
-        cursor = await self.connection.execute('''
+        cursor = await self._execute_write('''
             INSERT INTO user_livestock 
             (user_id, species_id, facility_type, facility_slot, birth_time)
             VALUES (?, ?, ?, ?, ?)
         ''', (user_id, species_id, facility_type, facility_slot, birth_time.isoformat()))
-        await self.connection.commit()
         return cursor.lastrowid
     
     async def get_user_livestock(self, user_id: int, facility_type: str = None) -> List[UserLivestock]:
         """Get user livestock, optionally filtered by facility type"""
         if facility_type:
-            cursor = await self.connection.execute(
+            rows = await self._fetchall(
                 'SELECT * FROM user_livestock WHERE user_id = ? AND facility_type = ? ORDER BY facility_slot',
                 (user_id, facility_type)
             )
         else:
-            cursor = await self.connection.execute(
+            rows = await self._fetchall(
                 'SELECT * FROM user_livestock WHERE user_id = ? ORDER BY facility_type, facility_slot',
                 (user_id,)
             )
         
-        rows = await cursor.fetchall()
         livestock_list = []
         
         for row in rows:
@@ -1196,11 +2033,10 @@ class Database:
     
     async def get_livestock_by_slot(self, user_id: int, facility_type: str, facility_slot: int) -> Optional[UserLivestock]:
         """Get livestock in specific slot"""
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM user_livestock WHERE user_id = ? AND facility_type = ? AND facility_slot = ?',
             (user_id, facility_type, facility_slot)
         )
-        row = await cursor.fetchone()
         
         if row:
             return UserLivestock(
@@ -1217,21 +2053,19 @@ class Database:
     
     async def update_livestock(self, livestock: UserLivestock):
         """Update livestock"""
-        await self.connection.execute('''
+        await self._execute_write('''
             UPDATE user_livestock 
             SET is_adult = ?, last_product_time = ?
             WHERE livestock_id = ?
         ''', (livestock.is_adult, 
               livestock.last_product_time.isoformat() if livestock.last_product_time else None,
               livestock.livestock_id))
-        await self.connection.commit()
     
     async def remove_livestock(self, livestock_id: int):
         """Remove livestock (for harvesting/selling)"""
-        await self.connection.execute(
+        await self._execute_write(
             'DELETE FROM user_livestock WHERE livestock_id = ?', (livestock_id,)
         )
-        await self.connection.commit()
     
     async def get_empty_facility_slots(self, user_id: int, facility_type: str) -> List[int]:
         """Get list of empty slots in facility"""
@@ -1239,11 +2073,11 @@ class Database:
         max_slots = facilities.pond_slots if facility_type == 'pond' else facilities.barn_slots
         
         # Get occupied slots
-        cursor = await self.connection.execute(
+        rows = await self._fetchall(
             'SELECT facility_slot FROM user_livestock WHERE user_id = ? AND facility_type = ?',
             (user_id, facility_type)
         )
-        occupied_slots = [row[0] for row in await cursor.fetchall()]
+        occupied_slots = [row[0] for row in rows]
         
         # Return empty slots
         return [slot for slot in range(max_slots) if slot not in occupied_slots]
@@ -1251,10 +2085,9 @@ class Database:
     # Livestock products methods
     async def get_livestock_product(self, species_id: str) -> Optional[LivestockProduct]:
         """Get product info for species"""
-        cursor = await self.connection.execute(
+        row = await self._fetchone(
             'SELECT * FROM livestock_products WHERE species_id = ?', (species_id,)
         )
-        row = await cursor.fetchone()
         
         if row:
             return LivestockProduct(
@@ -1268,10 +2101,9 @@ class Database:
     
     async def add_livestock_product(self, product: LivestockProduct):
         """Add livestock product definition"""
-        await self.connection.execute('''
+        await self._execute_write('''
             INSERT OR REPLACE INTO livestock_products 
             (species_id, product_name, product_emoji, production_time, sell_price)
             VALUES (?, ?, ?, ?, ?)
         ''', (product.species_id, product.product_name, product.product_emoji,
-              product.production_time, product.sell_price))
-        await self.connection.commit() 
\ No newline at end of file
+              product.production_time, product.sell_price)) 
\ No newline at end of file
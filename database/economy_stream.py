@@ -0,0 +1,159 @@
+"""
+Economy Stream - Luồng sự kiện thay đổi tiền + bộ đếm kinh tế chạy liên tục
+Mọi thay đổi money trong Database (update_user_money, update_user, mua/bán,
+gacha, casino, chuyển tiền...) phát ra một MoneyDelta. EconomyAggregator giữ
+tổng tiền lưu hành, nguồn vào / nguồn ra theo từng subsystem và dòng tiền
+theo giờ, nên snapshot kinh tế và tỷ lệ lạm phát là O(1).
+
+Giữ theo db_path như UserCache (xem lý do ở đó).
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Số giờ giữ dòng tiền theo giờ trong RAM
+FLOW_WINDOW_HOURS = 48
+# Cửa sổ mặc định khi tính lạm phát (giờ)
+INFLATION_WINDOW_HOURS = 24
+
+
+class MoneyDelta(NamedTuple):
+    """Một lần thay đổi tiền đã commit xuống DB"""
+    user_id: int
+    amount: int                 # > 0: tiền vào game (source), < 0: tiền bị rút (sink)
+    source: str                 # Subsystem: daily, shop, market, casino, gacha, transfer...
+    balance: Optional[int]      # Số dư sau thay đổi (None nếu không biết)
+    timestamp: float
+
+
+class FlowTotals:
+    """Tổng tiền vào / ra"""
+    __slots__ = ('inflow', 'outflow', 'events')
+
+    def __init__(self):
+        self.inflow = 0
+        self.outflow = 0
+        self.events = 0
+
+    def add(self, amount: int):
+        if amount > 0:
+            self.inflow += amount
+        else:
+            self.outflow -= amount
+        self.events += 1
+
+    @property
+    def net(self) -> int:
+        return self.inflow - self.outflow
+
+    def to_dict(self) -> Dict[str, int]:
+        return {'inflow': self.inflow, 'outflow': self.outflow, 'net': self.net, 'events': self.events}
+
+
+class EconomyAggregator:
+    """Bộ đếm kinh tế cập nhật theo từng MoneyDelta"""
+
+    def __init__(self, window_hours: int = FLOW_WINDOW_HOURS):
+        self.window_hours = window_hours
+        self.circulation = 0
+        self.loaded = False
+        self.started_at = time.time()
+        self.totals = FlowTotals()
+        self.by_source: Dict[str, FlowTotals] = {}
+        self._hourly: "OrderedDict[int, FlowTotals]" = OrderedDict()  # hour (epoch // 3600) -> flows
+        self._listeners: List[Callable[[MoneyDelta], None]] = []
+
+    def load_circulation(self, total_money: int):
+        """Đặt tổng tiền lưu hành ban đầu (SUM(money) khi khởi động)"""
+        self.circulation = total_money or 0
+        self.loaded = True
+
+    def add_listener(self, callback: Callable[[MoneyDelta], None]):
+        """Đăng ký callback nhận mọi MoneyDelta (ledger, metrics...)"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[MoneyDelta], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    # ---------- Ingest ----------
+
+    def record(self, user_id: int, amount: int, source: str = 'unknown',
+               balance: Optional[int] = None, timestamp: Optional[float] = None) -> Optional[MoneyDelta]:
+        """Ghi nhận một thay đổi tiền đã commit"""
+        if not amount:
+            return None
+        delta = MoneyDelta(user_id, amount, source, balance, timestamp or time.time())
+
+        self.circulation += amount
+        self.totals.add(amount)
+        flows = self.by_source.get(source)
+        if flows is None:
+            flows = self.by_source[source] = FlowTotals()
+        flows.add(amount)
+        self._hour_bucket(delta.timestamp).add(amount)
+
+        for callback in self._listeners:
+            try:
+                callback(delta)
+            except Exception:
+                pass  # Listener lỗi không được làm hỏng giao dịch đã commit
+        return delta
+
+    def _hour_bucket(self, timestamp: float) -> FlowTotals:
+        hour = int(timestamp // 3600)
+        bucket = self._hourly.get(hour)
+        if bucket is None:
+            bucket = self._hourly[hour] = FlowTotals()
+            while len(self._hourly) > self.window_hours:
+                self._hourly.popitem(last=False)
+        return bucket
+
+    # ---------- Queries ----------
+
+    def hourly_flows(self, hours: int = 24, now: Optional[float] = None) -> List[Dict[str, int]]:
+        """Dòng tiền các giờ gần nhất (cũ -> mới, giờ không có giao dịch = 0)"""
+        current_hour = int((now or time.time()) // 3600)
+        flows = []
+        for hour in range(current_hour - hours + 1, current_hour + 1):
+            bucket = self._hourly.get(hour)
+            entry = bucket.to_dict() if bucket else {'inflow': 0, 'outflow': 0, 'net': 0, 'events': 0}
+            entry['hour'] = hour * 3600
+            flows.append(entry)
+        return flows
+
+    def net_flow(self, hours: int = INFLATION_WINDOW_HOURS, now: Optional[float] = None) -> int:
+        """Tiền ròng vào game trong N giờ gần nhất"""
+        current_hour = int((now or time.time()) // 3600)
+        return sum(bucket.net for hour, bucket in self._hourly.items()
+                   if hour > current_hour - hours)
+
+    def inflation_rate(self, hours: int = INFLATION_WINDOW_HOURS, now: Optional[float] = None) -> float:
+        """Tăng trưởng tiền lưu hành trong N giờ: net / tiền lưu hành đầu kỳ"""
+        net = self.net_flow(hours, now)
+        base = self.circulation - net
+        if base <= 0:
+            return 0.0
+        return net / base
+
+    def snapshot(self) -> Dict:
+        """Toàn bộ bộ đếm (O(số subsystem))"""
+        return {
+            'circulation': self.circulation,
+            'totals': self.totals.to_dict(),
+            'by_source': {source: flows.to_dict() for source, flows in self.by_source.items()},
+            'net_flow_24h': self.net_flow(24),
+            'inflation_rate_24h': self.inflation_rate(24),
+            'tracking_since': self.started_at,
+        }
+
+
+_aggregators: Dict[str, EconomyAggregator] = {}
+
+
+def get_economy_aggregator(db_path: str) -> EconomyAggregator:
+    """EconomyAggregator dùng chung cho mọi Database instance cùng db_path"""
+    aggregator = _aggregators.get(db_path)
+    if aggregator is None:
+        aggregator = _aggregators[db_path] = EconomyAggregator()
+    return aggregator
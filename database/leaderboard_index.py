@@ -0,0 +1,173 @@
+"""
+Leaderboard Index - Bảng xếp hạng materialized trong RAM
+Mỗi board (money, streak, land, maid) là một list key (-score, user_id) đã
+sort, cập nhật từ các hook mutation trong Database và chỉ rebuild từ SQL khi
+khởi động. Top-N, rank và "players around me" không cần query SQLite.
+
+Thứ tự khớp với ORDER BY <column> DESC, user_id của get_top_users_by_*.
+"""
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# board_type -> field của profile
+BOARD_FIELDS = ('money', 'streak', 'land', 'maid')
+
+
+class LeaderboardEntry(NamedTuple):
+    """Một dòng trên bảng xếp hạng (cùng attribute với User cho embed)"""
+    rank: int
+    user_id: int
+    username: str
+    money: int
+    daily_streak: int
+    land_slots: int
+    maid_count: int
+
+
+class BoardIndex:
+    """Sorted list các key (-score, user_id) của một board"""
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int]] = []
+        self._scores: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, scores: Iterable[Tuple[int, int]]):
+        """Rebuild toàn bộ board từ (user_id, score)"""
+        self._scores = {user_id: score or 0 for user_id, score in scores}
+        self._keys = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def update(self, user_id: int, score: int):
+        score = score or 0
+        old_score = self._scores.get(user_id)
+        if old_score == score:
+            return
+        if old_score is not None:
+            self._remove_key((-old_score, user_id))
+        self._scores[user_id] = score
+        insort(self._keys, (-score, user_id))
+
+    def remove(self, user_id: int):
+        old_score = self._scores.pop(user_id, None)
+        if old_score is not None:
+            self._remove_key((-old_score, user_id))
+
+    def _remove_key(self, key: Tuple[int, int]):
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def score(self, user_id: int) -> Optional[int]:
+        return self._scores.get(user_id)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Thứ hạng (1-based) - O(log n)"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, user_id)) + 1
+
+    def slice(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """[(rank, user_id)] cho các vị trí start..stop-1 (0-based)"""
+        start = max(0, start)
+        return [(start + offset + 1, user_id)
+                for offset, (_, user_id) in enumerate(self._keys[start:stop])]
+
+
+class LeaderboardIndex:
+    """Các board + profile (username, money, streak, land, maid) của từng user"""
+
+    def __init__(self):
+        self.boards: Dict[str, BoardIndex] = {board_type: BoardIndex() for board_type in BOARD_FIELDS}
+        self._profiles: Dict[int, list] = {}  # user_id -> [username, money, streak, land, maid]
+        self.loaded = False
+        self.maid_loaded = False
+
+    # ---------- Rebuild (startup) ----------
+
+    def load_users(self, rows: Iterable[tuple]):
+        """Rebuild money/streak/land từ (user_id, username, money, daily_streak, land_slots)"""
+        profiles = {}
+        for user_id, username, money, daily_streak, land_slots in rows:
+            maid_count = self._profiles.get(user_id, [None, 0, 0, 0, 0])[4]
+            profiles[user_id] = [username, money or 0, daily_streak or 0, land_slots or 0, maid_count]
+        self._profiles = profiles
+
+        self.boards['money'].load((user_id, p[1]) for user_id, p in profiles.items())
+        self.boards['streak'].load((user_id, p[2]) for user_id, p in profiles.items())
+        self.boards['land'].load((user_id, p[3]) for user_id, p in profiles.items())
+        self.boards['maid'].load((user_id, p[4]) for user_id, p in profiles.items())
+        self.loaded = True
+
+    def load_maid_counts(self, rows: Iterable[Tuple[int, int]]):
+        """Rebuild board maid từ (user_id, số maid)"""
+        counts = dict(rows)
+        for user_id, profile in self._profiles.items():
+            profile[4] = counts.get(user_id, 0)
+        self.boards['maid'].load((user_id, p[4]) for user_id, p in self._profiles.items())
+        self.maid_loaded = True
+
+    # ---------- Mutation hooks ----------
+
+    def update_user(self, user):
+        """User (hoặc object cùng attribute) vừa được ghi xuống DB"""
+        self.set_user_row(user.user_id, user.username, user.money, user.daily_streak, user.land_slots)
+
+    def set_user_row(self, user_id: int, username: str, money: int, daily_streak: int, land_slots: int):
+        if not self.loaded:
+            return
+        profile = self._profiles.setdefault(user_id, [username, 0, 0, 0, 0])
+        profile[0:4] = [username, money or 0, daily_streak or 0, land_slots or 0]
+        self.boards['money'].update(user_id, profile[1])
+        self.boards['streak'].update(user_id, profile[2])
+        self.boards['land'].update(user_id, profile[3])
+        self.boards['maid'].update(user_id, profile[4])
+
+    def set_money(self, user_id: int, money: int):
+        profile = self._profiles.get(user_id)
+        if profile is None:
+            return
+        profile[1] = money
+        self.boards['money'].update(user_id, money)
+
+    def set_maid_count(self, user_id: int, count: int):
+        profile = self._profiles.get(user_id)
+        if profile is None:
+            return
+        profile[4] = count
+        self.boards['maid'].update(user_id, count)
+
+    # ---------- Queries ----------
+
+    def _entry(self, rank: int, user_id: int) -> LeaderboardEntry:
+        username, money, daily_streak, land_slots, maid_count = self._profiles[user_id]
+        return LeaderboardEntry(rank, user_id, username, money, daily_streak, land_slots, maid_count)
+
+    def rank(self, board_type: str, user_id: int) -> Optional[int]:
+        return self.boards[board_type].rank(user_id)
+
+    def top(self, board_type: str, limit: int = 10) -> List[LeaderboardEntry]:
+        """Top N của board"""
+        return [self._entry(rank, user_id) for rank, user_id in self.boards[board_type].slice(0, limit)]
+
+    def around(self, board_type: str, user_id: int, radius: int = 2) -> List[LeaderboardEntry]:
+        """Các user xung quanh user_id (radius người phía trên và phía dưới)"""
+        rank = self.boards[board_type].rank(user_id)
+        if rank is None:
+            return []
+        position = rank - 1
+        return [self._entry(r, uid)
+                for r, uid in self.boards[board_type].slice(position - radius, position + radius + 1)]
+
+
+_leaderboard_indexes: Dict[str, LeaderboardIndex] = {}
+
+
+def get_leaderboard_index(db_path: str) -> LeaderboardIndex:
+    """LeaderboardIndex dùng chung cho mọi Database instance cùng db_path"""
+    index = _leaderboard_indexes.get(db_path)
+    if index is None:
+        index = _leaderboard_indexes[db_path] = LeaderboardIndex()
+    return index
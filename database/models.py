@@ -40,7 +40,7 @@ class User:
 class Crop:
     def __init__(self, crop_id: int, user_id: int, crop_type: str, 
                  plot_index: int, plant_time: datetime, growth_stage: int = 0,
-                 buffs_applied: Optional[str] = None):
+                 buffs_applied: Optional[str] = None, ready_at: Optional[int] = None):
         self.crop_id = crop_id
         self.user_id = user_id
         self.crop_type = crop_type
@@ -48,6 +48,7 @@ class Crop:
         self.plant_time = plant_time
         self.growth_stage = growth_stage
         self.buffs_applied = buffs_applied or ""
+        self.ready_at = ready_at  # Epoch (giây) khi cây chín, None = chưa tính
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -57,7 +58,8 @@ class Crop:
             'plot_index': self.plot_index,
             'plant_time': self.plant_time.isoformat(),
             'growth_stage': self.growth_stage,
-            'buffs_applied': self.buffs_applied
+            'buffs_applied': self.buffs_applied,
+            'ready_at': self.ready_at
         }
     
     @classmethod
@@ -69,7 +71,8 @@ class Crop:
             plot_index=data['plot_index'],
             plant_time=datetime.fromisoformat(data['plant_time']),
             growth_stage=data['growth_stage'],
-            buffs_applied=data['buffs_applied']
+            buffs_applied=data['buffs_applied'],
+            ready_at=data.get('ready_at')
         )
 
 class InventoryItem:
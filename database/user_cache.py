@@ -0,0 +1,132 @@
+"""
+User Cache - Identity map (LRU) cho User objects
+Mỗi command thường gọi get_user 2-3 lần (registration check + cog), nên
+User được giữ trong một LRU có giới hạn kích thước, write-through khi
+create_user / update_user / update_user_money. Kèm theo một set user_id đã
+đăng ký để registration check không cần query DB.
+
+Mọi cog dùng chung bot.db; cache vẫn giữ theo db_path để các Database phụ
+trỏ tới cùng file (MaidBuffHelper, utils/livestock_initializer.py) không giữ
+một bản User lệch với bot.db.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from .models import User
+
+# Số User tối đa giữ trong cache
+USER_CACHE_MAX_SIZE = 2048
+
+
+class UserCache:
+    """LRU identity map: user_id -> User"""
+
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._users: "OrderedDict[int, User]" = OrderedDict()
+        self._registered: Optional[Set[int]] = None  # None = chưa load
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- Registered IDs ----------
+
+    @property
+    def registered_loaded(self) -> bool:
+        return self._registered is not None
+
+    def load_registered(self, user_ids: Iterable[int]):
+        """Nạp toàn bộ user_id đã đăng ký (khi khởi động)"""
+        self._registered = set(user_ids)
+
+    def is_registered(self, user_id: int) -> Optional[bool]:
+        """True/False nếu biết chắc, None nếu set chưa được load"""
+        if user_id in self._users:
+            return True
+        if self._registered is None:
+            return None
+        return user_id in self._registered
+
+    # ---------- Identity map ----------
+
+    def get(self, user_id: int) -> Optional[User]:
+        """User trong cache (không query DB)"""
+        user = self._users.get(user_id)
+        if user is not None:
+            self._users.move_to_end(user_id)
+        return user
+
+    def put(self, user: User):
+        """Ghi User vào cache (write-through)"""
+        self._users[user.user_id] = user
+        self._users.move_to_end(user.user_id)
+        if self._registered is not None:
+            self._registered.add(user.user_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def set_money(self, user_id: int, money: int):
+        """Cập nhật money của User đang cache sau khi DB đã commit"""
+        user = self._users.get(user_id)
+        if user is not None:
+            user.money = money
+
+    def invalidate(self, user_ids: Optional[Iterable[int]] = None):
+        """Bỏ User khỏi cache (toàn bộ nếu user_ids là None)"""
+        if user_ids is None:
+            self._users.clear()
+            return
+        for user_id in user_ids:
+            self._users.pop(user_id, None)
+
+    async def get_or_load(self, user_id: int, loader: Callable[[int], Awaitable[Optional[User]]]) -> Optional[User]:
+        """User từ cache, hoặc load từ DB (các lần miss đồng thời chỉ query một lần)"""
+        user = self.get(user_id)
+        if user is not None:
+            self.hits += 1
+            return user
+
+        if self.is_registered(user_id) is False:
+            self.hits += 1
+            return None
+
+        inflight = self._inflight.get(user_id)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            user = await loader(user_id)
+            if user is not None:
+                self.put(user)
+            future.set_result(user)
+            return user
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Tránh warning "exception never retrieved"
+            raise
+        finally:
+            self._inflight.pop(user_id, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._users),
+            'max_size': self.max_size,
+            'registered': len(self._registered) if self._registered is not None else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+_user_caches: Dict[str, UserCache] = {}
+
+
+def get_user_cache(db_path: str) -> UserCache:
+    """UserCache dùng chung cho mọi Database instance cùng db_path"""
+    cache = _user_caches.get(db_path)
+    if cache is None:
+        cache = _user_caches[db_path] = UserCache()
+    return cache
@@ -432,7 +432,7 @@ class AdminCog(commands.Cog):
             current_money = user.money
             
             # Add money to user
-            new_balance = await self.bot.db.update_user_money(target_user.id, amount)
+            new_balance = await self.bot.db.update_user_money(target_user.id, amount, source='admin')
             
             # Create success embed
             embed = EmbedBuilder.create_base_embed(
@@ -530,7 +530,7 @@ class AdminCog(commands.Cog):
             
             # Set new money amount
             user.money = amount
-            await self.bot.db.update_user(user)
+            await self.bot.db.update_user(user, source='admin')
             
             # Create success embed
             embed = EmbedBuilder.create_base_embed(
@@ -1075,6 +1075,23 @@ class AdminCog(commands.Cog):
             import traceback
             await ctx.send(f"```{traceback.format_exc()}```")
 
+    @commands.command(name='maidmonitor')
+    @commands.is_owner()
+    async def maid_monitor_stats(self, ctx):
+        """Tình trạng pipeline log buff / security alert (pending, dropped)"""
+        from features.maid_monitoring import maid_monitor
+        stats = maid_monitor.get_pipeline_stats()
+        
+        has_drops = stats["dropped_logs"] or stats["dropped_alerts"]
+        embed = EmbedBuilder.create_base_embed(
+            "📊 Maid Monitoring Pipeline",
+            color=0xff9900 if has_drops else 0x00ff00
+        )
+        embed.add_field(name="⏳ Pending", value=f"{stats['pending_logs']:,} logs\n{stats['pending_alerts']:,} alerts", inline=True)
+        embed.add_field(name="🗑️ Dropped", value=f"{stats['dropped_logs']:,} logs\n{stats['dropped_alerts']:,} alerts", inline=True)
+        embed.add_field(name="👥 Tracked users", value=f"{stats['tracked_users']:,}", inline=True)
+        await ctx.send(embed=embed)
+
     @commands.command(name='quicktest')
     @commands.is_owner()
     async def quick_test(self, ctx):
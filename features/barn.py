@@ -7,57 +7,30 @@ import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
 import asyncio
+import time
 from typing import Optional, List
 
 import config
-from database.database import Database
 from database.models import Species, UserLivestock, UserFacilities, LivestockProduct
 from utils.embeds import EmbedBuilder
 from utils.livestock_helpers import (
     calculate_livestock_maturity, get_livestock_display_info,
     get_livestock_weather_modifier, validate_facility_slot,
     get_available_species_for_purchase, format_livestock_value,
-    can_collect_product, get_product_ready_time, get_weather_modifier
+    can_collect_product, get_product_ready_time
 )
+from utils.world_modifiers import world_modifiers
 
 class BarnCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = Database(config.DATABASE_PATH)
-    
-    async def cog_load(self):
-        """Initialize database connection when cog loads"""
-        await self.db.init_db()
-    
-    async def cog_unload(self):
-        """Close database connection when cog unloads"""
-        await self.db.close()
+        self.db = bot.db  # Dùng chung writer / reader pool của bot
     
     def get_current_modifiers(self):
         """Get current weather and event modifiers"""
-        # Get weather modifier using helper function
-        weather_modifier = get_weather_modifier(self.bot, 'animal')
-        
-        # Get current weather for display
-        current_weather = "sunny"
-        weather_cog = self.bot.get_cog('WeatherCog')
-        if weather_cog and hasattr(weather_cog, 'current_weather'):
-            current_weather_data = weather_cog.current_weather
-            if isinstance(current_weather_data, dict):
-                current_weather = current_weather_data.get('type', 'sunny')
-            elif isinstance(current_weather_data, str):
-                current_weather = current_weather_data
-            else:
-                current_weather = 'sunny'
-        
-        # Get event modifier
-        events_cog = self.bot.get_cog('EventsCog')
-        event_growth_modifier = 1.0
-        
-        if events_cog and hasattr(events_cog, 'get_current_growth_modifier'):
-            event_growth_modifier = events_cog.get_current_growth_modifier()
-        
-        return weather_modifier, event_growth_modifier, current_weather
+        world = world_modifiers.current()
+        weather_modifier = get_livestock_weather_modifier(world.weather_type, 'animal')
+        return weather_modifier, world.event_growth, world.weather_type
     
     @commands.group(name='barn', aliases=['chuong'], invoke_without_command=True)
     async def barn_group(self, ctx):
@@ -286,7 +259,13 @@ class BarnCog(commands.Cog):
             
             if purchased_slots:
                 # Deduct money
-                await self.db.update_user_money(user_id, -total_cost)
+                await self.db.update_user_money(user_id, -total_cost, source='barn')
+
+                # ⏰ Lên lịch thông báo trưởng thành (nếu user bật f!notify)
+                from features.ready_notifier import ready_scheduler
+                ready_ts = ready_scheduler.get_livestock_ready_ts('barn', species_id, time.time())
+                if ready_ts is not None:
+                    ready_scheduler.schedule(user_id, 'barn', ready_ts, len(purchased_slots))
                 
                 # Create success embed
                 embed = EmbedBuilder.create_success_embed(
@@ -353,7 +332,7 @@ class BarnCog(commands.Cog):
                     await self.db.remove_livestock(animal.livestock_id)
                 
                 # Add money to user
-                await self.db.update_user_money(user_id, total_value)
+                await self.db.update_user_money(user_id, total_value, source='barn')
                 
                 # Create success embed
                 embed = EmbedBuilder.create_success_embed(
@@ -410,7 +389,7 @@ class BarnCog(commands.Cog):
             
             # Remove animal and add money
             await self.db.remove_livestock(target_animal.livestock_id)
-            await self.db.update_user_money(user_id, animal_value)
+            await self.db.update_user_money(user_id, animal_value, source='barn')
             
             # Create success embed
             embed = EmbedBuilder.create_success_embed(
@@ -462,7 +441,7 @@ class BarnCog(commands.Cog):
                 return
             
             # Perform upgrade
-            await self.db.update_user_money(user_id, -upgrade_cost)
+            await self.db.update_user_money(user_id, -upgrade_cost, source='barn')
             
             # Update facilities
             new_slots = facilities.barn_slots + 2
@@ -304,7 +304,7 @@ class SimpleBlackjackView(discord.ui.View):
             
             # Cập nhật database - CHỈ CỘNG PAYOUT (không trừ bet vì đã trừ ở đầu)
             if payout > 0:
-                await bot.db.update_user_money(self.game.user_id, payout)
+                await bot.db.update_user_money(self.game.user_id, payout, source='casino')
                 net_change = payout - self.game.bet_amount
                 logger.info(f"💰 Casino payout: User {self.game.user_id} bet {self.game.bet_amount}, payout {payout}, net {net_change:+}")
             else:
@@ -389,7 +389,7 @@ class NewCasinoCog(commands.Cog):
                 return
             
             # Trừ tiền trước (very important)
-            new_balance = await self.bot.db.update_user_money(ctx.author.id, -bet_amount)
+            new_balance = await self.bot.db.update_user_money(ctx.author.id, -bet_amount, source='casino')
             logger.info(f"🎲 Casino bet: User {ctx.author.id} bet {bet_amount}, balance: {new_balance}")
             
             # Tạo game mới
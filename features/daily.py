@@ -78,7 +78,7 @@ class DailyCog(commands.Cog):
         # Give rewards
         user.money += final_reward
         user.last_daily = now
-        await self.bot.db.update_user(user)
+        await self.bot.db.update_user(user, source='daily')
         
         # Create success embed
         embed = EmbedBuilder.create_success_embed(
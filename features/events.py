@@ -8,6 +8,8 @@ from utils.embeds import EmbedBuilder
 from utils.helpers import generate_seasonal_event
 from utils.registration import registration_required
 from utils.state_manager import StateManager
+from utils.crop_readiness import crop_readiness
+from utils.world_modifiers import world_modifiers
 
 class EventsCog(commands.Cog):
     """Hệ thống sự kiện theo mùa và ngẫu nhiên"""
@@ -54,12 +56,18 @@ class EventsCog(commands.Cog):
                 
             else:
                 print("🆕 No valid event state found, starting fresh")
+            
+            world_modifiers.refresh()
                 
         except Exception as e:
             print(f"❌ Error loading event state: {e}")
     
     async def _save_event_state(self):
         """Lưu event state vào database"""
+        # Mọi thay đổi sự kiện đều đi qua đây -> tính lại world modifiers
+        # và ready_at của cây + mốc thông báo cá / gia súc (growth modifier đổi)
+        world_modifiers.refresh()
+        crop_readiness.schedule_refresh()
         try:
             if self.state_manager:
                 # Convert datetime objects to strings for JSON serialization
@@ -568,7 +576,7 @@ class EventsCog(commands.Cog):
         
         # Give reward
         user.money += reward
-        await self.bot.db.update_user(user)
+        await self.bot.db.update_user(user, source='event')
         
         # Record the claim to prevent double claiming
         await self.bot.db.record_event_claim(ctx.author.id, event_id)
@@ -2,10 +2,14 @@ import discord
 from discord.ext import commands
 from datetime import datetime
 import random
+import time
 import config
 from utils.embeds import EmbedBuilder
 from utils.helpers import calculate_crop_yield, calculate_yield_range, is_crop_ready, validate_plot_index
 from utils.pricing import pricing_coordinator
+from utils.crop_readiness import crop_readiness
+from utils.world_modifiers import world_modifiers
+from features.ready_notifier import ready_scheduler
 from utils.registration import registration_required
 from features.maid_helper import maid_helper
 from features.maid_display_integration import add_maid_buffs_to_embed
@@ -160,6 +164,12 @@ class FarmCog(commands.Cog):
         user = await self.bot.db.get_user(user_id)
         return user
 
+    def _is_crop_ready(self, crop, now: float) -> bool:
+        """Cây đã chín chưa - dùng ready_at đã tính sẵn nếu có"""
+        if crop.ready_at is not None:
+            return crop.ready_at <= now
+        return is_crop_ready(crop.plant_time, crop.crop_type, 1.0, 1.0, crop.user_id)
+
     async def harvest_all_logic(self, user_id: int, username: str):
         """Logic để thu hoạch tất cả cây chín - dùng cho cả command và button"""
         user = await self.get_user_safe(user_id)
@@ -169,9 +179,10 @@ class FarmCog(commands.Cog):
                 'message': "❌ Bạn cần đăng ký tài khoản trước! Sử dụng `f!register`"
             }
             
-        crops = await self.bot.db.get_user_crops(user.user_id)
+        # ⚡ Chỉ lấy cây đã chín - query theo index (user_id, ready_at)
+        crops = await self.bot.db.get_ready_crops(user.user_id)
         
-        if not crops:
+        if not crops and not await self.bot.db.get_user_crops(user.user_id):
             return {
                 'success': False,
                 'message': "❌ Bạn chưa trồng cây nào!"
@@ -180,44 +191,37 @@ class FarmCog(commands.Cog):
         harvested_crops = []
         
         # Get modifiers once for all crops
-        weather_cog = self.bot.get_cog('WeatherCog')
-        weather_modifier = 1.0
-        if weather_cog:
-            _, weather_modifier = await weather_cog.get_current_weather_modifier()
-        
-        events_cog = self.bot.get_cog('EventsCog')
-        event_yield_modifier = 1.0
-        event_growth_modifier = 1.0
-        if events_cog:
-            if hasattr(events_cog, 'get_current_yield_modifier'):
-                event_yield_modifier = events_cog.get_current_yield_modifier()
-            if hasattr(events_cog, 'get_current_growth_modifier'):
-                event_growth_modifier = events_cog.get_current_growth_modifier()
+        world = world_modifiers.current()
+        weather_modifier = world.weather_yield
+        event_yield_modifier = world.event_yield
         
         # Harvest all ready crops
         for crop in crops:
-            if is_crop_ready(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user_id):
-                # Calculate yield với tất cả modifiers
-                crop_config = config.CROPS[crop.crop_type]
-                base_yield = calculate_crop_yield(crop.crop_type, weather_modifier, event_yield_modifier)
-                
-                # 🎀 Apply maid buff to yield
-                yield_amount = maid_helper.apply_yield_boost_buff(user_id, base_yield)
-                
-                min_yield, max_yield = calculate_yield_range(crop.crop_type, weather_modifier, event_yield_modifier)
-                
-                # Add to inventory only (no auto-sell)
-                await self.bot.db.add_item(user.user_id, 'crop', crop.crop_type, yield_amount)
-                
-                # Remove the crop from database
-                await self.bot.db.harvest_crop(crop.crop_id)
-                
-                harvested_crops.append({
-                    'name': crop_config['name'],
-                    'plot': crop.plot_index + 1,
-                    'yield': yield_amount,
-                    'yield_range': f"{min_yield}-{max_yield}"
-                })
+            # Calculate yield với tất cả modifiers
+            crop_config = config.CROPS[crop.crop_type]
+            base_yield = calculate_crop_yield(crop.crop_type, weather_modifier, event_yield_modifier)
+            
+            # 🎀 Apply maid buff to yield
+            yield_amount = maid_helper.apply_yield_boost_buff(user_id, base_yield)
+            
+            min_yield, max_yield = calculate_yield_range(crop.crop_type, weather_modifier, event_yield_modifier)
+            
+            harvested_crops.append({
+                'crop_id': crop.crop_id,
+                'crop_type': crop.crop_type,
+                'name': crop_config['name'],
+                'plot': crop.plot_index + 1,
+                'yield': yield_amount,
+                'yield_range': f"{min_yield}-{max_yield}"
+            })
+    
+        # Xóa cây + cộng nông sản vào kho trong một transaction (no auto-sell)
+        if harvested_crops:
+            harvested_ids = set(await self.bot.db.harvest_crops_bulk(user.user_id, [
+                (crop_data['crop_id'], crop_data['crop_type'], crop_data['yield'])
+                for crop_data in harvested_crops
+            ]))
+            harvested_crops = [c for c in harvested_crops if c['crop_id'] in harvested_ids]
         
         if not harvested_crops:
             return {
@@ -431,14 +435,16 @@ class FarmCog(commands.Cog):
                 await ctx.send(f"❌ Bạn cần {seeds_needed} hạt {crop_config['name']}, chỉ có {available_seeds}!")
                 return
             
-            # Use seeds from inventory
-            await self.bot.db.use_item(user.user_id, 'seed', crop_type, seeds_needed)
-            
-            # Plant crops on all specified plots
+            # Use seeds + plant all specified plots in one transaction
             current_time = datetime.now()
-            for plot_index in plots_to_plant:
-                await self.bot.db.plant_crop(user.user_id, crop_type, plot_index, current_time)
-            
+            ready_at = await crop_readiness.calculate_ready_at(user.user_id, crop_type, current_time)
+            try:
+                await self.bot.db.plant_crops_bulk(user.user_id, crop_type, plots_to_plant, current_time, ready_at)
+            except Exception as e:
+                await ctx.send(f"❌ {e}")
+                return
+            ready_scheduler.schedule(user.user_id, 'crop', ready_at, len(plots_to_plant))
+
             # Create success message
             if len(plots_to_plant) == 1:
                 embed = EmbedBuilder.create_success_embed(
@@ -528,23 +534,17 @@ class FarmCog(commands.Cog):
             return
         
         # Check which crops are ready
+        now = time.time()
         harvested_crops = []
         not_ready_crops = []
         
+        # Weather / event modifier một lần cho mọi cây
+        world = world_modifiers.current()
+        weather_modifier = world.weather_yield
+        event_modifier = world.event_yield
+        
         for crop in crops_to_harvest:
-            if is_crop_ready(crop.plant_time, crop.crop_type, 1.0, 1.0, user.user_id):
-                # Get weather modifier
-                weather_cog = self.bot.get_cog('WeatherCog')
-                weather_modifier = 1.0
-                if weather_cog:
-                    _, weather_modifier = await weather_cog.get_current_weather_modifier()
-                
-                # Get event modifier 
-                events_cog = self.bot.get_cog('EventsCog')
-                event_modifier = 1.0
-                if events_cog and hasattr(events_cog, 'get_current_yield_modifier'):
-                    event_modifier = events_cog.get_current_yield_modifier()
-                
+            if self._is_crop_ready(crop, now):
                 # Calculate yield với tất cả modifiers
                 crop_config = config.CROPS[crop.crop_type]
                 base_yield = calculate_crop_yield(crop.crop_type, weather_modifier, event_modifier)
@@ -555,10 +555,9 @@ class FarmCog(commands.Cog):
                 # Cũng tính range để hiển thị thông tin
                 min_yield, max_yield = calculate_yield_range(crop.crop_type, weather_modifier, event_modifier)
                 
-                await self.bot.db.add_item(user.user_id, 'crop', crop.crop_type, yield_amount)
-                await self.bot.db.harvest_crop(crop.crop_id)
-                
                 harvested_crops.append({
+                    'crop_id': crop.crop_id,
+                    'crop_type': crop.crop_type,
                     'name': crop_config['name'],
                     'plot': crop.plot_index + 1,
                     'yield': yield_amount,
@@ -573,6 +572,14 @@ class FarmCog(commands.Cog):
                     'plot': crop.plot_index + 1
                 })
         
+        # Xóa cây + cộng nông sản vào kho trong một transaction
+        if harvested_crops:
+            harvested_ids = set(await self.bot.db.harvest_crops_bulk(user.user_id, [
+                (crop_data['crop_id'], crop_data['crop_type'], crop_data['yield'])
+                for crop_data in harvested_crops
+            ]))
+            harvested_crops = [c for c in harvested_crops if c['crop_id'] in harvested_ids]
+        
         # Create response message
         if harvested_crops:
             # Tính toán tổng modifier để hiển thị
@@ -741,7 +748,7 @@ class FarmCog(commands.Cog):
         
         # Add money
         user.money += total_earned
-        await self.bot.db.update_user(user)
+        await self.bot.db.update_user(user, source='market')
         
         # Create detailed embed with "all" indication
         sell_description = f"Đã bán {quantity} {crop_config['name']}"
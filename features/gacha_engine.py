@@ -0,0 +1,182 @@
+"""
+Gacha Engine - Sampler alias-method dùng chung cho gacha thường và banner
+Rarity tier + pool template được compile thành alias table một lần (khi load
+hoặc khi reload templates), mỗi lần roll chỉ còn O(1): một random index và
+một random so sánh. Roll N lần là một lần gọi (vectorized bằng NumPy nếu có).
+
+Pool:
+- standard: tier theo RARITY_CONFIG["total_rate"], loại limited_only
+- banner:<id>: tier theo LIMITED_RARITY_CONFIG, GR chỉ gồm featured character
+  của banner, rate-up (banner_config["rate_up"]) nhân weight trong tier
+"""
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from features.maid_config_backup import (
+    MAID_TEMPLATES, RARITY_CONFIG, LIMITED_RARITY_CONFIG, BANNER_CONFIGS, ACTIVE_BANNER_CONFIG
+)
+from utils.enhanced_logging import get_bot_logger
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = get_bot_logger()
+
+STANDARD_POOL = 'standard'
+# Dưới ngưỡng này roll bằng Python (overhead NumPy không đáng)
+NUMPY_MIN_ROLLS = 32
+
+
+class AliasTable:
+    """Vose alias method: sample từ phân phối rời rạc trong O(1)"""
+
+    def __init__(self, items: Sequence[str], weights: Sequence[float]):
+        if not items or len(items) != len(weights):
+            raise ValueError("Alias table cần ít nhất một item và đủ weight")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("Tổng weight phải > 0")
+
+        n = len(items)
+        self.items: Tuple[str, ...] = tuple(items)
+        self.probabilities = {item: weight / total for item, weight in zip(items, weights)}
+        prob = [0.0] * n
+        alias = [0] * n
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in large + small:  # Phần còn lại (sai số float) = 1
+            prob[i] = 1.0
+            alias[i] = i
+
+        self._prob = prob
+        self._alias = alias
+        if NUMPY_AVAILABLE:
+            self._np_items = np.array(self.items, dtype=object)
+            self._np_prob = np.array(prob)
+            self._np_alias = np.array(alias)
+
+    def __len__(self):
+        return len(self.items)
+
+    def sample_indices(self, count: int, generator=None):
+        """Roll count lần, trả về mảng NumPy index trong self.items (cần NumPy)
+
+        generator: numpy.random.Generator (seed được) hoặc None = np.random
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("sample_indices cần NumPy")
+        generator = generator if generator is not None else np.random
+        columns = (generator.random(count) * len(self.items)).astype(np.int64)
+        accept = generator.random(count) < self._np_prob[columns]
+        return np.where(accept, columns, self._np_alias[columns])
+
+    def sample(self, count: int = 1, rng: Optional[random.Random] = None) -> List[str]:
+        """Roll count lần"""
+        if count <= 0:
+            return []
+        if NUMPY_AVAILABLE and rng is None and count >= NUMPY_MIN_ROLLS:
+            return self._np_items[self.sample_indices(count)].tolist()
+
+        rng = rng or random
+        n = len(self.items)
+        results = []
+        for _ in range(count):
+            column = int(rng.random() * n)
+            results.append(self.items[column] if rng.random() < self._prob[column]
+                           else self.items[self._alias[column]])
+        return results
+
+
+def _tier_weights(tier_rate: float, maid_ids: List[str],
+                  rate_up: Optional[Dict[str, float]] = None) -> List[Tuple[str, float]]:
+    """Chia tier_rate cho các maid trong tier (rate-up nhân weight, tổng tier giữ nguyên)"""
+    if tier_rate <= 0 or not maid_ids:
+        return []
+    rate_up = rate_up or {}
+    raw = [(maid_id, float(rate_up.get(maid_id, 1.0))) for maid_id in maid_ids]
+    total = sum(weight for _, weight in raw)
+    return [(maid_id, tier_rate * weight / total) for maid_id, weight in raw]
+
+
+def compile_standard_pool(templates: Dict[str, Dict]) -> AliasTable:
+    """Gacha thường: tier theo total_rate, loại limited_only"""
+    entries = []
+    for rarity, config in RARITY_CONFIG.items():
+        maid_ids = [maid_id for maid_id, template in templates.items()
+                    if template["rarity"] == rarity and not template.get("limited_only", False)]
+        entries.extend(_tier_weights(config["total_rate"], maid_ids))
+    return AliasTable([maid_id for maid_id, _ in entries], [weight for _, weight in entries])
+
+
+def compile_banner_pool(templates: Dict[str, Dict], banner_config: Dict) -> AliasTable:
+    """Banner: GR = featured character, các tier khác loại limited_only, cộng rate-up"""
+    featured = banner_config["featured_character"]
+    rate_up = banner_config.get("rate_up", {})
+    entries = []
+    for rarity, config in LIMITED_RARITY_CONFIG.items():
+        if rarity == "GR":
+            maid_ids = [featured] if featured in templates else []
+        else:
+            maid_ids = [maid_id for maid_id, template in templates.items()
+                        if template["rarity"] == rarity and not template.get("limited_only", False)]
+        entries.extend(_tier_weights(config["total_rate"], maid_ids, rate_up))
+    return AliasTable([maid_id for maid_id, _ in entries], [weight for _, weight in entries])
+
+
+class GachaEngine:
+    """Các alias table đã compile, thay thế nguyên khối khi reload"""
+
+    def __init__(self):
+        self._tables: Dict[str, AliasTable] = {}
+        self.template_count = 0
+
+    def compile(self, templates: Optional[Dict[str, Dict]] = None):
+        """Compile toàn bộ pool rồi swap một lần (roll đang chạy vẫn dùng bảng cũ)"""
+        templates = MAID_TEMPLATES if templates is None else templates
+        tables = {STANDARD_POOL: compile_standard_pool(templates)}
+        for banner_id, banner_config in BANNER_CONFIGS.items():
+            try:
+                tables[f'banner:{banner_id}'] = compile_banner_pool(templates, banner_config)
+            except ValueError as e:
+                logger.error(f"Gacha engine: bỏ qua banner {banner_id}: {e}")
+        self._tables = tables
+        self.template_count = len(templates)
+        logger.info(f"🎰 Gacha engine compiled {len(tables)} pools from {len(templates)} templates")
+
+    def _table(self, pool: str) -> AliasTable:
+        if not self._tables:
+            self.compile()
+        return self._tables[pool]
+
+    def roll(self, count: int = 1, pool: str = STANDARD_POOL, rng: Optional[random.Random] = None) -> List[str]:
+        """Roll count maid_id từ pool"""
+        return self._table(pool).sample(count, rng)
+
+    def roll_banner(self, count: int = 1, banner_id: Optional[str] = None,
+                    rng: Optional[random.Random] = None) -> List[str]:
+        """Roll từ banner đang active (gacha thường nếu banner tắt)"""
+        if banner_id is None:
+            if not ACTIVE_BANNER_CONFIG["enabled"]:
+                return self.roll(count, STANDARD_POOL, rng)
+            banner_id = ACTIVE_BANNER_CONFIG.get("current_banner", "kotori")
+        return self.roll(count, f'banner:{banner_id}', rng)
+
+    def get_rates(self, pool: str = STANDARD_POOL) -> Dict[str, float]:
+        """Xác suất (0-1) của từng maid trong pool"""
+        return dict(self._table(pool).probabilities)
+
+
+# Global instance - compile khi import, reload qua MaidSystemV2.reload_maid_templates
+gacha_engine = GachaEngine()
+gacha_engine.compile()
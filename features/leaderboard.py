@@ -44,6 +44,17 @@ class LeaderboardView(discord.ui.View):
             except:
                 pass
     
+    @discord.ui.button(label="🎀 Maid", style=discord.ButtonStyle.blurple)
+    async def maid_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        try:
+            await self._update_leaderboard(interaction, "maid")
+        except Exception as e:
+            print(f"Leaderboard maid button error: {e}")
+            try:
+                await interaction.response.send_message("❌ Có lỗi xảy ra. Vui lòng thử lại!", ephemeral=True)
+            except:
+                pass
+    
     @discord.ui.button(label="🔄 Cập nhật", style=discord.ButtonStyle.grey)
     async def refresh_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
@@ -58,14 +69,8 @@ class LeaderboardView(discord.ui.View):
     async def _update_leaderboard(self, interaction: discord.Interaction, board_type: str):
         """Cập nhật leaderboard theo loại"""
         try:
-            if board_type == "money":
-                users = await self.bot.db.get_top_users_by_money(10)
-            elif board_type == "streak":
-                users = await self.bot.db.get_top_users_by_streak(10)
-            elif board_type == "land":
-                users = await self.bot.db.get_top_users_by_land(10)
-            else:
-                users = await self.bot.db.get_top_users(10)
+            # ⚡ Đọc từ bảng xếp hạng trong RAM, không query SQLite
+            users = await self.bot.db.get_leaderboard(board_type, 10)
             
             embed = EmbedBuilder.create_leaderboard_embed(users, board_type)
             self.current_board = board_type
@@ -88,19 +93,14 @@ class LeaderboardCog(commands.Cog):
     async def leaderboard(self, ctx, board_type: str = "money"):
         """Xem bảng xếp hạng
         
-        Sử dụng: f!leaderboard [money|streak|land]
+        Sử dụng: f!leaderboard [money|streak|land|maid]
         """
-        valid_types = ["money", "streak", "land"]
+        valid_types = ["money", "streak", "land", "maid"]
         if board_type not in valid_types:
             board_type = "money"
         
-        # Get users data
-        if board_type == "money":
-            users = await self.bot.db.get_top_users_by_money(10)
-        elif board_type == "streak":
-            users = await self.bot.db.get_top_users_by_streak(10)
-        elif board_type == "land":
-            users = await self.bot.db.get_top_users_by_land(10)
+        # Get users data (bảng xếp hạng trong RAM)
+        users = await self.bot.db.get_leaderboard(board_type, 10)
         
         embed = EmbedBuilder.create_leaderboard_embed(users, board_type)
         
@@ -109,16 +109,20 @@ class LeaderboardCog(commands.Cog):
         if user:
             user_rank = await self._get_user_rank(user, board_type)
             if user_rank > 10:
-                if board_type == "money":
-                    value = f"{user.money:,} coins"
-                elif board_type == "streak":
-                    value = f"{user.daily_streak} ngày"
-                elif board_type == "land":
-                    value = f"{user.land_slots} ô đất"
+                # Những người chơi xung quanh bạn
+                neighbors = self.bot.db.get_leaderboard_around(user.user_id, board_type, radius=2)
+                if neighbors:
+                    lines = []
+                    for entry in neighbors:
+                        line = f"#{entry.rank} - **{entry.username}** - {EmbedBuilder.format_leaderboard_value(entry, board_type)}"
+                        lines.append(f"➤ {line}" if entry.user_id == user.user_id else line)
+                    value = "\n".join(lines)
+                else:
+                    value = f"#{user_rank} - **{user.username}** - {EmbedBuilder.format_leaderboard_value(user, board_type)}"
                 
                 embed.add_field(
                     name="📍 Vị trí của bạn",
-                    value=f"#{user_rank} - **{user.username}** - {value}",
+                    value=value,
                     inline=False
                 )
         
@@ -129,23 +133,8 @@ class LeaderboardCog(commands.Cog):
     
     async def _get_user_rank(self, user, board_type: str) -> int:
         """Lấy thứ hạng của user"""
-        if board_type == "money":
-            all_users = await self.bot.db.get_top_users_by_money(1000)  # Get more users
-            for i, u in enumerate(all_users, 1):
-                if u.user_id == user.user_id:
-                    return i
-        elif board_type == "streak":
-            all_users = await self.bot.db.get_top_users_by_streak(1000)
-            for i, u in enumerate(all_users, 1):
-                if u.user_id == user.user_id:
-                    return i
-        elif board_type == "land":
-            all_users = await self.bot.db.get_top_users_by_land(1000)
-            for i, u in enumerate(all_users, 1):
-                if u.user_id == user.user_id:
-                    return i
-        
-        return 999  # Default if not found
+        rank = await self.bot.db.get_user_rank(user.user_id, board_type)
+        return rank if rank is not None else 999  # Default if not found
     
     @commands.command(name='rank', aliases=['xephang'])
     async def rank(self, ctx, member: discord.Member = None):
@@ -169,10 +158,11 @@ class LeaderboardCog(commands.Cog):
                 await ctx.send(f"❌ {target.display_name} chưa đăng ký tài khoản nông trại!")
                 return
         
-        # Get ranks for all categories
-        money_rank = await self._get_user_rank(user, "money")
-        streak_rank = await self._get_user_rank(user, "streak")
-        land_rank = await self._get_user_rank(user, "land")
+        # Get ranks for all categories (một query)
+        ranks = await self.bot.db.get_user_ranks(user.user_id)
+        money_rank = ranks.get("money", 999)
+        streak_rank = ranks.get("streak", 999)
+        land_rank = ranks.get("land", 999)
         
         embed = EmbedBuilder.create_base_embed(
             f"📊 Thứ hạng của {user.username}",
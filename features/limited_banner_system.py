@@ -23,6 +23,8 @@ from features.maid_config_backup import (
     get_random_maid_limited_banner, is_limited_banner_active, get_limited_banner_info,
     get_featured_characters, generate_random_buffs, STARDUST_CONFIG
 )
+from features.gacha_engine import gacha_engine
+from features.maid_collection import MAID_INSERT_SQL, maid_insert_row
 
 logger = get_bot_logger()
 
@@ -40,8 +42,55 @@ class LimitedBannerSystem(commands.Cog):
         """Get database connection safely"""
         if not hasattr(self.bot, 'db') or not self.bot.db:
             raise Exception("Database not available")
+        # user_maids_v2 (cột rarity / maid_name...) do MaidSystemV2 tạo / migrate
+        maid_cog = self.bot.get_cog('MaidSystemV2')
+        if maid_cog:
+            await maid_cog.ensure_tables_ready()
         return await self.bot.db.get_connection()
     
+    async def roll_banner_batch(self, user_id: int, count: int, cost: int, roll_type: str) -> Optional[List[Dict]]:
+        """Roll count maid trên banner hiện tại trong một db.transaction().
+        
+        Returns:
+            List kết quả, hoặc None nếu không đủ tiền (không ghi gì)
+        Raises:
+            Exception khi ghi DB lỗi (đã rollback, tiền không bị trừ)
+        """
+        await self.get_db_connection()  # Đảm bảo bảng maid đã sẵn sàng
+        
+        # Sinh kết quả trong RAM trước, giữ writer lock ngắn nhất có thể
+        obtained_at = datetime.now().isoformat()
+        results = [
+            {"maid_id": maid_id, "instance_id": str(uuid.uuid4()), "buffs": generate_random_buffs(maid_id)}
+            for maid_id in gacha_engine.roll_banner(count)
+        ]
+        
+        async with self.bot.db.transaction() as connection:
+            # Double-check coins and deduct atomically
+            cursor = await connection.execute(
+                'UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
+                (cost, user_id, cost)
+            )
+            if cursor.rowcount == 0:
+                return None  # Chưa ghi gì - transaction rỗng
+            
+            # Save maids to database (same table as regular gacha)
+            await connection.executemany(MAID_INSERT_SQL, [
+                maid_insert_row(user_id, r["maid_id"], r["instance_id"], obtained_at, r["buffs"]) for r in results
+            ])
+            
+            # Save limited gacha history
+            await connection.execute('''
+                INSERT INTO gacha_history_v2 (user_id, roll_type, cost, results, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, roll_type, cost, json.dumps([r["maid_id"] for r in results]), obtained_at))
+            
+            await self.bot.db.append_money_ledger(connection, user_id, -cost, 'gacha')
+        
+        self.bot.db.invalidate_users([user_id])
+        self.bot.db.record_money_delta(user_id, -cost, 'gacha')
+        return results
+    
     @commands.hybrid_command(name="2mg", description="🌟 Limited Banner - Roll 1 lần (12,000 coins)")
     async def limited_gacha_single(self, ctx):
         """Limited banner single gacha"""
@@ -75,50 +124,9 @@ class LimitedBannerSystem(commands.Cog):
             return
         
         # 🛡️ SAFETY: Atomic transaction for limited gacha
-        connection = await self.get_db_connection()
         try:
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # Double-check coins and deduct atomically
-            cursor = await connection.execute(
-                'UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
-                (cost, user_id, cost)
-            )
-            
-            if cursor.rowcount == 0:
-                await connection.execute('ROLLBACK')
-                embed = EmbedBuilder.create_base_embed(
-                    title="❌ Không đủ coins",
-                    description="Không đủ tiền để thực hiện Limited Banner gacha!",
-                    color=0xFF0000
-                )
-                await ctx.send(embed=embed)
-                return
-            
-            # Multi-banner gacha roll (after successful payment)
-            from features.maid_config_backup import get_random_maid_multi_banner
-            maid_id = get_random_maid_multi_banner()
-            instance_id = str(uuid.uuid4())
-            buffs = generate_random_buffs(maid_id)
-            
-            # Save maid to database (same table as regular gacha)
-            await connection.execute('''
-                INSERT INTO user_maids_v2 (user_id, maid_id, instance_id, obtained_at, buff_values)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, maid_id, instance_id, datetime.now().isoformat(), json.dumps(buffs)))
-            
-            # Save limited gacha history
-            await connection.execute('''
-                INSERT INTO gacha_history_v2 (user_id, roll_type, cost, results, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, "limited_single", cost, json.dumps([maid_id]), datetime.now().isoformat()))
-            
-            # 🛡️ COMMIT: All operations successful
-            await connection.commit()
-            
+            results = await self.roll_banner_batch(user_id, 1, cost, "limited_single")
         except Exception as e:
-            # 🛡️ ROLLBACK: Any error rolls back entire transaction
-            await connection.execute('ROLLBACK')
             logger.error(f"Limited gacha transaction failed for user {user_id}: {e}")
             embed = EmbedBuilder.create_base_embed(
                 title="❌ Lỗi Limited Banner gacha",
@@ -128,6 +136,17 @@ class LimitedBannerSystem(commands.Cog):
             await ctx.send(embed=embed)
             return
         
+        if results is None:
+            embed = EmbedBuilder.create_base_embed(
+                title="❌ Không đủ coins",
+                description="Không đủ tiền để thực hiện Limited Banner gacha!",
+                color=0xFF0000
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        maid_id, instance_id, buffs = results[0]["maid_id"], results[0]["instance_id"], results[0]["buffs"]
+        
         # Create result embed with LIMITED styling
         template = MAID_TEMPLATES[maid_id]
         featured_chars = get_featured_characters()
@@ -210,58 +229,9 @@ class LimitedBannerSystem(commands.Cog):
             return
         
         # 🛡️ SAFETY: Atomic transaction for 10-roll limited gacha
-        connection = await self.get_db_connection()
         try:
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # Double-check coins and deduct atomically
-            cursor = await connection.execute(
-                'UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
-                (cost, user_id, cost)
-            )
-            
-            if cursor.rowcount == 0:
-                await connection.execute('ROLLBACK')
-                embed = EmbedBuilder.create_base_embed(
-                    title="❌ Không đủ coins",
-                    description="Không đủ tiền để thực hiện Limited Banner 10-roll!",
-                    color=0xFF0000
-                )
-                await ctx.send(embed=embed)
-                return
-            
-            # Roll 10 times (after successful payment)
-            from features.maid_config_backup import get_random_maid_multi_banner
-            results = []
-            for _ in range(10):
-                maid_id = get_random_maid_multi_banner()
-                instance_id = str(uuid.uuid4())
-                buffs = generate_random_buffs(maid_id)
-                
-                # Save to database
-                await connection.execute('''
-                    INSERT INTO user_maids_v2 (user_id, maid_id, instance_id, obtained_at, buff_values)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (user_id, maid_id, instance_id, datetime.now().isoformat(), json.dumps(buffs)))
-                
-                results.append({
-                    "maid_id": maid_id,
-                    "instance_id": instance_id,
-                    "buffs": buffs
-                })
-            
-            # Save limited gacha history
-            await connection.execute('''
-                INSERT INTO gacha_history_v2 (user_id, roll_type, cost, results, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, "limited_ten_roll", cost, json.dumps([r["maid_id"] for r in results]), datetime.now().isoformat()))
-            
-            # 🛡️ COMMIT: All operations successful
-            await connection.commit()
-            
+            results = await self.roll_banner_batch(user_id, 10, cost, "limited_ten_roll")
         except Exception as e:
-            # 🛡️ ROLLBACK: Any error rolls back entire transaction
-            await connection.execute('ROLLBACK')
             logger.error(f"Limited 10-roll gacha transaction failed for user {user_id}: {e}")
             embed = EmbedBuilder.create_base_embed(
                 title="❌ Lỗi Limited Banner gacha",
@@ -271,6 +241,15 @@ class LimitedBannerSystem(commands.Cog):
             await ctx.send(embed=embed)
             return
         
+        if results is None:
+            embed = EmbedBuilder.create_base_embed(
+                title="❌ Không đủ coins",
+                description="Không đủ tiền để thực hiện Limited Banner 10-roll!",
+                color=0xFF0000
+            )
+            await ctx.send(embed=embed)
+            return
+        
         # Send results with view
         view = LimitedGachaResultsView(user_id, results)
         embed = view.create_embed(show_remaining=False)
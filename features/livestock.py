@@ -10,7 +10,6 @@ import asyncio
 from typing import Optional, List, Dict
 
 import config
-from database.database import Database
 from database.models import Species, UserLivestock, UserFacilities
 from utils.embeds import EmbedBuilder
 from utils.livestock_helpers import (
@@ -18,39 +17,18 @@ from utils.livestock_helpers import (
     get_livestock_weather_modifier, can_collect_product, 
     get_product_ready_time
 )
+from utils.world_modifiers import world_modifiers
 
 class LivestockCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = Database(config.DATABASE_PATH)
-    
-    async def cog_load(self):
-        """Initialize database connection when cog loads"""
-        await self.db.init_db()
-    
-    async def cog_unload(self):
-        """Close database connection when cog unloads"""
-        await self.db.close()
+        self.db = bot.db  # Dùng chung writer / reader pool của bot
     
     def get_current_modifiers(self):
         """Get current weather and event modifiers"""
-        # Get weather modifier
-        weather_cog = self.bot.get_cog('WeatherCog')
-        weather_modifier = 1.0
-        current_weather = "sunny"
-        
-        if weather_cog and hasattr(weather_cog, 'current_weather'):
-            current_weather = weather_cog.current_weather
-            weather_modifier = get_livestock_weather_modifier(current_weather, 'fish')  # Average
-        
-        # Get event modifier
-        events_cog = self.bot.get_cog('EventsCog')
-        event_growth_modifier = 1.0
-        
-        if events_cog:
-            event_growth_modifier = events_cog.get_current_growth_modifier()
-        
-        return weather_modifier, event_growth_modifier, current_weather
+        world = world_modifiers.current()
+        weather_modifier = get_livestock_weather_modifier(world.weather_type, 'fish')  # Average
+        return weather_modifier, world.event_growth, world.weather_type
     
     @commands.command(name='livestock', aliases=['thucung', 'overview'])
     async def livestock_overview(self, ctx):
@@ -115,7 +115,7 @@ class MaidSystem(commands.Cog):
             cooldown_manager.set_cooldown(user_id, self.GACHA_COOLDOWN)
             
             # Trừ tiền trước
-            await self.bot.db.update_user_money(user_id, -cost)
+            await self.bot.db.update_user_money(user_id, -cost, source='gacha')
             
             # Thực hiện roll
             result = await self._perform_gacha_roll(user_id, 1, cost, "single")
@@ -126,12 +126,12 @@ class MaidSystem(commands.Cog):
                 await interaction.response.send_message(embed=embed)
             else:
                 # Rollback tiền nếu gacha fail
-                await self.bot.db.update_user_money(user_id, cost)
+                await self.bot.db.update_user_money(user_id, cost, source='gacha')
                 await interaction.response.send_message(f"❌ Lỗi gacha: {result['error']}", ephemeral=True)
                 
         except Exception as e:
             # Rollback tiền nếu có exception
-            await self.bot.db.update_user_money(user_id, cost)
+            await self.bot.db.update_user_money(user_id, cost, source='gacha')
             await interaction.response.send_message(f"❌ Lỗi hệ thống: {str(e)}", ephemeral=True)
             logger.error(f"Error in maid_gacha_single for user {user_id}: {e}", exc_info=True)
     
@@ -170,7 +170,7 @@ class MaidSystem(commands.Cog):
             cooldown_manager.set_cooldown(user_id, self.GACHA_COOLDOWN)
             
             # Trừ tiền trước
-            await self.bot.db.update_user_money(user_id, -cost)
+            await self.bot.db.update_user_money(user_id, -cost, source='gacha')
             
             # Thực hiện roll
             result = await self._perform_gacha_roll(user_id, 10, cost, "ten")
@@ -181,12 +181,12 @@ class MaidSystem(commands.Cog):
                 await interaction.response.send_message(embed=embed)
             else:
                 # Rollback tiền nếu gacha fail
-                await self.bot.db.update_user_money(user_id, cost)
+                await self.bot.db.update_user_money(user_id, cost, source='gacha')
                 await interaction.response.send_message(f"❌ Lỗi gacha: {result['error']}", ephemeral=True)
                 
         except Exception as e:
             # Rollback tiền nếu có exception
-            await self.bot.db.update_user_money(user_id, cost)
+            await self.bot.db.update_user_money(user_id, cost, source='gacha')
             await interaction.response.send_message(f"❌ Lỗi hệ thống: {str(e)}", ephemeral=True)
             logger.error(f"Error in maid_gacha_ten for user {user_id}: {e}", exc_info=True)
     
@@ -0,0 +1,142 @@
+"""
+Maid Buff Cache - Cache buff của maid active trong memory
+Toàn bộ maid active được load một lần khi khởi động, sau đó chỉ refresh
+những user bị ảnh hưởng bởi equip / reroll / dismantle / trade.
+Farm, shop và harvest đọc buff trực tiếp từ memory, không chạm vào disk.
+"""
+import json
+from typing import Dict, Iterable, List, Optional
+
+from utils.enhanced_logging import get_bot_logger
+
+logger = get_bot_logger()
+
+BUFF_KEYS = ("growth_speed", "seed_discount", "yield_boost", "sell_price")
+
+
+def empty_buffs() -> Dict[str, float]:
+    """Buff vector rỗng (user không có maid active)"""
+    return {key: 0.0 for key in BUFF_KEYS}
+
+
+def parse_buff_values(buff_values_json: Optional[str]) -> Dict[str, float]:
+    """Chuyển cột buff_values (JSON) thành buff vector"""
+    buffs = empty_buffs()
+    if not buff_values_json:
+        return buffs
+
+    try:
+        buff_list = json.loads(buff_values_json)
+    except (TypeError, ValueError):
+        return buffs
+
+    for buff_data in buff_list:
+        # Data cũ dùng "type", data mới dùng "buff_type"
+        buff_type = buff_data.get('type') or buff_data.get('buff_type')
+        if buff_type in buffs:
+            try:
+                buffs[buff_type] += float(buff_data.get('value', 0.0))
+            except (TypeError, ValueError):
+                continue
+
+    return buffs
+
+
+class MaidBuffCache:
+    """Identity cache: user_id -> buff vector của maid active"""
+
+    def __init__(self):
+        self.db = None
+        self._buffs: Dict[int, Dict[str, float]] = {}
+        self._loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    async def load(self, db) -> int:
+        """Load buff của tất cả maid active bằng một query duy nhất"""
+        self.db = db
+        buffs: Dict[int, Dict[str, float]] = {}
+
+        try:
+            async with db.reader() as connection:
+                cursor = await connection.execute(
+                    'SELECT user_id, buff_values FROM user_maids_v2 WHERE is_active = 1'
+                )
+                rows = await cursor.fetchall()
+            for user_id, buff_values in rows:
+                buffs[user_id] = parse_buff_values(buff_values)
+        except Exception as e:
+            # Bảng user_maids_v2 chưa tồn tại = chưa có maid nào
+            logger.warning(f"Maid buff cache: không load được maid active ({e})")
+
+        self._buffs = buffs
+        self._loaded = True
+        logger.info(f"✅ Maid buff cache loaded ({len(buffs)} maid active)")
+        return len(buffs)
+
+    def get_cached_buffs(self, user_id: int) -> Dict[str, float]:
+        """Đọc buff từ memory - O(1), an toàn khi gọi từ code sync"""
+        buffs = self._buffs.get(user_id)
+        return dict(buffs) if buffs else empty_buffs()
+
+    async def get_buffs(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, float]]:
+        """Batch API: buff vector cho nhiều user cùng lúc"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not self._loaded and self.db is not None:
+            await self._fetch_users(user_ids)
+        return {user_id: self.get_cached_buffs(user_id) for user_id in user_ids}
+
+    async def refresh_users(self, user_ids: Iterable[int]):
+        """Đọc lại maid active của các user (gọi sau equip/reroll/dismantle/trade)"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids or self.db is None:
+            return
+
+        try:
+            await self._fetch_users(user_ids)
+        except Exception as e:
+            # Không đọc được thì bỏ entry để tránh dùng buff cũ
+            for user_id in user_ids:
+                self._buffs.pop(user_id, None)
+            logger.warning(f"Maid buff cache: refresh thất bại cho {user_ids} ({e})")
+        
+        # Growth speed buff đổi -> tính lại ready_at cây của các user này
+        from utils.crop_readiness import crop_readiness
+        crop_readiness.schedule_refresh(user_ids)
+
+    async def refresh_user(self, user_id: int):
+        """Refresh buff của một user"""
+        await self.refresh_users([user_id])
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Xóa cache (một user hoặc toàn bộ)"""
+        if user_id is None:
+            self._buffs.clear()
+            self._loaded = False
+        else:
+            self._buffs.pop(user_id, None)
+
+    async def _fetch_users(self, user_ids: List[int]):
+        """Query maid active cho danh sách user bằng IN (...)"""
+        if not user_ids:
+            return
+
+        placeholders = ",".join("?" * len(user_ids))
+        async with self.db.reader() as connection:
+            cursor = await connection.execute(
+                f'SELECT user_id, buff_values FROM user_maids_v2 '
+                f'WHERE is_active = 1 AND user_id IN ({placeholders})',
+                user_ids
+            )
+            rows = await cursor.fetchall()
+
+        for user_id in user_ids:
+            self._buffs.pop(user_id, None)
+        for user_id, buff_values in rows:
+            self._buffs[user_id] = parse_buff_values(buff_values)
+
+
+# Global instance để dùng chung giữa các cogs
+maid_buff_cache = MaidBuffCache()
@@ -0,0 +1,266 @@
+"""
+Maid Collection - Filter + phân trang collection maid phía SQL
+rarity / maid_name của template được denormalize vào user_maids_v2 (có
+index theo user_id) nên filter rarity / tên / loại buff, COUNT và phân
+trang keyset (obtained_at, id) đều chạy trong SQLite. Chỉ các dòng của
+trang đang xem mới json.loads buff_values.
+
+Mọi INSERT vào user_maids_v2 dùng MAID_INSERT_SQL + maid_insert_row để
+điền sẵn rarity / maid_name; sync_template_columns backfill dữ liệu cũ và
+cập nhật lại khi templates thay đổi (reload).
+
+Tách maid hàng loạt (dismantle_maids) cũng lọc phía SQL: một DELETE ...
+RETURNING + một upsert bụi sao trong cùng transaction, không gửi danh
+sách instance_id qua lại.
+"""
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from features.maid_config_backup import MAID_TEMPLATES, STARDUST_CONFIG
+
+MAID_INSERT_SQL = '''
+    INSERT INTO user_maids_v2 (user_id, maid_id, instance_id, obtained_at, buff_values, rarity, maid_name)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Cột đọc cho một trang collection
+_PAGE_COLUMNS = 'id, instance_id, maid_id, custom_name, obtained_at, is_active, buff_values, reroll_count'
+
+# Buff type trong JSON: buff_type (mới) hoặc type (dữ liệu cũ)
+_BUFF_TYPE_EXISTS = '''EXISTS (
+    SELECT 1 FROM json_each(user_maids_v2.buff_values)
+    WHERE COALESCE(json_extract(value, '$.buff_type'), json_extract(value, '$.type')) = :buff_type
+)'''
+
+# DELETE ... RETURNING cần SQLite 3.35+ (Ubuntu 20.04 có 3.31): bản cũ SELECT rồi DELETE
+# trong cùng transaction (writer đã giữ lock nên kết quả như nhau)
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def maid_insert_row(user_id: int, maid_id: str, instance_id: str, obtained_at: str, buffs: List[Dict]) -> Tuple:
+    """Tham số cho MAID_INSERT_SQL (kèm rarity / tên template)"""
+    template = MAID_TEMPLATES.get(maid_id, {})
+    return (user_id, maid_id, instance_id, obtained_at, json.dumps(buffs),
+            template.get("rarity"), template.get("name"))
+
+
+async def ensure_collection_columns(connection):
+    """Thêm cột rarity / maid_name + index (schema evolution, giữ dữ liệu cũ)"""
+    for column, definition in (('rarity', 'TEXT'), ('maid_name', 'TEXT COLLATE NOCASE')):
+        try:
+            await connection.execute(f'ALTER TABLE user_maids_v2 ADD COLUMN {column} {definition}')
+        except Exception:
+            pass  # Column already exists
+
+    await connection.execute(
+        'CREATE INDEX IF NOT EXISTS idx_user_maids_v2_user_obtained ON user_maids_v2(user_id, obtained_at)'
+    )
+    await connection.execute(
+        'CREATE INDEX IF NOT EXISTS idx_user_maids_v2_user_rarity ON user_maids_v2(user_id, rarity, obtained_at)'
+    )
+    await connection.execute(
+        'CREATE INDEX IF NOT EXISTS idx_user_maids_v2_user_name ON user_maids_v2(user_id, maid_name)'
+    )
+
+
+async def sync_template_columns(connection, templates: Optional[Dict[str, Dict]] = None):
+    """Backfill / cập nhật rarity + maid_name theo templates (chỉ ghi dòng bị lệch)"""
+    templates = MAID_TEMPLATES if templates is None else templates
+    await connection.executemany('''
+        UPDATE user_maids_v2 SET rarity = ?, maid_name = ?
+        WHERE maid_id = ? AND (rarity IS NOT ? OR maid_name IS NOT ?)
+    ''', [(template["rarity"], template["name"], maid_id, template["rarity"], template["name"])
+          for maid_id, template in templates.items()])
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+@dataclass
+class MaidFilter:
+    """Filter collection: rarity, tên (template / custom / maid_id), loại buff, template"""
+    rarity: Optional[str] = None
+    name: Optional[str] = None
+    buff_type: Optional[str] = None
+    maid_id: Optional[str] = None
+
+    @classmethod
+    def parse(cls, args: Optional[str]) -> 'MaidFilter':
+        """Parse '-r UR -n zero two -b growth_speed -t rem_ur' (tên nhiều từ tới flag kế tiếp)"""
+        maid_filter = cls()
+        parts = args.split() if args else []
+        i = 0
+        while i < len(parts):
+            flag = parts[i]
+            if flag in ('-r', '-n', '-b', '-t') and i + 1 < len(parts):
+                values = []
+                i += 1
+                while i < len(parts) and not parts[i].startswith('-'):
+                    values.append(parts[i])
+                    i += 1
+                if not values:
+                    continue
+                if flag == '-r':
+                    maid_filter.rarity = values[0].upper()
+                elif flag == '-n':
+                    maid_filter.name = ' '.join(values).lower()
+                elif flag == '-b':
+                    maid_filter.buff_type = values[0].lower()
+                else:
+                    maid_filter.maid_id = values[0].lower()
+            else:
+                i += 1
+        return maid_filter
+
+    def is_empty(self) -> bool:
+        return not (self.rarity or self.name or self.buff_type or self.maid_id)
+
+    def describe(self) -> str:
+        """Text hiển thị trong embed"""
+        parts = []
+        if self.rarity:
+            parts.append(f"rarity = `{self.rarity}`")
+        if self.name:
+            parts.append(f"tên chứa `{self.name}`")
+        if self.buff_type:
+            parts.append(f"buff = `{self.buff_type}`")
+        if self.maid_id:
+            parts.append(f"template = `{self.maid_id}`")
+        return " • ".join(parts)
+
+    def where(self, user_id: int) -> Tuple[str, Dict]:
+        """Điều kiện WHERE + params (named) cho user_maids_v2"""
+        conditions = ['user_id = :user_id']
+        params: Dict = {'user_id': user_id}
+        if self.rarity:
+            conditions.append('rarity = :rarity')
+            params['rarity'] = self.rarity
+        if self.name:
+            conditions.append(
+                "(maid_name LIKE :name ESCAPE '\\' OR custom_name LIKE :name ESCAPE '\\' "
+                "OR maid_id LIKE :name ESCAPE '\\')"
+            )
+            params['name'] = f"%{_escape_like(self.name)}%"
+        if self.buff_type:
+            conditions.append(_BUFF_TYPE_EXISTS)
+            params['buff_type'] = self.buff_type
+        if self.maid_id:
+            conditions.append('maid_id = :maid_id')
+            params['maid_id'] = self.maid_id
+        return ' AND '.join(conditions), params
+
+
+async def count_user_maids(db, user_id: int, maid_filter: Optional[MaidFilter] = None) -> int:
+    """Số maid khớp filter"""
+    where, params = (maid_filter or MaidFilter()).where(user_id)
+    row = await db._fetchone(f'SELECT COUNT(*) FROM user_maids_v2 WHERE {where}', params)
+    return row[0] if row else 0
+
+
+async def fetch_maid_page(db, user_id: int, maid_filter: Optional[MaidFilter], limit: int,
+                          after: Optional[Tuple[str, int]] = None, offset: int = 0) -> List[Dict]:
+    """Một trang collection, mới nhất trước
+
+    after: keyset (obtained_at, id) của dòng cuối trang trước - đi tiếp
+    không cần OFFSET. Không có keyset thì dùng offset.
+    """
+    where, params = (maid_filter or MaidFilter()).where(user_id)
+    params['limit'] = limit
+    if after is not None:
+        where += ' AND (obtained_at, id) < (:after_obtained, :after_id)'
+        params['after_obtained'], params['after_id'] = after
+        params['offset'] = 0
+    else:
+        params['offset'] = offset
+
+    rows = await db._fetchall(f'''
+        SELECT {_PAGE_COLUMNS} FROM user_maids_v2 WHERE {where}
+        ORDER BY obtained_at DESC, id DESC LIMIT :limit OFFSET :offset
+    ''', params)
+    return [{
+        "instance_id": row[1],
+        "maid_id": row[2],
+        "custom_name": row[3],
+        "obtained_at": row[4],
+        "is_active": bool(row[5]),
+        "buffs": json.loads(row[6]),
+        "reroll_count": row[7] or 0,
+        "cursor": (row[4], row[0]),
+    } for row in rows]
+
+
+@dataclass
+class DismantleResult:
+    """Số maid / bụi sao khi tách (preview hoặc đã tách)"""
+    count: int = 0
+    stardust: int = 0
+    by_rarity: Dict[str, int] = field(default_factory=dict)
+    max_id: Optional[int] = None    # Preview: id lớn nhất, maid roll sau lúc xác nhận không bị tách
+
+    def add(self, maid_id: str, rarity: Optional[str], count: int = 1):
+        # Dòng cũ chưa backfill thì lấy rarity từ template; template không còn = 0 bụi sao
+        rarity = rarity or MAID_TEMPLATES.get(maid_id, {}).get("rarity")
+        self.count += count
+        reward = STARDUST_CONFIG["dismantle_rewards"].get(rarity)
+        if reward is not None:
+            self.by_rarity[rarity] = self.by_rarity.get(rarity, 0) + count
+            self.stardust += reward * count
+
+
+def _dismantle_where(user_id: int, maid_filter: Optional[MaidFilter], exclude_active: bool,
+                     max_id: Optional[int] = None) -> Tuple[str, Dict]:
+    where, params = (maid_filter or MaidFilter()).where(user_id)
+    if exclude_active:
+        where += ' AND COALESCE(is_active, 0) = 0'
+    if max_id is not None:
+        where += ' AND id <= :max_id'
+        params['max_id'] = max_id
+    return where, params
+
+
+async def preview_dismantle(db, user_id: int, maid_filter: Optional[MaidFilter] = None,
+                            exclude_active: bool = True) -> DismantleResult:
+    """Tách thì được bao nhiêu (GROUP BY trong SQL, không đọc từng maid)"""
+    where, params = _dismantle_where(user_id, maid_filter, exclude_active)
+    rows = await db._fetchall(f'''
+        SELECT maid_id, rarity, COUNT(*), MAX(id) FROM user_maids_v2
+        WHERE {where} GROUP BY maid_id, rarity
+    ''', params)
+    result = DismantleResult()
+    for maid_id, rarity, count, max_id in rows:
+        result.add(maid_id, rarity, count)
+        result.max_id = max_id if result.max_id is None else max(result.max_id, max_id)
+    return result
+
+
+async def dismantle_maids(db, user_id: int, maid_filter: Optional[MaidFilter] = None,
+                          exclude_active: bool = True, max_id: Optional[int] = None) -> DismantleResult:
+    """Tách mọi maid khớp filter: một DELETE ... RETURNING + một upsert bụi sao, một transaction"""
+    where, params = _dismantle_where(user_id, maid_filter, exclude_active, max_id)
+    result = DismantleResult()
+    async with db.transaction() as connection:
+        if SUPPORTS_RETURNING:
+            cursor = await connection.execute(
+                f'DELETE FROM user_maids_v2 WHERE {where} RETURNING maid_id, rarity', params
+            )
+            rows = await cursor.fetchall()
+        else:
+            cursor = await connection.execute(f'SELECT maid_id, rarity FROM user_maids_v2 WHERE {where}', params)
+            rows = await cursor.fetchall()
+            await connection.execute(f'DELETE FROM user_maids_v2 WHERE {where}', params)
+
+        for maid_id, rarity in rows:
+            result.add(maid_id, rarity)
+
+        if result.stardust:
+            await connection.execute('''
+                INSERT INTO user_stardust_v2 (user_id, stardust_amount, last_updated) VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    stardust_amount = stardust_amount + excluded.stardust_amount,
+                    last_updated = excluded.last_updated
+            ''', (user_id, result.stardust, datetime.now().isoformat()))
+    return result
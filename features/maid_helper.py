@@ -7,6 +7,7 @@ from database.database import Database
 from features.maid_database import MaidDatabase
 from features.maid_config import MAID_TEMPLATES
 from features.maid_monitoring import maid_monitor
+from features.maid_buff_cache import maid_buff_cache
 
 class MaidBuffHelper:
     def __init__(self, db_path: str = "farm_bot.db"):
@@ -27,6 +28,11 @@ class MaidBuffHelper:
             Dict với key là buff_type và value là % buff
             VD: {"growth_speed": 25.5, "yield_boost": 15.0}
         """
+        # ⚡ Đọc từ memory cache (được load khi bot khởi động)
+        if maid_buff_cache.is_loaded:
+            return maid_buff_cache.get_cached_buffs(user_id)
+        
+        # Fallback: cache chưa sẵn sàng (script/test chạy ngoài bot)
         buffs = {
             "growth_speed": 0.0,
             "seed_discount": 0.0,
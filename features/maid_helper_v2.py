@@ -5,6 +5,7 @@ import aiosqlite
 import json
 from typing import Dict, Optional, Tuple
 from database.database import Database
+from features.maid_buff_cache import maid_buff_cache
 from utils.enhanced_logging import get_bot_logger
 
 logger = get_bot_logger()
@@ -22,29 +23,16 @@ class MaidHelperV2:
             Dict với key là buff_type và value là % buff
             VD: {"growth_speed": 25.5, "yield_boost": 15.0}
         """
-        buffs = {
-            "growth_speed": 0.0,
-            "seed_discount": 0.0,
-            "yield_boost": 0.0,
-            "sell_price": 0.0
-        }
-        
         try:
-            # Lấy maid active từ database
-            cursor = await self.db.connection.execute('''
-                SELECT buff_values FROM user_maids_v2 
-                WHERE user_id = ? AND is_active = 1
-            ''', (user_id,))
-            result = await cursor.fetchone()
-            
-            if result:
-                buff_data = json.loads(result[0])
-                for buff in buff_data:
-                    if buff["type"] in buffs:
-                        buffs[buff["type"]] += buff["value"]
-            
+            buffs = (await maid_buff_cache.get_buffs([user_id]))[user_id]
         except Exception as e:
             logger.warning(f"Error getting maid buffs for user {user_id}: {e}")
+            buffs = {
+                "growth_speed": 0.0,
+                "seed_discount": 0.0,
+                "yield_boost": 0.0,
+                "sell_price": 0.0
+            }
         
         return buffs
     
@@ -22,6 +22,7 @@ from features.maid_config_backup import (
     BUFF_TYPES as BACKUP_BUFF_TYPES,
     RARITY_EMOJIS
 )
+from features.maid_search_index import maid_search_index
 
 logger = get_bot_logger()
 
@@ -31,7 +32,7 @@ class MaidInfoSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
-        # Cache search results for numbered selection
+        # Từ khóa search gần nhất của user cho f!select (kết quả tính lại từ index, rất rẻ)
         self.user_search_cache = {}
         
     async def cog_load(self):
@@ -102,18 +103,12 @@ class MaidInfoSystem(commands.Cog):
             logger.error(f"Error finding user maid: {e}")
             return None
     
-    async def search_maid_database(self, search_term: str) -> List[Dict]:
-        """🔍 Search maids in database by name"""
-        search_lower = search_term.lower()
-        found_maids = []
-        
-        for maid_id, template in BACKUP_MAID_TEMPLATES.items():
-            if (search_lower in template["name"].lower() or 
-                search_lower in template.get("full_name", "").lower() or
-                search_lower in maid_id.lower()):
-                found_maids.append((maid_id, template))
-        
-        return found_maids
+    async def search_maid_database(self, search_term: str) -> List[tuple]:
+        """🔍 Search maids in database by name (trigram index, tên / full name / series / maid_id)"""
+        results = maid_search_index.search(search_term, limit=None)
+        # Trùng tên chính xác thì chỉ trả về maid đó (smart detection hiện chi tiết ngay)
+        exact = [(maid_id, template) for maid_id, template, score in results if score >= 1.0]
+        return exact or [(maid_id, template) for maid_id, template, _ in results]
     
     async def check_user_ownership(self, user_id: int, maid_id: str) -> bool:
         """🔒 Check if user owns specific maid"""
@@ -327,9 +322,8 @@ class MaidInfoSystem(commands.Cog):
             color=0x9932CC
         )
         
-        # Cache results for this user
+        # Chỉ nhớ từ khóa, f!select search lại qua index
         self.user_search_cache[user_id] = {
-            'results': maids_found,
             'search_term': search_term,
             'timestamp': datetime.now().timestamp()
         }
@@ -559,6 +553,16 @@ class MaidInfoSystem(commands.Cog):
             embed = self.create_numbered_selection_embed(maids_found, search_term, ctx.author.id)
             await ctx.send(embed=embed)
     
+    @maid_database_search.autocomplete('search_term')
+    async def maid_database_search_autocomplete(self, interaction: discord.Interaction,
+                                                current: str) -> List[app_commands.Choice[str]]:
+        """Gợi ý tên maid khi gõ /mdbsearch"""
+        return [
+            app_commands.Choice(name=f"{template['name']} ({template['rarity']}) - {template.get('series', '')}"[:100],
+                                value=template["name"])
+            for _, template in maid_search_index.autocomplete(current)
+        ]
+    
     @commands.hybrid_command(name="select", description="🎯 Chọn maid từ kết quả search bằng số")
     async def select_maid(self, ctx, number: int):
         """Chọn maid từ kết quả search trước đó bằng số"""
@@ -602,7 +606,7 @@ class MaidInfoSystem(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        results = cache_data['results']
+        results = await self.search_maid_database(cache_data['search_term'])
         
         # Validate number
         if number < 1 or number > len(results):
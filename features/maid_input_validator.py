@@ -4,7 +4,9 @@ Validation functions cho tất cả user inputs trong maid system
 """
 import re
 import difflib
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
+
+from features.maid_search_index import MaidSearchIndex, maid_search_index
 
 class MaidInputValidator:
     """Input validator cho maid system"""
@@ -117,51 +119,24 @@ class MaidFuzzySearch:
     """Fuzzy search implementation cho maid system"""
     
     @staticmethod
-    def search_maids(search_term: str, all_maids: Dict[str, Any], threshold: float = 0.6) -> List[Tuple[str, Dict, float]]:
+    def search_maids(search_term: str, all_maids: Optional[Dict[str, Any]] = None, threshold: float = 0.6,
+                     limit: Optional[int] = None) -> List[Tuple[str, Dict, float]]:
         """
-        Implement fuzzy search for maids
+        Implement fuzzy search for maids (qua MaidSearchIndex, không quét từng template)
         
         Args:
             search_term: Từ khóa tìm kiếm
-            all_maids: Dictionary tất cả maids
+            all_maids: Dictionary maids (mặc định MAID_TEMPLATES - dùng index global)
             threshold: Ngưỡng similarity minimum
+            limit: Số kết quả tối đa (None = tất cả)
             
         Returns:
             List[Tuple[str, Dict, float]]: List (maid_id, template, score)
         """
-        search_lower = search_term.lower().strip()
-        results = []
-        
-        for maid_id, template in all_maids.items():
-            score = 0.0
-            
-            # Exact name match (highest priority)
-            if search_lower == template["name"].lower():
-                score = 1.0
-            # Starts with search term
-            elif template["name"].lower().startswith(search_lower):
-                score = 0.95
-            # Contains search term
-            elif search_lower in template["name"].lower():
-                score = 0.9
-            # Full name matches
-            elif search_lower in template["full_name"].lower():
-                score = 0.85
-            # Series matches
-            elif "series" in template and search_lower in template["series"].lower():
-                score = 0.8
-            else:
-                # Fuzzy matching
-                name_ratio = difflib.SequenceMatcher(None, search_lower, template["name"].lower()).ratio()
-                full_name_ratio = difflib.SequenceMatcher(None, search_lower, template["full_name"].lower()).ratio()
-                score = max(name_ratio, full_name_ratio)
-            
-            if score >= threshold:
-                results.append((maid_id, template, score))
-        
-        # Sort by score (highest first), then by name
-        results.sort(key=lambda x: (-x[2], x[1]["name"]))
-        return results
+        index = maid_search_index
+        if all_maids is not None and all_maids is not maid_search_index.templates:
+            index = MaidSearchIndex(all_maids)
+        return index.search(search_term, limit=limit, threshold=threshold)
     
     @staticmethod
     def search_user_maids(search_term: str, user_maids: List, maid_templates: Dict[str, Any]) -> List:
@@ -1,15 +1,46 @@
 """
 Maid System Monitoring & Security
 Track usage, buffs, và detect suspicious activity
+
+log_buff_usage / create_security_alert chạy trên mọi lần thu hoạch, bán,
+mua hạt nên không chạm DB: event được đẩy vào ring buffer giới hạn trong
+RAM (đầy thì bỏ event cũ nhất + đếm dropped) và flush bằng executemany
+theo chu kỳ trong thread pool. detect_suspicious_buff_usage đọc cửa sổ
+24h theo giờ giữ trong RAM thay vì query maid_buff_logs.
 """
+import asyncio
 import sqlite3
-import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Số event tối đa chờ flush (mỗi loại)
+BUFFER_SIZE = 10000
+ALERT_BUFFER_SIZE = 1000
+# Chu kỳ flush xuống DB (giây)
+FLUSH_INTERVAL = 5.0
+# Cửa sổ phát hiện bất thường (giờ) + ngưỡng
+WINDOW_HOURS = 24
+HIGH_BUFF_VALUE = 100        # Over 100% is suspicious
+EXCESSIVE_USAGE = 1000       # Over 1000 uses per day
+# Dọn cửa sổ của user không còn hoạt động mỗi N lần flush
+PRUNE_EVERY_FLUSHES = 120
+
 
 class MaidMonitoringSystem:
     def __init__(self, db_path: str = "farm_bot.db"):
         self.db_path = db_path
+        self._log_buffer: Deque[Tuple] = deque()
+        self._alert_buffer: Deque[Tuple] = deque()
+        self.dropped_logs = 0
+        self.dropped_alerts = 0
+        # user_id -> buff_type -> deque[[hour, count, max_value]]
+        self._windows: Dict[int, Dict[str, Deque[list]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_count = 0
+        self._reported_drops = (0, 0)  # (dropped_logs, dropped_alerts) lần báo gần nhất
         self.init_tables()
     
     def init_tables(self):
@@ -49,82 +80,172 @@ class MaidMonitoringSystem:
         except Exception as e:
             print(f"Error initializing monitoring tables: {e}")
     
+    # ---------- Ingest (sync, không I/O) ----------
+
+    @staticmethod
+    def _push(buffer: Deque[Tuple], item: Tuple, limit: int) -> bool:
+        """Ring buffer: đầy thì bỏ event cũ nhất, trả về True nếu có event bị bỏ"""
+        dropped = len(buffer) >= limit
+        if dropped:
+            buffer.popleft()
+        buffer.append(item)
+        return dropped
+    
     def log_buff_usage(self, user_id: int, buff_type: str, buff_value: float, 
                       base_value: int, final_value: int, context: str = ""):
-        """Log buff usage để track economic impact"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO maid_buff_logs 
-                    (user_id, buff_type, buff_value, base_value, final_value, timestamp, context)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    user_id, buff_type, buff_value, base_value, 
-                    final_value, datetime.now().isoformat(), context
-                ))
-                conn.commit()
-        except Exception as e:
-            print(f"Error logging buff usage: {e}")
+        """Log buff usage để track economic impact (buffer, flush định kỳ)"""
+        now = time.time()
+        if self._push(self._log_buffer, (
+            user_id, buff_type, buff_value, base_value,
+            final_value, datetime.fromtimestamp(now).isoformat(), context
+        ), BUFFER_SIZE):
+            self.dropped_logs += 1
+        self._record_window(user_id, buff_type, buff_value, now)
     
     def create_security_alert(self, user_id: int, alert_type: str, 
                             description: str, severity: str = "medium"):
-        """Tạo security alert"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO maid_security_alerts 
-                    (user_id, alert_type, description, severity, timestamp)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    user_id, alert_type, description, 
-                    severity, datetime.now().isoformat()
-                ))
-                conn.commit()
-        except Exception as e:
-            print(f"Error creating security alert: {e}")
+        """Tạo security alert (buffer, flush định kỳ)"""
+        if self._push(self._alert_buffer, (
+            user_id, alert_type, description, severity, datetime.now().isoformat()
+        ), ALERT_BUFFER_SIZE):
+            self.dropped_alerts += 1
+    
+    def _record_window(self, user_id: int, buff_type: str, buff_value: float, now: float):
+        hour = int(now // 3600)
+        buckets = self._windows.setdefault(user_id, {}).get(buff_type)
+        if buckets is None:
+            buckets = self._windows[user_id][buff_type] = deque(maxlen=WINDOW_HOURS)
+        if buckets and buckets[-1][0] == hour:
+            bucket = buckets[-1]
+            bucket[1] += 1
+            bucket[2] = max(bucket[2], buff_value)
+        else:
+            buckets.append([hour, 1, buff_value])
     
     def detect_suspicious_buff_usage(self, user_id: int) -> List[str]:
-        """Detect suspicious buff usage patterns"""
+        """Detect suspicious buff usage patterns (cửa sổ 24h trong RAM)"""
         alerts = []
+        current_hour = int(time.time() // 3600)
         
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Check for excessive buff values
-                cursor.execute('''
-                    SELECT buff_type, MAX(buff_value) as max_buff, COUNT(*) as usage_count
-                    FROM maid_buff_logs 
-                    WHERE user_id = ? AND timestamp > datetime('now', '-24 hours')
-                    GROUP BY buff_type
-                ''', (user_id,))
-                
-                for row in cursor.fetchall():
-                    buff_type, max_buff, usage_count = row
-                    
-                    # Suspicious high buff values
-                    if max_buff > 100:  # Over 100% is suspicious
-                        alerts.append(f"High {buff_type} buff: {max_buff}%")
-                        self.create_security_alert(
-                            user_id, "high_buff_value", 
-                            f"Buff {buff_type} reached {max_buff}%", "high"
-                        )
-                    
-                    # Excessive usage
-                    if usage_count > 1000:  # Over 1000 uses per day
-                        alerts.append(f"Excessive {buff_type} usage: {usage_count} times")
-                        self.create_security_alert(
-                            user_id, "excessive_usage",
-                            f"Buff {buff_type} used {usage_count} times in 24h", "medium"
-                        )
-                
-        except Exception as e:
-            print(f"Error detecting suspicious activity: {e}")
+        for buff_type, buckets in self._windows.get(user_id, {}).items():
+            recent = [bucket for bucket in buckets if bucket[0] > current_hour - WINDOW_HOURS]
+            if not recent:
+                continue
+            max_buff = max(bucket[2] for bucket in recent)
+            usage_count = sum(bucket[1] for bucket in recent)
+            
+            # Suspicious high buff values
+            if max_buff > HIGH_BUFF_VALUE:
+                alerts.append(f"High {buff_type} buff: {max_buff}%")
+                self.create_security_alert(
+                    user_id, "high_buff_value", 
+                    f"Buff {buff_type} reached {max_buff}%", "high"
+                )
+            
+            # Excessive usage
+            if usage_count > EXCESSIVE_USAGE:
+                alerts.append(f"Excessive {buff_type} usage: {usage_count} times")
+                self.create_security_alert(
+                    user_id, "excessive_usage",
+                    f"Buff {buff_type} used {usage_count} times in 24h", "medium"
+                )
         
         return alerts
     
+    def _prune_windows(self):
+        """Bỏ cửa sổ của user không dùng buff trong WINDOW_HOURS"""
+        oldest_hour = int(time.time() // 3600) - WINDOW_HOURS
+        for user_id in list(self._windows):
+            windows = self._windows[user_id]
+            if all(not buckets or buckets[-1][0] <= oldest_hour for buckets in windows.values()):
+                del self._windows[user_id]
+    
+    # ---------- Flush (async) ----------
+
+    def start(self, interval: float = FLUSH_INTERVAL):
+        """Chạy vòng flush trên event loop hiện tại (gọi khi bot khởi động)"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = asyncio.create_task(self._flush_loop(interval))
+    
+    async def stop(self):
+        """Dừng vòng flush và ghi nốt event còn trong buffer"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+    
+    async def _flush_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+            self._report_drops()
+            self._flush_count += 1
+            if self._flush_count % PRUNE_EVERY_FLUSHES == 0:
+                self._prune_windows()
+    
+    def _report_drops(self):
+        """Cảnh báo khi có event bị bỏ từ lần báo trước (buffer đầy / flush lỗi)"""
+        drops = (self.dropped_logs, self.dropped_alerts)
+        if drops != self._reported_drops:
+            new_logs = drops[0] - self._reported_drops[0]
+            new_alerts = drops[1] - self._reported_drops[1]
+            self._reported_drops = drops
+            print(f"⚠️ Maid monitoring dropped {new_logs} buff logs, {new_alerts} alerts "
+                  f"(total {drops[0]} / {drops[1]}, pending {len(self._log_buffer)} / {len(self._alert_buffer)})")
+    
+    async def flush(self) -> int:
+        """Ghi toàn bộ event đang chờ bằng executemany (thread pool), trả về số event đã ghi"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            logs = list(self._log_buffer)
+            alerts = list(self._alert_buffer)
+            self._log_buffer.clear()
+            self._alert_buffer.clear()
+            if not logs and not alerts:
+                return 0
+            
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_batch, logs, alerts)
+            except Exception as e:
+                print(f"Error flushing monitoring events: {e}")
+                self.dropped_logs += len(logs)
+                self.dropped_alerts += len(alerts)
+                return 0
+            return len(logs) + len(alerts)
+    
+    def _write_batch(self, logs: List[Tuple], alerts: List[Tuple]):
+        with sqlite3.connect(self.db_path, timeout=10) as conn:
+            if logs:
+                conn.executemany('''
+                    INSERT INTO maid_buff_logs 
+                    (user_id, buff_type, buff_value, base_value, final_value, timestamp, context)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', logs)
+            if alerts:
+                conn.executemany('''
+                    INSERT INTO maid_security_alerts 
+                    (user_id, alert_type, description, severity, timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', alerts)
+            conn.commit()
+    
+    def get_pipeline_stats(self) -> Dict[str, int]:
+        """Tình trạng buffer monitoring"""
+        return {
+            "pending_logs": len(self._log_buffer),
+            "pending_alerts": len(self._alert_buffer),
+            "dropped_logs": self.dropped_logs,
+            "dropped_alerts": self.dropped_alerts,
+            "tracked_users": len(self._windows),
+        }
+    
     def get_buff_statistics(self, hours: int = 24) -> Dict:
         """Get buff usage statistics"""
         try:
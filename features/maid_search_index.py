@@ -0,0 +1,193 @@
+"""
+Maid Search Index - Inverted index trigram + prefix cho maid templates
+Build một lần khi load (và khi reload_maid_templates). Index chỉ chọn ra
+candidate (template có chung trigram / prefix với từ khóa) để chấm đủ các
+bậc điểm; mỗi query vẫn duyệt toàn bộ template nên chi phí là O(số template).
+
+Field được index (trigram + prefix): name, full_name, series, maid_id,
+aliases (nếu template có). Từ khóa có từ ngắn hơn 3 ký tự không đủ trigram
+để lọc -> chấm điểm mọi template (chỉ vài chục, vẫn rẻ).
+Thang điểm giữ như MaidFuzzySearch cũ:
+1.0 trùng tên, 0.95 tên bắt đầu bằng, 0.9 tên chứa, 0.85 full name / alias,
+0.8 series / maid_id, còn lại là SequenceMatcher.ratio() với name / full_name.
+Template ngoài candidate vẫn được chấm fuzzy để giữ recall bằng scorer cũ
+(lỗi gõ không chung trigram nào vẫn phải tìm ra). Phần rẻ hơn difflib cũ nằm
+ở SequenceMatcher dựng sẵn và real_quick_ratio / quick_ratio (cận trên của
+ratio) loại trước phần lớn. benchmarks/maid_search_recall.py so kết quả với
+scorer cũ.
+"""
+import bisect
+import difflib
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from features.maid_config_backup import MAID_TEMPLATES
+
+RARITY_ORDER = ["GR", "UR", "SSR", "SR", "R"]
+# Discord giới hạn 25 lựa chọn autocomplete
+AUTOCOMPLETE_LIMIT = 25
+# Field dùng cho điểm fuzzy (SequenceMatcher)
+FUZZY_FIELDS = ('name', 'full_name')
+# Field đưa vào trigram postings
+INDEXED_FIELDS = ('name', 'full_name', 'series', 'maid_id', 'aliases')
+# Từ ngắn hơn thế không có trigram bên trong -> không lọc candidate được
+MIN_GRAM_WORD = 3
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase, bỏ dấu, ký tự đặc biệt thành khoảng trắng ('Re:Zero' -> 're zero')"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def trigrams(text: str) -> set:
+    """Trigram có đệm đầu / cuối từng từ ('rem' -> '  r', ' re', 'rem', 'em ')"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class _Entry:
+    __slots__ = ('maid_id', 'template', 'fields', 'matchers')
+
+    def __init__(self, maid_id: str, template: Dict):
+        self.maid_id = maid_id
+        self.template = template
+        self.fields = {
+            'name': normalize(template.get("name", "")),
+            'full_name': normalize(template.get("full_name", "")),
+            'series': normalize(template.get("series", "")),
+            'maid_id': normalize(maid_id),
+            'aliases': tuple(normalize(alias) for alias in template.get("aliases", [])),
+        }
+        # Fuzzy giữ nguyên như scorer cũ (lowercase, không chuẩn hoá); seq2 = text
+        # được phân tích một lần khi build, mỗi query chỉ set_seq1
+        self.matchers = tuple(
+            difflib.SequenceMatcher(None, "", template.get(field, "").lower()) for field in FUZZY_FIELDS
+        )
+
+    def texts(self) -> List[str]:
+        fields = self.fields
+        return [fields['name'], fields['full_name'], fields['series'], fields['maid_id'], *fields['aliases']]
+
+    def fuzzy(self, raw_query: str, threshold: float) -> float:
+        """SequenceMatcher.ratio() tốt nhất; bỏ qua (0.0) khi cận trên quick_ratio < threshold"""
+        best = 0.0
+        for matcher in self.matchers:
+            matcher.set_seq1(raw_query)
+            if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold:
+                best = max(best, matcher.ratio())
+        return best
+
+    def score(self, query: str, raw_query: str, threshold: float) -> float:
+        fields = self.fields
+        name = fields['name']
+        if query == name:
+            return 1.0
+        if name.startswith(query):
+            return 0.95
+        if query in name:
+            return 0.9
+        if query in fields['full_name'] or any(query in alias for alias in fields['aliases']):
+            return 0.85
+        if query in fields['series'] or query in fields['maid_id']:
+            # Gõ gần đúng maid_id ('rem_u') vẫn có thể giống tên hơn 0.8
+            return max(0.8, self.fuzzy(raw_query, threshold))
+        return self.fuzzy(raw_query, threshold)
+
+
+class MaidSearchIndex:
+    """Index tìm kiếm maid template (trigram inverted index + prefix theo từ)"""
+
+    def __init__(self, templates: Optional[Dict[str, Dict]] = None):
+        self._entries: List[_Entry] = []
+        self._postings: Dict[str, List[int]] = {}               # trigram -> [entry]
+        self._prefix_words: List[Tuple[str, int]] = []          # (từ, entry) đã sort
+        self.templates: Dict[str, Dict] = {}
+        if templates is not None:
+            self.build(templates)
+
+    def build(self, templates: Dict[str, Dict]):
+        """Build lại toàn bộ index rồi swap (query đang chạy vẫn dùng bản cũ)"""
+        ordered = sorted(templates.items(), key=lambda item: (
+            RARITY_ORDER.index(item[1]["rarity"]) if item[1].get("rarity") in RARITY_ORDER else len(RARITY_ORDER),
+            item[1].get("name", item[0])
+        ))
+        entries = [_Entry(maid_id, template) for maid_id, template in ordered]
+
+        postings = defaultdict(list)
+        prefix_words = set()
+        for index, entry in enumerate(entries):
+            texts = entry.texts()
+            grams = set()
+            for text in texts:
+                grams.update(trigrams(text))
+                prefix_words.update((word, index) for word in text.split())
+            for gram in grams:
+                postings[gram].append(index)
+
+        self._entries = entries
+        self._postings = dict(postings)
+        self._prefix_words = sorted(prefix_words)
+        self.templates = templates
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _prefix_candidates(self, prefix: str) -> set:
+        start = bisect.bisect_left(self._prefix_words, (prefix, -1))
+        found = set()
+        for word, index in self._prefix_words[start:]:
+            if not word.startswith(prefix):
+                break
+            found.add(index)
+        return found
+
+    def search(self, query: str, limit: Optional[int] = 10,
+               threshold: float = 0.6) -> List[Tuple[str, Dict, float]]:
+        """Top-k (maid_id, template, score), điểm cao trước rồi theo tên"""
+        raw, query = query, normalize(query)
+        if not query:
+            return []
+
+        # Candidate = template có chung trigram / prefix: chỉ chúng có thể khớp chuỗi con
+        if min(len(word) for word in query.split()) < MIN_GRAM_WORD:
+            candidates = set(range(len(self._entries)))
+        else:
+            candidates = self._prefix_candidates(query.split()[-1])
+            for gram in trigrams(query):
+                candidates.update(self._postings.get(gram, ()))
+
+        raw_query = raw.lower().strip()
+        results = []
+        for index, entry in enumerate(self._entries):
+            if index in candidates:
+                score = entry.score(query, raw_query, threshold)
+            else:
+                # Không chung trigram vẫn có thể đủ giống (lỗi gõ) - quick_ratio loại gần hết
+                score = entry.fuzzy(raw_query, threshold)
+            if score >= threshold:
+                results.append((entry.maid_id, entry.template, score))
+
+        sort_key = lambda result: (-result[2], result[1].get("name", result[0]))
+        if limit is None:
+            return sorted(results, key=sort_key)
+        return heapq.nsmallest(limit, results, key=sort_key)
+
+    def autocomplete(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[Tuple[str, Dict]]:
+        """Gợi ý cho slash command: query rỗng = theo rarity rồi tên"""
+        if not normalize(query):
+            return [(entry.maid_id, entry.template) for entry in self._entries[:limit]]
+        return [(maid_id, template) for maid_id, template, _ in self.search(query, limit, threshold=0.3)]
+
+
+# Global instance - build khi import, rebuild qua MaidSystemV2.reload_maid_templates
+maid_search_index = MaidSearchIndex(MAID_TEMPLATES)
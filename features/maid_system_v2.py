@@ -12,18 +12,40 @@ from database.database import Database
 from utils.embeds import EmbedBuilder
 from utils.registration import require_registration
 from utils.enhanced_logging import get_bot_logger
+from features.maid_buff_cache import maid_buff_cache
+from features.gacha_engine import gacha_engine
+from features.maid_search_index import maid_search_index
+from features.maid_collection import (
+    MAID_INSERT_SQL, DismantleResult, MaidFilter, count_user_maids, dismantle_maids,
+    ensure_collection_columns, fetch_maid_page, maid_insert_row, preview_dismantle, sync_template_columns
+)
 from features.maid_config_backup import MAID_TEMPLATES, RARITY_CONFIG as CONFIG_RARITY_CONFIG, STARDUST_CONFIG as CONFIG_STARDUST_CONFIG, BUFF_TYPES as CONFIG_BUFF_TYPES
 
 logger = get_bot_logger()
 
+
+class MaidActionAborted(Exception):
+    """Hủy thao tác maid giữa transaction (rollback) với thông báo cho user"""
+
+
 # Configuration - Use shared configs from maid_config_backup
 GACHA_CONFIG = {
     "single_roll_cost": 10000,
     "ten_roll_cost": 90000,
     "pity_threshold": None,
-    "guaranteed_ur_rolls": None
+    "guaranteed_ur_rolls": None,
+    "max_bulk_rolls": 100           # Số roll tối đa mỗi lần f!mgn
 }
 
+RARITY_ORDER = ["GR", "UR", "SSR", "SR", "R"]
+RARITY_EMOJIS = {"GR": "👻", "UR": "💎", "SSR": "🌟", "SR": "⭐", "R": "✨"}
+
+
+def get_gacha_cost(count: int) -> int:
+    """Giá N roll: mỗi 10 roll tính giá x10 (giảm 10%), phần lẻ tính giá đơn"""
+    tens, singles = divmod(count, 10)
+    return tens * GACHA_CONFIG["ten_roll_cost"] + singles * GACHA_CONFIG["single_roll_cost"]
+
 # Use configs from maid_config_backup.py để sync với limited banner
 RARITY_CONFIG = CONFIG_RARITY_CONFIG
 STARDUST_CONFIG = CONFIG_STARDUST_CONFIG
@@ -54,90 +76,95 @@ class MaidSystemV2(commands.Cog):
                 logger.warning("Database not available, skipping table creation")
                 return
             
-            # Get connection
-            connection = await self.bot.db.get_connection()
+            # DDL + đồng bộ cột template trong một transaction của writer
+            async with self.bot.db.transaction() as connection:
+                # 🛡️ SAFETY: Create tables only if they don't exist (preserve existing data)
+                logger.info("Creating maid system v2 tables (preserving existing data)...")
             
-            # 🛡️ SAFETY: Create tables only if they don't exist (preserve existing data)
-            logger.info("Creating maid system v2 tables (preserving existing data)...")
+                # 🚫 REMOVED: DROP TABLE operations to prevent data loss
+                # Tables will only be created if they don't exist
             
-            # 🚫 REMOVED: DROP TABLE operations to prevent data loss
-            # Tables will only be created if they don't exist
-            
-            # User maids table with schema validation
-            await connection.execute('''
-                CREATE TABLE IF NOT EXISTS user_maids_v2 (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    maid_id TEXT NOT NULL,
-                    instance_id TEXT NOT NULL UNIQUE,
-                    custom_name TEXT,
-                    obtained_at TEXT NOT NULL,
-                    is_active BOOLEAN DEFAULT 0,
-                    buff_values TEXT NOT NULL,
-                    reroll_count INTEGER DEFAULT 0,
-                    last_reroll_time TEXT
-                )
-            ''')
-            
-            # 🛡️ SAFETY: Add missing columns if they don't exist (for schema evolution)
-            try:
-                await connection.execute('ALTER TABLE user_maids_v2 ADD COLUMN reroll_count INTEGER DEFAULT 0')
-                logger.info("Added reroll_count column to user_maids_v2")
-            except:
-                pass  # Column already exists
+                # User maids table with schema validation
+                await connection.execute('''
+                    CREATE TABLE IF NOT EXISTS user_maids_v2 (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        maid_id TEXT NOT NULL,
+                        instance_id TEXT NOT NULL UNIQUE,
+                        custom_name TEXT,
+                        obtained_at TEXT NOT NULL,
+                        is_active BOOLEAN DEFAULT 0,
+                        buff_values TEXT NOT NULL,
+                        reroll_count INTEGER DEFAULT 0,
+                        last_reroll_time TEXT
+                    )
+                ''')
+            
+                # 🛡️ SAFETY: Add missing columns if they don't exist (for schema evolution)
+                try:
+                    await connection.execute('ALTER TABLE user_maids_v2 ADD COLUMN reroll_count INTEGER DEFAULT 0')
+                    logger.info("Added reroll_count column to user_maids_v2")
+                except:
+                    pass  # Column already exists
                 
-            try:
-                await connection.execute('ALTER TABLE user_maids_v2 ADD COLUMN last_reroll_time TEXT')
-                logger.info("Added last_reroll_time column to user_maids_v2")
-            except:
-                pass  # Column already exists
+                try:
+                    await connection.execute('ALTER TABLE user_maids_v2 ADD COLUMN last_reroll_time TEXT')
+                    logger.info("Added last_reroll_time column to user_maids_v2")
+                except:
+                    pass  # Column already exists
             
-            # Gacha history table
-            await connection.execute('''
-                CREATE TABLE IF NOT EXISTS gacha_history_v2 (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    roll_type TEXT NOT NULL,
-                    cost INTEGER NOT NULL,
-                    results TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                )
-            ''')
+                # rarity / maid_name denormalize để filter + phân trang collection trong SQL
+                await ensure_collection_columns(connection)
+                await sync_template_columns(connection)
             
-            # User stardust table
-            await connection.execute('''
-                CREATE TABLE IF NOT EXISTS user_stardust_v2 (
-                    user_id INTEGER PRIMARY KEY,
-                    stardust_amount INTEGER DEFAULT 0,
-                    last_updated TEXT NOT NULL
-                )
-            ''')
+                # Gacha history table
+                await connection.execute('''
+                    CREATE TABLE IF NOT EXISTS gacha_history_v2 (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        roll_type TEXT NOT NULL,
+                        cost INTEGER NOT NULL,
+                        results TEXT NOT NULL,
+                        created_at TEXT NOT NULL
+                    )
+                ''')
             
-            # Reroll history table
-            await connection.execute('''
-                CREATE TABLE IF NOT EXISTS maid_reroll_history_v2 (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    maid_instance_id TEXT NOT NULL,
-                    old_buffs TEXT NOT NULL,
-                    new_buffs TEXT NOT NULL,
-                    stardust_cost INTEGER NOT NULL,
-                    reroll_time TEXT NOT NULL
-                )
-            ''')
+                # User stardust table
+                await connection.execute('''
+                    CREATE TABLE IF NOT EXISTS user_stardust_v2 (
+                        user_id INTEGER PRIMARY KEY,
+                        stardust_amount INTEGER DEFAULT 0,
+                        last_updated TEXT NOT NULL
+                    )
+                ''')
             
-            # Maid equip cooldown table (preserve existing data)
-            await connection.execute('''
-                CREATE TABLE IF NOT EXISTS maid_equip_cooldown_v2 (
-                    user_id INTEGER PRIMARY KEY,
-                    last_equip_time TEXT NOT NULL,
-                    cooldown_until TEXT NOT NULL
-                )
-            ''')
+                # Reroll history table
+                await connection.execute('''
+                    CREATE TABLE IF NOT EXISTS maid_reroll_history_v2 (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        maid_instance_id TEXT NOT NULL,
+                        old_buffs TEXT NOT NULL,
+                        new_buffs TEXT NOT NULL,
+                        stardust_cost INTEGER NOT NULL,
+                        reroll_time TEXT NOT NULL
+                    )
+                ''')
+            
+                # Maid equip cooldown table (preserve existing data)
+                await connection.execute('''
+                    CREATE TABLE IF NOT EXISTS maid_equip_cooldown_v2 (
+                        user_id INTEGER PRIMARY KEY,
+                        last_equip_time TEXT NOT NULL,
+                        cooldown_until TEXT NOT NULL
+                    )
+                ''')
             
-            await connection.commit()
             logger.info("✅ Maid system v2 tables initialized safely (existing data preserved)")
             
+            # Bảng xếp hạng maid cần user_maids_v2 -> build sau khi tạo bảng
+            await self.bot.db.load_maid_leaderboard()
+            
         except Exception as e:
             logger.error(f"Error creating maid tables: {e}")
             import traceback
@@ -163,29 +190,11 @@ class MaidSystemV2(commands.Cog):
     # Helper functions
     def get_random_maid(self) -> str:
         """Roll random maid theo rates (EXCLUDE limited-only characters)"""
-        rate = random.uniform(0, 100)
-        
-        if rate < RARITY_CONFIG["UR"]["rate"]:
-            # ⚠️ EXCLUDE limited-only characters từ gacha thường
-            maids = [k for k, v in MAID_TEMPLATES.items() 
-                     if v["rarity"] == "UR" and not v.get("limited_only", False)]
-        elif rate < RARITY_CONFIG["UR"]["rate"] + RARITY_CONFIG["SSR"]["rate"]:
-            maids = [k for k, v in MAID_TEMPLATES.items() 
-                     if v["rarity"] == "SSR" and not v.get("limited_only", False)]
-        elif rate < RARITY_CONFIG["UR"]["rate"] + RARITY_CONFIG["SSR"]["rate"] + RARITY_CONFIG["SR"]["rate"]:
-            maids = [k for k, v in MAID_TEMPLATES.items() 
-                     if v["rarity"] == "SR" and not v.get("limited_only", False)]
-        else:
-            maids = [k for k, v in MAID_TEMPLATES.items() 
-                     if v["rarity"] == "R" and not v.get("limited_only", False)]
-        
-        # Fallback nếu không có maid nào available
-        if not maids:
-            fallback_maids = [k for k, v in MAID_TEMPLATES.items() 
-                             if v["rarity"] == "R" and not v.get("limited_only", False)]
-            return random.choice(fallback_maids) if fallback_maids else "tsunade_r"
-        
-        return random.choice(maids)
+        return gacha_engine.roll(1)[0]
+    
+    def get_random_maids(self, count: int) -> List[str]:
+        """Roll count maid trong một lần gọi (alias table đã compile sẵn)"""
+        return gacha_engine.roll(count)
     
     def generate_buffs(self, maid_id: str) -> List[Dict]:
         """Generate buffs cho maid"""
@@ -221,12 +230,11 @@ class MaidSystemV2(commands.Cog):
     
     async def add_stardust(self, user_id: int, amount: int):
         """Thêm stardust cho user"""
-        connection = await self.get_db_connection()
-        await connection.execute('''
-            INSERT OR REPLACE INTO user_stardust_v2 (user_id, stardust_amount, last_updated)
-            VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)
-        ''', (user_id, user_id, amount, datetime.now().isoformat()))
-        await connection.commit()
+        async with self.bot.db.transaction() as connection:
+            await connection.execute('''
+                INSERT OR REPLACE INTO user_stardust_v2 (user_id, stardust_amount, last_updated)
+                VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)
+            ''', (user_id, user_id, amount, datetime.now().isoformat()))
     
     async def spend_stardust(self, user_id: int, amount: int) -> bool:
         """Tiêu stardust, return True nếu đủ tiền"""
@@ -234,12 +242,11 @@ class MaidSystemV2(commands.Cog):
         if current < amount:
             return False
         
-        connection = await self.get_db_connection()
-        await connection.execute('''
-            UPDATE user_stardust_v2 SET stardust_amount = stardust_amount - ?, last_updated = ?
-            WHERE user_id = ?
-        ''', (amount, datetime.now().isoformat(), user_id))
-        await connection.commit()
+        async with self.bot.db.transaction() as connection:
+            await connection.execute('''
+                UPDATE user_stardust_v2 SET stardust_amount = stardust_amount - ?, last_updated = ?
+                WHERE user_id = ?
+            ''', (amount, datetime.now().isoformat(), user_id))
         return True
     
     async def check_equip_cooldown(self, user_id: int) -> tuple[bool, str]:
@@ -297,12 +304,11 @@ class MaidSystemV2(commands.Cog):
         now = datetime.now()
         cooldown_until = now + timedelta(hours=10)
         
-        connection = await self.get_db_connection()
-        await connection.execute('''
-            INSERT OR REPLACE INTO maid_equip_cooldown_v2 (user_id, last_equip_time, cooldown_until)
-            VALUES (?, ?, ?)
-        ''', (user_id, now.isoformat(), cooldown_until.isoformat()))
-        await connection.commit()
+        async with self.bot.db.transaction() as connection:
+            await connection.execute('''
+                INSERT OR REPLACE INTO maid_equip_cooldown_v2 (user_id, last_equip_time, cooldown_until)
+                VALUES (?, ?, ?)
+            ''', (user_id, now.isoformat(), cooldown_until.isoformat()))
     
     async def get_user_maids(self, user_id: int) -> List[Dict]:
         """Lấy tất cả maids của user"""
@@ -399,50 +405,10 @@ class MaidSystemV2(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        # 🛡️ SAFETY: Atomic transaction for gacha
-        connection = await self.get_db_connection()
+        # 🛡️ SAFETY: Atomic transaction for gacha (roll 1 lần qua roll_gacha_batch)
         try:
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # Double-check coins and deduct atomically
-            cursor = await connection.execute(
-                'UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
-                (cost, user_id, cost)
-            )
-            
-            if cursor.rowcount == 0:
-                await connection.execute('ROLLBACK')
-                embed = EmbedBuilder.create_base_embed(
-                    title="❌ Không đủ coins",
-                    description="Không đủ tiền để thực hiện gacha!",
-                    color=0xFF0000
-                )
-                await ctx.send(embed=embed)
-                return
-            
-            # Gacha roll (after successful payment)
-            maid_id = self.get_random_maid()
-            instance_id = str(uuid.uuid4())
-            buffs = self.generate_buffs(maid_id)
-            
-            # Save maid to database
-            await connection.execute('''
-                INSERT INTO user_maids_v2 (user_id, maid_id, instance_id, obtained_at, buff_values)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, maid_id, instance_id, datetime.now().isoformat(), json.dumps(buffs)))
-            
-            # Save gacha history
-            await connection.execute('''
-                INSERT INTO gacha_history_v2 (user_id, roll_type, cost, results, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, "single", cost, json.dumps([maid_id]), datetime.now().isoformat()))
-            
-            # 🛡️ COMMIT: All operations successful
-            await connection.commit()
-            
+            results = await self.roll_gacha_batch(user_id, 1, cost, "single")
         except Exception as e:
-            # 🛡️ ROLLBACK: Any error rolls back entire transaction
-            await connection.execute('ROLLBACK')
             logger.error(f"Gacha transaction failed for user {user_id}: {e}")
             embed = EmbedBuilder.create_base_embed(
                 title="❌ Lỗi gacha",
@@ -452,6 +418,17 @@ class MaidSystemV2(commands.Cog):
             await ctx.send(embed=embed)
             return
         
+        if results is None:
+            embed = EmbedBuilder.create_base_embed(
+                title="❌ Không đủ coins",
+                description="Không đủ tiền để thực hiện gacha!",
+                color=0xFF0000
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        maid_id, instance_id, buffs = results[0]["maid_id"], results[0]["instance_id"], results[0]["buffs"]
+        
         # Create result embed
         template = get_maid_template_safe(maid_id)
         if not template:
@@ -481,6 +458,49 @@ class MaidSystemV2(commands.Cog):
         
         await ctx.send(embed=embed)
     
+    async def roll_gacha_batch(self, user_id: int, count: int, cost: int, roll_type: str) -> Optional[List[Dict]]:
+        """Roll count maid trong một transaction: trừ tiền một lần, sinh maid + buffs
+        trong RAM, ghi bằng một executemany và một dòng gacha_history_v2.
+        
+        Returns:
+            List kết quả, hoặc None nếu không đủ tiền (không ghi gì)
+        Raises:
+            Exception khi ghi DB lỗi (đã rollback, tiền không bị trừ)
+        """
+        await self.ensure_tables_ready()
+        
+        # Sinh toàn bộ kết quả trong RAM trước, giữ writer lock ngắn nhất có thể
+        obtained_at = datetime.now().isoformat()
+        results = [
+            {"maid_id": maid_id, "instance_id": str(uuid.uuid4()), "buffs": self.generate_buffs(maid_id)}
+            for maid_id in self.get_random_maids(count)
+        ]
+        
+        # 🛡️ SAFETY: db.transaction() commit khi thành công, rollback khi lỗi
+        async with self.bot.db.transaction() as connection:
+            # Double-check coins and deduct atomically
+            cursor = await connection.execute(
+                'UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
+                (cost, user_id, cost)
+            )
+            if cursor.rowcount == 0:
+                return None  # Chưa ghi gì - transaction rỗng
+            
+            await connection.executemany(MAID_INSERT_SQL, [
+                maid_insert_row(user_id, r["maid_id"], r["instance_id"], obtained_at, r["buffs"]) for r in results
+            ])
+            
+            await connection.execute('''
+                INSERT INTO gacha_history_v2 (user_id, roll_type, cost, results, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, roll_type, cost, json.dumps([r["maid_id"] for r in results]), obtained_at))
+            
+            await self.bot.db.append_money_ledger(connection, user_id, -cost, 'gacha')
+        
+        self.bot.db.invalidate_users([user_id])
+        self.bot.db.record_money_delta(user_id, -cost, 'gacha')
+        return results
+    
     @commands.hybrid_command(name="mg10", description="🎰 Gacha maid - Roll 10 lần (90,000 coins)")
     async def maid_gacha_10(self, ctx):
         """Gacha maid 10 lần"""
@@ -502,58 +522,9 @@ class MaidSystemV2(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        # 🛡️ SAFETY: Atomic transaction for 10-roll gacha
-        connection = await self.get_db_connection()
         try:
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # Double-check coins and deduct atomically
-            cursor = await connection.execute(
-                'UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
-                (cost, user_id, cost)
-            )
-            
-            if cursor.rowcount == 0:
-                await connection.execute('ROLLBACK')
-                embed = EmbedBuilder.create_base_embed(
-                    title="❌ Không đủ coins",
-                    description="Không đủ tiền để thực hiện gacha 10 lần!",
-                    color=0xFF0000
-                )
-                await ctx.send(embed=embed)
-                return
-            
-            # Roll 10 times (after successful payment)
-            results = []
-            for _ in range(10):
-                maid_id = self.get_random_maid()
-                instance_id = str(uuid.uuid4())
-                buffs = self.generate_buffs(maid_id)
-                
-                # Save to database
-                await connection.execute('''
-                    INSERT INTO user_maids_v2 (user_id, maid_id, instance_id, obtained_at, buff_values)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (user_id, maid_id, instance_id, datetime.now().isoformat(), json.dumps(buffs)))
-                
-                results.append({
-                    "maid_id": maid_id,
-                    "instance_id": instance_id,
-                    "buffs": buffs
-                })
-            
-            # Save gacha history
-            await connection.execute('''
-                INSERT INTO gacha_history_v2 (user_id, roll_type, cost, results, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, "ten_roll", cost, json.dumps([r["maid_id"] for r in results]), datetime.now().isoformat()))
-            
-            # 🛡️ COMMIT: All operations successful
-            await connection.commit()
-            
+            results = await self.roll_gacha_batch(user_id, 10, cost, "ten_roll")
         except Exception as e:
-            # 🛡️ ROLLBACK: Any error rolls back entire transaction
-            await connection.execute('ROLLBACK')
             logger.error(f"10-roll gacha transaction failed for user {user_id}: {e}")
             embed = EmbedBuilder.create_base_embed(
                 title="❌ Lỗi gacha",
@@ -563,11 +534,117 @@ class MaidSystemV2(commands.Cog):
             await ctx.send(embed=embed)
             return
         
+        if results is None:
+            embed = EmbedBuilder.create_base_embed(
+                title="❌ Không đủ coins",
+                description="Không đủ tiền để thực hiện gacha 10 lần!",
+                color=0xFF0000
+            )
+            await ctx.send(embed=embed)
+            return
+        
         # Send results with view
         view = GachaResultsView(user_id, results)
         embed = view.create_embed(show_remaining=False)
         await ctx.send(embed=embed, view=view)
     
+    @commands.hybrid_command(name="mgn", description="🎰 Gacha maid - Roll nhiều lần (tối đa 100, giá x10 cho mỗi 10 roll)")
+    @app_commands.describe(count="Số lần roll (1-100)")
+    async def maid_gacha_bulk(self, ctx, count: int = 10):
+        """Gacha maid N lần trong một giao dịch"""
+        # Check registration
+        if not await require_registration(ctx.bot, ctx):
+            return
+        
+        max_rolls = GACHA_CONFIG["max_bulk_rolls"]
+        if count < 1 or count > max_rolls:
+            await ctx.send(f"❌ Số lần roll phải từ 1 đến {max_rolls}!")
+            return
+        
+        # Ensure tables are ready
+        await self.ensure_tables_ready()
+        
+        user_id = ctx.author.id
+        cost = get_gacha_cost(count)
+        
+        # Check coins
+        user = await self.db.get_user(user_id)
+        if user.money < cost:
+            embed = EmbedBuilder.create_base_embed(
+                title="❌ Không đủ coins",
+                description=f"Bạn cần {cost:,} coins để gacha {count} lần!\nBạn hiện có: {user.money:,} coins",
+                color=0xFF0000
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        try:
+            results = await self.roll_gacha_batch(user_id, count, cost, f"bulk_{count}")
+        except Exception as e:
+            logger.error(f"Bulk gacha ({count}) transaction failed for user {user_id}: {e}")
+            embed = EmbedBuilder.create_base_embed(
+                title="❌ Lỗi gacha",
+                description=f"Đã xảy ra lỗi trong quá trình gacha {count} lần. Tiền của bạn không bị trừ.",
+                color=0xFF0000
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        if results is None:
+            embed = EmbedBuilder.create_base_embed(
+                title="❌ Không đủ coins",
+                description=f"Không đủ tiền để thực hiện gacha {count} lần!",
+                color=0xFF0000
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        await ctx.send(embed=self.create_bulk_summary_embed(results, cost))
+    
+    def create_bulk_summary_embed(self, results: List[Dict], cost: int) -> discord.Embed:
+        """Embed tóm tắt cho roll nhiều lần: đếm theo rarity, liệt kê GR/UR/SSR, gộp SR/R theo tên"""
+        full_price = len(results) * GACHA_CONFIG["single_roll_cost"]
+        embed = EmbedBuilder.create_base_embed(
+            title=f"🎰 Gacha x{len(results)} Results!",
+            description=f"Chi phí: {cost:,} coins • Tiết kiệm: {full_price - cost:,} coins",
+            color=0x00FF00
+        )
+        
+        by_rarity = {rarity: [] for rarity in RARITY_ORDER}
+        for result in results:
+            template = get_maid_template_safe(result["maid_id"])
+            if template:
+                by_rarity[template["rarity"]].append((template, result))
+        
+        summary = " • ".join(
+            f"{RARITY_EMOJIS[rarity]} {rarity}: {len(items)}x" for rarity, items in by_rarity.items() if items
+        )
+        embed.add_field(name="📊 Tổng kết", value=summary or "Không có kết quả", inline=False)
+        
+        # Maid hiếm: từng con + ID để equip ngay
+        highlights = [
+            f"{RARITY_EMOJIS[rarity]} {template['emoji']} **{template['name']}** `{result['instance_id'][:8]}`"
+            for rarity in ("GR", "UR", "SSR") for template, result in by_rarity[rarity]
+        ]
+        if highlights:
+            shown = highlights[:15]
+            if len(highlights) > len(shown):
+                shown.append(f"... và {len(highlights) - len(shown)} maid khác")
+            embed.add_field(name="🌟 Maid hiếm", value="\n".join(shown), inline=False)
+        
+        # SR / R: gộp theo tên
+        for rarity in ("SR", "R"):
+            if not by_rarity[rarity]:
+                continue
+            counts = {}
+            for template, _ in by_rarity[rarity]:
+                counts[template["name"]] = counts.get(template["name"], 0) + 1
+            value = ", ".join(f"{name} x{n}" for name, n in sorted(counts.items(), key=lambda item: -item[1]))
+            embed.add_field(name=f"{RARITY_EMOJIS[rarity]} {rarity}", value=value[:1024], inline=False)
+        
+        embed.set_footer(text="Dùng f!mc để xem collection • f!mdisall -r R để tách maid R")
+        return embed
+    
     @commands.hybrid_command(name="ma", description="👑 Xem maid đang active và buffs")
     async def maid_active(self, ctx):
         """Xem maid active"""
@@ -627,85 +704,40 @@ class MaidSystemV2(commands.Cog):
         f!mc - Xem tất cả
         f!mc -r UR - Lọc theo rarity 
         f!mc -n zero - Lọc theo tên
+        f!mc -b growth_speed - Lọc theo loại buff (kết hợp được: -r UR -b yield_boost)
         """
         # Check registration
         if not await require_registration(ctx.bot, ctx):
             return
         
-        # Parse arguments
-        filter_type = None
-        filter_value = None
-        
-        if args:
-            parts = args.strip().split()
-            if len(parts) >= 2:
-                if parts[0] == '-r':
-                    filter_type = 'rarity'
-                    filter_value = parts[1]
-                elif parts[0] == '-n':
-                    filter_type = 'name'
-                    filter_value = ' '.join(parts[1:])  # Support multi-word names
-            
-        user_id = ctx.author.id
-        maids = await self.get_user_maids(user_id)
+        await self.ensure_tables_ready()
         
-        if not maids:
-            embed = EmbedBuilder.create_base_embed(
-                title="❌ Collection trống",
-                description="Bạn chưa có maid nào!\nDùng `f!mg` để gacha maid",
-                color=0xFF0000
-            )
-            await ctx.send(embed=embed)
-            return
+        user_id = ctx.author.id
+        maid_filter = MaidFilter.parse(args)
         
-        # Apply filters
-        filtered_maids = self.apply_maid_filters(maids, filter_type, filter_value)
+        # Chỉ COUNT trong SQL, các trang được load khi xem
+        total = await count_user_maids(self.db, user_id, maid_filter)
         
-        if not filtered_maids:
-            filter_text = ""
-            if filter_type == 'rarity':
-                filter_text = f" với rarity `{filter_value.upper()}`"
-            elif filter_type == 'name':
-                filter_text = f" với tên chứa `{filter_value}`"
-                
-            embed = EmbedBuilder.create_base_embed(
-                title="❌ Không tìm thấy maid",
-                description=f"Không có maid nào{filter_text}",
-                color=0xFF0000
-            )
+        if not total:
+            if maid_filter.is_empty() or not await count_user_maids(self.db, user_id):
+                embed = EmbedBuilder.create_base_embed(
+                    title="❌ Collection trống",
+                    description="Bạn chưa có maid nào!\nDùng `f!mg` để gacha maid",
+                    color=0xFF0000
+                )
+            else:
+                embed = EmbedBuilder.create_base_embed(
+                    title="❌ Không tìm thấy maid",
+                    description=f"Không có maid nào với {maid_filter.describe()}",
+                    color=0xFF0000
+                )
             await ctx.send(embed=embed)
             return
         
         # Send with pagination view
-        view = MaidCollectionView(user_id, filtered_maids, self, filter_type, filter_value)
-        embed = view.create_embed(1)
-        await ctx.send(embed=embed, view=view)
-    
-    def apply_maid_filters(self, maids: List[Dict], filter_type: Optional[str], filter_value: Optional[str]) -> List[Dict]:
-        """Apply filters to maid list"""
-        if not filter_type or not filter_value:
-            return maids
-            
-        filtered = []
-        
-        for maid in maids:
-            template = MAID_TEMPLATES.get(maid["maid_id"], {})
-            
-            if filter_type == 'rarity':
-                if template.get("rarity", "").upper() == filter_value.upper():
-                    filtered.append(maid)
-                    
-            elif filter_type == 'name':
-                maid_name = template.get("name", "").lower()
-                custom_name = (maid.get("custom_name") or "").lower()
-                search_term = filter_value.lower()
-                
-                if (search_term in maid_name or 
-                    search_term in custom_name or
-                    search_term in maid["maid_id"].lower()):
-                    filtered.append(maid)
-        
-        return filtered
+        view = MaidCollectionView(user_id, self, maid_filter, total)
+        await view.load_page(1)
+        await ctx.send(embed=view.create_embed(), view=view)
     
     @commands.hybrid_command(name="mequip", description="🎯 Trang bị maid")
     async def maid_equip(self, ctx, maid_id: str):
@@ -748,20 +780,20 @@ class MaidSystemV2(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        # Deactivate all maids
-        connection = await self.get_db_connection()
-        await connection.execute(
-            "UPDATE user_maids_v2 SET is_active = 0 WHERE user_id = ?",
-            (user_id,)
-        )
-        
-        # Activate target maid
-        await connection.execute(
-            "UPDATE user_maids_v2 SET is_active = 1 WHERE instance_id = ?",
-            (target_maid["instance_id"],)
-        )
+        async with self.bot.db.transaction() as connection:
+            # Deactivate all maids
+            await connection.execute(
+                "UPDATE user_maids_v2 SET is_active = 0 WHERE user_id = ?",
+                (user_id,)
+            )
+            
+            # Activate target maid
+            await connection.execute(
+                "UPDATE user_maids_v2 SET is_active = 1 WHERE instance_id = ?",
+                (target_maid["instance_id"],)
+            )
         
-        await connection.commit()
+        await maid_buff_cache.refresh_user(user_id)
         
         # Set 10-hour cooldown
         await self.set_equip_cooldown(user_id)
@@ -906,7 +938,7 @@ class MaidSystemV2(commands.Cog):
         
         await ctx.send(embed=embed, view=view)
 
-    @commands.hybrid_command(name="mdisall", description="💥 Tách nhiều maid theo filter (-r rarity / -n name)")
+    @commands.hybrid_command(name="mdisall", description="💥 Tách nhiều maid theo filter (-r rarity / -n name / -b buff / -t template)")
     async def maid_dismantle_all(self, ctx, *, args: Optional[str] = None):
         """Tách nhiều maid cùng lúc theo filter"""
         # Check registration
@@ -915,115 +947,58 @@ class MaidSystemV2(commands.Cog):
             
         user_id = ctx.author.id
         
-        # Parse filters
-        filter_type = None
-        filter_value = None
-        
-        if args:
-            parts = args.split()
-            i = 0
-            while i < len(parts):
-                if parts[i] == "-r" and i + 1 < len(parts):
-                    filter_type = "rarity"
-                    filter_value = parts[i + 1].upper()
-                    i += 2
-                elif parts[i] == "-n" and i + 1 < len(parts):
-                    filter_type = "name"
-                    # Handle multi-word names
-                    name_parts = []
-                    i += 1
-                    while i < len(parts) and not parts[i].startswith("-"):
-                        name_parts.append(parts[i])
-                        i += 1
-                    filter_value = " ".join(name_parts).lower()
-                else:
-                    i += 1
-        
-        # Get all maids
-        all_maids = await self.get_user_maids(user_id)
-        if not all_maids:
-            embed = EmbedBuilder.create_base_embed(
-                title="❌ Không có maid",
-                description="Bạn chưa có maid nào để tách!",
-                color=0xFF0000
-            )
-            await ctx.send(embed=embed)
-            return
+        await self.ensure_tables_ready()
         
-        # Apply filters
-        filtered_maids = self.apply_maid_filters(all_maids, filter_type, filter_value)
+        # Preview bằng GROUP BY trong SQL (maid active không bao giờ bị tách)
+        maid_filter = MaidFilter.parse(args)
+        preview = await preview_dismantle(self.db, user_id, maid_filter)
         
-        if not filtered_maids:
-            if filter_type and filter_value:
+        if not preview.count:
+            if await count_user_maids(self.db, user_id, maid_filter):
+                embed = EmbedBuilder.create_base_embed(
+                    title="⚠️ Không thể tách",
+                    description="Không thể tách maid đang active! Hãy unequip trước.",
+                    color=0xFFA500
+                )
+            elif not maid_filter.is_empty() and await count_user_maids(self.db, user_id):
                 embed = EmbedBuilder.create_base_embed(
                     title="❌ Không tìm thấy maid",
-                    description=f"Không tìm thấy maid với filter: `{filter_type}={filter_value}`",
+                    description=f"Không tìm thấy maid với filter: {maid_filter.describe()}",
                     color=0xFF0000
                 )
             else:
                 embed = EmbedBuilder.create_base_embed(
                     title="❌ Không có maid",
-                    description="Bạn chưa có maid nào!",
+                    description="Bạn chưa có maid nào để tách!",
                     color=0xFF0000
                 )
             await ctx.send(embed=embed)
             return
         
-        # Remove active maid from dismantle list
-        active_maid = await self.get_active_maid(user_id)
-        if active_maid:
-            filtered_maids = [m for m in filtered_maids if m["instance_id"] != active_maid["instance_id"]]
-        
-        if not filtered_maids:
-            embed = EmbedBuilder.create_base_embed(
-                title="⚠️ Không thể tách",
-                description="Không thể tách maid đang active! Hãy unequip trước.",
-                color=0xFFA500
-            )
-            await ctx.send(embed=embed)
-            return
-        
-        # Calculate total rewards
-        total_rewards = {}
-        total_stardust = 0
-        for maid in filtered_maids:
-            template = get_maid_template_safe(maid["maid_id"])
-            if not template:
-                continue  # Skip invalid templates
-            rarity = template["rarity"]
-            reward = STARDUST_CONFIG["dismantle_rewards"][rarity]
-            total_rewards[rarity] = total_rewards.get(rarity, 0) + 1
-            total_stardust += reward
-        
         # Create confirmation view
-        view = BulkDismantleConfirmView(user_id, filtered_maids, total_stardust, total_rewards, self)
+        view = BulkDismantleConfirmView(user_id, maid_filter, preview, self)
         
         # Create embed
         embed = EmbedBuilder.create_base_embed(
             title="⚠️ Xác nhận tách nhiều maid",
-            description=f"Bạn có chắc muốn tách **{len(filtered_maids)} maid**?",
+            description=f"Bạn có chắc muốn tách **{preview.count} maid**?",
             color=0xFFA500
         )
         
         # Show filter used
-        if filter_type and filter_value:
-            if filter_type == "rarity":
-                embed.add_field(name="🔍 Filter", value=f"Rarity: **{filter_value}**", inline=False)
-            else:
-                embed.add_field(name="🔍 Filter", value=f"Name: **{filter_value}**", inline=False)
+        if not maid_filter.is_empty():
+            embed.add_field(name="🔍 Filter", value=maid_filter.describe(), inline=False)
         
         # Show breakdown by rarity
         breakdown_parts = []
-        for rarity in ["UR", "SSR", "SR", "R"]:
-            if rarity in total_rewards:
-                count = total_rewards[rarity]
-                reward_per = STARDUST_CONFIG["dismantle_rewards"][rarity]
-                total_per_rarity = count * reward_per
-                rarity_emoji = {"GR": "👻", "UR": "💎", "SSR": "🌟", "SR": "⭐", "R": "✨"}[rarity]
-                breakdown_parts.append(f"{rarity_emoji} **{rarity}**: {count}x → {total_per_rarity}⭐")
-        
-        embed.add_field(name="📊 Chi tiết", value="\n".join(breakdown_parts), inline=False)
-        embed.add_field(name="💰 Tổng stardust", value=f"**{total_stardust:,} ⭐**", inline=True)
+        for rarity in RARITY_ORDER:
+            if rarity in preview.by_rarity:
+                count = preview.by_rarity[rarity]
+                total_per_rarity = count * STARDUST_CONFIG["dismantle_rewards"][rarity]
+                breakdown_parts.append(f"{RARITY_EMOJIS[rarity]} **{rarity}**: {count}x → {total_per_rarity}⭐")
+        
+        embed.add_field(name="📊 Chi tiết", value="\n".join(breakdown_parts) or "—", inline=False)
+        embed.add_field(name="💰 Tổng stardust", value=f"**{preview.stardust:,} ⭐**", inline=True)
         embed.add_field(name="⚠️ Cảnh báo", value="**Hành động này KHÔNG THỂ hoàn tác!**", inline=False)
         
         await ctx.send(embed=embed, view=view)
@@ -1101,7 +1076,10 @@ class MaidSystemV2(commands.Cog):
             # with open('ai/maid_characters.json', 'r', encoding='utf-8') as f:
             #     external_templates = json.load(f)
             #     MAID_TEMPLATES.update(external_templates)
-            pass
+            gacha_engine.compile(MAID_TEMPLATES)
+            maid_search_index.build(MAID_TEMPLATES)
+            async with self.bot.db.transaction() as connection:
+                await sync_template_columns(connection)
         except Exception as e:
             logger.error(f"Failed to reload maid templates: {e}")
     
@@ -1246,22 +1224,38 @@ class GachaResultsView(discord.ui.View):
 
 
 class MaidCollectionView(discord.ui.View):
-    """View cho maid collection với pagination buttons"""
+    """View cho maid collection với pagination buttons (load từng trang từ DB)"""
     
-    def __init__(self, user_id: int, maids: List[Dict], cog, filter_type: Optional[str] = None, filter_value: Optional[str] = None):
+    def __init__(self, user_id: int, cog, maid_filter: MaidFilter, total: int):
         super().__init__(timeout=300)  # 5 minutes timeout
         self.user_id = user_id
-        self.maids = maids
         self.cog = cog
-        self.filter_type = filter_type
-        self.filter_value = filter_value
+        self.maid_filter = maid_filter
+        self.total = total
         self.per_page = 8
         self.current_page = 1
-        self.total_pages = (len(maids) - 1) // self.per_page + 1
+        self.total_pages = max(1, (total - 1) // self.per_page + 1)
+        self.page_maids: List[Dict] = []
+        # Trang -> keyset (obtained_at, id) của dòng cuối trang trước
+        self._page_cursors: Dict[int, Optional[tuple]] = {1: None}
         
         # Update button states
         self.update_buttons()
     
+    async def load_page(self, page: int):
+        """Query đúng một trang (keyset nếu đã biết trang trước, không thì OFFSET)"""
+        page = max(1, min(page, self.total_pages))
+        if page in self._page_cursors:
+            maids = await fetch_maid_page(self.cog.db, self.user_id, self.maid_filter,
+                                          self.per_page, after=self._page_cursors[page])
+        else:
+            maids = await fetch_maid_page(self.cog.db, self.user_id, self.maid_filter,
+                                          self.per_page, offset=(page - 1) * self.per_page)
+        self.current_page = page
+        self.page_maids = maids
+        if len(maids) == self.per_page:
+            self._page_cursors[page + 1] = maids[-1]["cursor"]
+    
     def update_buttons(self):
         """Update button states based on current page"""
         # Clear all buttons first
@@ -1295,25 +1289,20 @@ class MaidCollectionView(discord.ui.View):
             next_button.callback = self.next_page
             self.add_item(next_button)
     
-    def create_embed(self, page: int) -> discord.Embed:
-        """Tạo embed cho page hiện tại"""
-        self.current_page = max(1, min(page, self.total_pages))
-        
-        start_idx = (self.current_page - 1) * self.per_page
-        end_idx = start_idx + self.per_page
-        page_maids = self.maids[start_idx:end_idx]
+    def create_embed(self) -> discord.Embed:
+        """Tạo embed cho trang đã load (load_page)"""
+        page_maids = self.page_maids
         
         # Create title with filter info
         title = "📚 Maid Collection"
-        if self.filter_type:
-            if self.filter_type == 'rarity':
-                title += f" - {self.filter_value.upper()} Only"
-            elif self.filter_type == 'name':
-                title += f" - '{self.filter_value}'"
+        if self.maid_filter.rarity:
+            title += f" - {self.maid_filter.rarity} Only"
+        if self.maid_filter.name:
+            title += f" - '{self.maid_filter.name}'"
         
-        description = f"Trang {self.current_page}/{self.total_pages} • Tổng cộng: {len(self.maids)} maids"
-        if self.filter_type:
-            description += f"\n🔍 **Filter**: {self.filter_type} = `{self.filter_value}`"
+        description = f"Trang {self.current_page}/{self.total_pages} • Tổng cộng: {self.total} maids"
+        if not self.maid_filter.is_empty():
+            description += f"\n🔍 **Filter**: {self.maid_filter.describe()}"
         
         embed = EmbedBuilder.create_base_embed(
             title=title,
@@ -1347,7 +1336,7 @@ class MaidCollectionView(discord.ui.View):
                 inline=False
             )
         
-        footer_text = "💡 f!mequip <id> để trang bị • f!mc -r <rarity> • f!mc -n <tên>"
+        footer_text = "💡 f!mequip <id> để trang bị • f!mc -r <rarity> • f!mc -n <tên> • f!mc -b <buff>"
         embed.set_footer(text=footer_text)
         return embed
     
@@ -1358,10 +1347,9 @@ class MaidCollectionView(discord.ui.View):
             return
         
         if self.current_page > 1:
-            self.current_page -= 1
+            await self.load_page(self.current_page - 1)
             self.update_buttons()
-            embed = self.create_embed(self.current_page)
-            await interaction.response.edit_message(embed=embed, view=self)
+            await interaction.response.edit_message(embed=self.create_embed(), view=self)
         else:
             await interaction.response.defer()
     
@@ -1372,10 +1360,9 @@ class MaidCollectionView(discord.ui.View):
             return
         
         if self.current_page < self.total_pages:
-            self.current_page += 1
+            await self.load_page(self.current_page + 1)
             self.update_buttons()
-            embed = self.create_embed(self.current_page)
-            await interaction.response.edit_message(embed=embed, view=self)
+            await interaction.response.edit_message(embed=self.create_embed(), view=self)
         else:
             await interaction.response.defer()
     
@@ -1401,40 +1388,38 @@ class DismantleConfirmView(discord.ui.View):
         
         try:
             # 🛡️ SAFETY: Atomic transaction for single dismantle
-            connection = await self.cog.get_db_connection()
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # 🔐 VALIDATION: Verify ownership before deletion
-            cursor = await connection.execute(
-                'SELECT user_id FROM user_maids_v2 WHERE instance_id = ?', 
-                (self.maid["instance_id"],)
-            )
-            row = await cursor.fetchone()
-            if not row or row[0] != self.user_id:
-                await connection.execute('ROLLBACK')
-                await interaction.response.send_message("❌ Maid không thuộc sở hữu của bạn!", ephemeral=True)
-                return
-            
-            # Delete maid with ownership validation
-            cursor = await connection.execute(
-                "DELETE FROM user_maids_v2 WHERE instance_id = ? AND user_id = ?",
-                (self.maid["instance_id"], self.user_id)
-            )
-            
-            # 🛡️ VALIDATION: Check if maid was actually deleted
-            if cursor.rowcount == 0:
-                await connection.execute('ROLLBACK')
-                await interaction.response.send_message("❌ Không thể tách maid này!", ephemeral=True)
+            try:
+                async with self.cog.bot.db.transaction() as connection:
+                    # 🔐 VALIDATION: Verify ownership before deletion
+                    cursor = await connection.execute(
+                        'SELECT user_id FROM user_maids_v2 WHERE instance_id = ?', 
+                        (self.maid["instance_id"],)
+                    )
+                    row = await cursor.fetchone()
+                    if not row or row[0] != self.user_id:
+                        raise MaidActionAborted("❌ Maid không thuộc sở hữu của bạn!")
+                    
+                    # Delete maid with ownership validation
+                    cursor = await connection.execute(
+                        "DELETE FROM user_maids_v2 WHERE instance_id = ? AND user_id = ?",
+                        (self.maid["instance_id"], self.user_id)
+                    )
+                    
+                    # 🛡️ VALIDATION: Check if maid was actually deleted
+                    if cursor.rowcount == 0:
+                        raise MaidActionAborted("❌ Không thể tách maid này!")
+                    
+                    # Add stardust in same transaction
+                    await connection.execute('''
+                        INSERT OR REPLACE INTO user_stardust_v2 (user_id, stardust_amount, last_updated)
+                        VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)
+                    ''', (self.user_id, self.user_id, self.reward, datetime.now().isoformat()))
+            except MaidActionAborted as aborted:
+                await interaction.response.send_message(str(aborted), ephemeral=True)
                 return
             
-            # Add stardust in same transaction
-            await connection.execute('''
-                INSERT OR REPLACE INTO user_stardust_v2 (user_id, stardust_amount, last_updated)
-                VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)
-            ''', (self.user_id, self.user_id, self.reward, datetime.now().isoformat()))
-            
-            # 🛡️ COMMIT: All operations successful
-            await connection.commit()
+            self.cog.bot.db.invalidate_users([self.user_id])
+            await maid_buff_cache.refresh_user(self.user_id)
             
             template = get_maid_template_safe(self.maid["maid_id"])
             if not template:
@@ -1454,11 +1439,7 @@ class DismantleConfirmView(discord.ui.View):
             await interaction.response.edit_message(embed=embed, view=self)
             
         except Exception as e:
-            # 🛡️ ROLLBACK: Any error rolls back entire transaction
-            try:
-                await connection.execute('ROLLBACK')
-            except:
-                pass  # Connection might be closed
+            # 🛡️ ROLLBACK: db.transaction() đã rollback toàn bộ
             logger.error(f"Single dismantle failed for user {self.user_id}: {e}")
             await interaction.response.send_message(f"❌ Lỗi khi tách maid: Operation đã được rollback.", ephemeral=True)
     
@@ -1478,12 +1459,11 @@ class DismantleConfirmView(discord.ui.View):
         await interaction.response.edit_message(embed=embed, view=self)
 
 class BulkDismantleConfirmView(discord.ui.View):
-    def __init__(self, user_id: int, maids: List[Dict], total_stardust: int, total_rewards: Dict, cog):
+    def __init__(self, user_id: int, maid_filter: MaidFilter, preview: DismantleResult, cog):
         super().__init__(timeout=300)
         self.user_id = user_id
-        self.maids = maids
-        self.total_stardust = total_stardust
-        self.total_rewards = total_rewards
+        self.maid_filter = maid_filter
+        self.preview = preview
         self.cog = cog
 
     @discord.ui.button(label="💥 Xác nhận tách tất cả", style=discord.ButtonStyle.danger)
@@ -1493,93 +1473,46 @@ class BulkDismantleConfirmView(discord.ui.View):
             return
         
         try:
-            # 🛡️ SAFETY: Validate input before processing
-            if not self.maids or len(self.maids) == 0:
-                await interaction.response.send_message("❌ Không có maid nào để tách!", ephemeral=True)
-                return
-                
-            # 🔓 REMOVED LIMIT: Cho phép người dùng tách toàn bộ collection của mình
-            # Old limit: max 50 maids per bulk operation - đã được loại bỏ theo yêu cầu người dùng
-            
-            # 🛡️ SAFETY: Atomic transaction for bulk dismantle
-            connection = await self.cog.get_db_connection()
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # 🔐 VALIDATION: Verify ownership before deletion
-            instance_ids = [maid["instance_id"] for maid in self.maids]
-            for instance_id in instance_ids:
-                cursor = await connection.execute(
-                    'SELECT user_id FROM user_maids_v2 WHERE instance_id = ?', 
-                    (instance_id,)
-                )
-                row = await cursor.fetchone()
-                if not row or row[0] != self.user_id:
-                    await connection.execute('ROLLBACK')
-                    await interaction.response.send_message(
-                        f"❌ Phát hiện maid không thuộc sở hữu! Bulk dismantle bị hủy.",
-                        ephemeral=True
-                    )
-                    return
-            
-            # Delete all maids with ownership validation
-            placeholders = ",".join("?" * len(instance_ids))
-            cursor = await connection.execute(
-                f"DELETE FROM user_maids_v2 WHERE instance_id IN ({placeholders}) AND user_id = ?",
-                instance_ids + [self.user_id]  # Add user_id for extra safety
+            # 🛡️ SAFETY: Một transaction - DELETE ... RETURNING theo filter + một upsert stardust.
+            # user_id nằm trong WHERE (ownership), id <= max_id của preview nên maid mới roll không bị tách
+            result = await dismantle_maids(
+                self.cog.db, self.user_id, self.maid_filter, max_id=self.preview.max_id
             )
-            
-            # 🛡️ VALIDATION: Check if expected number of maids were deleted
-            if cursor.rowcount != len(instance_ids):
-                await connection.execute('ROLLBACK')
-                await interaction.response.send_message(
-                    f"❌ Có lỗi xảy ra khi tách maid (expected {len(instance_ids)}, deleted {cursor.rowcount}). Operation rolled back.",
-                    ephemeral=True
-                )
-                return
-            
-            # Add stardust in same transaction
-            await connection.execute('''
-                INSERT OR REPLACE INTO user_stardust_v2 (user_id, stardust_amount, last_updated)
-                VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)
-            ''', (self.user_id, self.user_id, self.total_stardust, datetime.now().isoformat()))
-            
-            # 🛡️ COMMIT: All operations successful
-            await connection.commit()
-            
-            embed = EmbedBuilder.create_base_embed(
-                title="💥 Tách thành công!",
-                description=f"Đã tách **{len(self.maids)} maid** thành stardust!",
-                color=0x00FF00
-            )
-            
-            # Show breakdown
-            breakdown_parts = []
-            for rarity in ["GR", "UR", "SSR", "SR", "R"]:
-                if rarity in self.total_rewards:
-                    count = self.total_rewards[rarity]
-                    reward_per = STARDUST_CONFIG["dismantle_rewards"][rarity]
-                    total_per_rarity = count * reward_per
-                    rarity_emoji = {"GR": "👻", "UR": "💎", "SSR": "🌟", "SR": "⭐", "R": "✨"}[rarity]
-                    breakdown_parts.append(f"{rarity_emoji} {rarity}: {count}x → +{total_per_rarity}⭐")
-            
-            embed.add_field(name="📊 Đã tách", value="\n".join(breakdown_parts), inline=False)
-            embed.add_field(name="💰 Tổng stardust nhận", value=f"**+{self.total_stardust:,} ⭐**", inline=True)
-            
-            # Get current stardust for display
-            current_stardust = await self.cog.get_user_stardust(self.user_id)
-            embed.add_field(name="💫 Stardust hiện có", value=f"{current_stardust:,} ⭐", inline=True)
-            
-            self.clear_items()
-            await interaction.response.edit_message(embed=embed, view=self)
-            
         except Exception as e:
-            # 🛡️ ROLLBACK: Any error rolls back entire transaction
-            try:
-                await connection.execute('ROLLBACK')
-            except:
-                pass  # Connection might be closed
             logger.error(f"Bulk dismantle failed for user {self.user_id}: {e}")
             await interaction.response.send_message(f"❌ Lỗi khi tách maid: Đã rollback toàn bộ operation.", ephemeral=True)
+            return
+        
+        if not result.count:
+            await interaction.response.send_message("❌ Không còn maid nào để tách!", ephemeral=True)
+            return
+        
+        self.cog.bot.db.invalidate_users([self.user_id])
+        await maid_buff_cache.refresh_user(self.user_id)
+        
+        embed = EmbedBuilder.create_base_embed(
+            title="💥 Tách thành công!",
+            description=f"Đã tách **{result.count} maid** thành stardust!",
+            color=0x00FF00
+        )
+        
+        # Show breakdown
+        breakdown_parts = []
+        for rarity in RARITY_ORDER:
+            if rarity in result.by_rarity:
+                count = result.by_rarity[rarity]
+                total_per_rarity = count * STARDUST_CONFIG["dismantle_rewards"][rarity]
+                breakdown_parts.append(f"{RARITY_EMOJIS[rarity]} {rarity}: {count}x → +{total_per_rarity}⭐")
+        
+        embed.add_field(name="📊 Đã tách", value="\n".join(breakdown_parts) or "—", inline=False)
+        embed.add_field(name="💰 Tổng stardust nhận", value=f"**+{result.stardust:,} ⭐**", inline=True)
+        
+        # Get current stardust for display
+        current_stardust = await self.cog.get_user_stardust(self.user_id)
+        embed.add_field(name="💫 Stardust hiện có", value=f"{current_stardust:,} ⭐", inline=True)
+        
+        self.clear_items()
+        await interaction.response.edit_message(embed=embed, view=self)
 
     @discord.ui.button(label="❌ Hủy", style=discord.ButtonStyle.secondary)
     async def cancel_bulk_dismantle(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -1624,54 +1557,49 @@ class RerollConfirmView(discord.ui.View):
             new_buffs = self.cog.generate_buffs(self.maid["maid_id"])
             
             # 🛡️ SAFETY: Atomic transaction for reroll
-            connection = await self.cog.get_db_connection()
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # 🔐 VALIDATION: Verify maid ownership
-            cursor = await connection.execute(
-                'SELECT user_id FROM user_maids_v2 WHERE instance_id = ?', 
-                (self.maid["instance_id"],)
-            )
-            row = await cursor.fetchone()
-            if not row or row[0] != self.user_id:
-                await connection.execute('ROLLBACK')
-                await interaction.response.send_message("❌ Maid không thuộc sở hữu của bạn!", ephemeral=True)
-                return
-            
-            # 🔐 VALIDATION: Double-check stardust and spend atomically
-            cursor = await connection.execute('''
-                UPDATE user_stardust_v2 SET stardust_amount = stardust_amount - ?, last_updated = ?
-                WHERE user_id = ? AND stardust_amount >= ?
-            ''', (self.cost, datetime.now().isoformat(), self.user_id, self.cost))
-            
-            if cursor.rowcount == 0:
-                await connection.execute('ROLLBACK')
-                await interaction.response.send_message("❌ Không đủ stardust để reroll!", ephemeral=True)
-                return
-            
-            # Update maid buffs
-            cursor = await connection.execute('''
-                UPDATE user_maids_v2 
-                SET buff_values = ?, reroll_count = reroll_count + 1, last_reroll_time = ?
-                WHERE instance_id = ? AND user_id = ?
-            ''', (json.dumps(new_buffs), datetime.now().isoformat(), self.maid["instance_id"], self.user_id))
-            
-            # 🛡️ VALIDATION: Check if maid was actually updated
-            if cursor.rowcount == 0:
-                await connection.execute('ROLLBACK')
-                await interaction.response.send_message("❌ Không thể reroll maid này!", ephemeral=True)
+            try:
+                async with self.cog.bot.db.transaction() as connection:
+                    # 🔐 VALIDATION: Verify maid ownership
+                    cursor = await connection.execute(
+                        'SELECT user_id FROM user_maids_v2 WHERE instance_id = ?', 
+                        (self.maid["instance_id"],)
+                    )
+                    row = await cursor.fetchone()
+                    if not row or row[0] != self.user_id:
+                        raise MaidActionAborted("❌ Maid không thuộc sở hữu của bạn!")
+                    
+                    # 🔐 VALIDATION: Double-check stardust and spend atomically
+                    cursor = await connection.execute('''
+                        UPDATE user_stardust_v2 SET stardust_amount = stardust_amount - ?, last_updated = ?
+                        WHERE user_id = ? AND stardust_amount >= ?
+                    ''', (self.cost, datetime.now().isoformat(), self.user_id, self.cost))
+                    
+                    if cursor.rowcount == 0:
+                        raise MaidActionAborted("❌ Không đủ stardust để reroll!")
+                    
+                    # Update maid buffs
+                    cursor = await connection.execute('''
+                        UPDATE user_maids_v2 
+                        SET buff_values = ?, reroll_count = reroll_count + 1, last_reroll_time = ?
+                        WHERE instance_id = ? AND user_id = ?
+                    ''', (json.dumps(new_buffs), datetime.now().isoformat(), self.maid["instance_id"], self.user_id))
+                    
+                    # 🛡️ VALIDATION: Check if maid was actually updated (rollback cả phần trừ stardust)
+                    if cursor.rowcount == 0:
+                        raise MaidActionAborted("❌ Không thể reroll maid này!")
+                    
+                    # Save reroll history
+                    await connection.execute('''
+                        INSERT INTO maid_reroll_history_v2 
+                        (user_id, maid_instance_id, old_buffs, new_buffs, stardust_cost, reroll_time)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (self.user_id, self.maid["instance_id"], json.dumps(old_buffs), 
+                          json.dumps(new_buffs), self.cost, datetime.now().isoformat()))
+            except MaidActionAborted as aborted:
+                await interaction.response.send_message(str(aborted), ephemeral=True)
                 return
             
-            # Save reroll history
-            await connection.execute('''
-                INSERT INTO maid_reroll_history_v2 
-                (user_id, maid_instance_id, old_buffs, new_buffs, stardust_cost, reroll_time)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (self.user_id, self.maid["instance_id"], json.dumps(old_buffs), 
-                  json.dumps(new_buffs), self.cost, datetime.now().isoformat()))
-            
-            # 🛡️ COMMIT: All operations successful
-            await connection.commit()
+            await maid_buff_cache.refresh_user(self.user_id)
             
             template = get_maid_template_safe(self.maid["maid_id"])
             if not template:
@@ -1699,11 +1627,7 @@ class RerollConfirmView(discord.ui.View):
             await interaction.response.edit_message(embed=embed, view=self)
             
         except Exception as e:
-            # 🛡️ ROLLBACK: Any error rolls back entire transaction
-            try:
-                await connection.execute('ROLLBACK')
-            except:
-                pass  # Connection might be closed
+            # 🛡️ ROLLBACK: db.transaction() đã rollback toàn bộ
             logger.error(f"Reroll failed for user {self.user_id}: {e}")
             await interaction.response.send_message(f"❌ Lỗi khi reroll maid: Operation đã được rollback. Stardust không bị trừ.", ephemeral=True)
     
@@ -2,61 +2,25 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
-import uuid
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, List, Any
 
 from database.database import Database
 from utils.embeds import EmbedBuilder
 from utils.registration import require_registration
 from utils.enhanced_logging import get_bot_logger
+from features.maid_buff_cache import maid_buff_cache
+from features.trade_sessions import TradeOffer, TradeSessionManager
+
+# SQLite cũ giới hạn 999 tham số mỗi câu lệnh
+OWNERSHIP_CHUNK = 500
 
 logger = get_bot_logger()
 
-class TradeOffer:
-    """Class để quản lý một giao dịch trade"""
-    def __init__(self, channel_id: int, user1_id: int, user2_id: int):
-        self.trade_id = str(uuid.uuid4())[:8]
-        self.channel_id = channel_id
-        self.user1_id = user1_id
-        self.user2_id = user2_id
-        self.created_at = datetime.now()
-        self.expires_at = datetime.now() + timedelta(minutes=10)
-        
-        # Trade offers từ mỗi user
-        self.user1_offer = {
-            "maids": [],
-            "money": 0,
-            "stardust": 0,
-            "confirmed": False
-        }
-        self.user2_offer = {
-            "maids": [],
-            "money": 0,
-            "stardust": 0,
-            "confirmed": False
-        }
-        
-    def get_user_offer(self, user_id: int):
-        """Lấy offer của user"""
-        if user_id == self.user1_id:
-            return self.user1_offer
-        elif user_id == self.user2_id:
-            return self.user2_offer
-        return None
-    
-    def is_participant(self, user_id: int) -> bool:
-        """Kiểm tra user có phải participant không"""
-        return user_id in [self.user1_id, self.user2_id]
-    
-    def is_expired(self) -> bool:
-        """Kiểm tra trade đã hết hạn chưa"""
-        return datetime.now() > self.expires_at
-    
-    def both_confirmed(self) -> bool:
-        """Kiểm tra cả 2 user đã confirm chưa"""
-        return self.user1_offer["confirmed"] and self.user2_offer["confirmed"]
+class TradeAborted(Exception):
+    """Hủy trade giữa transaction (rollback) với thông báo cho user"""
+
 
 class TradeConfirmationView(discord.ui.View):
     def __init__(self, requester_id: int, target_id: int, trading_cog):
@@ -135,7 +99,7 @@ class MaidTrading(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
-        self.active_trades: Dict[int, TradeOffer] = {}  # channel_id -> TradeOffer
+        self.sessions = TradeSessionManager()  # channel_id -> TradeOffer (+ heap hết hạn, lưu DB)
         
     async def cog_load(self):
         """Khởi tạo khi load cog"""
@@ -149,25 +113,28 @@ class MaidTrading(commands.Cog):
                 logger.warning("Database not available, skipping table creation")
                 return
             
-            connection = await self.bot.db.get_connection()
+            async with self.bot.db.transaction() as connection:
+                # Trade history table
+                await connection.execute('''
+                    CREATE TABLE IF NOT EXISTS trade_history (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        trade_id TEXT NOT NULL,
+                        user1_id INTEGER NOT NULL,
+                        user2_id INTEGER NOT NULL,
+                        user1_offer TEXT NOT NULL,
+                        user2_offer TEXT NOT NULL,
+                        completed_at TEXT NOT NULL,
+                        channel_id INTEGER NOT NULL
+                    )
+                ''')
             
-            # Trade history table
-            await connection.execute('''
-                CREATE TABLE IF NOT EXISTS trade_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    trade_id TEXT NOT NULL,
-                    user1_id INTEGER NOT NULL,
-                    user2_id INTEGER NOT NULL,
-                    user1_offer TEXT NOT NULL,
-                    user2_offer TEXT NOT NULL,
-                    completed_at TEXT NOT NULL,
-                    channel_id INTEGER NOT NULL
-                )
-            ''')
-            
-            await connection.commit()
             logger.info("✅ Trade tables created successfully")
             
+            # Nạp lại trade đang dở từ lần chạy trước
+            restored = await self.sessions.attach(self.bot.db)
+            if restored:
+                logger.info(f"🔄 Restored {restored} active trade session(s)")
+            
         except Exception as e:
             logger.error(f"Error creating trade tables: {e}")
     
@@ -226,15 +193,9 @@ class MaidTrading(commands.Cog):
             logger.error(f"Error getting user stats: {e}")
             return {"money": 0, "stardust": 0}
     
-    def cleanup_expired_trades(self):
+    async def cleanup_expired_trades(self):
         """Dọn dẹp các trade đã hết hạn"""
-        expired_channels = []
-        for channel_id, trade in self.active_trades.items():
-            if trade.is_expired():
-                expired_channels.append(channel_id)
-        
-        for channel_id in expired_channels:
-            del self.active_trades[channel_id]
+        await self.sessions.cleanup_expired()
     
     @commands.hybrid_group(name="trade", description="🔄 Hệ thống trade maid", invoke_without_command=True)
     async def trade_group(self, ctx, user: Optional[discord.Member] = None):
@@ -269,7 +230,7 @@ class MaidTrading(commands.Cog):
     async def trade_start(self, ctx, user: discord.Member):
         """Bắt đầu một giao dịch trade"""
         await self.ensure_tables_ready()
-        self.cleanup_expired_trades()
+        await self.cleanup_expired_trades()
         
         # Kiểm tra không trade với chính mình
         if user.id == ctx.author.id:
@@ -284,7 +245,7 @@ class MaidTrading(commands.Cog):
             return
         
         # Kiểm tra channel đã có trade chưa
-        if ctx.channel.id in self.active_trades:
+        if ctx.channel.id in self.sessions:
             embed = EmbedBuilder.create_error_embed("❌ Kênh này đang có giao dịch trade khác! Hãy đợi hoặc chuyển sang kênh khác.")
             await ctx.send(embed=embed)
             return
@@ -311,17 +272,17 @@ class MaidTrading(commands.Cog):
     async def create_trade_room(self, interaction: discord.Interaction, user1_id: int, user2_id: int):
         """Tạo phòng trade sau khi đối phương đồng ý"""
         await self.ensure_tables_ready()
-        self.cleanup_expired_trades()
+        await self.cleanup_expired_trades()
         
         # Kiểm tra channel đã có trade chưa (double check)
-        if interaction.channel.id in self.active_trades:
+        if interaction.channel.id in self.sessions:
             embed = EmbedBuilder.create_error_embed("❌ Kênh này đang có giao dịch trade khác!")
             await interaction.followup.send(embed=embed)
             return
         
         # Tạo trade mới
         trade = TradeOffer(interaction.channel.id, user1_id, user2_id)
-        self.active_trades[interaction.channel.id] = trade
+        await self.sessions.add(trade)
         
         # Lấy thông tin users
         user1 = self.bot.get_user(user1_id)
@@ -386,11 +347,11 @@ class MaidTrading(commands.Cog):
         """Timeout chờ người thứ 2 confirm sau khi người đầu tiên đã confirm"""
         await asyncio.sleep(60)  # 1 phút
         
-        if ctx.channel.id in self.active_trades:
-            trade = self.active_trades[ctx.channel.id]
+        trade = self.sessions.get(ctx.channel.id)
+        if trade is not None:
             if trade.trade_id == trade_id and not trade.both_confirmed():
                 # Có đúng 1 người confirm và timeout
-                del self.active_trades[ctx.channel.id]
+                await self.sessions.remove(ctx.channel.id)
                 embed = EmbedBuilder.create_error_embed(f"⏰ Trade `{trade.trade_id}` đã hết thời gian chờ xác nhận và bị hủy!")
                 try:
                     await ctx.send(embed=embed)
@@ -418,13 +379,12 @@ class MaidTrading(commands.Cog):
             return
         
         # Kiểm tra có trade trong channel không
-        if ctx.channel.id not in self.active_trades:
+        trade = self.sessions.get(ctx.channel.id)
+        if trade is None:
             embed = EmbedBuilder.create_error_embed("❌ Không có giao dịch trade nào trong kênh này!")
             await ctx.send(embed=embed)
             return
         
-        trade = self.active_trades[ctx.channel.id]
-        
         # Kiểm tra user có phải participant không
         if not trade.is_participant(ctx.author.id):
             embed = EmbedBuilder.create_error_embed("❌ Bạn không phải là người tham gia trade này!")
@@ -433,7 +393,7 @@ class MaidTrading(commands.Cog):
         
         # Kiểm tra trade đã hết hạn chưa
         if trade.is_expired():
-            del self.active_trades[ctx.channel.id]
+            await self.sessions.remove(ctx.channel.id)
             embed = EmbedBuilder.create_error_embed("⏰ Trade đã hết hạn!")
             await ctx.send(embed=embed)
             return
@@ -590,6 +550,7 @@ class MaidTrading(commands.Cog):
         user_offer['confirmed'] = False
         trade.user1_offer['confirmed'] = False
         trade.user2_offer['confirmed'] = False
+        await self.sessions.save(trade)
         
         await ctx.send(embed=embed)
         
@@ -712,20 +673,19 @@ class MaidTrading(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        if ctx.channel.id not in self.active_trades:
+        trade = self.sessions.get(ctx.channel.id)
+        if trade is None:
             embed = EmbedBuilder.create_error_embed("❌ Không có giao dịch trade nào trong kênh này!")
             await ctx.send(embed=embed)
             return
         
-        trade = self.active_trades[ctx.channel.id]
-        
         if not trade.is_participant(ctx.author.id):
             embed = EmbedBuilder.create_error_embed("❌ Bạn không phải là người tham gia trade này!")
             await ctx.send(embed=embed)
             return
         
         if trade.is_expired():
-            del self.active_trades[ctx.channel.id]
+            await self.sessions.remove(ctx.channel.id)
             embed = EmbedBuilder.create_error_embed("⏰ Trade đã hết hạn!")
             await ctx.send(embed=embed)
             return
@@ -736,6 +696,7 @@ class MaidTrading(commands.Cog):
         first_to_confirm = not (trade.user1_offer['confirmed'] or trade.user2_offer['confirmed'])
         
         user_offer['confirmed'] = True
+        await self.sessions.save(trade)
         
         if first_to_confirm:
             # Người đầu tiên confirm - bắt đầu timeout cho người còn lại
@@ -755,11 +716,34 @@ class MaidTrading(commands.Cog):
         else:
             await self.send_trade_status(ctx, trade)
     
+    async def _verify_maid_ownership(self, connection, trade: TradeOffer) -> Optional[tuple]:
+        """Kiểm tra quyền sở hữu mọi maid trong trade bằng SELECT ... IN (...)
+
+        Trả về (user_id, instance_id) của maid đầu tiên không hợp lệ, None nếu ổn.
+        """
+        expected_owner = {}
+        for owner_id, offer in ((trade.user1_id, trade.user1_offer), (trade.user2_id, trade.user2_offer)):
+            for maid in offer['maids']:
+                expected_owner[maid['instance_id']] = owner_id
+        
+        instance_ids = list(expected_owner)
+        actual_owner = {}
+        for start in range(0, len(instance_ids), OWNERSHIP_CHUNK):
+            chunk = instance_ids[start:start + OWNERSHIP_CHUNK]
+            cursor = await connection.execute(
+                f'SELECT instance_id, user_id FROM user_maids_v2 WHERE instance_id IN ({", ".join("?" * len(chunk))})',
+                chunk
+            )
+            actual_owner.update(await cursor.fetchall())
+        
+        for instance_id, owner_id in expected_owner.items():
+            if actual_owner.get(instance_id) != owner_id:
+                return owner_id, instance_id
+        return None
+    
     async def execute_trade(self, ctx, trade: TradeOffer):
         """Thực hiện trade"""
         try:
-            connection = await self.bot.db.get_connection()
-            
             # Validate lại tài sản trước khi trade
             user1_stats = await self.get_user_stats(trade.user1_id)
             user2_stats = await self.get_user_stats(trade.user2_id)
@@ -778,120 +762,89 @@ class MaidTrading(commands.Cog):
                 await ctx.send(embed=embed)
                 return
             
-            # 🛡️ SAFETY: Begin atomic transaction  
-            await connection.execute('BEGIN TRANSACTION')
-            
-            # 🔐 VALIDATION: Verify maid ownership before transfer
-            for maid in trade.user1_offer['maids']:
-                cursor = await connection.execute(
-                    'SELECT user_id FROM user_maids_v2 WHERE instance_id = ?', 
-                    (maid['instance_id'],)
-                )
-                row = await cursor.fetchone()
-                if not row or row[0] != trade.user1_id:
-                    await connection.execute('ROLLBACK')
-                    logger.warning(f"🚨 SECURITY: User {trade.user1_id} tried to trade maid {maid['instance_id']} they don't own!")
-                    embed = EmbedBuilder.create_error_embed("❌ Phát hiện maid không thuộc sở hữu! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
+            money_transfers = [(payer_id, payee_id, amount) for payer_id, payee_id, amount in (
+                (trade.user1_id, trade.user2_id, trade.user1_offer['money']),
+                (trade.user2_id, trade.user1_id, trade.user2_offer['money'])) if amount > 0]
+            stardust_transfers = [(payer_id, payee_id, amount) for payer_id, payee_id, amount in (
+                (trade.user1_id, trade.user2_id, trade.user1_offer['stardust']),
+                (trade.user2_id, trade.user1_id, trade.user2_offer['stardust'])) if amount > 0]
+            maid_transfers = [(payee_id, maid['instance_id'], payer_id) for payer_id, payee_id, offer in (
+                (trade.user1_id, trade.user2_id, trade.user1_offer),
+                (trade.user2_id, trade.user1_id, trade.user2_offer)) for maid in offer['maids']]
+            
+            # 🛡️ SAFETY: Atomic transaction - lỗi ở bất kỳ bước nào đều rollback toàn bộ
+            abort_message = None
+            try:
+                async with self.bot.db.transaction() as connection:
+                    # 🔐 VALIDATION: Verify maid ownership before transfer (batched)
+                    invalid = await self._verify_maid_ownership(connection, trade)
+                    if invalid:
+                        logger.warning(f"🚨 SECURITY: User {invalid[0]} tried to trade maid {invalid[1]} they don't own!")
+                        raise TradeAborted("❌ Phát hiện maid không thuộc sở hữu! Trade bị hủy.")
                     
-            for maid in trade.user2_offer['maids']:
-                cursor = await connection.execute(
-                    'SELECT user_id FROM user_maids_v2 WHERE instance_id = ?', 
-                    (maid['instance_id'],)
-                )
-                row = await cursor.fetchone()
-                if not row or row[0] != trade.user2_id:
-                    await connection.execute('ROLLBACK')
-                    logger.warning(f"🚨 SECURITY: User {trade.user2_id} tried to trade maid {maid['instance_id']} they don't own!")
-                    embed = EmbedBuilder.create_error_embed("❌ Phát hiện maid không thuộc sở hữu! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
-            
-            # Transfer money (with validation)
-            if trade.user1_offer['money'] > 0:
-                cursor = await connection.execute('UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
-                                                (trade.user1_offer['money'], trade.user1_id, trade.user1_offer['money']))
-                if cursor.rowcount == 0:
-                    await connection.execute('ROLLBACK')
-                    embed = EmbedBuilder.create_error_embed("❌ User 1 không đủ tiền! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
-                await connection.execute('UPDATE users SET money = money + ? WHERE user_id = ?',
-                                       (trade.user1_offer['money'], trade.user2_id))
-            
-            if trade.user2_offer['money'] > 0:
-                cursor = await connection.execute('UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
-                                                (trade.user2_offer['money'], trade.user2_id, trade.user2_offer['money']))
-                if cursor.rowcount == 0:
-                    await connection.execute('ROLLBACK')
-                    embed = EmbedBuilder.create_error_embed("❌ User 2 không đủ tiền! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
-                await connection.execute('UPDATE users SET money = money + ? WHERE user_id = ?',
-                                       (trade.user2_offer['money'], trade.user1_id))
-            
-            # Transfer stardust (with validation)
-            if trade.user1_offer['stardust'] > 0:
-                cursor = await connection.execute('UPDATE user_stardust_v2 SET stardust_amount = stardust_amount - ? WHERE user_id = ? AND stardust_amount >= ?',
-                                                (trade.user1_offer['stardust'], trade.user1_id, trade.user1_offer['stardust']))
-                if cursor.rowcount == 0:
-                    await connection.execute('ROLLBACK')
-                    embed = EmbedBuilder.create_error_embed("❌ User 1 không đủ stardust! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
-                await connection.execute('''INSERT OR REPLACE INTO user_stardust_v2 
-                                           (user_id, stardust_amount, last_updated) 
-                                           VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)''',
-                                       (trade.user2_id, trade.user2_id, trade.user1_offer['stardust'], datetime.now().isoformat()))
-            
-            if trade.user2_offer['stardust'] > 0:
-                cursor = await connection.execute('UPDATE user_stardust_v2 SET stardust_amount = stardust_amount - ? WHERE user_id = ? AND stardust_amount >= ?',
-                                                (trade.user2_offer['stardust'], trade.user2_id, trade.user2_offer['stardust']))
-                if cursor.rowcount == 0:
-                    await connection.execute('ROLLBACK')
-                    embed = EmbedBuilder.create_error_embed("❌ User 2 không đủ stardust! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
-                await connection.execute('''INSERT OR REPLACE INTO user_stardust_v2 
-                                           (user_id, stardust_amount, last_updated) 
-                                           VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)''',
-                                       (trade.user1_id, trade.user1_id, trade.user2_offer['stardust'], datetime.now().isoformat()))
-            
-            # Transfer maids (validated ownership above)
-            for maid in trade.user1_offer['maids']:
-                cursor = await connection.execute('UPDATE user_maids_v2 SET user_id = ?, is_active = 0 WHERE instance_id = ? AND user_id = ?',
-                                                (trade.user2_id, maid['instance_id'], trade.user1_id))
-                if cursor.rowcount == 0:
-                    await connection.execute('ROLLBACK')
-                    logger.error(f"❌ Failed to transfer maid {maid['instance_id']} from user {trade.user1_id}")
-                    embed = EmbedBuilder.create_error_embed("❌ Lỗi transfer maid! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
-            
-            for maid in trade.user2_offer['maids']:
-                cursor = await connection.execute('UPDATE user_maids_v2 SET user_id = ?, is_active = 0 WHERE instance_id = ? AND user_id = ?',
-                                                (trade.user1_id, maid['instance_id'], trade.user2_id))
-                if cursor.rowcount == 0:
-                    await connection.execute('ROLLBACK')
-                    logger.error(f"❌ Failed to transfer maid {maid['instance_id']} from user {trade.user2_id}")
-                    embed = EmbedBuilder.create_error_embed("❌ Lỗi transfer maid! Trade bị hủy.")
-                    await ctx.send(embed=embed)
-                    return
+                    # Transfer money (with validation)
+                    for payer_id, payee_id, amount in money_transfers:
+                        cursor = await connection.execute('UPDATE users SET money = money - ? WHERE user_id = ? AND money >= ?',
+                                                        (amount, payer_id, amount))
+                        if cursor.rowcount == 0:
+                            label = "User 1" if payer_id == trade.user1_id else "User 2"
+                            raise TradeAborted(f"❌ {label} không đủ tiền! Trade bị hủy.")
+                        await connection.execute('UPDATE users SET money = money + ? WHERE user_id = ?',
+                                               (amount, payee_id))
+                    
+                    # Transfer stardust (with validation)
+                    for payer_id, payee_id, amount in stardust_transfers:
+                        cursor = await connection.execute('UPDATE user_stardust_v2 SET stardust_amount = stardust_amount - ? WHERE user_id = ? AND stardust_amount >= ?',
+                                                        (amount, payer_id, amount))
+                        if cursor.rowcount == 0:
+                            label = "User 1" if payer_id == trade.user1_id else "User 2"
+                            raise TradeAborted(f"❌ {label} không đủ stardust! Trade bị hủy.")
+                        await connection.execute('''INSERT OR REPLACE INTO user_stardust_v2 
+                                                   (user_id, stardust_amount, last_updated) 
+                                                   VALUES (?, COALESCE((SELECT stardust_amount FROM user_stardust_v2 WHERE user_id = ?), 0) + ?, ?)''',
+                                               (payee_id, payee_id, amount, datetime.now().isoformat()))
+                    
+                    # Transfer maids (validated ownership above) - một executemany cho cả 2 bên
+                    if maid_transfers:
+                        cursor = await connection.executemany(
+                            'UPDATE user_maids_v2 SET user_id = ?, is_active = 0 WHERE instance_id = ? AND user_id = ?',
+                            maid_transfers
+                        )
+                        if cursor.rowcount != len(maid_transfers):
+                            logger.error(f"❌ Failed to transfer maids for trade {trade.trade_id} "
+                                         f"({cursor.rowcount}/{len(maid_transfers)} updated)")
+                            raise TradeAborted("❌ Lỗi transfer maid! Trade bị hủy.")
+                    
+                    # Save trade history
+                    await connection.execute('''INSERT INTO trade_history 
+                                               (trade_id, user1_id, user2_id, user1_offer, user2_offer, completed_at, channel_id)
+                                               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                                            (trade.trade_id, trade.user1_id, trade.user2_id,
+                                             json.dumps(trade.user1_offer, default=str),
+                                             json.dumps(trade.user2_offer, default=str),
+                                             datetime.now().isoformat(), trade.channel_id))
+                    
+                    for payer_id, payee_id, amount in money_transfers:
+                        await self.bot.db.append_money_ledger(connection, payer_id, -amount, 'trade')
+                        await self.bot.db.append_money_ledger(connection, payee_id, amount, 'trade')
+                    
+                    # Đóng phiên trade cùng transaction (restart không nạp lại trade đã xong)
+                    await self.sessions.remove(ctx.channel.id, connection)
+            except TradeAborted as aborted:
+                abort_message = str(aborted)
             
-            # Save trade history
-            await connection.execute('''INSERT INTO trade_history 
-                                       (trade_id, user1_id, user2_id, user1_offer, user2_offer, completed_at, channel_id)
-                                       VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                                    (trade.trade_id, trade.user1_id, trade.user2_id,
-                                     json.dumps(trade.user1_offer, default=str),
-                                     json.dumps(trade.user2_offer, default=str),
-                                     datetime.now().isoformat(), trade.channel_id))
+            if abort_message:
+                embed = EmbedBuilder.create_error_embed(abort_message)
+                await ctx.send(embed=embed)
+                return
             
-            await connection.commit()
+            self.bot.db.invalidate_users([trade.user1_id, trade.user2_id])
+            for payer_id, payee_id, amount in money_transfers:
+                self.bot.db.record_money_delta(payer_id, -amount, 'trade')
+                self.bot.db.record_money_delta(payee_id, amount, 'trade')
             
-            # Xóa trade khỏi memory
-            del self.active_trades[ctx.channel.id]
+            # Maid active có thể đã đổi chủ -> refresh buff cache của cả 2 user
+            await maid_buff_cache.refresh_users([trade.user1_id, trade.user2_id])
             
             # Thông báo thành công
             user1 = self.bot.get_user(trade.user1_id)
@@ -948,47 +901,45 @@ class MaidTrading(commands.Cog):
             await ctx.send(embed=embed)
             
         except Exception as e:
+            # Transaction đã tự rollback khi có lỗi
             logger.error(f"Error executing trade: {e}")
-            # 🛡️ SAFETY: Always rollback on any error
-            try:
-                await connection.execute('ROLLBACK')
-            except:
-                pass  # Connection might be closed
             embed = EmbedBuilder.create_error_embed(f"❌ Có lỗi xảy ra khi thực hiện trade! Trade đã được rollback.")
             await ctx.send(embed=embed)
             
-            # Cleanup trade from memory on error
-            if ctx.channel.id in self.active_trades:
-                del self.active_trades[ctx.channel.id]
+            # Cleanup trade on error
+            if ctx.channel.id in self.sessions:
+                await self.sessions.remove(ctx.channel.id)
     
     @trade_group.command(name="cancel", description="❌ Hủy trade hiện tại")
     async def trade_cancel(self, ctx):
         """Hủy trade"""
-        if ctx.channel.id not in self.active_trades:
+        await self.ensure_tables_ready()
+        
+        trade = self.sessions.get(ctx.channel.id)
+        if trade is None:
             embed = EmbedBuilder.create_error_embed("❌ Không có giao dịch trade nào trong kênh này!")
             await ctx.send(embed=embed)
             return
         
-        trade = self.active_trades[ctx.channel.id]
-        
         if not trade.is_participant(ctx.author.id):
             embed = EmbedBuilder.create_error_embed("❌ Bạn không phải là người tham gia trade này!")
             await ctx.send(embed=embed)
             return
         
-        del self.active_trades[ctx.channel.id]
+        await self.sessions.remove(ctx.channel.id)
         embed = EmbedBuilder.create_success_embed("Thành công", f"❌ **{ctx.author.display_name}** đã hủy trade `{trade.trade_id}`!")
         await ctx.send(embed=embed)
     
     @trade_group.command(name="status", description="📋 Xem trạng thái trade hiện tại")
     async def trade_status(self, ctx):
         """Xem trạng thái trade hiện tại"""
-        if ctx.channel.id not in self.active_trades:
+        await self.ensure_tables_ready()
+        
+        trade = self.sessions.get(ctx.channel.id)
+        if trade is None:
             embed = EmbedBuilder.create_error_embed("❌ Không có giao dịch trade nào trong kênh này!")
             await ctx.send(embed=embed)
             return
-        
-        trade = self.active_trades[ctx.channel.id]
         await self.send_trade_status(ctx, trade)
 
 async def setup(bot):
@@ -7,6 +7,7 @@ import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
 import asyncio
+import time
 from typing import Optional, List, Dict, Any
 
 import config
@@ -19,6 +20,7 @@ from utils.livestock_helpers import (
     get_available_species_for_purchase, format_livestock_value,
     calculate_livestock_value, get_weather_modifier
 )
+from utils.world_modifiers import world_modifiers
 # Remove direct imports to avoid circular imports
 
 class PondCog(commands.Cog):
@@ -87,33 +89,11 @@ class PondCog(commands.Cog):
             # Get fish in pond
             fish_list = await self.db.get_user_livestock(user_id, 'pond')
             
-            # Get current weather modifier
-            weather_modifier = 1.0
-            current_weather = "sunny"
-            try:
-                weather_cog = self.bot.get_cog('WeatherCog')
-                if weather_cog and hasattr(weather_cog, 'current_weather'):
-                    current_weather_data = weather_cog.current_weather
-                    # Extract weather type from dict or use as string
-                    if isinstance(current_weather_data, dict):
-                        current_weather = current_weather_data.get('type', 'sunny')
-                    else:
-                        current_weather = current_weather_data
-                    # Get weather modifier
-                    from utils.livestock_helpers import get_livestock_weather_modifier
-                    weather_modifier = get_livestock_weather_modifier(current_weather, 'fish')
-            except Exception as e:
-                print(f"Weather error: {e}")
-                pass
-            
-            # Get event modifier
-            event_modifier = 1.0
-            try:
-                events_cog = self.bot.get_cog('EventsCog')
-                if events_cog and hasattr(events_cog, 'get_current_growth_modifier'):
-                    event_modifier = events_cog.get_current_growth_modifier()
-            except:
-                pass
+            # Get current weather / event modifier
+            world = world_modifiers.current()
+            current_weather = world.weather_type
+            weather_modifier = get_livestock_weather_modifier(current_weather, 'fish')
+            event_modifier = world.event_growth
             
             total_modifier = weather_modifier * event_modifier
             
@@ -308,7 +288,13 @@ class PondCog(commands.Cog):
             
             if purchased_slots:
                 # Deduct money
-                await self.db.update_user_money(user_id, -total_cost)
+                await self.db.update_user_money(user_id, -total_cost, source='pond')
+
+                # ⏰ Lên lịch thông báo trưởng thành (nếu user bật f!notify)
+                from features.ready_notifier import ready_scheduler
+                ready_ts = ready_scheduler.get_livestock_ready_ts('pond', species_id, time.time())
+                if ready_ts is not None:
+                    ready_scheduler.schedule(user_id, 'pond', ready_ts, len(purchased_slots))
                 
                 # Create success embed
                 embed = EmbedBuilder.create_success_embed(
@@ -345,13 +331,7 @@ class PondCog(commands.Cog):
             
             # Get weather and event modifiers
             weather_modifier = get_weather_modifier(self.bot, 'fish')
-            event_modifier = 1.0
-            try:
-                events_cog = self.bot.get_cog('EventsCog')
-                if events_cog and hasattr(events_cog, 'get_current_growth_modifier'):
-                    event_modifier = events_cog.get_current_growth_modifier()
-            except:
-                pass
+            event_modifier = world_modifiers.current().event_growth
             
             total_modifier = weather_modifier * event_modifier
             
@@ -384,7 +364,7 @@ class PondCog(commands.Cog):
                     await self.db.remove_livestock(fish.livestock_id)
                 
                 # Add money to user
-                await self.db.update_user_money(user_id, total_value)
+                await self.db.update_user_money(user_id, total_value, source='pond')
                 
                 # Create success embed
                 embed = EmbedBuilder.create_success_embed(
@@ -441,7 +421,7 @@ class PondCog(commands.Cog):
             
             # Remove fish and add money
             await self.db.remove_livestock(target_fish.livestock_id)
-            await self.db.update_user_money(user_id, fish_value)
+            await self.db.update_user_money(user_id, fish_value, source='pond')
             
             # Create success embed
             embed = EmbedBuilder.create_success_embed(
@@ -496,7 +476,7 @@ class PondCog(commands.Cog):
             await self.db.update_user_facilities(facilities)
             
             # Deduct money
-            await self.db.update_user_money(user_id, -upgrade_cost)
+            await self.db.update_user_money(user_id, -upgrade_cost, source='pond')
             
             # Create success embed
             embed = EmbedBuilder.create_success_embed(
@@ -0,0 +1,346 @@
+"""
+Ready Notifier - Thông báo khi cây trồng / cá / gia súc sẵn sàng thu hoạch
+Các mốc "sẵn sàng" được giữ trong một min-heap, load từ DB khi khởi động và
+cập nhật khi trồng cây / mua cá / mua gia súc. Thông báo được gom theo user
+(cửa sổ gom + rate limit) và gom theo channel, để người chơi không phải spam
+f!farm / f!pond để kiểm tra.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import discord
+from discord.ext import commands
+
+import config
+from utils.crop_readiness import crop_readiness
+from utils.world_modifiers import world_modifiers
+from utils.embeds import EmbedBuilder
+from utils.enhanced_logging import get_bot_logger, log_error
+from utils.livestock_helpers import get_livestock_weather_modifier, livestock_required_seconds
+from utils.registration import registration_required
+
+logger = get_bot_logger()
+
+# Chờ thêm một chút sau mốc sẵn sàng đầu tiên để gom các mốc gần nhau
+COALESCE_WINDOW_SECONDS = 60
+# Tối đa một thông báo mỗi user trong khoảng này
+USER_RATE_LIMIT_SECONDS = 600
+# Giới hạn độ dài tin nhắn Discord
+MAX_MESSAGE_LENGTH = 1900
+
+READY_KINDS = {
+    'crop': "🌾 {count} cây trồng đã chín",
+    'pond': "🐟 {count} con cá đã trưởng thành",
+    'barn': "🐄 {count} gia súc đã trưởng thành",
+}
+
+# facility -> (bảng species trong config, species_type cho weather modifier)
+LIVESTOCK_SPECIES = {
+    'pond': ('FISH_SPECIES', 'fish'),
+    'barn': ('ANIMAL_SPECIES', 'animal'),
+}
+
+
+class ReadyScheduler:
+    """Min-heap các mốc sẵn sàng + gom thông báo theo user"""
+
+    def __init__(self):
+        self.bot = None
+        self._heap: List[Tuple[float, int, int, str, int, int]] = []
+        self._seq = itertools.count()
+        self._subscribers: Dict[int, Tuple[str, Optional[int]]] = {}
+        # Generation mỗi user: reload_users() làm các entry cũ trong heap hết hiệu lực
+        self._generation: Dict[int, int] = {}
+        self._pending: Dict[int, Counter] = {}
+        self._send_at: Dict[int, float] = {}
+        self._last_sent: Dict[int, float] = {}
+        # Tạo trong start(): singleton dựng lúc import, Event phải gắn với loop của bot
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- Subscribers ----------
+
+    def is_subscribed(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    async def subscribe(self, user_id: int, mode: str, channel_id: Optional[int] = None):
+        """Bật thông báo cho user và nạp các mốc sắp tới của user"""
+        self._subscribers[user_id] = (mode, channel_id)
+        await self.reload_users([user_id])
+
+    def unsubscribe(self, user_id: int):
+        """Tắt thông báo - entry còn lại trong heap bị bỏ qua khi tới hạn"""
+        self._subscribers.pop(user_id, None)
+        self._generation[user_id] = self._generation.get(user_id, 0) + 1
+        self._pending.pop(user_id, None)
+        self._send_at.pop(user_id, None)
+
+    # ---------- Heap ----------
+
+    def schedule(self, user_id: int, kind: str, ready_ts: float, count: int = 1):
+        """Thêm một mốc sẵn sàng (gọi khi trồng cây / mua cá / mua gia súc)"""
+        if user_id not in self._subscribers or kind not in READY_KINDS:
+            return
+
+        generation = self._generation.get(user_id, 0)
+        heapq.heappush(self._heap, (ready_ts, next(self._seq), user_id, kind, count, generation))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def load(self, bot):
+        """Load subscribers + các mốc sắp tới từ DB (khi khởi động)"""
+        self.bot = bot
+        rows = await bot.db.get_ready_notification_subscribers()
+        self._subscribers = {user_id: (mode, channel_id) for user_id, mode, channel_id in rows}
+        await self.reload_users(None)
+        logger.info(f"✅ Ready notifier loaded ({len(self._subscribers)} subscribers, {len(self._heap)} events)")
+
+    async def reload_users(self, user_ids: Optional[Iterable[int]] = None):
+        """Nạp lại mốc sẵn sàng từ DB (sau khi ready_at được tính lại)"""
+        if self.bot is None:
+            return
+
+        if user_ids is None:
+            user_ids = list(self._subscribers)
+            self._heap = []
+            self._generation = {}
+        else:
+            user_ids = [user_id for user_id in user_ids if user_id in self._subscribers]
+        if not user_ids:
+            return
+
+        for user_id in user_ids:
+            self._generation[user_id] = self._generation.get(user_id, 0) + 1
+
+        db = self.bot.db
+        now = time.time()
+
+        for user_id, ready_at, count in await db.get_upcoming_crop_ready_times(user_ids, int(now)):
+            self.schedule(user_id, 'crop', ready_at, count)
+
+        # Mốc của cá / gia súc tính theo thời tiết + sự kiện hiện tại; đổi thời tiết /
+        # sự kiện -> crop_readiness.schedule_refresh() -> on_ready_at_changed nạp lại
+        for livestock in await db.get_livestock_for_users(user_ids):
+            ready_ts = self.get_livestock_ready_ts(livestock.facility_type, livestock.species_id,
+                                                   livestock.birth_time.timestamp())
+            if ready_ts is not None and ready_ts > now:
+                self.schedule(livestock.user_id, livestock.facility_type, ready_ts)
+
+    def get_livestock_ready_ts(self, facility_type: str, species_id: str,
+                               birth_ts: float) -> Optional[float]:
+        """Epoch khi cá / gia súc trưởng thành (cùng công thức với f!pond / f!barn)"""
+        table_name, species_type = LIVESTOCK_SPECIES.get(facility_type, ('', ''))
+        if species_id not in getattr(config, table_name, {}):
+            return None
+        world = world_modifiers.current()
+        weather_modifier = get_livestock_weather_modifier(world.weather_type, species_type)
+        return birth_ts + livestock_required_seconds(species_id, weather_modifier, world.event_growth)
+
+    # ---------- Dispatch loop ----------
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def _collect_due(self, now: float):
+        """Chuyển các mốc đã tới hạn vào hàng chờ của từng user"""
+        while self._heap and self._heap[0][0] <= now:
+            ready_ts, _, user_id, kind, count, generation = heapq.heappop(self._heap)
+            if user_id not in self._subscribers or generation != self._generation.get(user_id, 0):
+                continue  # Entry cũ / user đã tắt thông báo
+
+            pending = self._pending.setdefault(user_id, Counter())
+            pending[kind] += count
+            if user_id not in self._send_at:
+                earliest = self._last_sent.get(user_id, 0) + USER_RATE_LIMIT_SECONDS
+                self._send_at[user_id] = max(ready_ts + COALESCE_WINDOW_SECONDS, earliest)
+
+    def _next_wakeup(self) -> Optional[float]:
+        candidates = list(self._send_at.values())
+        if self._heap:
+            candidates.append(self._heap[0][0])
+        return min(candidates) if candidates else None
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                self._wakeup.clear()
+                now = time.time()
+                self._collect_due(now)
+
+                due_users = [user_id for user_id, send_at in self._send_at.items() if send_at <= now]
+                if due_users:
+                    await self._dispatch(due_users, now)
+
+                next_at = self._next_wakeup()
+                timeout = None if next_at is None else max(0.0, next_at - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_error(logger, "❌ Ready notifier loop error", e)
+                await asyncio.sleep(5)
+
+    async def _dispatch(self, user_ids: List[int], now: float):
+        """Gửi thông báo đã gom cho các user tới hạn"""
+        batches: Dict[int, Counter] = {}
+        for user_id in user_ids:
+            self._send_at.pop(user_id, None)
+            pending = self._pending.pop(user_id, None)
+            if pending and user_id in self._subscribers:
+                batches[user_id] = pending
+
+        # Cây có thể đã được thu hoạch trong cửa sổ gom - đếm lại từ DB
+        crop_users = [user_id for user_id, pending in batches.items() if pending.get('crop')]
+        if crop_users:
+            ready_counts = await self.bot.db.count_ready_crops_by_user(crop_users, int(now))
+            for user_id in crop_users:
+                batches[user_id]['crop'] = ready_counts.get(user_id, 0)
+
+        channel_lines: Dict[int, List[str]] = {}
+        for user_id, pending in batches.items():
+            parts = [READY_KINDS[kind].format(count=count) for kind, count in pending.items() if count > 0]
+            if not parts:
+                continue
+
+            self._last_sent[user_id] = now
+            mode, channel_id = self._subscribers[user_id]
+            if mode == 'channel' and channel_id:
+                channel_lines.setdefault(channel_id, []).append(f"<@{user_id}>: " + " • ".join(parts))
+            else:
+                await self._send_dm(user_id, parts)
+
+        for channel_id, lines in channel_lines.items():
+            await self._send_channel(channel_id, lines)
+
+    async def _send_dm(self, user_id: int, parts: List[str]):
+        try:
+            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+            embed = EmbedBuilder.create_base_embed(
+                "⏰ Sẵn sàng thu hoạch!",
+                "\n".join(parts) + "\n\nDùng `f!harvest all`, `f!pond harvest` hoặc `f!barn harvest` để thu hoạch.",
+                color=0x2ecc71
+            )
+            await user.send(embed=embed)
+        except (discord.Forbidden, discord.NotFound):
+            # User chặn DM - tắt luôn để khỏi thử lại mãi
+            logger.info(f"Ready notifier: cannot DM user {user_id}, disabling")
+            self.unsubscribe(user_id)
+            await self.bot.db.disable_ready_notification(user_id)
+        except Exception as e:
+            log_error(logger, f"❌ Ready notifier DM error for {user_id}", e)
+
+    async def _send_channel(self, channel_id: int, lines: List[str]):
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            return
+
+        # Một tin nhắn cho nhiều user cùng channel
+        chunk = "⏰ **Sẵn sàng thu hoạch!**"
+        try:
+            for line in lines:
+                if len(chunk) + len(line) + 1 > MAX_MESSAGE_LENGTH:
+                    await channel.send(chunk)
+                    chunk = ""
+                chunk = f"{chunk}\n{line}" if chunk else line
+            if chunk:
+                await channel.send(chunk)
+        except Exception as e:
+            log_error(logger, f"❌ Ready notifier channel error ({channel_id})", e)
+
+    async def on_ready_at_changed(self, user_ids: Optional[Set[int]]):
+        """Listener của crop_readiness: ready_at / thời tiết / sự kiện đổi -> nạp lại heap"""
+        await self.reload_users(user_ids)
+
+
+# Global instance để farm / pond / barn đẩy mốc mới vào
+ready_scheduler = ReadyScheduler()
+
+
+class ReadyNotifierCog(commands.Cog):
+    """Thông báo khi nông trại / ao / chuồng sẵn sàng thu hoạch"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        try:
+            await ready_scheduler.load(self.bot)
+            crop_readiness.add_listener(ready_scheduler.on_ready_at_changed)
+            ready_scheduler.start()
+        except Exception as e:
+            log_error(logger, "❌ Error starting ready notifier", e)
+
+    def cog_unload(self):
+        crop_readiness.remove_listener(ready_scheduler.on_ready_at_changed)
+        ready_scheduler.stop()
+
+    @commands.group(name='notify', aliases=['thongbao'], invoke_without_command=True)
+    @registration_required
+    async def notify(self, ctx):
+        """⏰ Thông báo khi cây / cá / gia súc sẵn sàng thu hoạch
+
+        Sử dụng:
+        • f!notify dm - Nhận thông báo qua tin nhắn riêng
+        • f!notify here - Nhận thông báo ở kênh hiện tại
+        • f!notify off - Tắt thông báo
+        """
+        settings = await self.bot.db.get_ready_notification(ctx.author.id)
+        if settings and settings['enabled']:
+            where = "tin nhắn riêng" if settings['mode'] == 'dm' else f"<#{settings['channel_id']}>"
+            status = f"✅ Đang bật - gửi qua {where}"
+        else:
+            status = "❌ Đang tắt"
+
+        embed = EmbedBuilder.create_base_embed(
+            "⏰ Thông báo thu hoạch",
+            f"**Trạng thái:** {status}\n\n"
+            "• `f!notify dm` - Nhận qua tin nhắn riêng\n"
+            "• `f!notify here` - Nhận ở kênh này\n"
+            "• `f!notify off` - Tắt thông báo\n\n"
+            f"Thông báo được gom lại, tối đa 1 lần mỗi {USER_RATE_LIMIT_SECONDS // 60} phút.",
+            color=0x3498db
+        )
+        await ctx.send(embed=embed)
+
+    @notify.command(name='dm')
+    @registration_required
+    async def notify_dm(self, ctx):
+        """Nhận thông báo thu hoạch qua tin nhắn riêng"""
+        await self.bot.db.set_ready_notification(ctx.author.id, 'dm')
+        await ready_scheduler.subscribe(ctx.author.id, 'dm')
+        await ctx.send("✅ Sẽ nhắn riêng cho bạn khi có cây / cá / gia súc sẵn sàng thu hoạch!")
+
+    @notify.command(name='here', aliases=['channel'])
+    @registration_required
+    async def notify_here(self, ctx):
+        """Nhận thông báo thu hoạch ở kênh hiện tại"""
+        await self.bot.db.set_ready_notification(ctx.author.id, 'channel', ctx.channel.id)
+        await ready_scheduler.subscribe(ctx.author.id, 'channel', ctx.channel.id)
+        await ctx.send(f"✅ Sẽ thông báo ở {ctx.channel.mention} khi có cây / cá / gia súc sẵn sàng thu hoạch!")
+
+    @notify.command(name='off')
+    @registration_required
+    async def notify_off(self, ctx):
+        """Tắt thông báo thu hoạch"""
+        await self.bot.db.disable_ready_notification(ctx.author.id)
+        ready_scheduler.unsubscribe(ctx.author.id)
+        await ctx.send("🔕 Đã tắt thông báo thu hoạch.")
+
+
+async def setup(bot):
+    await bot.add_cog(ReadyNotifierCog(bot))
@@ -3,6 +3,7 @@ from discord.ext import commands
 import config
 from utils.embeds import EmbedBuilder
 from utils.helpers import calculate_land_expansion_cost
+from utils.world_modifiers import world_modifiers
 from utils.registration import registration_required
 from features.maid_helper import maid_helper
 from features.maid_display_integration import add_maid_buffs_to_embed
@@ -23,19 +24,15 @@ class ShopView(discord.ui.View):
                 return
             
             # Get event modifier for seed costs
-            events_cog = self.bot.get_cog('EventsCog')
-            cost_modifier = 1.0
+            cost_modifier = world_modifiers.current().event_seed_cost
             event_note = ""
             
-            if events_cog and hasattr(events_cog, 'get_current_seed_cost_modifier'):
-                cost_modifier = events_cog.get_current_seed_cost_modifier()
-                
-                if cost_modifier < 1.0:
-                    discount_percent = (1.0 - cost_modifier) * 100
-                    event_note = f"🌟 **Giảm giá sự kiện: -{discount_percent:.0f}%**\n"
-                elif cost_modifier > 1.0:
-                    increase_percent = (cost_modifier - 1.0) * 100
-                    event_note = f"💸 **Tăng giá sự kiện: +{increase_percent:.0f}%**\n"
+            if cost_modifier < 1.0:
+                discount_percent = (1.0 - cost_modifier) * 100
+                event_note = f"🌟 **Giảm giá sự kiện: -{discount_percent:.0f}%**\n"
+            elif cost_modifier > 1.0:
+                increase_percent = (cost_modifier - 1.0) * 100
+                event_note = f"💸 **Tăng giá sự kiện: +{increase_percent:.0f}%**\n"
             
             # Create seeds shop embed
             embed_title = "🌱 Cửa hàng Hạt giống"
@@ -435,19 +432,15 @@ class ShopCog(commands.Cog):
             base_price = crop_config['price']
             
             # Apply event modifier to seed cost
-            events_cog = self.bot.get_cog('EventsCog')
-            cost_modifier = 1.0
+            cost_modifier = world_modifiers.current().event_seed_cost
             event_info = ""
             
-            if events_cog and hasattr(events_cog, 'get_current_seed_cost_modifier'):
-                cost_modifier = events_cog.get_current_seed_cost_modifier()
-                
-                if cost_modifier < 1.0:
-                    discount_percent = (1.0 - cost_modifier) * 100
-                    event_info = f"\n🌟 Giảm giá sự kiện: -{discount_percent:.0f}%"
-                elif cost_modifier > 1.0:
-                    increase_percent = (cost_modifier - 1.0) * 100
-                    event_info = f"\n💸 Tăng giá sự kiện: +{increase_percent:.0f}%"
+            if cost_modifier < 1.0:
+                discount_percent = (1.0 - cost_modifier) * 100
+                event_info = f"\n🌟 Giảm giá sự kiện: -{discount_percent:.0f}%"
+            elif cost_modifier > 1.0:
+                increase_percent = (cost_modifier - 1.0) * 100
+                event_info = f"\n💸 Tăng giá sự kiện: +{increase_percent:.0f}%"
             
             # Calculate final cost with modifier
             event_price_per_seed = int(base_price * cost_modifier)
@@ -462,7 +455,7 @@ class ShopCog(commands.Cog):
             
             # Deduct money
             user.money -= total_cost
-            await self.bot.db.update_user(user)
+            await self.bot.db.update_user(user, source='shop')
             
             # Add seeds to inventory
             await self.bot.db.add_item(user.user_id, 'seed', crop_type, quantity)
@@ -509,7 +502,7 @@ class ShopCog(commands.Cog):
         # Deduct money and add land slot
         user.money -= expansion_cost
         user.land_slots += 1
-        await self.bot.db.update_user(user)
+        await self.bot.db.update_user(user, source='land')
         
         embed = EmbedBuilder.create_success_embed(
             "Mở rộng đất thành công!",
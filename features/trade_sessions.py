@@ -0,0 +1,196 @@
+"""
+Trade Sessions - Quản lý các phiên trade maid đang mở (mỗi kênh một phiên)
+Hết hạn dùng min-heap (expires_at, channel_id, trade_id): dọn trade hết hạn
+chỉ pop các phần tử đã tới hạn - O(log n) mỗi trade thay vì quét toàn bộ.
+Entry trong heap bị xóa lười: trade đã hủy / hoàn thành / thay phiên mới
+thì entry cũ bị bỏ qua khi pop.
+
+Persistence (tùy chọn): attach(db) tạo bảng trade_sessions và nạp lại các
+trade chưa hết hạn, mọi thay đổi offer ghi xuống DB nên restart bot không
+làm mất trade đang dở.
+"""
+import heapq
+import itertools
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Thời gian sống của một phiên trade
+TRADE_DURATION = timedelta(minutes=10)
+
+
+def _empty_offer() -> Dict:
+    return {
+        "maids": [],
+        "money": 0,
+        "stardust": 0,
+        "confirmed": False
+    }
+
+
+class TradeOffer:
+    """Class để quản lý một giao dịch trade"""
+    def __init__(self, channel_id: int, user1_id: int, user2_id: int):
+        self.trade_id = str(uuid.uuid4())[:8]
+        self.channel_id = channel_id
+        self.user1_id = user1_id
+        self.user2_id = user2_id
+        self.created_at = datetime.now()
+        self.expires_at = self.created_at + TRADE_DURATION
+
+        # Trade offers từ mỗi user
+        self.user1_offer = _empty_offer()
+        self.user2_offer = _empty_offer()
+
+    def get_user_offer(self, user_id: int):
+        """Lấy offer của user"""
+        if user_id == self.user1_id:
+            return self.user1_offer
+        elif user_id == self.user2_id:
+            return self.user2_offer
+        return None
+
+    def is_participant(self, user_id: int) -> bool:
+        """Kiểm tra user có phải participant không"""
+        return user_id in [self.user1_id, self.user2_id]
+
+    def is_expired(self) -> bool:
+        """Kiểm tra trade đã hết hạn chưa"""
+        return datetime.now() > self.expires_at
+
+    def both_confirmed(self) -> bool:
+        """Kiểm tra cả 2 user đã confirm chưa"""
+        return self.user1_offer["confirmed"] and self.user2_offer["confirmed"]
+
+    def to_row(self) -> Tuple:
+        """Tham số cho trade_sessions"""
+        return (self.channel_id, self.trade_id, self.user1_id, self.user2_id,
+                self.created_at.isoformat(), self.expires_at.timestamp(),
+                json.dumps(self.user1_offer, default=str), json.dumps(self.user2_offer, default=str))
+
+    @classmethod
+    def from_row(cls, row) -> 'TradeOffer':
+        """Dựng lại trade từ một dòng trade_sessions"""
+        channel_id, trade_id, user1_id, user2_id, created_at, expires_at, user1_offer, user2_offer = row
+        trade = cls(channel_id, user1_id, user2_id)
+        trade.trade_id = trade_id
+        trade.created_at = datetime.fromisoformat(created_at)
+        trade.expires_at = datetime.fromtimestamp(expires_at)
+        trade.user1_offer = {**_empty_offer(), **json.loads(user1_offer)}
+        trade.user2_offer = {**_empty_offer(), **json.loads(user2_offer)}
+        return trade
+
+
+_SESSION_COLUMNS = 'channel_id, trade_id, user1_id, user2_id, created_at, expires_at, user1_offer, user2_offer'
+
+
+class TradeSessionManager:
+    """Trade đang mở theo channel_id + heap hết hạn + persistence tùy chọn"""
+
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        self._db = None
+        self._trades: Dict[int, TradeOffer] = {}
+        self._expiry_heap: List[Tuple[float, int, int, str]] = []   # (expires_at, seq, channel_id, trade_id)
+        self._sequence = itertools.count()
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._trades
+
+    def __len__(self):
+        return len(self._trades)
+
+    def get(self, channel_id: int) -> Optional[TradeOffer]:
+        """Trade của kênh (có thể đã hết hạn - caller kiểm tra is_expired)"""
+        return self._trades.get(channel_id)
+
+    async def attach(self, db) -> int:
+        """Tạo bảng trade_sessions + nạp lại trade chưa hết hạn, trả về số trade nạp lại"""
+        if not self.persist:
+            return 0
+
+        async with db.transaction() as connection:
+            await connection.execute('''
+                CREATE TABLE IF NOT EXISTS trade_sessions (
+                    channel_id INTEGER PRIMARY KEY,
+                    trade_id TEXT NOT NULL,
+                    user1_id INTEGER NOT NULL,
+                    user2_id INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    user1_offer TEXT NOT NULL,
+                    user2_offer TEXT NOT NULL
+                )
+            ''')
+            await connection.execute('DELETE FROM trade_sessions WHERE expires_at <= ?', (time.time(),))
+            cursor = await connection.execute(f'SELECT {_SESSION_COLUMNS} FROM trade_sessions')
+            rows = await cursor.fetchall()
+
+        self._db = db
+        restored = 0
+        for row in rows:
+            trade = TradeOffer.from_row(row)
+            # Phiên tạo trong lúc đang attach (trong RAM) mới hơn bản trên disk
+            if trade.channel_id not in self._trades:
+                self._track(trade)
+                restored += 1
+        return restored
+
+    def _track(self, trade: TradeOffer):
+        self._trades[trade.channel_id] = trade
+        heapq.heappush(self._expiry_heap, (
+            trade.expires_at.timestamp(), next(self._sequence), trade.channel_id, trade.trade_id
+        ))
+
+    async def add(self, trade: TradeOffer):
+        """Mở phiên trade mới cho kênh"""
+        self._track(trade)
+        await self.save(trade)
+
+    async def save(self, trade: TradeOffer):
+        """Ghi offer hiện tại của trade xuống DB (no-op nếu không persist)"""
+        if self._db is None or self._trades.get(trade.channel_id) is not trade:
+            return
+        async with self._db.transaction() as connection:
+            await connection.execute(
+                f'INSERT OR REPLACE INTO trade_sessions ({_SESSION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                trade.to_row()
+            )
+
+    async def remove(self, channel_id: int, connection=None) -> Optional[TradeOffer]:
+        """Đóng phiên trade của kênh
+
+        connection: transaction đang mở của caller (vd. execute_trade) để xóa
+        phiên cùng lúc với commit giao dịch.
+        """
+        trade = self._trades.pop(channel_id, None)
+        if self._db is not None:
+            if connection is not None:
+                await connection.execute('DELETE FROM trade_sessions WHERE channel_id = ?', (channel_id,))
+            else:
+                async with self._db.transaction() as own_connection:
+                    await own_connection.execute('DELETE FROM trade_sessions WHERE channel_id = ?', (channel_id,))
+        return trade
+
+    async def cleanup_expired(self) -> List[TradeOffer]:
+        """Đóng mọi trade đã hết hạn (chỉ pop phần đầu heap đã tới hạn)"""
+        now = time.time()
+        expired = []
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            _, _, channel_id, trade_id = heapq.heappop(heap)
+            trade = self._trades.get(channel_id)
+            # Entry cũ (trade đã đóng / kênh đã mở phiên khác) thì bỏ qua
+            if trade is not None and trade.trade_id == trade_id and trade.is_expired():
+                del self._trades[channel_id]
+                expired.append(trade)
+
+        if expired and self._db is not None:
+            async with self._db.transaction() as connection:
+                await connection.executemany(
+                    'DELETE FROM trade_sessions WHERE channel_id = ? AND trade_id = ?',
+                    [(trade.channel_id, trade.trade_id) for trade in expired]
+                )
+        return expired
@@ -227,8 +227,8 @@ class TransferCog(commands.Cog):
                 return
             
             # Execute transfer
-            sender_new_balance = await self.bot.db.update_user_money(ctx.author.id, -amount)
-            receiver_new_balance = await self.bot.db.update_user_money(target_user.id, amount)
+            sender_new_balance = await self.bot.db.update_user_money(ctx.author.id, -amount, source='transfer')
+            receiver_new_balance = await self.bot.db.update_user_money(target_user.id, amount, source='transfer')
             
             # Update tracking
             self.transfer_cooldowns[ctx.author.id] = datetime.now()
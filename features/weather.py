@@ -9,6 +9,8 @@ import logging
 import config
 from utils.embeds import EmbedBuilder
 from utils.state_manager import StateManager
+from utils.crop_readiness import crop_readiness
+from utils.world_modifiers import world_modifiers
 
 logger = logging.getLogger(__name__)
 
@@ -91,12 +93,17 @@ class WeatherCog(commands.Cog):
                         logger.warning(f"Error parsing next_weather_change: {e}")
                         self.next_weather_change = None
                         
+            world_modifiers.refresh()
             logger.info(f"✅ Loaded weather state: {self.current_weather}")
         except Exception as e:
             logger.error(f"❌ Error loading weather state: {e}", exc_info=True)
     
     async def _save_weather_state(self):
         """Save weather state to database"""
+        # Mọi thay đổi thời tiết đều đi qua đây -> tính lại world modifiers
+        # và ready_at của cây + mốc thông báo cá / gia súc (growth modifier đổi)
+        world_modifiers.refresh()
+        crop_readiness.schedule_refresh()
         try:
             if not self.state_manager:
                 return
@@ -0,0 +1,123 @@
+"""
+Crop Readiness - Quản lý cột ready_at (epoch) của bảng crops
+ready_at được tính khi trồng và tính lại khi thời tiết / sự kiện / maid buff
+thay đổi, để farm, harvest và thông báo chỉ cần query
+WHERE user_id = ? AND ready_at <= ? thay vì tính lại từng cây trong Python.
+"""
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, List, Optional, Set, Tuple
+
+from utils.enhanced_logging import get_bot_logger, log_error
+from utils.helpers import calculate_ready_at, get_final_growth_time
+from utils.world_modifiers import world_modifiers
+
+logger = get_bot_logger()
+
+# Gom nhiều thay đổi modifier liên tiếp thành một lần tính lại
+REFRESH_DEBOUNCE_SECONDS = 1.0
+
+
+class CropReadiness:
+    """Tính và cập nhật ready_at cho cây trồng"""
+
+    def __init__(self):
+        self.bot = None
+        self._pending_users: Set[int] = set()
+        self._pending_all = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Callback(user_ids | None) chạy sau mỗi lần ready_at được tính lại
+        self._listeners: List[Callable[[Optional[Set[int]]], Awaitable[None]]] = []
+
+    def init(self, bot):
+        """Gắn bot (cần để đọc DB)"""
+        self.bot = bot
+
+    def add_listener(self, callback: Callable[[Optional[Set[int]]], Awaitable[None]]):
+        """Đăng ký callback nhận thông báo khi ready_at thay đổi"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Hủy đăng ký callback"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    async def get_growth_modifiers(self) -> Tuple[float, float]:
+        """(weather growth modifier, event growth modifier) hiện tại"""
+        world = world_modifiers.current()
+        return world.weather_growth, world.event_growth
+
+    async def calculate_ready_at(self, user_id: int, crop_type: str, plant_time: datetime) -> int:
+        """ready_at cho cây vừa trồng với modifier hiện tại"""
+        weather_modifier, event_modifier = await self.get_growth_modifiers()
+        growth_time = get_final_growth_time(crop_type, weather_modifier, event_modifier, user_id)
+        return calculate_ready_at(plant_time, growth_time)
+
+    async def refresh(self, user_ids: Optional[Iterable[int]] = None) -> int:
+        """Tính lại ready_at (toàn server hoặc một số user)
+
+        Returns:
+            số nhóm (user_id, crop_type) đã cập nhật
+        """
+        if not self.bot or not getattr(self.bot, 'db', None):
+            return 0
+
+        db = self.bot.db
+        groups = await db.get_crop_growth_groups(None if user_ids is None else list(user_ids))
+        if not groups:
+            return 0
+
+        weather_modifier, event_modifier = await self.get_growth_modifiers()
+        growth_times = [
+            (user_id, crop_type, get_final_growth_time(crop_type, weather_modifier, event_modifier, user_id))
+            for user_id, crop_type in groups
+        ]
+        await db.update_crops_ready_at(growth_times)
+        return len(growth_times)
+
+    def schedule_refresh(self, user_ids: Optional[Iterable[int]] = None):
+        """Lên lịch tính lại ready_at (debounce, không block caller)"""
+        if user_ids is None:
+            self._pending_all = True
+        else:
+            self._pending_users.update(user_ids)
+
+        if self._refresh_task is None or self._refresh_task.done():
+            try:
+                self._refresh_task = asyncio.create_task(self._run_scheduled_refresh())
+            except RuntimeError:
+                # Không có event loop (script chạy ngoài bot)
+                pass
+
+    async def _run_scheduled_refresh(self):
+        """Chạy refresh đã lên lịch sau khoảng debounce"""
+        await asyncio.sleep(REFRESH_DEBOUNCE_SECONDS)
+
+        refresh_all, self._pending_all = self._pending_all, False
+        user_ids, self._pending_users = self._pending_users, set()
+
+        try:
+            if refresh_all:
+                count = await self.refresh()
+                logger.info(f"🌱 Recomputed ready_at for {count} crop groups")
+            elif user_ids:
+                await self.refresh(user_ids)
+            else:
+                return
+        except Exception as e:
+            log_error(logger, "❌ Error recomputing crop ready_at", e)
+            if not refresh_all:
+                return
+            # Refresh toàn server = thời tiết / sự kiện đổi: listener vẫn cần
+            # nạp lại mốc của cá / gia súc dù ready_at của cây chưa tính lại được
+
+        for callback in list(self._listeners):
+            try:
+                await callback(None if refresh_all else user_ids)
+            except Exception as e:
+                log_error(logger, "❌ Error in ready_at listener", e)
+
+
+# Global instance để dùng chung giữa các cogs
+crop_readiness = CropReadiness()
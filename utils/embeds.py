@@ -1,9 +1,12 @@
 import discord
+import time
 from datetime import datetime
 from typing import List, Optional
 import config
 from database.models import User, Crop
-from utils.helpers import is_crop_ready, get_crop_growth_progress, format_time_remaining
+from utils.helpers import (is_crop_ready, get_crop_growth_progress, format_time_remaining,
+                           get_ready_at_progress, format_seconds_remaining)
+from utils.world_modifiers import world_modifiers
 
 class EmbedBuilder:
     """Utility class for creating Discord embeds"""
@@ -138,30 +141,14 @@ class EmbedBuilder:
         event_info = ""
         
         if bot:
-            # Get weather modifier
-            weather_cog = bot.get_cog('WeatherCog')
-            if weather_cog:
-                try:
-                    _, weather_modifier = await weather_cog.get_current_weather_modifier()
-                except:
-                    pass
+            world = world_modifiers.current()
+            weather_modifier = world.weather_yield
+            event_growth_modifier = world.event_growth
+            event_yield_modifier = world.event_yield
             
-            # Get event modifiers
-            events_cog = bot.get_cog('EventsCog')
-            if events_cog:
-                try:
-                    if hasattr(events_cog, 'get_current_growth_modifier'):
-                        event_growth_modifier = events_cog.get_current_growth_modifier()
-                    if hasattr(events_cog, 'get_current_yield_modifier'):
-                        event_yield_modifier = events_cog.get_current_yield_modifier()
-                    
-                    # Get current event info for display
-                    if hasattr(events_cog, 'current_event') and events_cog.current_event:
-                        event_data = events_cog.current_event.get('data', {})
-                        event_name = event_data.get('name', 'Sự kiện đặc biệt')
-                        event_info = f"🎯 **{event_name}**\n"
-                except:
-                    pass
+            # Current event info for display
+            if world.event_name:
+                event_info = f"🎯 **{world.event_name}**\n"
         
         embed_title = f"🌾 Nông trại của {user.username}"
         embed_description = f"Trang {page + 1}/{total_pages} • Ô {start_plot + 1}-{end_plot}/{user.land_slots}"
@@ -175,6 +162,23 @@ class EmbedBuilder:
             color=0x2ecc71
         )
         
+        # ⚡ Trạng thái cây: dùng ready_at đã tính sẵn, chỉ tính lại khi cây chưa có ready_at
+        now = time.time()
+        crop_states = {}
+        for crop in crops:
+            if crop.ready_at is not None:
+                crop_states[crop.crop_id] = (
+                    crop.ready_at <= now,
+                    get_ready_at_progress(crop.plant_time, crop.ready_at, now),
+                    format_seconds_remaining(crop.ready_at - now)
+                )
+            else:
+                crop_states[crop.crop_id] = (
+                    is_crop_ready(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id),
+                    get_crop_growth_progress(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id),
+                    format_time_remaining(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id)
+                )
+        
         # Create farm grid visualization for current page
         page_plots = ["⬜"] * (end_plot - start_plot)
         
@@ -182,14 +186,13 @@ class EmbedBuilder:
         for crop in crops:
             if start_plot <= crop.plot_index < end_plot:
                 local_index = crop.plot_index - start_plot
+                ready, progress, _ = crop_states[crop.crop_id]
                 
-                # Use helper functions with modifiers
-                if is_crop_ready(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id):
+                if ready:
                     # Ready to harvest
                     page_plots[local_index] = "✨"
                 else:
-                    # Growing - use progress with modifiers
-                    progress = get_crop_growth_progress(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id)
+                    # Growing
                     if progress < 0.33:
                         page_plots[local_index] = "🌱"
                     elif progress < 0.66:
@@ -226,11 +229,11 @@ class EmbedBuilder:
                 crop_config = config.CROPS.get(crop.crop_type, {})
                 crop_name = crop_config.get('name', crop.crop_type)
                 
-                if is_crop_ready(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id):
+                ready, _, remaining = crop_states[crop.crop_id]
+                if ready:
                     status = "✅ Có thể thu hoạch"
                 else:
-                    # Use format_time_remaining with modifiers
-                    status = f"⏰ {format_time_remaining(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id)}"
+                    status = f"⏰ {remaining}"
                 
                 crop_status.append(f"Ô {crop.plot_index + 1}: {crop_name} - {status}")
             
@@ -242,7 +245,7 @@ class EmbedBuilder:
         
         # Summary info
         total_crops = len(crops)
-        ready_crops = sum(1 for crop in crops if is_crop_ready(crop.plant_time, crop.crop_type, weather_modifier, event_growth_modifier, user.user_id))
+        ready_crops = sum(1 for ready, _, _ in crop_states.values() if ready)
         
         embed.add_field(
             name="📊 Tổng quan",
@@ -321,13 +324,27 @@ class EmbedBuilder:
         
         return embed
     
+    @staticmethod
+    def format_leaderboard_value(user, board_type: str) -> str:
+        """Giá trị hiển thị của user trên một bảng xếp hạng"""
+        if board_type == "money":
+            return f"{user.money:,} coins"
+        elif board_type == "streak":
+            return f"{user.daily_streak} ngày"
+        elif board_type == "land":
+            return f"{user.land_slots} ô đất"
+        elif board_type == "maid":
+            return f"{getattr(user, 'maid_count', 0)} maid"
+        return "N/A"
+    
     @staticmethod
     def create_leaderboard_embed(users: List[User], board_type: str = "money") -> discord.Embed:
         """Create leaderboard embed"""
         title_map = {
             "money": "💰 Bảng xếp hạng Giàu có",
             "streak": "🔥 Bảng xếp hạng Streak",
-            "land": "🏞️ Bảng xếp hạng Đất đai"
+            "land": "🏞️ Bảng xếp hạng Đất đai",
+            "maid": "🎀 Bảng xếp hạng Maid"
         }
         
         embed = EmbedBuilder.create_base_embed(
@@ -344,15 +361,7 @@ class EmbedBuilder:
         
         for i, user in enumerate(users[:10]):
             rank = medals[i] if i < 3 else f"{i+1}."
-            
-            if board_type == "money":
-                value = f"{user.money:,} coins"
-            elif board_type == "streak":
-                value = f"{user.daily_streak} ngày"
-            elif board_type == "land":
-                value = f"{user.land_slots} ô đất"
-            else:
-                value = "N/A"
+            value = EmbedBuilder.format_leaderboard_value(user, board_type)
             
             leaderboard_text.append(f"{rank} **{user.username}** - {value}")
         
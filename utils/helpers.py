@@ -1,4 +1,5 @@
 import random
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 import config
@@ -62,8 +63,8 @@ def calculate_growth_time(crop_type: str, weather_modifier: float = 1.0, event_m
     
     return max(60, final_time)  # Minimum 1 minute
 
-def is_crop_ready(plant_time: datetime, crop_type: str, weather_modifier: float = 1.0, event_modifier: float = 1.0, user_id: int = None) -> bool:
-    """Check if crop is ready for harvest"""
+def get_final_growth_time(crop_type: str, weather_modifier: float = 1.0, event_modifier: float = 1.0, user_id: int = None) -> int:
+    """Growth time (seconds) used for readiness: maid buff first, then weather/event modifiers"""
     # 🔧 FIX: Sử dụng base growth time để tránh double modifier khi restart
     crop_config = config.CROPS.get(crop_type, {})
     base_growth_time = crop_config.get('growth_time', 300)
@@ -79,55 +80,37 @@ def is_crop_ready(plant_time: datetime, crop_type: str, weather_modifier: float
     # Apply weather/event modifiers sau khi đã có maid buff
     combined_modifier = weather_modifier * event_modifier
     final_growth_time = int(base_growth_time / combined_modifier)
-    final_growth_time = max(60, final_growth_time)  # Minimum 1 minute
+    return max(60, final_growth_time)  # Minimum 1 minute
+
+def calculate_ready_at(plant_time: datetime, growth_time: int) -> int:
+    """Epoch (seconds) at which a crop planted at plant_time becomes ready"""
+    return int(plant_time.timestamp()) + int(growth_time)
+
+def is_crop_ready(plant_time: datetime, crop_type: str, weather_modifier: float = 1.0, event_modifier: float = 1.0, user_id: int = None) -> bool:
+    """Check if crop is ready for harvest"""
+    final_growth_time = get_final_growth_time(crop_type, weather_modifier, event_modifier, user_id)
     
     elapsed_time = (datetime.now() - plant_time).total_seconds()
     return elapsed_time >= final_growth_time
 
 def get_crop_growth_progress(plant_time: datetime, crop_type: str, weather_modifier: float = 1.0, event_modifier: float = 1.0, user_id: int = None) -> float:
     """Get crop growth progress as percentage (0.0 - 1.0)"""
-    # 🔧 FIX: Sử dụng logic tương tự như is_crop_ready
-    crop_config = config.CROPS.get(crop_type, {})
-    base_growth_time = crop_config.get('growth_time', 300)
-    
-    # 🎀 Apply maid growth speed buff chỉ một lần
-    if user_id:
-        try:
-            from features.maid_helper import maid_helper
-            base_growth_time = maid_helper.apply_growth_speed_buff(user_id, base_growth_time)
-        except ImportError:
-            pass
-    
-    # Apply weather/event modifiers sau khi đã có maid buff
-    combined_modifier = weather_modifier * event_modifier
-    final_growth_time = int(base_growth_time / combined_modifier)
-    final_growth_time = max(60, final_growth_time)
+    final_growth_time = get_final_growth_time(crop_type, weather_modifier, event_modifier, user_id)
     
     elapsed_time = (datetime.now() - plant_time).total_seconds()
     return min(elapsed_time / final_growth_time, 1.0)
 
-def format_time_remaining(plant_time: datetime, crop_type: str, weather_modifier: float = 1.0, event_modifier: float = 1.0, user_id: int = None) -> str:
-    """Format remaining time for crop growth"""
-    # 🔧 FIX: Sử dụng logic tương tự như is_crop_ready
-    crop_config = config.CROPS.get(crop_type, {})
-    base_growth_time = crop_config.get('growth_time', 300)
-    
-    # 🎀 Apply maid growth speed buff chỉ một lần
-    if user_id:
-        try:
-            from features.maid_helper import maid_helper
-            base_growth_time = maid_helper.apply_growth_speed_buff(user_id, base_growth_time)
-        except ImportError:
-            pass
-    
-    # Apply weather/event modifiers sau khi đã có maid buff
-    combined_modifier = weather_modifier * event_modifier
-    final_growth_time = int(base_growth_time / combined_modifier)
-    final_growth_time = max(60, final_growth_time)
-    
-    elapsed_time = (datetime.now() - plant_time).total_seconds()
-    remaining_time = max(0, final_growth_time - elapsed_time)
-    
+def get_ready_at_progress(plant_time: datetime, ready_at: int, now: Optional[float] = None) -> float:
+    """Growth progress (0.0 - 1.0) from a precomputed ready_at epoch"""
+    now = time.time() if now is None else now
+    start = plant_time.timestamp()
+    total = ready_at - start
+    if total <= 0:
+        return 1.0
+    return max(0.0, min((now - start) / total, 1.0))
+
+def format_seconds_remaining(remaining_time: float) -> str:
+    """Format remaining seconds until harvest"""
     if remaining_time <= 0:
         return "Sẵn sàng thu hoạch!"
     
@@ -142,6 +125,13 @@ def format_time_remaining(plant_time: datetime, crop_type: str, weather_modifier
     else:
         return f"{seconds}s"
 
+def format_time_remaining(plant_time: datetime, crop_type: str, weather_modifier: float = 1.0, event_modifier: float = 1.0, user_id: int = None) -> str:
+    """Format remaining time for crop growth"""
+    final_growth_time = get_final_growth_time(crop_type, weather_modifier, event_modifier, user_id)
+    
+    elapsed_time = (datetime.now() - plant_time).total_seconds()
+    return format_seconds_remaining(max(0, final_growth_time - elapsed_time))
+
 def calculate_daily_reward(streak: int) -> int:
     """Calculate daily login reward based on streak"""
     base_reward = config.DAILY_REWARD_BASE
@@ -2,23 +2,30 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 import config
 from database.models import Species, UserLivestock, UserFacilities, LivestockProduct
+from utils.world_modifiers import world_modifiers
+
+def livestock_required_seconds(species_id: str, growth_modifier: float = 1.0,
+                               event_growth_modifier: float = 1.0) -> int:
+    """Số giây cần để trưởng thành (weather * event modifier, tối thiểu 5 phút)
+
+    Công thức duy nhất cho maturity, hiển thị và ready notifier.
+    """
+    all_species = {**config.FISH_SPECIES, **config.ANIMAL_SPECIES}
+
+    if species_id not in all_species:
+        base_growth_time = 3600  # Default 1 hour
+    else:
+        base_growth_time = all_species[species_id]['growth_time']
+
+    # Apply modifiers chỉ một lần (modifier cao = lớn nhanh)
+    combined_modifier = growth_modifier * event_growth_modifier
+    required_time = int(base_growth_time / combined_modifier)
+    return max(required_time, 300)  # Minimum 5 minutes
 
 def get_livestock_growth_time_with_modifiers(species_id: str, growth_modifier: float = 1.0, 
                                            event_growth_modifier: float = 1.0) -> int:
     """Calculate actual growth time with weather and event modifiers"""
-    # Get base species info
-    all_species = {**config.FISH_SPECIES, **config.ANIMAL_SPECIES}
-    
-    if species_id not in all_species:
-        return 3600  # Default 1 hour
-    
-    base_time = all_species[species_id]['growth_time']
-    
-    # Apply modifiers (lower modifier = faster growth)
-    modified_time = int(base_time / growth_modifier / event_growth_modifier)
-    
-    # Minimum 5 minutes
-    return max(modified_time, 300)
+    return livestock_required_seconds(species_id, growth_modifier, event_growth_modifier)
 
 def calculate_livestock_maturity(livestock: UserLivestock, growth_modifier: float = 1.0,
                                event_growth_modifier: float = 1.0) -> Tuple[bool, float]:
@@ -28,19 +35,7 @@ def calculate_livestock_maturity(livestock: UserLivestock, growth_modifier: floa
     """
     now = datetime.now()
     age = (now - livestock.birth_time).total_seconds()
-    
-    # 🔧 FIX: Lấy base growth time từ config để tránh double modifier
-    all_species = {**config.FISH_SPECIES, **config.ANIMAL_SPECIES}
-    
-    if livestock.species_id not in all_species:
-        base_growth_time = 3600  # Default 1 hour
-    else:
-        base_growth_time = all_species[livestock.species_id]['growth_time']
-    
-    # Apply modifiers chỉ một lần
-    combined_modifier = growth_modifier * event_growth_modifier
-    required_time = int(base_growth_time / combined_modifier)
-    required_time = max(required_time, 300)  # Minimum 5 minutes
+    required_time = livestock_required_seconds(livestock.species_id, growth_modifier, event_growth_modifier)
     
     growth_percentage = min(age / required_time * 100, 100)
     is_mature = age >= required_time
@@ -60,17 +55,7 @@ def get_livestock_display_info(livestock: UserLivestock, species: Species,
     if not is_mature:
         now = datetime.now()
         age = (now - livestock.birth_time).total_seconds()
-        
-        # 🔧 FIX: Sử dụng base growth time để tính chính xác
-        all_species = {**config.FISH_SPECIES, **config.ANIMAL_SPECIES}
-        if livestock.species_id in all_species:
-            base_growth_time = all_species[livestock.species_id]['growth_time']
-        else:
-            base_growth_time = 3600  # Default
-        
-        combined_modifier = growth_modifier * event_growth_modifier
-        required_time = int(base_growth_time / combined_modifier)
-        required_time = max(required_time, 300)
+        required_time = livestock_required_seconds(livestock.species_id, growth_modifier, event_growth_modifier)
         
         remaining_seconds = required_time - age
         
@@ -225,14 +210,7 @@ def calculate_livestock_value(base_price: int, weather_modifier: float = 1.0, ev
 
 def get_weather_modifier(bot, species_type: str) -> float:
     """Get current weather modifier for livestock"""
-    try:
-        weather_cog = bot.get_cog('WeatherCog')
-        if weather_cog:
-            current_weather, modifier = weather_cog.get_current_weather_modifier()
-            return get_livestock_weather_modifier(current_weather, species_type)
-    except:
-        pass
-    return 1.0
+    return get_livestock_weather_modifier(world_modifiers.current().weather_type, species_type)
 
 def is_livestock_mature_simple(birth_time: datetime, growth_time: int, modifier: float = 1.0) -> bool:
     """Calculate if livestock is mature based on birth time and growth time (simple version)"""
@@ -5,6 +5,8 @@ import json
 import os
 from datetime import datetime, timedelta
 
+from utils.world_modifiers import world_modifiers
+
 logger = logging.getLogger(__name__)
 
 class PricingCoordinator:
@@ -87,6 +89,7 @@ class PricingCoordinator:
             
             self.ai_price_adjustments[crop_type] = adjustment
             self._save_ai_adjustments()
+            world_modifiers.refresh()
             
             crop_name = config.CROPS[crop_type]['name']
             logger.info(f"🎀 Latina Price Adjustment: {crop_name} - Sell: {sell_price_modifier:.2f}x, Seed: {seed_price_modifier:.2f}x")
@@ -193,16 +196,15 @@ class PricingCoordinator:
                 modifiers['total_modifier'] = ai_sell_modifier
                 return max(1, final_price), modifiers
             
-            # Get weather modifier
-            weather_modifier = self._get_weather_modifier(bot)
+            # Weather / event / AI modifiers từ snapshot hiện tại
+            world = world_modifiers.current()
+            weather_modifier = world.weather_price
             modifiers['weather_modifier'] = weather_modifier
             
-            # Get event modifier
-            event_modifier = self._get_event_modifier(bot)
+            event_modifier = world.market_price_modifier
             modifiers['event_modifier'] = event_modifier
             
-            # Get AI modifier
-            ai_sell_modifier, _ = self.get_ai_price_modifier(crop_type)
+            ai_sell_modifier, _ = world.ai_modifier(crop_type)
             modifiers['ai_modifier'] = ai_sell_modifier
             
             # Calculate total modifier
@@ -223,112 +225,15 @@ class PricingCoordinator:
     
     def _get_weather_modifier(self, bot) -> float:
         """Get weather price modifier"""
-        try:
-            weather_cog = bot.get_cog('WeatherCog')
-            if not weather_cog:
-                return 1.0
-            
-            # Get current weather directly
-            current_weather = getattr(weather_cog, 'current_weather', 'sunny')
-            
-            # Weather price effects - affect market prices directly
-            weather_price_effects = {
-                'sunny': 1.15,    # +15% (high demand, premium quality crops)
-                'perfect': 1.25,  # +25% (perfect conditions, premium pricing)
-                'cloudy': 1.0,    # No change (normal market conditions)
-                'rainy': 1.1,     # +10% (good for growth, steady supply)
-                'stormy': 0.75    # -25% (poor conditions, damaged/lower quality crops)
-            }
-            
-            # Handle weather as string or dict
-            if isinstance(current_weather, dict):
-                weather_type = current_weather.get('type', 'sunny')
-            else:
-                weather_type = current_weather if current_weather else 'sunny'
-            
-            modifier = weather_price_effects.get(weather_type, 1.0)
-            logger.info(f"Weather modifier: {weather_type} -> {modifier:.2f}")
-            
-            return modifier
-            
-        except Exception as e:
-            logger.error(f"Error getting weather modifier: {e}")
-            return 1.0
+        return world_modifiers.current().weather_price
     
     def _get_event_modifier(self, bot) -> float:
         """Get event price modifier"""
-        try:
-            events_cog = bot.get_cog('EventsCog')
-            if not events_cog:
-                return 1.0
-            
-            effects = events_cog.get_current_event_effects()
-            
-            # Combine multiple event effects that affect pricing
-            price_modifier = 1.0
-            
-            # Direct price bonus from events
-            if 'price_bonus' in effects:
-                price_modifier *= effects['price_bonus']
-            
-            # Yield bonus affects market price (higher yield = lower unit price, but better profits)
-            # Convert yield bonus to subtle price effect
-            if 'yield_bonus' in effects:
-                yield_bonus = effects['yield_bonus']
-                # Higher yield = slightly lower market price due to supply increase
-                # But overall profit is still higher due to more quantity
-                if yield_bonus > 1.0:
-                    # Reduce price slightly due to increased supply, but not too much
-                    price_modifier *= (1.0 + (yield_bonus - 1.0) * 0.3)  # 30% of yield bonus affects price
-                elif yield_bonus < 1.0:
-                    # Lower yield = higher prices due to scarcity
-                    price_modifier *= (1.0 + (yield_bonus - 1.0) * 0.5)  # 50% of yield reduction affects price
-            
-            # Growth bonus can affect price (faster growth = more supply = slight price adjustment)
-            if 'growth_bonus' in effects:
-                growth_bonus = effects['growth_bonus']
-                if growth_bonus > 1.0:
-                    # Faster growth = more supply = slightly lower prices
-                    price_modifier *= (1.0 + (growth_bonus - 1.0) * 0.1)  # 10% of growth bonus affects price
-            
-            return price_modifier
-            
-        except Exception as e:
-            logger.error(f"Error getting event modifier: {e}")
-            return 1.0
+        return world_modifiers.current().market_price_modifier
     
     def get_seed_cost_modifier(self, bot) -> float:
         """Get seed cost modifier from events (legacy method)"""
-        try:
-            events_cog = bot.get_cog('EventsCog')
-            if not events_cog:
-                return 1.0
-            
-            effects = events_cog.get_current_event_effects()
-            
-            # Combine multiple effects that affect seed costs
-            seed_modifier = 1.0
-            
-            # Direct seed discount
-            if 'seed_discount' in effects:
-                seed_modifier *= effects['seed_discount']
-            
-            # Seed cost multiplier
-            if 'seed_cost_multiplier' in effects:
-                seed_modifier *= effects['seed_cost_multiplier']
-            
-            # Events with growth bonus might reduce seed costs slightly (government subsidies)
-            if 'growth_bonus' in effects:
-                growth_bonus = effects['growth_bonus']
-                if growth_bonus > 1.0:
-                    # Better growing conditions = slight seed discount (government support)
-                    seed_modifier *= (1.0 - (growth_bonus - 1.0) * 0.1)  # 10% of growth bonus as seed discount
-            
-            return max(0.1, seed_modifier)  # Minimum 10% of original cost
-            
-        except Exception as e:
-            logger.error(f"Error getting seed cost modifier: {e}")
-            return 1.0
+        return world_modifiers.current().market_seed_modifier
     
     def get_seed_cost_with_ai(self, crop_type: str, bot = None) -> Tuple[int, Dict[str, float]]:
         """
@@ -351,11 +256,14 @@ class PricingCoordinator:
             }
             
             # Get event modifier
-            event_modifier = self.get_seed_cost_modifier(bot) if bot else 1.0
+            if bot:
+                world = world_modifiers.current()
+                event_modifier = world.market_seed_modifier
+                _, ai_seed_modifier = world.ai_modifier(crop_type)
+            else:
+                event_modifier = 1.0
+                _, ai_seed_modifier = self.get_ai_price_modifier(crop_type)
             modifiers['event_modifier'] = event_modifier
-            
-            # Get AI seed modifier
-            _, ai_seed_modifier = self.get_ai_price_modifier(crop_type)
             modifiers['ai_modifier'] = ai_seed_modifier
             
             # Calculate total modifier
@@ -4,17 +4,15 @@ from utils.embeds import EmbedBuilder
 
 async def check_user_registered(bot, user_id: int):
     """Check if user is registered (exists in database)"""
-    user = await bot.db.get_user(user_id)
-    return user is not None
+    return await bot.db.is_user_registered(user_id)
 
 async def require_registration(bot, ctx):
     """
     Decorator function để yêu cầu user phải register trước
     Returns True nếu user đã register, False nếu chưa (và gửi thông báo)
     """
-    user = await bot.db.get_user(ctx.author.id)
-    
-    if not user:
+    # ⚡ Set user_id đã đăng ký trong RAM - không query DB mỗi command
+    if not await bot.db.is_user_registered(ctx.author.id):
         embed = EmbedBuilder.create_base_embed(
             "🚫 Cần đăng ký tài khoản!",
             f"Bạn cần đăng ký tài khoản trước khi sử dụng lệnh này.",
@@ -0,0 +1,208 @@
+"""
+World Modifiers - Snapshot bất biến của mọi modifier toàn server
+(thời tiết, sự kiện, điều chỉnh giá AI) cho farm, shop, pond, barn,
+livestock, pricing và embeds.
+
+Snapshot chỉ được tính lại khi trạng thái thế giới đổi: WeatherCog / EventsCog
+lưu hoặc load state (set_weather, start_event, sự kiện theo mùa / ngẫu nhiên,
+Gemini, admin reset) và PricingCoordinator.apply_ai_price_adjustment. Sự kiện / điều
+chỉnh giá AI hết hạn được xử lý qua valid_until: lần đọc đầu tiên sau mốc đó
+tự tính lại. Consumer chỉ gọi world_modifiers.current() - O(1), không
+get_cog() hay await trong vòng lặp.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from utils.enhanced_logging import get_bot_logger
+
+logger = get_bot_logger()
+
+# Ảnh hưởng của thời tiết lên giá bán nông sản
+WEATHER_PRICE_EFFECTS = {
+    'sunny': 1.15,    # +15% (high demand, premium quality crops)
+    'perfect': 1.25,  # +25% (perfect conditions, premium pricing)
+    'cloudy': 1.0,    # No change (normal market conditions)
+    'rainy': 1.1,     # +10% (good for growth, steady supply)
+    'stormy': 0.75    # -25% (poor conditions, damaged/lower quality crops)
+}
+
+_EMPTY = MappingProxyType({})
+
+
+def market_event_modifier(effects: Mapping) -> float:
+    """Modifier giá bán từ hiệu ứng sự kiện (price / yield / growth bonus)"""
+    price_modifier = 1.0
+
+    # Direct price bonus from events
+    if 'price_bonus' in effects:
+        price_modifier *= effects['price_bonus']
+
+    # Yield bonus: sản lượng cao = cung tăng = giá giảm nhẹ, sản lượng thấp = khan hiếm
+    if 'yield_bonus' in effects:
+        yield_bonus = effects['yield_bonus']
+        if yield_bonus > 1.0:
+            price_modifier *= (1.0 + (yield_bonus - 1.0) * 0.3)  # 30% of yield bonus affects price
+        elif yield_bonus < 1.0:
+            price_modifier *= (1.0 + (yield_bonus - 1.0) * 0.5)  # 50% of yield reduction affects price
+
+    # Growth bonus: cây lớn nhanh = cung tăng = điều chỉnh giá nhẹ
+    if 'growth_bonus' in effects:
+        growth_bonus = effects['growth_bonus']
+        if growth_bonus > 1.0:
+            price_modifier *= (1.0 + (growth_bonus - 1.0) * 0.1)  # 10% of growth bonus affects price
+
+    return price_modifier
+
+
+def seed_event_modifier(effects: Mapping) -> float:
+    """Modifier giá hạt giống từ hiệu ứng sự kiện (dùng cho market / pricing)"""
+    seed_modifier = 1.0
+
+    if 'seed_discount' in effects:
+        seed_modifier *= effects['seed_discount']
+
+    if 'seed_cost_multiplier' in effects:
+        seed_modifier *= effects['seed_cost_multiplier']
+
+    # Growth bonus -> trợ giá hạt giống nhẹ (government support)
+    if 'growth_bonus' in effects:
+        growth_bonus = effects['growth_bonus']
+        if growth_bonus > 1.0:
+            seed_modifier *= (1.0 - (growth_bonus - 1.0) * 0.1)  # 10% of growth bonus as seed discount
+
+    return max(0.1, seed_modifier)  # Minimum 10% of original cost
+
+
+@dataclass(frozen=True)
+class WorldModifiers:
+    """Một phiên bản bất biến của modifier toàn server"""
+    version: int = 0
+    # Thời tiết
+    weather_type: str = 'sunny'
+    weather_growth: float = 1.0
+    weather_yield: float = 1.0
+    weather_price: float = 1.0
+    # Sự kiện
+    event_name: Optional[str] = None
+    event_effects: Mapping[str, float] = field(default_factory=lambda: _EMPTY)
+    event_growth: float = 1.0
+    event_yield: float = 1.0
+    event_price: float = 1.0
+    event_seed_cost: float = 1.0          # EventsCog.get_current_seed_cost_modifier (shop)
+    market_price_modifier: float = 1.0    # market_event_modifier (pricing)
+    market_seed_modifier: float = 1.0     # seed_event_modifier (pricing)
+    # Điều chỉnh giá AI: crop_type -> (sell, seed)
+    ai_adjustments: Mapping[str, Tuple[float, float]] = field(default_factory=lambda: _EMPTY)
+    # Epoch hết hạn sớm nhất (sự kiện / điều chỉnh AI), None = không hết hạn
+    valid_until: Optional[float] = None
+
+    def ai_modifier(self, crop_type: str) -> Tuple[float, float]:
+        """(sell, seed) modifier AI của một loại cây"""
+        return self.ai_adjustments.get(crop_type, (1.0, 1.0))
+
+
+class WorldModifierService:
+    """Giữ snapshot WorldModifiers hiện tại và tính lại khi được báo thay đổi"""
+
+    def __init__(self):
+        self.bot = None
+        self._snapshot = WorldModifiers()
+
+    def init(self, bot):
+        """Gắn bot (cần để đọc WeatherCog / EventsCog)"""
+        self.bot = bot
+        self.refresh()
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def current(self) -> WorldModifiers:
+        """Snapshot hiện tại (tự tính lại nếu sự kiện / điều chỉnh AI đã hết hạn)"""
+        snapshot = self._snapshot
+        if snapshot.valid_until is not None and time.time() >= snapshot.valid_until:
+            snapshot = self.refresh()
+        return snapshot
+
+    def refresh(self) -> WorldModifiers:
+        """Tính lại snapshot từ WeatherCog / EventsCog / PricingCoordinator"""
+        try:
+            snapshot = self._compute(self._snapshot.version + 1)
+        except Exception as e:
+            logger.error(f"Error computing world modifiers: {e}")
+            return self._snapshot
+        self._snapshot = snapshot
+        return snapshot
+
+    def _compute(self, version: int) -> WorldModifiers:
+        from utils.pricing import pricing_coordinator
+
+        bot = self.bot
+        weather_cog = bot.get_cog('WeatherCog') if bot else None
+        events_cog = bot.get_cog('EventsCog') if bot else None
+
+        # Thời tiết
+        weather_type = 'sunny'
+        weather_growth = weather_yield = 1.0
+        if weather_cog:
+            current_weather = getattr(weather_cog, 'current_weather', None)
+            if isinstance(current_weather, dict):
+                current_weather = current_weather.get('type')
+            weather_type = current_weather or 'sunny'
+            try:
+                effects = weather_cog.get_weather_effects(weather_type)
+                weather_growth = effects.get('growth_modifier', 1.0)
+                weather_yield = effects.get('yield_modifier', 1.0)
+            except Exception as e:
+                logger.error(f"Error reading weather effects: {e}")
+
+        # Sự kiện
+        expiries = []
+        event_name = None
+        event_effects = {}
+        event_seed_cost = 1.0
+        if events_cog:
+            try:
+                event_effects = dict(events_cog.get_current_event_effects())
+                if hasattr(events_cog, 'get_current_seed_cost_modifier'):
+                    event_seed_cost = events_cog.get_current_seed_cost_modifier()
+            except Exception as e:
+                logger.error(f"Error reading event effects: {e}")
+            current_event = getattr(events_cog, 'current_event', None)
+            if current_event:
+                event_name = current_event.get('data', {}).get('name', 'Sự kiện đặc biệt')
+                event_end_time = getattr(events_cog, 'event_end_time', None)
+                if isinstance(event_end_time, datetime):
+                    expiries.append(event_end_time.timestamp())
+
+        # Điều chỉnh giá AI
+        pricing_coordinator.clear_expired_adjustments()
+        ai_adjustments = {}
+        for crop_type, adjustment in pricing_coordinator.ai_price_adjustments.items():
+            ai_adjustments[crop_type] = (adjustment['sell_price_modifier'], adjustment['seed_price_modifier'])
+            expiries.append(adjustment['expires_at'].timestamp())
+
+        return WorldModifiers(
+            version=version,
+            weather_type=weather_type,
+            weather_growth=weather_growth,
+            weather_yield=weather_yield,
+            weather_price=WEATHER_PRICE_EFFECTS.get(weather_type, 1.0),
+            event_name=event_name,
+            event_effects=MappingProxyType(event_effects),
+            event_growth=event_effects.get('growth_bonus', 1.0),
+            event_yield=event_effects.get('yield_bonus', 1.0),
+            event_price=event_effects.get('price_bonus', 1.0),
+            event_seed_cost=event_seed_cost,
+            market_price_modifier=market_event_modifier(event_effects),
+            market_seed_modifier=seed_event_modifier(event_effects),
+            ai_adjustments=MappingProxyType(ai_adjustments),
+            valid_until=min(expiries) if expiries else None,
+        )
+
+
+# Global instance
+world_modifiers = WorldModifierService()